@@ -8,6 +8,7 @@ import numpy as np
 from datetime import datetime
 import os
 from trading_bot import TechnicalIndicators, BacktestEngine
+import strategy_kernel as kernel
 
 class BalancedTradingStrategy:
     """Estrategia balanceada que detecta más oportunidades sin ser demasiado agresiva"""
@@ -31,6 +32,12 @@ class BalancedTradingStrategy:
         # Control de frecuencia de trading
         self.min_time_between_trades = 30  # segundos mínimos entre trades
         
+        # Umbrales y gestión de riesgo
+        self.buy_threshold = 2.5     # Umbral más alto
+        self.sell_threshold = 2.0
+        self.stop_loss_pct = 0.02    # 2%
+        self.take_profit_pct = 0.015  # 1.5%
+        
     def generate_signals(self, df):
         """Genera señales balanceadas"""
         signals = pd.DataFrame(index=df.index)
@@ -67,192 +74,100 @@ class BalancedTradingStrategy:
         signals['volatility'] = df['close'].rolling(window=20).std()
         signals['price_position'] = (df['close'] - bb_lower) / (bb_upper - bb_lower)
         
-        # Generar señales con control de calidad
-        for i in range(50, len(signals)):  # Empezar después de calcular todos los indicadores
-            
-            # Verificar tiempo mínimo entre trades
-            if self._time_filter_check(signals, i):
-                
-                # Calcular señales de entrada y salida
-                buy_score = self._calculate_buy_score(signals, i)
-                sell_score = self._calculate_sell_score(signals, i)
-                
-                current_position = signals['position'].iloc[i-1]
-                
-                if current_position == 0:  # Sin posición
-                    # Condiciones más selectivas para entrada
-                    if buy_score >= 2.5:  # Umbral más alto
-                        signals.loc[signals.index[i], 'signal'] = 1
-                        signals.loc[signals.index[i], 'position'] = 1
-                        signals.loc[signals.index[i], 'signal_strength'] = buy_score
-                        signals.loc[signals.index[i], 'signal_type'] = self._get_buy_reason(signals, i)
-                        self.last_trade_time = i
-                    else:
-                        signals.loc[signals.index[i], 'position'] = 0
-                        
-                else:  # Con posición
-                    # Verificar stop loss y take profit
-                    stop_loss = self._check_stop_loss(signals, i, stop_loss_pct=0.02)  # 2%
-                    take_profit = self._check_take_profit(signals, i, take_profit_pct=0.015)  # 1.5%
-                    
-                    # Salir por señales técnicas o gestión de riesgo
-                    if sell_score >= 2.0 or stop_loss or take_profit:
-                        signals.loc[signals.index[i], 'signal'] = -1
-                        signals.loc[signals.index[i], 'position'] = 0
-                        signals.loc[signals.index[i], 'signal_strength'] = sell_score
-                        
-                        exit_reason = []
-                        if stop_loss: exit_reason.append("STOP_LOSS")
-                        if take_profit: exit_reason.append("TAKE_PROFIT")
-                        if sell_score >= 2.0: exit_reason.append("TECHNICAL")
-                        
-                        signals.loc[signals.index[i], 'signal_type'] = f"SELL: {', '.join(exit_reason)}"
-                        self.last_trade_time = i
-                    else:
-                        signals.loc[signals.index[i], 'position'] = 1
+        # Puntuaciones sobre columnas completas y máquina de estados compilada
+        columns = self._kernel_columns(signals)
+        buy_score = kernel.evaluate_score(self._buy_score_spec(), columns)
+        sell_score = kernel.evaluate_score(self._sell_score_spec(), columns)
+        
+        result = kernel.run_state_machine(
+            columns['price'], buy_score, sell_score,
+            start=50,  # Empezar después de calcular todos los indicadores
+            buy_threshold=self.buy_threshold, sell_threshold=self.sell_threshold,
+            min_gap=self.min_time_between_trades, last_trade=self.last_trade_time,
+            stop_pct=self.stop_loss_pct, take_pct=self.take_profit_pct)
+        self.last_trade_time = result['last_trade']
+        
+        signal = result['signal']
+        signal_strength = np.zeros(len(signals))
+        signal_strength[signal == 1] = buy_score[signal == 1]
+        signal_strength[signal == -1] = sell_score[signal == -1]
+        
+        signal_type = [''] * len(signals)
+        for i in np.flatnonzero(signal):
+            if signal[i] == 1:
+                signal_type[i] = self._get_buy_reason(signals, i)
             else:
-                # Mantener posición anterior si no pasa el filtro de tiempo
-                signals.loc[signals.index[i], 'position'] = signals['position'].iloc[i-1]
+                reasons = result['reasons'][i]
+                exit_reason = []
+                if reasons & kernel.STOP_LOSS: exit_reason.append("STOP_LOSS")
+                if reasons & kernel.TAKE_PROFIT: exit_reason.append("TAKE_PROFIT")
+                if reasons & kernel.TECHNICAL: exit_reason.append("TECHNICAL")
+                signal_type[i] = f"SELL: {', '.join(exit_reason)}"
+        
+        signals['signal'] = signal
+        signals['position'] = result['position']
+        signals['signal_strength'] = signal_strength
+        signals['signal_type'] = signal_type
         
         return signals
     
-    def _time_filter_check(self, signals, i):
-        """Verifica si ha pasado suficiente tiempo desde el último trade"""
-        if self.last_trade_time is None:
-            return True
-        return (i - self.last_trade_time) >= self.min_time_between_trades
+    def _kernel_columns(self, signals):
+        """Columnas (actuales y previas) que usan las especificaciones de puntuación"""
+        columns = {name: signals[name].to_numpy(dtype=float) for name in
+                   ('price', 'rsi', 'rsi_fast', 'ma9', 'ma21', 'ma50', 'macd', 'macd_signal',
+                    'bb_upper', 'bb_lower', 'price_position', 'volatility')}
+        for name in ('rsi', 'ma9', 'ma21', 'macd', 'macd_signal'):
+            columns[f'{name}_prev'] = kernel.shifted(columns[name])
+        columns['recent_low'] = signals['price'].rolling(window=5).min().shift(1).to_numpy(dtype=float)
+        columns['recent_high'] = signals['price'].rolling(window=5).max().shift(1).to_numpy(dtype=float)
+        columns['avg_volatility'] = kernel.window_mean(columns['volatility'], 20)
+        return columns
     
-    def _calculate_buy_score(self, signals, i):
-        """Calcula puntuación de compra (0-5)"""
-        score = 0
-        
-        # RSI Conditions
-        rsi = signals['rsi'].iloc[i]
-        rsi_prev = signals['rsi'].iloc[i-1]
-        rsi_fast = signals['rsi_fast'].iloc[i]
-        
-        if rsi < self.rsi_strong_oversold:
-            score += 1.5  # Muy sobrevvendido
-        elif rsi < self.rsi_oversold and rsi_prev >= self.rsi_oversold:
-            score += 1.0  # Saliendo de sobreventa
-        elif rsi < self.rsi_oversold:
-            score += 0.5  # En sobreventa
-        
-        if rsi_fast < 25:
-            score += 0.5  # RSI rápido bajo
-        
-        # Moving Average Conditions
-        ma9 = signals['ma9'].iloc[i]
-        ma21 = signals['ma21'].iloc[i]
-        ma50 = signals['ma50'].iloc[i]
-        ma9_prev = signals['ma9'].iloc[i-1]
-        ma21_prev = signals['ma21'].iloc[i-1]
-        
-        if ma9 > ma21 and ma9_prev <= ma21_prev:
-            score += 1.0  # Golden cross
-        elif ma9 > ma21 > ma50:
-            score += 0.8  # Tendencia alcista fuerte
-        elif ma9 > ma21:
-            score += 0.3  # Tendencia alcista básica
-        
-        # MACD Conditions
-        macd = signals['macd'].iloc[i]
-        macd_signal = signals['macd_signal'].iloc[i]
-        macd_prev = signals['macd'].iloc[i-1]
-        macd_signal_prev = signals['macd_signal'].iloc[i-1]
-        
-        if macd > macd_signal and macd_prev <= macd_signal_prev:
-            score += 0.8  # MACD cross up
-        elif macd > macd_signal:
-            score += 0.3  # MACD above signal
-        
-        # Bollinger Bands
-        price = signals['price'].iloc[i]
-        bb_lower = signals['bb_lower'].iloc[i]
-        bb_middle = signals['bb_middle'].iloc[i]
-        price_position = signals['price_position'].iloc[i]
-        
-        if price <= bb_lower:
-            score += 0.8  # Precio en banda inferior
-        elif price_position < 0.3:
-            score += 0.4  # Precio en tercio inferior
-        
-        # Momentum y volatilidad
-        if i >= 5:
-            recent_low = signals['price'].iloc[i-5:i].min()
-            if price > recent_low * 1.001:  # Rebote del mínimo reciente
-                score += 0.3
-        
-        # Penalizar si ya hay mucha volatilidad
-        volatility = signals['volatility'].iloc[i]
-        avg_volatility = signals['volatility'].iloc[max(0, i-20):i].mean()
-        if volatility > avg_volatility * 1.5:
-            score -= 0.5  # Reducir score en alta volatilidad
-        
-        return score
+    def _buy_score_spec(self):
+        """Puntuación de compra (0-5)"""
+        return [
+            # RSI Conditions
+            [((('rsi', '<', self.rsi_strong_oversold),), 1.5),  # Muy sobrevendido
+             ((('rsi', '<', self.rsi_oversold), ('rsi_prev', '>=', self.rsi_oversold)), 1.0),  # Saliendo de sobreventa
+             ((('rsi', '<', self.rsi_oversold),), 0.5)],  # En sobreventa
+            [((('rsi_fast', '<', 25),), 0.5)],  # RSI rápido bajo
+            # Moving Average Conditions
+            [((('ma9', '>', 'ma21'), ('ma9_prev', '<=', 'ma21_prev')), 1.0),  # Golden cross
+             ((('ma9', '>', 'ma21'), ('ma21', '>', 'ma50')), 0.8),  # Tendencia alcista fuerte
+             ((('ma9', '>', 'ma21'),), 0.3)],  # Tendencia alcista básica
+            # MACD Conditions
+            [((('macd', '>', 'macd_signal'), ('macd_prev', '<=', 'macd_signal_prev')), 0.8),  # MACD cross up
+             ((('macd', '>', 'macd_signal'),), 0.3)],  # MACD above signal
+            # Bollinger Bands
+            [((('price', '<=', 'bb_lower'),), 0.8),  # Precio en banda inferior
+             ((('price_position', '<', 0.3),), 0.4)],  # Precio en tercio inferior
+            # Rebote del mínimo reciente
+            [((('price', '>', 'recent_low', 1.001),), 0.3)],
+            # Penalizar si ya hay mucha volatilidad
+            [((('volatility', '>', 'avg_volatility', 1.5),), -0.5)],
+        ]
     
-    def _calculate_sell_score(self, signals, i):
-        """Calcula puntuación de venta (0-5)"""
-        score = 0
-        
-        # RSI Conditions
-        rsi = signals['rsi'].iloc[i]
-        rsi_prev = signals['rsi'].iloc[i-1]
-        rsi_fast = signals['rsi_fast'].iloc[i]
-        
-        if rsi > self.rsi_strong_overbought:
-            score += 1.5  # Muy sobrecomprado
-        elif rsi > self.rsi_overbought and rsi_prev <= self.rsi_overbought:
-            score += 1.0  # Entrando en sobrecompra
-        elif rsi > self.rsi_overbought:
-            score += 0.5  # En sobrecompra
-        
-        if rsi_fast > 75:
-            score += 0.5  # RSI rápido alto
-        
-        # Moving Average Conditions
-        ma9 = signals['ma9'].iloc[i]
-        ma21 = signals['ma21'].iloc[i]
-        ma50 = signals['ma50'].iloc[i]
-        ma9_prev = signals['ma9'].iloc[i-1]
-        ma21_prev = signals['ma21'].iloc[i-1]
-        
-        if ma9 < ma21 and ma9_prev >= ma21_prev:
-            score += 1.0  # Death cross
-        elif ma9 < ma21 < ma50:
-            score += 0.8  # Tendencia bajista fuerte
-        elif ma9 < ma21:
-            score += 0.3  # Tendencia bajista básica
-        
-        # MACD Conditions
-        macd = signals['macd'].iloc[i]
-        macd_signal = signals['macd_signal'].iloc[i]
-        macd_prev = signals['macd'].iloc[i-1]
-        macd_signal_prev = signals['macd_signal'].iloc[i-1]
-        
-        if macd < macd_signal and macd_prev >= macd_signal_prev:
-            score += 0.8  # MACD cross down
-        elif macd < macd_signal:
-            score += 0.3  # MACD below signal
-        
-        # Bollinger Bands
-        price = signals['price'].iloc[i]
-        bb_upper = signals['bb_upper'].iloc[i]
-        bb_middle = signals['bb_middle'].iloc[i]
-        price_position = signals['price_position'].iloc[i]
-        
-        if price >= bb_upper:
-            score += 0.8  # Precio en banda superior
-        elif price_position > 0.7:
-            score += 0.4  # Precio en tercio superior
-        
-        # Momentum bajista
-        if i >= 5:
-            recent_high = signals['price'].iloc[i-5:i].max()
-            if price < recent_high * 0.999:  # Caída del máximo reciente
-                score += 0.3
-        
-        return score
+    def _sell_score_spec(self):
+        """Puntuación de venta (0-5)"""
+        return [
+            # RSI Conditions
+            [((('rsi', '>', self.rsi_strong_overbought),), 1.5),  # Muy sobrecomprado
+             ((('rsi', '>', self.rsi_overbought), ('rsi_prev', '<=', self.rsi_overbought)), 1.0),  # Entrando en sobrecompra
+             ((('rsi', '>', self.rsi_overbought),), 0.5)],  # En sobrecompra
+            [((('rsi_fast', '>', 75),), 0.5)],  # RSI rápido alto
+            # Moving Average Conditions
+            [((('ma9', '<', 'ma21'), ('ma9_prev', '>=', 'ma21_prev')), 1.0),  # Death cross
+             ((('ma9', '<', 'ma21'), ('ma21', '<', 'ma50')), 0.8),  # Tendencia bajista fuerte
+             ((('ma9', '<', 'ma21'),), 0.3)],  # Tendencia bajista básica
+            # MACD Conditions
+            [((('macd', '<', 'macd_signal'), ('macd_prev', '>=', 'macd_signal_prev')), 0.8),  # MACD cross down
+             ((('macd', '<', 'macd_signal'),), 0.3)],  # MACD below signal
+            # Bollinger Bands
+            [((('price', '>=', 'bb_upper'),), 0.8),  # Precio en banda superior
+             ((('price_position', '>', 0.7),), 0.4)],  # Precio en tercio superior
+            # Caída del máximo reciente
+            [((('price', '<', 'recent_high', 0.999),), 0.3)],
+        ]
     
     def _get_buy_reason(self, signals, i):
         """Identifica la razón principal de compra"""
@@ -280,28 +195,6 @@ class BalancedTradingStrategy:
             reasons.append("BB_SUPPORT")
         
         return f"BUY: {', '.join(reasons)}" if reasons else "BUY: MULTIPLE"
-    
-    def _check_stop_loss(self, signals, index, stop_loss_pct=0.02):
-        """Verifica stop loss"""
-        if signals['position'].iloc[index-1] == 1:
-            for j in range(index-1, -1, -1):
-                if signals['signal'].iloc[j] == 1:
-                    entry_price = signals['price'].iloc[j]
-                    current_price = signals['price'].iloc[index]
-                    loss_pct = (entry_price - current_price) / entry_price
-                    return loss_pct >= stop_loss_pct
-        return False
-    
-    def _check_take_profit(self, signals, index, take_profit_pct=0.015):
-        """Verifica take profit"""
-        if signals['position'].iloc[index-1] == 1:
-            for j in range(index-1, -1, -1):
-                if signals['signal'].iloc[j] == 1:
-                    entry_price = signals['price'].iloc[j]
-                    current_price = signals['price'].iloc[index]
-                    profit_pct = (current_price - entry_price) / entry_price
-                    return profit_pct >= take_profit_pct
-        return False
 
 class BalancedTradingBot:
     """Bot de Trading Balanceado"""
@@ -0,0 +1,247 @@
+"""
+Backtesting por lotes: todas las estrategias sobre todos los CSV
+Ejecuta el producto cartesiano (configuración de estrategia × archivo de datos)
+en un pool de procesos. Cada CSV se carga una sola vez en el proceso principal
+y se publica en memoria compartida; los workers reconstruyen el DataFrame sin
+volver a leer ni copiar el archivo por cada configuración. Los resultados se
+consolidan en una única tabla.
+"""
+
+import contextlib
+import glob
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Estrategias disponibles: nombre -> (módulo, clase de estrategia)
+# El motor de backtesting se toma del mismo módulo que la estrategia
+STRATEGIES = {
+    'original': ('trading_bot', 'TradingStrategy'),
+    'balanced': ('balanced_trading_bot', 'BalancedTradingStrategy'),
+    'optimized': ('optimized_trading_bot', 'OptimizedTradingStrategy'),
+    'hybrid': ('hybrid_fast_bot', 'HybridFastStrategy'),
+    'enhanced': ('enhanced_trading_bot', 'EnhancedTradingStrategy'),
+}
+
+# Columnas de la tabla consolidada (además de las de la configuración)
+RESULT_COLUMNS = ['initial_capital', 'final_capital', 'total_return_pct', 'total_trades',
+                  'winning_trades', 'losing_trades', 'win_rate_pct', 'avg_win_pct',
+                  'avg_loss_pct', 'total_commission']
+
+
+def load_csv(csv_file):
+    """Carga un CSV de velas igual que TradingBot.load_data"""
+    data = pd.read_csv(csv_file)
+    data['datetime'] = pd.to_datetime(data['datetime'])
+    data.set_index('datetime', inplace=True)
+    return data
+
+
+class SharedFrame:
+    """
+    DataFrame publicado en un bloque de memoria compartida.
+
+    Las columnas numéricas y el índice se copian una vez en el bloque; el
+    descriptor (pequeño y serializable) basta para reconstruir el DataFrame
+    en otro proceso. Las columnas no numéricas viajan dentro del descriptor.
+    """
+
+    def __init__(self, df):
+        numeric = [c for c in df.columns if df[c].dtype.kind in 'biuf']
+        arrays = [np.ascontiguousarray(df.index.asi8)] + [df[c].to_numpy() for c in numeric]
+        size = sum(a.nbytes for a in arrays)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+        layout = []
+        offset = 0
+        for name, array in zip([None] + numeric, arrays):
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf, offset=offset)
+            target[:] = array
+            layout.append((name, array.dtype.str, offset))
+            offset += array.nbytes
+
+        self.descriptor = {
+            'shm_name': self.shm.name,
+            'rows': len(df),
+            'layout': layout,
+            'index_name': df.index.name,
+            'index_dtype': str(df.index.dtype),
+            'columns': list(df.columns),
+            'other': {c: df[c].to_numpy() for c in df.columns if c not in numeric},
+        }
+
+    def close(self):
+        """Libera el bloque (solo desde el proceso que lo creó)"""
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_frame(descriptor):
+    """
+    Reconstruye el DataFrame de un SharedFrame.
+    Devuelve (DataFrame, SharedMemory); el bloque debe seguir abierto mientras
+    se use el DataFrame.
+    """
+    shm = shared_memory.SharedMemory(name=descriptor['shm_name'])
+    rows = descriptor['rows']
+    columns = {}
+    index = None
+    for name, dtype, offset in descriptor['layout']:
+        values = np.ndarray((rows,), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        if name is None:
+            index = pd.DatetimeIndex(values.view(descriptor['index_dtype']), name=descriptor['index_name'])
+        else:
+            columns[name] = values
+    columns.update(descriptor['other'])
+    df = pd.DataFrame({c: columns[c] for c in descriptor['columns']}, index=index, copy=False)
+    return df, shm
+
+
+# Estado de cada worker: DataFrames ya reconstruidos por archivo
+_worker_frames = {}
+_worker_shms = []
+
+
+def _init_worker(descriptors):
+    """Inicializador del pool: reconstruye cada archivo una sola vez por worker"""
+    for csv_file, descriptor in descriptors.items():
+        df, shm = attach_frame(descriptor)
+        _worker_frames[csv_file] = df
+        _worker_shms.append(shm)
+
+
+def run_single(config, csv_file, data):
+    """
+    Ejecuta una configuración sobre un DataFrame ya cargado.
+
+    Args:
+        config: dict con 'strategy' (clave de STRATEGIES) y opcionalmente
+            'name', 'params' (atributos de la estrategia), 'initial_capital'
+            y 'commission'
+        csv_file: archivo de origen (solo para la tabla)
+        data: DataFrame de velas
+
+    Returns:
+        dict: fila de la tabla consolidada
+    """
+    import importlib
+
+    module_name, class_name = STRATEGIES[config['strategy']]
+    module = importlib.import_module(module_name)
+    row = {
+        'config': config.get('name', config['strategy']),
+        'strategy': config['strategy'],
+        'params': repr(config.get('params', {})),
+        'file': os.path.basename(csv_file),
+        'rows': len(data),
+    }
+
+    start = time.perf_counter()
+    try:
+        strategy = getattr(module, class_name)()
+        for attr, value in config.get('params', {}).items():
+            setattr(strategy, attr, value)
+        engine = module.BacktestEngine(config.get('initial_capital', 1000),
+                                       config.get('commission', 0.001))
+        # Las estrategias informan por consola de cada señal: silenciar en lote
+        with contextlib.redirect_stdout(io.StringIO()):
+            signals = strategy.generate_signals(data)
+            results = engine.run_backtest(signals)
+        row['error'] = '' if results else 'Sin operaciones'
+        for column in RESULT_COLUMNS:
+            row[column] = results[column] if results else np.nan
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+        for column in RESULT_COLUMNS:
+            row[column] = np.nan
+    row['elapsed_s'] = time.perf_counter() - start
+    return row
+
+
+def _run_task(config, csv_file):
+    return run_single(config, csv_file, _worker_frames[csv_file])
+
+
+def run_batch(configs, csv_files, max_workers=None, output_file=None, callback=None):
+    """
+    Ejecuta todas las configuraciones sobre todos los archivos.
+
+    Args:
+        configs: lista de configuraciones (ver run_single)
+        csv_files: lista de rutas de CSV
+        max_workers: procesos del pool (por defecto núcleos disponibles)
+        output_file: CSV donde guardar la tabla consolidada (None = no guardar)
+        callback: función opcional para mensajes de progreso
+
+    Returns:
+        DataFrame con una fila por (configuración, archivo), en el orden del
+        producto cartesiano
+    """
+    log = callback or (lambda message: None)
+    start = time.perf_counter()
+
+    shared = {}
+    try:
+        for csv_file in csv_files:
+            try:
+                shared[csv_file] = SharedFrame(load_csv(csv_file))
+            except Exception as e:
+                log(f"❌ Error cargando {csv_file}: {e}")
+        log(f"✅ {len(shared)} archivos en memoria compartida")
+
+        tasks = [(c, f) for c in configs for f in csv_files if f in shared]
+        max_workers = max_workers or min(len(tasks), os.cpu_count() or 1) or 1
+        descriptors = {f: s.descriptor for f, s in shared.items()}
+        rows = [None] * len(tasks)
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(descriptors,)) as pool:
+            futures = {pool.submit(_run_task, c, f): i for i, (c, f) in enumerate(tasks)}
+            for done, future in enumerate(as_completed(futures), 1):
+                row = future.result()
+                rows[futures[future]] = row
+                status = row['error'] or f"{row['total_return_pct']:+.2f}%"
+                log(f"[{done}/{len(tasks)}] {row['config']} · {row['file']}: {status} ({row['elapsed_s']:.2f}s)")
+    finally:
+        for frame in shared.values():
+            frame.close()
+
+    table = pd.DataFrame(rows, columns=['config', 'strategy', 'params', 'file', 'rows']
+                         + RESULT_COLUMNS + ['elapsed_s', 'error'])
+    if output_file:
+        table.to_csv(output_file, index=False)
+        log(f"💾 Resultados guardados en: {output_file}")
+    log(f"⏱️ {len(tasks)} backtests en {time.perf_counter() - start:.1f}s con {max_workers} procesos")
+    return table
+
+
+def main():
+    """Evalúa todas las estrategias sobre todos los CSV de velas de la carpeta"""
+    configs = [{'strategy': name} for name in STRATEGIES]
+    # Ejemplo de variantes con parámetros propios:
+    # configs.append({'strategy': 'original', 'name': 'original_rsi25',
+    #                 'params': {'rsi_oversold': 25, 'rsi_overbought': 75}})
+
+    csv_files = sorted(glob.glob('binance_BNBUSDT_*.csv'))
+    if not csv_files:
+        print("❌ No se encontraron archivos binance_BNBUSDT_*.csv")
+        return
+
+    print(f"🚀 {len(configs)} configuraciones × {len(csv_files)} archivos")
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    table = run_batch(configs, csv_files, output_file=f'batch_results_{timestamp}.csv', callback=print)
+
+    print("\n" + "=" * 60)
+    print("📊 RESUMEN POR ESTRATEGIA (retorno medio %)")
+    print("=" * 60)
+    print(table.pivot_table(index='config', columns='file', values='total_return_pct').round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
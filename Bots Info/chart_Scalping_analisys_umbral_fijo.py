@@ -7,7 +7,13 @@ import matplotlib.pyplot as plt
 import mplfinance as mpf
 import requests
 import pandas as pd
-import talib  # pylint: disable=no-member
+import os
+import sys
+
+# Núcleo de análisis compartido con MAConvergenceBot (carpeta convergence-bot)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'convergence-bot'))
+from scalping_core import (procesar_indicadores, segmentar_ma, detectar_convergencias_ma,
+                           acumular_convergencias, filtrar_consecutivas, extremos_rsi, cruces_rsi_macd)
 
 # --- Parámetros de la interfaz ---
 SYMBOLS = ["BNBUSDT", "USDTARS"]
@@ -25,23 +31,6 @@ TIEMPO_OPTIONS = {
 }
 BINANCE_URL = "https://api.binance.com/api/v3/klines"
 
-"""Funciones para calcular indicadores técnicos usando TA-Lib."""
-def sma(values, window):
-    # TA-Lib SMA
-    return pd.Series(talib.SMA(values.values, timeperiod=window), index=values.index) # pylint: disable=no-member
-
-""" --- Indicadores técnicos con TA-Lib ---"""
-def rsi(values, window=14):
-    # TA-Lib espera un array numpy
-    return pd.Series(talib.RSI(values.values, timeperiod=window), index=values.index) # pylint: disable=no-member
-
-""" --- Indicadores técnicos con TA-Lib ---"""
-def macd(values, fast=12, slow=26, signal=9):
-    # TA-Lib MACD
-    macd_line, signal_line, _ = talib.MACD(values.values, fastperiod=fast, slowperiod=slow, signalperiod=signal) # pylint: disable=no-member
-    # Devuelve como pd.Series para mantener compatibilidad
-    return pd.Series(macd_line, index=values.index), pd.Series(signal_line, index=values.index)
-
 """ --- Obtener datos históricos de Binance ---"""
 def obtener_historico_binance(symbol, interval, limit=600):
     all_data = []
@@ -112,25 +101,10 @@ def obtener_historico_binance(symbol, interval, limit=600):
     print(f"Obtenidos {len(df)} registros de datos")  # Debug info
     return df
 
-""" --- Procesar indicadores y señales ---"""
-def procesar_indicadores(df):
-    df["MA3"] = sma(df["Close"], 3)
-    df["MA7"] = sma(df["Close"], 7)
-    df["MA14"] = sma(df["Close"], 14)
-    df["MA25"] = sma(df["Close"], 25)
-    df["MA50"] = sma(df["Close"], 50)
-    df["MA99"] = sma(df["Close"], 99)
-    df["RSI"] = rsi(df["Close"], 14)
-    df["MACD"], df["Signal"] = macd(df["Close"])
-    return df
-
-
-
 """ --- Función para calcular y mostrar líneas de tendencia de MA basadas en cambios de pendiente ---"""
 def calcular_lineas_tendencia_ma_individual(axes, df, periodo_ma, es_segunda_ma=False):
     """Calcula y muestra líneas de tendencia de una MA específica basadas en cambios significativos de pendiente con umbrales independientes"""
     import matplotlib.dates as mdates
-    import numpy as np
     
     # Seleccionar umbral específico según qué MA se está procesando
     umbral_actual = UMBRAL_MA2 if es_segunda_ma else UMBRAL_MA1
@@ -141,84 +115,8 @@ def calcular_lineas_tendencia_ma_individual(axes, df, periodo_ma, es_segunda_ma=
     elif not es_segunda_ma and not mostrar_lineas_tendencia_ma1.get():
         return []
     
-    ma_values = df[periodo_ma].dropna()
-    
-    if len(ma_values) < 10:  # Necesitamos suficientes datos
-        return []
-    
-    # Calcular pendientes móviles para detectar cambios
-    ventana = 3  # Ventana más pequeña para mayor sensibilidad
-    pendientes_locales = []
-    indices_validos = []
-    
-    for i in range(ventana, len(ma_values) - ventana):
-        # Calcular pendiente en una ventana pequeña alrededor del punto
-        inicio_idx = i - ventana // 2
-        fin_idx = i + ventana // 2
-        
-        x_window = np.arange(fin_idx - inicio_idx + 1)
-        y_window = ma_values.iloc[inicio_idx:fin_idx+1].values
-        
-        # Calcular pendiente usando regresión lineal
-        if len(x_window) > 1 and not np.any(np.isnan(y_window)):
-            pendiente = np.polyfit(x_window, y_window, 1)[0]
-            pendientes_locales.append(pendiente)
-            indices_validos.append(i)
-    
-    if len(pendientes_locales) < 3:
-        return []
-    
-    # Enfoque alternativo: dividir en segmentos de tamaño fijo y luego analizar cada uno
-    longitud_segmento = max(20, len(ma_values) // 10)  # Segmentos adaptativos
-    cambios_tendencia = [0]
-    
-    # Crear puntos de división cada cierto número de datos
-    for i in range(longitud_segmento, len(ma_values), longitud_segmento):
-        cambios_tendencia.append(i)
-    
-    # También agregar detección de cambios significativos
-    umbral_cambio = max(np.std(pendientes_locales) * 0.8, 0.00005)
-    
-    for i in range(1, len(pendientes_locales)):
-        cambio_pendiente = abs(pendientes_locales[i] - pendientes_locales[i-1])
-        cambio_direccion = (pendientes_locales[i-1] > 0 and pendientes_locales[i] < 0) or \
-                          (pendientes_locales[i-1] < 0 and pendientes_locales[i] > 0)
-        
-        if (cambio_pendiente > umbral_cambio or cambio_direccion) and indices_validos[i] not in cambios_tendencia:
-            cambios_tendencia.append(indices_validos[i])
-    
-    # Ordenar y eliminar duplicados
-    cambios_tendencia = sorted(list(set(cambios_tendencia)))
-    
-    cambios_tendencia.append(len(ma_values) - 1)  # Terminar al final
-    
-    # Crear segmentos de líneas de tendencia
-    segmentos_tendencia = []
-    for i in range(len(cambios_tendencia) - 1):
-        inicio_idx = cambios_tendencia[i]
-        fin_idx = cambios_tendencia[i + 1]
-        
-        if fin_idx > inicio_idx:
-            # Calcular pendiente del segmento completo
-            x_segment = np.arange(fin_idx - inicio_idx + 1)
-            y_segment = ma_values.iloc[inicio_idx:fin_idx+1].values
-            
-            if len(x_segment) > 1 and not np.any(np.isnan(y_segment)):
-                pendiente_segmento = np.polyfit(x_segment, y_segment, 1)[0]
-                
-                inicio_timestamp = ma_values.index[inicio_idx]
-                fin_timestamp = ma_values.index[fin_idx]
-                inicio_valor = ma_values.iloc[inicio_idx]
-                fin_valor = ma_values.iloc[fin_idx]
-                
-                segmentos_tendencia.append({
-                    'inicio_timestamp': inicio_timestamp,
-                    'fin_timestamp': fin_timestamp,
-                    'inicio_valor': inicio_valor,
-                    'fin_valor': fin_valor,
-                    'pendiente': pendiente_segmento,
-                    'longitud': fin_idx - inicio_idx + 1
-                })
+    # Segmentos rectos de la MA: cortes fijos más cambios significativos de pendiente
+    segmentos_tendencia = segmentar_ma(df[periodo_ma].dropna())
     
     # Dibujar las líneas de tendencia usando el umbral específico de esta MA
     for i, segmento in enumerate(segmentos_tendencia):
@@ -279,88 +177,8 @@ def marcar_convergencias_doble_ma_rsi(axes, df, segmentos_ma1, segmentos_ma2):
     if not (mostrar_ma.get() and mostrar_ma2.get()) or not segmentos_ma1 or not segmentos_ma2:
         return convergencias_persistentes  # Devolver las existentes si no hay condiciones
     
-    convergencias_detectadas = []
-    
-    # Función para obtener la tendencia en un timestamp específico
-    def obtener_tendencia_en_timestamp(segmentos, timestamp, es_ma2=False):
-        for segmento in segmentos:
-            if segmento['inicio_timestamp'] <= timestamp <= segmento['fin_timestamp']:
-                umbral_actual = UMBRAL_MA2 if es_ma2 else UMBRAL_MA1  # Usar umbral específico
-                if segmento['pendiente'] > umbral_actual:
-                    return 'alcista'
-                elif segmento['pendiente'] < -umbral_actual:
-                    return 'bajista'
-                else:
-                    return 'lateral'
-        return None
-    
-    # Función para detectar cambios de dirección en MA2
-    def detectar_cambios_direccion_ma2():
-        cambios = []
-        umbral_actual = UMBRAL_MA2  # Usar umbral específico para MA2
-        for i in range(1, len(segmentos_ma2)):
-            segmento_anterior = segmentos_ma2[i-1]
-            segmento_actual = segmentos_ma2[i]
-            
-            # Clasificar tendencias usando umbral específico de MA2
-            tend_anterior = 'alcista' if segmento_anterior['pendiente'] > umbral_actual else ('bajista' if segmento_anterior['pendiente'] < -umbral_actual else 'lateral')
-            tend_actual = 'alcista' if segmento_actual['pendiente'] > umbral_actual else ('bajista' if segmento_actual['pendiente'] < -umbral_actual else 'lateral')
-            
-            # Detectar cambios significativos
-            if (tend_anterior != 'bajista' and tend_actual == 'bajista') or \
-               (tend_anterior != 'alcista' and tend_actual == 'alcista'):
-                cambios.append({
-                    'timestamp': segmento_actual['inicio_timestamp'],
-                    'direccion_nueva': tend_actual,
-                    'direccion_anterior': tend_anterior
-                })
-        return cambios
-    
-    # Obtener cambios de dirección en MA2
-    cambios_ma2 = detectar_cambios_direccion_ma2()
-    
-    # Para cada cambio de dirección en MA2, verificar condiciones
-    for cambio in cambios_ma2:
-        timestamp = cambio['timestamp']
-        
-        # Verificar RSI en ese momento
-        try:
-            rsi_valor = df.loc[timestamp, 'RSI']
-        except KeyError:
-            # Si no hay dato exacto, buscar el más cercano
-            idx_cercano = df.index.get_indexer([timestamp], method='nearest')[0]
-            timestamp_cercano = df.index[idx_cercano]
-            rsi_valor = df.loc[timestamp_cercano, 'RSI']
-            timestamp = timestamp_cercano
-        
-        # Obtener tendencia de MA1 en ese momento (usar umbral específico MA1)
-        tendencia_ma1 = obtener_tendencia_en_timestamp(segmentos_ma1, timestamp, es_ma2=False)
-        
-        # CONDICIÓN 1: MA1 bajista + MA2 cambia a bajista (sin RSI)
-        if (tendencia_ma1 == 'bajista' and 
-            cambio['direccion_nueva'] == 'bajista'):
-            
-            convergencias_detectadas.append({
-                'timestamp': timestamp,
-                'tipo': 'VENTA_CONVERGENCIA',
-                'rsi': rsi_valor,
-                'ma1_tendencia': tendencia_ma1,
-                'ma2_cambio': cambio['direccion_nueva'],
-                'descripcion': 'MA1↘ + MA2→↘'
-            })
-        
-        # CONDICIÓN 2: MA1 alcista + MA2 cambia a alcista (sin RSI)
-        elif (tendencia_ma1 == 'alcista' and 
-              cambio['direccion_nueva'] == 'alcista'):
-            
-            convergencias_detectadas.append({
-                'timestamp': timestamp,
-                'tipo': 'COMPRA_CONVERGENCIA',
-                'rsi': rsi_valor,
-                'ma1_tendencia': tendencia_ma1,
-                'ma2_cambio': cambio['direccion_nueva'],
-                'descripcion': 'MA1↗ + MA2→↗'
-            })
+    # MA2 cambia de dirección hacia la misma tendencia que tiene MA1 en ese momento
+    convergencias_detectadas = detectar_convergencias_ma(df, segmentos_ma1, segmentos_ma2, UMBRAL_MA1, UMBRAL_MA2)
     
     # Análisis de pendientes para debugging
     if segmentos_ma1 or segmentos_ma2:
@@ -392,42 +210,10 @@ def marcar_convergencias_doble_ma_rsi(axes, df, segmentos_ma1, segmentos_ma2):
             print(f"  [-] Bajistas: {bajistas} ({bajistas/len(todas_pendientes)*100:.1f}%)")
             print(f"  ⚪ Laterales: {laterales} ({laterales/len(todas_pendientes)*100:.1f}%)")
     
-    # Sistema de convergencias persistentes con filtro de señales consecutivas
-    
-    # Agregar nuevas convergencias a la lista persistente (evitar duplicados)
-    for conv in convergencias_detectadas:
-        # Verificar si ya existe una convergencia muy cercana en tiempo (dentro de 5 segundos)
-        es_nueva = True
-        for conv_existente in convergencias_persistentes:
-            tiempo_diff = abs((conv['timestamp'] - conv_existente['timestamp']).total_seconds())
-            if tiempo_diff < 5 and conv['tipo'] == conv_existente['tipo']:
-                es_nueva = False
-                break
-        
-        # Solo agregar si es realmente nueva
-        if es_nueva:
-            convergencias_persistentes.append(conv)
-    
-    # Limpiar convergencias muy antiguas (más de 30 minutos)
-    tiempo_actual = df.index[-1]
-    convergencias_persistentes[:] = [
-        conv for conv in convergencias_persistentes 
-        if (tiempo_actual - conv['timestamp']).total_seconds() < 1800  # 30 minutos
-    ]
-    
-    # FILTRADO DE SEÑALES CONSECUTIVAS DEL MISMO TIPO
-    # Ordenar convergencias por tiempo para aplicar filtro correctamente
-    convergencias_ordenadas = sorted(convergencias_persistentes, key=lambda x: x['timestamp'])
-    
-    convergencias_filtradas = []
-    ultimo_tipo = None
-    
-    for conv in convergencias_ordenadas:
-        # Solo agregar si es diferente al tipo anterior (filtro de consecutivas)
-        if conv['tipo'] != ultimo_tipo:
-            convergencias_filtradas.append(conv)
-            ultimo_tipo = conv['tipo']
-        # Si es del mismo tipo que la anterior, se omite (filtrado)
+    # Sistema de convergencias persistentes (sin duplicados a menos de 5 s, máximo
+    # 30 minutos) con filtro de señales consecutivas del mismo tipo
+    acumular_convergencias(convergencias_persistentes, convergencias_detectadas, df.index[-1])
+    convergencias_filtradas = filtrar_consecutivas(convergencias_persistentes)
     
     # Dibujar las convergencias filtradas
     for conv in convergencias_filtradas:
@@ -486,68 +272,24 @@ def marcar_extremos_rsi(axes, df):
     if not mostrar_extremos_rsi.get():
         return
     
-    # Función para encontrar períodos continuos
-    def encontrar_periodos_continuos(mask):
-        """Encuentra períodos continuos donde la máscara es True"""
-        periodos = []
-        inicio = None
-        
-        for i, valor in enumerate(mask):
-            if valor and inicio is None:
-                # Comenzar un nuevo período
-                inicio = i
-            elif not valor and inicio is not None:
-                # Terminar el período actual
-                periodos.append((inicio, i-1))
-                inicio = None
-        
-        # Si el período continúa hasta el final
-        if inicio is not None:
-            periodos.append((inicio, len(mask)-1))
-        
-        return periodos
-    
-    # Encontrar períodos continuos de sobrecompra (RSI > 70)
-    sobrecompra_mask = df['RSI'] > 70
-    periodos_sobrecompra = encontrar_periodos_continuos(sobrecompra_mask.values)
-    
-    # Marcar el MÁXIMO valor durante cada período de sobrecompra
-    for inicio_idx, fin_idx in periodos_sobrecompra:
-        periodo_data = df.iloc[inicio_idx:fin_idx+1]
-        if len(periodo_data) > 0:
-            max_precio = periodo_data['Close'].max()
-            max_idx = periodo_data['Close'].idxmax()
-            max_date = mdates.date2num(max_idx)
-            
-            # Línea vertical roja para el máximo del período
-            axes[0].axvline(x=max_date, color='red', linestyle='-', linewidth=2, alpha=0.8)
-            
-            # Etiqueta con el valor máximo
-            axes[0].annotate(f'MAX: {max_precio:.4f}', 
-                            xy=(max_date, max_precio),
+    # Máximo de cada período continuo de sobrecompra (RSI > 70) y mínimo de
+    # cada período de sobreventa (RSI < 30)
+    for extremo in extremos_rsi(df):
+        fecha = mdates.date2num(extremo['timestamp'])
+        if extremo['tipo'] == 'MAX':
+            # Línea vertical roja y etiqueta con el valor máximo
+            axes[0].axvline(x=fecha, color='red', linestyle='-', linewidth=2, alpha=0.8)
+            axes[0].annotate(f'MAX: {extremo["precio"]:.4f}', 
+                            xy=(fecha, extremo['precio']),
                             xytext=(8, 15), textcoords='offset points',
                             bbox=dict(boxstyle='round,pad=0.3', facecolor='red', alpha=0.8),
                             fontsize=8, color='white', weight='bold',
                             arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0.1'))
-    
-    # Encontrar períodos continuos de sobreventa (RSI < 30)
-    sobreventa_mask = df['RSI'] < 30
-    periodos_sobreventa = encontrar_periodos_continuos(sobreventa_mask.values)
-    
-    # Marcar el MÍNIMO valor durante cada período de sobreventa
-    for inicio_idx, fin_idx in periodos_sobreventa:
-        periodo_data = df.iloc[inicio_idx:fin_idx+1]
-        if len(periodo_data) > 0:
-            min_precio = periodo_data['Close'].min()
-            min_idx = periodo_data['Close'].idxmin()
-            min_date = mdates.date2num(min_idx)
-            
-            # Línea vertical verde para el mínimo del período
-            axes[0].axvline(x=min_date, color='green', linestyle='-', linewidth=2, alpha=0.8)
-            
-            # Etiqueta con el valor mínimo
-            axes[0].annotate(f'MIN: {min_precio:.4f}', 
-                            xy=(min_date, min_precio),
+        else:
+            # Línea vertical verde y etiqueta con el valor mínimo
+            axes[0].axvline(x=fecha, color='green', linestyle='-', linewidth=2, alpha=0.8)
+            axes[0].annotate(f'MIN: {extremo["precio"]:.4f}', 
+                            xy=(fecha, extremo['precio']),
                             xytext=(8, -25), textcoords='offset points',
                             bbox=dict(boxstyle='round,pad=0.3', facecolor='green', alpha=0.8),
                             fontsize=8, color='white', weight='bold',
@@ -561,44 +303,8 @@ def marcar_convergencias_rsi_macd(axes, df):
     if not mostrar_convergencias_rsi_macd.get():
         return
     
-    convergencias = []
-    
-    # Detectar cruces entre MACD y línea de señal
-    macd_prev = df['MACD'].shift(1)
-    signal_prev = df['Signal'].shift(1)
-    
-    # Cruce alcista: MACD cruza SOBRE la línea de señal (de abajo hacia arriba)
-    # MACD anterior < Signal anterior Y MACD actual >= Signal actual
-    cruces_alcistas = (macd_prev < signal_prev) & (df['MACD'] >= df['Signal'])
-    
-    # Cruce bajista: MACD cruza DEBAJO de la línea de señal (de arriba hacia abajo)
-    # MACD anterior > Signal anterior Y MACD actual <= Signal actual
-    cruces_bajistas = (macd_prev > signal_prev) & (df['MACD'] <= df['Signal'])
-    
-    # Combinar todos los cruces
-    cruces_macd = cruces_alcistas | cruces_bajistas
-    
-    # Para cada cruce, verificar si RSI está en zona extrema
-    for idx in df[cruces_macd].index:
-        rsi_valor = df.loc[idx, 'RSI']
-        macd_valor = df.loc[idx, 'MACD']
-        signal_valor = df.loc[idx, 'Signal']
-        close_valor = df.loc[idx, 'Close']
-        
-        # Verificar si RSI está en zona extrema
-        if rsi_valor > 70 or rsi_valor < 30:
-            # Determinar tipo de cruce
-            es_cruce_alcista = cruces_alcistas[idx] if idx in cruces_alcistas.index else False
-            
-            convergencias.append({
-                'timestamp': idx,
-                'rsi': rsi_valor,
-                'macd': macd_valor,
-                'signal': signal_valor,
-                'close': close_valor,
-                'zona_rsi': 'sobrecompra' if rsi_valor > 70 else 'sobreventa',
-                'cruce_macd': 'alcista' if es_cruce_alcista else 'bajista'
-            })
+    # Cruces MACD/señal con el RSI en zona extrema (> 70 o < 30)
+    convergencias = cruces_rsi_macd(df)
     
     # Marcar las convergencias en todos los paneles
     for conv in convergencias:
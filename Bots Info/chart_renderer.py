@@ -0,0 +1,511 @@
+"""
+Renderizado de gráficos de scalping sin interfaz
+Dibuja el mismo gráfico de tres paneles que chart_scalping_backtest.py (velas
+con MAs y líneas de tendencia, RSI y MACD, con las convergencias MA marcadas)
+sobre el backend Agg, sin Tk ni pyplot, y lo guarda en PNG/SVG/PDF.
+
+render_batch recorre un rango de fechas de un CSV en ventanas (o una ventana
+centrada en cada convergencia) y las reparte entre procesos. El análisis
+(indicadores, segmentos y convergencias) se calcula una vez en el proceso
+principal sobre el histórico completo; los datos viajan en memoria compartida
+y cada worker crea una sola figura (PlantillaGrafico) que reutiliza para
+todas sus ventanas: solo cambian los datos de las líneas y las marcas.
+
+Las primitivas de dibujo (velas e histograma agregados por columna de píxeles
+y líneas de tendencia) las usa también la GUI de chart_scalping_backtest.py.
+"""
+
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import matplotlib.style as mplstyle
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+
+from batch_backtester import SharedFrame, attach_frame
+
+# Núcleo de análisis compartido con MAConvergenceBot (carpeta convergence-bot)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'convergence-bot'))
+from scalping_core import (procesar_indicadores, segmentar_ma, segmentos_en_rango, detectar_convergencias_ma,
+                           filtrar_consecutivas, extremos_rsi, cruces_rsi_macd)
+
+# Colores de las MAs (los mismos que la GUI)
+COLORES_MA1 = {"MA3": "magenta", "MA7": "red", "MA14": "cyan", "MA25": "orange", "MA50": "purple", "MA99": "blue"}
+COLORES_MA2 = {"MA3": "lightcoral", "MA7": "lightblue", "MA14": "lightyellow", "MA25": "lightgreen",
+               "MA50": "lightpink", "MA99": "lightgray"}
+
+# Configuración por defecto de render_batch
+CONFIG_DEFECTO = {
+    'ma1': 'MA7',
+    'ma2': 'MA25',
+    'umbral_ma1': 0.01,  # Mismos umbrales que chart_scalping_backtest.py
+    'umbral_ma2': 0.0002,
+    'ventana': 3600,  # Velas por gráfico (1 hora de velas de 1s)
+    'paso': None,  # Velas que avanza cada ventana (None = ventana, sin solape)
+    'modo': 'ventanas',  # 'ventanas' o 'convergencias' (una ventana centrada en cada una)
+    'formatos': ('png',),  # Cualquier combinación de 'png', 'svg' y 'pdf'
+    'dpi': 100,
+    'figsize': (18, 10),
+    'etiquetas': True,  # Etiquetas de las convergencias MA
+    'extremos_rsi': True,
+    'cruces_rsi_macd': True,
+}
+
+
+""" --- Primitivas de dibujo (compartidas con la GUI) ---"""
+def columnas_disponibles(ax):
+    """Columnas de píxeles del panel (ancho del eje en pantalla)"""
+    return max(int(ax.bbox.width), 1)
+
+def agrupar_lod(n, columnas):
+    """
+    Inicio de cada grupo de barras consecutivas para que haya como mucho
+    'columnas' grupos. Con menos barras que columnas cada barra es un grupo.
+    """
+    paso = max(1, -(-n // max(columnas, 1)))  # División hacia arriba
+    return np.arange(0, n, paso), paso
+
+def dibujar_velas_lod(ax, fechas, open_, high, low, close, colorup='g', colordown='r', columnas=None):
+    """
+    Dibuja velas OHLC como dos colecciones (mechas y cuerpos).
+    Si hay más velas que columnas de píxeles se agregan: apertura del primer
+    segundo, máximo y mínimo del grupo (envolvente) y cierre del último.
+    """
+    fechas = np.asarray(fechas, dtype=float)
+    n = len(fechas)
+    if n == 0:
+        return
+    inicios, paso = agrupar_lod(n, columnas or columnas_disponibles(ax))
+    finales = np.r_[inicios[1:], n] - 1
+    x = (fechas[inicios] + fechas[finales]) / 2
+    o = np.asarray(open_, dtype=float)[inicios]
+    c = np.asarray(close, dtype=float)[finales]
+    h = np.fmax.reduceat(np.asarray(high, dtype=float), inicios)
+    l = np.fmin.reduceat(np.asarray(low, dtype=float), inicios)
+
+    # Ancho: 80% del intervalo de cada grupo (como candlestick_ohlc)
+    intervalo = (fechas[1] - fechas[0]) if n > 1 else 0.001
+    mitad = intervalo * paso * 0.8 / 2
+    colores = np.where(c >= o, colorup, colordown)
+
+    mechas = np.stack([np.column_stack([x, l]), np.column_stack([x, h])], axis=1)
+    ax.add_collection(LineCollection(mechas, colors=colores, linewidths=0.5))
+    abajo = np.minimum(o, c)
+    arriba = np.maximum(o, c)
+    cuerpos = np.stack([np.column_stack([x - mitad, abajo]), np.column_stack([x - mitad, arriba]),
+                        np.column_stack([x + mitad, arriba]), np.column_stack([x + mitad, abajo])], axis=1)
+    ax.add_collection(PolyCollection(cuerpos, facecolors=colores, edgecolors=colores, linewidths=0.5))
+    ax.update_datalim(np.column_stack([np.r_[x - mitad, x + mitad], np.r_[l, h]]))
+    ax.autoscale_view()
+
+def dibujar_histograma_lod(ax, fechas, valores, alpha=0.5, label=None, columnas=None):
+    """
+    Histograma (p. ej. MACD - Signal) como una sola colección de barras.
+    Al agregar, cada grupo dibuja su envolvente: barra verde hasta el máximo
+    positivo y roja hasta el mínimo negativo.
+    """
+    fechas = np.asarray(fechas, dtype=float)
+    valores = np.asarray(valores, dtype=float)
+    n = len(fechas)
+    if n == 0:
+        return
+    inicios, paso = agrupar_lod(n, columnas or columnas_disponibles(ax))
+    finales = np.r_[inicios[1:], n] - 1
+    x = (fechas[inicios] + fechas[finales]) / 2
+    intervalo = (fechas[1] - fechas[0]) if n > 1 else 0.001
+    mitad = intervalo * paso * 0.8 / 2
+    with np.errstate(invalid='ignore'):
+        maximos = np.fmax.reduceat(valores, inicios)
+        minimos = np.fmin.reduceat(valores, inicios)
+
+    barras = []
+    colores = []
+    for extremos, color, valido in ((maximos, 'green', maximos >= 0), (minimos, 'red', minimos < 0)):
+        xs = x[valido]
+        ys = extremos[valido]
+        barras.append(np.stack([np.column_stack([xs - mitad, np.zeros_like(ys)]), np.column_stack([xs - mitad, ys]),
+                                np.column_stack([xs + mitad, ys]), np.column_stack([xs + mitad, np.zeros_like(ys)])], axis=1))
+        colores += [color] * len(xs)
+    barras = np.concatenate(barras)
+    if len(barras) == 0:
+        return
+    ax.add_collection(PolyCollection(barras, facecolors=colores, alpha=alpha, linewidths=0, label=label))
+    ax.update_datalim(barras.reshape(-1, 2))
+    ax.autoscale_view()
+
+def dibujar_segmentos_tendencia(ax, segmentos, umbral, x_min, x_max, es_segunda_ma=False):
+    """
+    Líneas de tendencia de una MA en una sola colección: verde/roja/amarilla
+    según la pendiente frente al umbral, recortadas al rango [x_min, x_max].
+    """
+    if not segmentos:
+        return
+    colores = ['lime' if segmento['pendiente'] > umbral  # Pendiente alcista significativa
+               else 'red' if segmento['pendiente'] < -umbral  # Pendiente bajista significativa
+               else 'yellow'  # Pendiente lateral/neutral
+               for segmento in segmentos]
+
+    lineas = []
+    for segmento in segmentos:
+        x0 = mdates.date2num(segmento['inicio_timestamp'])
+        x1 = mdates.date2num(segmento['fin_timestamp'])
+        y0 = segmento['inicio_valor']
+        y1 = segmento['fin_valor']
+        xs = np.clip([x0, x1], x_min, x_max)
+        ys = np.interp(xs, [x0, x1], [y0, y1]) if x1 > x0 else [y0, y1]
+        lineas.append(list(zip(xs, ys)))
+
+    # MA2 con puntos más densos, MA1 con guiones
+    linestyle, linewidth = (':', 2.5) if es_segunda_ma else ('--', 3)
+    ax.add_collection(LineCollection(lineas, colors=colores, linewidths=linewidth,
+                                     linestyles=linestyle, alpha=0.8))
+
+
+""" --- Carga de datos y análisis del histórico ---"""
+def cargar_csv(filepath):
+    """
+    Carga un CSV de velas con columnas Open/High/Low/Close (formato
+    datetime,open,high,low,close,... de binance_downloader o el de klines de
+    Binance con 'Close time') e índice temporal ordenado.
+    """
+    df = pd.read_csv(filepath)
+    if 'datetime' in df.columns:
+        df['datetime'] = pd.to_datetime(df['datetime'])
+        df = df.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'})
+        df.set_index('datetime', inplace=True)
+    elif 'Close time' in df.columns:
+        tiempos = df['Close time']
+        df['Close time'] = pd.to_datetime(tiempos, unit='ms') if tiempos.dtype.kind in 'if' else pd.to_datetime(tiempos)
+        df.set_index('Close time', inplace=True)
+    else:
+        raise ValueError(f"Formato de CSV no reconocido: {list(df.columns)}")
+
+    columnas = ['Open', 'High', 'Low', 'Close']
+    df = df[columnas].apply(pd.to_numeric, errors='coerce').astype(float)
+    return df.sort_index()
+
+def preparar_analisis(df, config):
+    """
+    Segmentos de las dos MAs y convergencias sobre el histórico completo
+    (df ya con indicadores). La longitud de los cortes fijos es la de una
+    ventana, igual que en la GUI.
+    """
+    longitud_segmento = max(20, config['ventana'] // 10)
+    segmentos_ma1 = segmentar_ma(df[config['ma1']].dropna(), longitud_segmento)
+    segmentos_ma2 = segmentar_ma(df[config['ma2']].dropna(), longitud_segmento)
+    return {
+        'segmentos_ma1': segmentos_ma1,
+        'segmentos_ma2': segmentos_ma2,
+        'convergencias': detectar_convergencias_ma(df, segmentos_ma1, segmentos_ma2,
+                                                   config['umbral_ma1'], config['umbral_ma2']),
+    }
+
+def ventanas_en_rango(indice, inicio, fin, ventana, paso=None):
+    """
+    Ventanas (posición inicial, posición final exclusiva) de 'ventana' filas
+    dentro de [inicio, fin], avanzando 'paso' filas (por defecto sin solape).
+    La última se alinea con el final del rango para no dejar datos fuera.
+    """
+    primero = indice.searchsorted(inicio, side='left') if inicio is not None else 0
+    ultimo = indice.searchsorted(fin, side='right') if fin is not None else len(indice)
+    if ultimo - primero <= ventana:
+        return [(primero, ultimo)] if ultimo > primero else []
+    paso = paso or ventana
+    inicios = list(range(primero, ultimo - ventana + 1, paso))
+    if inicios[-1] + ventana < ultimo:
+        inicios.append(ultimo - ventana)
+    return [(i, i + ventana) for i in inicios]
+
+def ventanas_convergencias(indice, convergencias, inicio, fin, ventana):
+    """Una ventana de 'ventana' filas centrada en cada convergencia de [inicio, fin]"""
+    ventanas = []
+    for conv in convergencias:
+        if (inicio is not None and conv['timestamp'] < inicio) or (fin is not None and conv['timestamp'] > fin):
+            continue
+        centro = indice.searchsorted(conv['timestamp'])
+        desde = min(max(centro - ventana // 2, 0), max(len(indice) - ventana, 0))
+        ventanas.append((desde, min(desde + ventana, len(indice))))
+    return ventanas
+
+
+""" --- Plantilla de figura reutilizable ---"""
+class PlantillaGrafico:
+    """
+    Figura de tres paneles (velas + MAs, RSI y MACD) creada una sola vez.
+
+    Los ejes, rejillas, leyendas, líneas de referencia y las líneas de las MAs,
+    RSI, MACD y señal son persistentes: en cada ventana solo se actualizan sus
+    datos y se quitan y vuelven a crear las marcas propias de la ventana
+    (velas, histograma, tendencias y convergencias).
+    """
+
+    def __init__(self, config):
+        self.config = config
+        with mplstyle.context('dark_background'):
+            self.fig = Figure(figsize=config['figsize'], dpi=config['dpi'])
+            FigureCanvasAgg(self.fig)
+            self.axes = self.fig.subplots(3, 1, sharex=True, gridspec_kw={'height_ratios': [2, 1, 1]})
+            ax_precio, ax_rsi, ax_macd = self.axes
+
+            self.linea_ma1, = ax_precio.plot([], [], color=COLORES_MA1.get(config['ma1'], 'purple'),
+                                             linewidth=1.5, label=config['ma1'], alpha=0.8)
+            self.linea_ma2, = ax_precio.plot([], [], color=COLORES_MA2.get(config['ma2'], 'lightgray'),
+                                             linewidth=1.5, label=config['ma2'], alpha=0.7)
+            ax_precio.legend(loc='upper left')
+            ax_precio.set_ylabel('Precio')
+
+            self.linea_rsi, = ax_rsi.plot([], [], color='blue', label='RSI')
+            ax_rsi.axhline(70, color='red', linestyle='--', alpha=0.7, label='Sobrecompra (70)')
+            ax_rsi.axhline(30, color='green', linestyle='--', alpha=0.7, label='Sobreventa (30)')
+            ax_rsi.axhspan(70, 100, alpha=0.1, color='red')
+            ax_rsi.axhspan(0, 30, alpha=0.1, color='green')
+            ax_rsi.set_title('RSI (Zonas extremas resaltadas)')
+            ax_rsi.set_ylabel('RSI')
+            ax_rsi.set_ylim(0, 100)
+            ax_rsi.legend(loc='upper left')
+
+            self.linea_macd, = ax_macd.plot([], [], color='white', label='MACD')
+            self.linea_signal, = ax_macd.plot([], [], color='orange', label='Signal')
+            ax_macd.axhline(0, color='grey', linestyle='--')
+            ax_macd.set_title('MACD')
+            ax_macd.set_ylabel('MACD')
+            ax_macd.legend(loc='upper left')
+
+            for ax in self.axes:
+                ax.grid(True, alpha=0.3)
+                ax.xaxis_date()
+                ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+            self.titulo_precio = ax_precio.set_title('')
+            self.titulo = self.fig.suptitle('')
+            # Márgenes fijos: tight_layout en cada ventana costaría más que el dibujo
+            self.fig.subplots_adjust(left=0.05, right=0.98, top=0.93, bottom=0.05, hspace=0.25)
+
+        self._persistentes = {id(artista) for ax in self.axes
+                              for artista in [*ax.lines, *ax.collections, *ax.patches, *ax.texts]}
+
+    def _limpiar(self):
+        """Quita las marcas de la ventana anterior (no los artistas persistentes)"""
+        for ax in self.axes:
+            for artista in [*ax.lines, *ax.collections, *ax.texts]:
+                if id(artista) not in self._persistentes:
+                    artista.remove()
+
+    def render(self, df, analisis, titulo=''):
+        """
+        Dibuja una ventana de datos (con indicadores) y devuelve el número de
+        convergencias MA marcadas.
+        """
+        config = self.config
+        with mplstyle.context('dark_background'):
+            self._limpiar()
+            ax_precio, ax_rsi, ax_macd = self.axes
+            fechas = mdates.date2num(df.index)
+            x_min, x_max = fechas[0], fechas[-1]
+            inicio, fin = df.index[0], df.index[-1]
+
+            # Panel 0: velas, MAs y líneas de tendencia
+            dibujar_velas_lod(ax_precio, fechas, df['Open'], df['High'], df['Low'], df['Close'])
+            self.linea_ma1.set_data(fechas, df[config['ma1']].to_numpy())
+            self.linea_ma2.set_data(fechas, df[config['ma2']].to_numpy())
+            dibujar_segmentos_tendencia(ax_precio, segmentos_en_rango(analisis['segmentos_ma1'], inicio, fin),
+                                        config['umbral_ma1'], x_min, x_max)
+            dibujar_segmentos_tendencia(ax_precio, segmentos_en_rango(analisis['segmentos_ma2'], inicio, fin),
+                                        config['umbral_ma2'], x_min, x_max, es_segunda_ma=True)
+            bajo = np.nanmin(df['Low'].to_numpy())
+            alto = np.nanmax(df['High'].to_numpy())
+            margen = (alto - bajo) * 0.05 or 1
+            ax_precio.set_ylim(bajo - margen, alto + margen)
+
+            # Panel 1: RSI
+            self.linea_rsi.set_data(fechas, df['RSI'].to_numpy())
+
+            # Panel 2: MACD, señal e histograma
+            macd = df['MACD'].to_numpy()
+            signal = df['Signal'].to_numpy()
+            self.linea_macd.set_data(fechas, macd)
+            self.linea_signal.set_data(fechas, signal)
+            dibujar_histograma_lod(ax_macd, fechas, macd - signal, alpha=0.5)
+            if np.isfinite(macd).any():
+                bajo = min(np.nanmin(macd), np.nanmin(signal), 0)
+                alto = max(np.nanmax(macd), np.nanmax(signal), 0)
+                margen = (alto - bajo) * 0.1 or 1
+                ax_macd.set_ylim(bajo - margen, alto + margen)
+
+            # Marcas de análisis: extremos RSI, cruces RSI+MACD y convergencias MA
+            if config['extremos_rsi']:
+                self._marcar_extremos(extremos_rsi(df))
+            if config['cruces_rsi_macd']:
+                self._marcar_cruces(cruces_rsi_macd(df))
+            convergencias = filtrar_consecutivas([conv for conv in analisis['convergencias']
+                                                  if inicio <= conv['timestamp'] <= fin])
+            self._marcar_convergencias(convergencias)
+
+            ax_precio.set_xlim(x_min, x_max)
+            self.titulo_precio.set_text(f"Velas ({len(convergencias)} Conv MA)")
+            self.titulo.set_text(titulo)
+        return len(convergencias)
+
+    def _marcar_extremos(self, extremos):
+        """Máximo (rojo) y mínimo (verde) de cada período de RSI extremo"""
+        ax = self.axes[0]
+        for tipo, color in (('MAX', 'red'), ('MIN', 'green')):
+            puntos = [extremo for extremo in extremos if extremo['tipo'] == tipo]
+            if puntos:
+                ax.vlines(mdates.date2num([p['timestamp'] for p in puntos]), 0, 1,
+                          transform=ax.get_xaxis_transform(), colors=color, linewidth=2, alpha=0.8)
+
+    def _marcar_cruces(self, cruces):
+        """Cruces MACD/señal con RSI extremo: rojo en sobrecompra, verde en sobreventa"""
+        for zona, color in (('sobrecompra', 'red'), ('sobreventa', 'green')):
+            for cruce, linestyle in (('alcista', '--'), ('bajista', ':')):
+                fechas = [c['timestamp'] for c in cruces if c['zona_rsi'] == zona and c['cruce_macd'] == cruce]
+                if not fechas:
+                    continue
+                for ax in self.axes:
+                    ax.vlines(mdates.date2num(fechas), 0, 1, transform=ax.get_xaxis_transform(),
+                              colors=color, linestyles=linestyle, linewidth=1.5, alpha=0.8)
+
+    def _marcar_convergencias(self, convergencias):
+        """Líneas verticales en los tres paneles y etiqueta con el precio de cada convergencia MA"""
+        for conv in convergencias:
+            fecha = mdates.date2num(conv['timestamp'])
+            compra = conv['tipo'] == 'COMPRA_CONVERGENCIA'
+            color = 'darkgreen' if compra else 'darkred'
+            for ax in self.axes:
+                ax.axvline(x=fecha, color=color, linestyle='-', linewidth=4, alpha=0.9)
+            if self.config['etiquetas']:
+                simbolo, flecha = ('BUY', '^') if compra else ('SELL', 'v')
+                self.axes[0].annotate(f'{simbolo} CONVERGENCIA MA {flecha}\n${conv["close"]:.4f}\n{conv["descripcion"]}',
+                                      xy=(fecha, conv['close']),
+                                      xytext=(20, 40 if compra else -60), textcoords='offset points',
+                                      bbox=dict(boxstyle='round,pad=0.6', facecolor=color, alpha=0.95,
+                                                edgecolor='white', linewidth=2),
+                                      fontsize=10, color='white', weight='bold', ha='center',
+                                      arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0.2',
+                                                      color=color, lw=2))
+
+    def guardar(self, ruta_base):
+        """Guarda la figura en cada formato configurado; devuelve las rutas"""
+        rutas = []
+        for formato in self.config['formatos']:
+            ruta = f"{ruta_base}.{formato}"
+            self.fig.savefig(ruta, format=formato, dpi=self.config['dpi'], facecolor=self.fig.get_facecolor())
+            rutas.append(ruta)
+        return rutas
+
+
+""" --- Renderizado por lotes en procesos ---"""
+# Estado de cada worker (se inicializa una vez por proceso)
+_worker = {}
+
+def _init_worker(descriptor, analisis, config, output_dir, prefijo):
+    df, shm = attach_frame(descriptor)
+    _worker.update(df=df, shm=shm, analisis=analisis, config=config,
+                   output_dir=output_dir, prefijo=prefijo, plantilla=PlantillaGrafico(config))
+
+def _render_ventana(tarea):
+    """Dibuja y guarda una ventana (numero, posición inicial, posición final)"""
+    numero, desde, hasta = tarea
+    t0 = time.perf_counter()
+    df = _worker['df'].iloc[desde:hasta]
+    config = _worker['config']
+    inicio, fin = df.index[0], df.index[-1]
+    titulo = (f"{_worker['prefijo']} | {inicio:%Y-%m-%d %H:%M:%S} → {fin:%H:%M:%S} | "
+              f"MA1: {config['umbral_ma1']}, MA2: {config['umbral_ma2']}")
+    convergencias = _worker['plantilla'].render(df, _worker['analisis'], titulo)
+    ruta_base = os.path.join(_worker['output_dir'], f"{_worker['prefijo']}_{numero:04d}_{inicio:%Y%m%d_%H%M%S}")
+    rutas = _worker['plantilla'].guardar(ruta_base)
+    return {
+        'ventana': numero,
+        'inicio': inicio,
+        'fin': fin,
+        'velas': len(df),
+        'convergencias': convergencias,
+        'archivos': ';'.join(os.path.basename(ruta) for ruta in rutas),
+        'segundos': time.perf_counter() - t0,
+    }
+
+def render_batch(csv_file, inicio=None, fin=None, config=None, output_dir='graficos',
+                 max_workers=None, callback=None):
+    """
+    Genera los gráficos de todas las ventanas de un rango de fechas.
+
+    Args:
+        csv_file: CSV de velas (ver cargar_csv)
+        inicio, fin: rango de fechas (str o Timestamp; None = todo el archivo)
+        config: cambios sobre CONFIG_DEFECTO (MAs, umbrales, ventana, paso,
+            modo, formatos, dpi, figsize, etiquetas...)
+        output_dir: carpeta de salida (se crea si no existe)
+        max_workers: procesos del pool (por defecto núcleos disponibles)
+        callback: función opcional para mensajes de progreso
+
+    Returns:
+        DataFrame con una fila por gráfico (también se guarda como
+        indice_graficos.csv en output_dir)
+    """
+    log = callback or (lambda message: None)
+    start = time.perf_counter()
+    config = {**CONFIG_DEFECTO, **(config or {})}
+    inicio = pd.Timestamp(inicio) if inicio is not None else None
+    fin = pd.Timestamp(fin) if fin is not None else None
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Indicadores y análisis una sola vez sobre el histórico completo
+    df = procesar_indicadores(cargar_csv(csv_file))
+    analisis = preparar_analisis(df, config)
+    if config['modo'] == 'convergencias':
+        ventanas = ventanas_convergencias(df.index, analisis['convergencias'], inicio, fin, config['ventana'])
+    else:
+        ventanas = ventanas_en_rango(df.index, inicio, fin, config['ventana'], config['paso'])
+    tareas = [(numero, desde, hasta) for numero, (desde, hasta) in enumerate(ventanas, 1)]
+    log(f"✅ {len(df)} velas, {len(analisis['convergencias'])} convergencias, {len(tareas)} gráficos "
+        f"(análisis en {time.perf_counter() - start:.1f}s)")
+
+    filas = []
+    if tareas:
+        prefijo = os.path.splitext(os.path.basename(csv_file))[0]
+        max_workers = max_workers or min(len(tareas), os.cpu_count() or 1)
+        compartido = SharedFrame(df)
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(compartido.descriptor, analisis, config, output_dir, prefijo)) as pool:
+                # Lotes grandes: cada worker reutiliza su figura en muchas ventanas seguidas
+                chunksize = max(1, len(tareas) // (max_workers * 4))
+                for hechas, fila in enumerate(pool.map(_render_ventana, tareas, chunksize=chunksize), 1):
+                    filas.append(fila)
+                    log(f"[{hechas}/{len(tareas)}] {fila['inicio']:%Y-%m-%d %H:%M:%S}: "
+                        f"{fila['convergencias']} convergencias → {fila['archivos']} ({fila['segundos']:.2f}s)")
+        finally:
+            compartido.close()
+
+    tabla = pd.DataFrame(filas, columns=['ventana', 'inicio', 'fin', 'velas', 'convergencias', 'archivos', 'segundos'])
+    tabla.to_csv(os.path.join(output_dir, 'indice_graficos.csv'), index=False)
+    log(f"⏱️ {len(tabla)} gráficos en {time.perf_counter() - start:.1f}s con {max_workers or 0} procesos")
+    return tabla
+
+
+def main():
+    """Un gráfico PNG por cada convergencia MA del CSV de 1s más reciente de la carpeta"""
+    csv_files = sorted(glob.glob('binance_BNBUSDT_1s_*.csv'))
+    if not csv_files:
+        print("❌ No se encontraron archivos binance_BNBUSDT_1s_*.csv")
+        return
+
+    csv_file = csv_files[-1]
+    print(f"📁 Usando archivo: {os.path.basename(csv_file)}")
+    output_dir = f"graficos_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    tabla = render_batch(csv_file, config={'modo': 'convergencias', 'ventana': 600},
+                         output_dir=output_dir, callback=print)
+    print(f"💾 {len(tabla)} gráficos guardados en: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
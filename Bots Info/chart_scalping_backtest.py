@@ -1,13 +1,22 @@
 """Modulo generador de gráficos para scalping, usando datos CSV y TA-Lib para indicadores técnicos.
 Configurado para análisis de datos históricos desde archivos CSV."""
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, filedialog, messagebox
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
 import mplfinance as mpf
 import pandas as pd
-import talib  # pylint: disable=no-member
 import os
+import sys
+
+# Núcleo de análisis compartido con MAConvergenceBot (carpeta convergence-bot)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'convergence-bot'))
+from scalping_core import (procesar_indicadores, segmentar_ma, segmentos_en_rango,
+                           detectar_convergencias_ma, acumular_convergencias, filtrar_consecutivas,
+                           extremos_rsi, cruces_rsi_macd)
+# Primitivas de dibujo compartidas con el renderizado por lotes sin interfaz
+from chart_renderer import dibujar_velas_lod, dibujar_histograma_lod, dibujar_segmentos_tendencia
 
 # --- Parámetros de la interfaz ---
 SYMBOLS = ["BNBUSDT", "USDTARS"]
@@ -25,26 +34,10 @@ TIEMPO_OPTIONS = {
 }
 BINANCE_URL = "https://api.binance.com/api/v3/klines"
 
-"""Funciones para calcular indicadores técnicos usando TA-Lib."""
-def sma(values, window):
-    # TA-Lib SMA
-    return pd.Series(talib.SMA(values.values, timeperiod=window), index=values.index) # pylint: disable=no-member
-
-""" --- Indicadores técnicos con TA-Lib ---"""
-def rsi(values, window=14):
-    # TA-Lib espera un array numpy
-    return pd.Series(talib.RSI(values.values, timeperiod=window), index=values.index) # pylint: disable=no-member
-
-""" --- Indicadores técnicos con TA-Lib ---"""
-def macd(values, fast=12, slow=26, signal=9):
-    # TA-Lib MACD
-    macd_line, signal_line, _ = talib.MACD(values.values, fastperiod=fast, slowperiod=slow, signalperiod=signal) # pylint: disable=no-member
-    # Devuelve como pd.Series para mantener compatibilidad
-    return pd.Series(macd_line, index=values.index), pd.Series(signal_line, index=values.index)
-
 """ --- Variable global para archivo CSV seleccionado ---"""
 archivo_csv_seleccionado = None
 df_completo = None  # DataFrame completo cargado
+df_indicadores = None  # df_completo con indicadores (se calcula una vez por archivo)
 fecha_inicio_datos = None
 fecha_fin_datos = None
 total_registros = 0
@@ -131,6 +124,7 @@ def cargar_datos_csv(filepath, limit=None):
         if limit is None:
             global df_completo, fecha_inicio_datos, fecha_fin_datos, total_registros
             df_completo = df_compatible.copy()
+            preparar_historico(df_completo)
             fecha_inicio_datos = df_compatible.index[0]
             fecha_fin_datos = df_compatible.index[-1]
             total_registros = len(df_compatible)
@@ -152,7 +146,8 @@ def obtener_historico_binance(symbol, interval, limit=600):
     if archivo_csv_seleccionado and os.path.exists(archivo_csv_seleccionado):
         # Si es la primera carga, cargar todo el archivo
         if df_completo is None:
-            return cargar_datos_csv(archivo_csv_seleccionado, limit=None)
+            cargar_datos_csv(archivo_csv_seleccionado, limit=None)
+            return df_indicadores
         else:
             # Si ya tenemos datos cargados, usar la función de posición
             df_subset = obtener_datos_por_posicion()
@@ -165,25 +160,43 @@ def obtener_historico_binance(symbol, interval, limit=600):
         # Si no hay archivo seleccionado, mostrar mensaje
         raise Exception("No hay archivo CSV seleccionado. Por favor selecciona un archivo primero.")
 
-""" --- Procesar indicadores y señales ---"""
-def procesar_indicadores(df):
-    df["MA3"] = sma(df["Close"], 3)
-    df["MA7"] = sma(df["Close"], 7)
-    df["MA14"] = sma(df["Close"], 14)
-    df["MA25"] = sma(df["Close"], 25)
-    df["MA50"] = sma(df["Close"], 50)
-    df["MA99"] = sma(df["Close"], 99)
-    df["RSI"] = rsi(df["Close"], 14)
-    df["MACD"], df["Signal"] = macd(df["Close"])
-    return df
+def con_indicadores(df):
+    """Devuelve df con indicadores: los cortes de df_indicadores ya los traen"""
+    if "MACD" in df.columns:
+        return df
+    return procesar_indicadores(df)
+
+""" --- Caché del análisis sobre el histórico completo ---"""
+# Los indicadores, segmentos de tendencia y convergencias se calculan una vez
+# sobre todo el archivo; cada posición del slider solo toma un corte. Así
+# tampoco aparecen los NaN de calentamiento al borde izquierdo de la ventana.
+_cache_segmentos = {}  # (columna MA, longitud de segmento) -> segmentos
+_cache_convergencias = {}  # (columna MA1, columna MA2, longitud) -> convergencias
 
+def preparar_historico(df):
+    """Calcula los indicadores del histórico completo y vacía las cachés"""
+    global df_indicadores
+    df_indicadores = procesar_indicadores(df.copy())
+    _cache_segmentos.clear()
+    _cache_convergencias.clear()
 
 
+
+def longitud_segmento_ventana():
+    """Longitud de los cortes fijos: la que tendría la ventana de tiempo seleccionada"""
+    return max(20, TIEMPO_OPTIONS[tiempo_var.get()] // 10)
+
+def segmentos_historicos(periodo_ma, longitud_segmento=None):
+    """Segmentos de una MA sobre el histórico completo (calculados una sola vez)"""
+    clave = (periodo_ma, longitud_segmento or longitud_segmento_ventana())
+    if clave not in _cache_segmentos:
+        _cache_segmentos[clave] = segmentar_ma(df_indicadores[periodo_ma].dropna(), clave[1])
+    return _cache_segmentos[clave]
+
 """ --- Función para calcular y mostrar líneas de tendencia de MA basadas en cambios de pendiente ---"""
 def calcular_lineas_tendencia_ma_individual(axes, df, periodo_ma, es_segunda_ma=False):
     """Calcula y muestra líneas de tendencia de una MA específica basadas en cambios significativos de pendiente con umbrales independientes"""
     import matplotlib.dates as mdates
-    import numpy as np
     
     # Seleccionar umbral específico según qué MA se está procesando
     umbral_actual = UMBRAL_MA2 if es_segunda_ma else UMBRAL_MA1
@@ -194,112 +207,19 @@ def calcular_lineas_tendencia_ma_individual(axes, df, periodo_ma, es_segunda_ma=
     elif not es_segunda_ma and not mostrar_lineas_tendencia_ma1.get():
         return []
     
-    ma_values = df[periodo_ma].dropna()
-    
-    if len(ma_values) < 10:  # Necesitamos suficientes datos
-        return []
-    
-    # Calcular pendientes móviles para detectar cambios
-    ventana = 3  # Ventana más pequeña para mayor sensibilidad
-    pendientes_locales = []
-    indices_validos = []
-    
-    for i in range(ventana, len(ma_values) - ventana):
-        # Calcular pendiente en una ventana pequeña alrededor del punto
-        inicio_idx = i - ventana // 2
-        fin_idx = i + ventana // 2
-        
-        x_window = np.arange(fin_idx - inicio_idx + 1)
-        y_window = ma_values.iloc[inicio_idx:fin_idx+1].values
-        
-        # Calcular pendiente usando regresión lineal
-        if len(x_window) > 1 and not np.any(np.isnan(y_window)):
-            pendiente = np.polyfit(x_window, y_window, 1)[0]
-            pendientes_locales.append(pendiente)
-            indices_validos.append(i)
+    if df_indicadores is not None and df.index[0] in df_indicadores.index:
+        # Ventana del histórico cargado: segmentos ya calculados sobre el archivo completo
+        segmentos_tendencia = segmentos_en_rango(segmentos_historicos(periodo_ma), df.index[0], df.index[-1])
+    else:
+        segmentos_tendencia = segmentar_ma(df[periodo_ma].dropna())
     
-    if len(pendientes_locales) < 3:
+    if not segmentos_tendencia:
         return []
     
-    # Enfoque alternativo: dividir en segmentos de tamaño fijo y luego analizar cada uno
-    longitud_segmento = max(20, len(ma_values) // 10)  # Segmentos adaptativos
-    cambios_tendencia = [0]
-    
-    # Crear puntos de división cada cierto número de datos
-    for i in range(longitud_segmento, len(ma_values), longitud_segmento):
-        cambios_tendencia.append(i)
-    
-    # También agregar detección de cambios significativos
-    umbral_cambio = max(np.std(pendientes_locales) * 0.8, 0.00005)
-    
-    for i in range(1, len(pendientes_locales)):
-        cambio_pendiente = abs(pendientes_locales[i] - pendientes_locales[i-1])
-        cambio_direccion = (pendientes_locales[i-1] > 0 and pendientes_locales[i] < 0) or \
-                          (pendientes_locales[i-1] < 0 and pendientes_locales[i] > 0)
-        
-        if (cambio_pendiente > umbral_cambio or cambio_direccion) and indices_validos[i] not in cambios_tendencia:
-            cambios_tendencia.append(indices_validos[i])
-    
-    # Ordenar y eliminar duplicados
-    cambios_tendencia = sorted(list(set(cambios_tendencia)))
-    
-    cambios_tendencia.append(len(ma_values) - 1)  # Terminar al final
-    
-    # Crear segmentos de líneas de tendencia
-    segmentos_tendencia = []
-    for i in range(len(cambios_tendencia) - 1):
-        inicio_idx = cambios_tendencia[i]
-        fin_idx = cambios_tendencia[i + 1]
-        
-        if fin_idx > inicio_idx:
-            # Calcular pendiente del segmento completo
-            x_segment = np.arange(fin_idx - inicio_idx + 1)
-            y_segment = ma_values.iloc[inicio_idx:fin_idx+1].values
-            
-            if len(x_segment) > 1 and not np.any(np.isnan(y_segment)):
-                pendiente_segmento = np.polyfit(x_segment, y_segment, 1)[0]
-                
-                inicio_timestamp = ma_values.index[inicio_idx]
-                fin_timestamp = ma_values.index[fin_idx]
-                inicio_valor = ma_values.iloc[inicio_idx]
-                fin_valor = ma_values.iloc[fin_idx]
-                
-                segmentos_tendencia.append({
-                    'inicio_timestamp': inicio_timestamp,
-                    'fin_timestamp': fin_timestamp,
-                    'inicio_valor': inicio_valor,
-                    'fin_valor': fin_valor,
-                    'pendiente': pendiente_segmento,
-                    'longitud': fin_idx - inicio_idx + 1
-                })
-    
-    # Dibujar las líneas de tendencia usando el umbral específico de esta MA
-    for i, segmento in enumerate(segmentos_tendencia):
-        # Determinar color según la pendiente usando umbral específico
-        # umbral_actual ya se definió al inicio de la función
-        if segmento['pendiente'] > umbral_actual:  # Pendiente alcista significativa
-            color_tendencia = 'lime'
-        elif segmento['pendiente'] < -umbral_actual:  # Pendiente bajista significativa
-            color_tendencia = 'red'
-        else:  # Pendiente lateral/neutral
-            color_tendencia = 'yellow'
-        
-        # Convertir timestamps a números para matplotlib
-        inicio_date = mdates.date2num(segmento['inicio_timestamp'])
-        fin_date = mdates.date2num(segmento['fin_timestamp'])
-        
-        # Usar diferente estilo para la segunda MA
-        if es_segunda_ma:
-            linestyle = ':'  # Líneas punteadas más densas para MA2
-            linewidth = 2.5
-        else:
-            linestyle = '--'  # Líneas punteadas normales para MA1
-            linewidth = 3
-        
-        # Dibujar línea de tendencia recta basada en la regresión del segmento
-        axes[0].plot([inicio_date, fin_date], 
-                    [segmento['inicio_valor'], segmento['fin_valor']], 
-                    color=color_tendencia, linewidth=linewidth, alpha=0.8, linestyle=linestyle)
+    # Líneas rectas de cada segmento en una sola colección, coloreadas con el
+    # umbral específico y recortadas al rango visible de la ventana
+    dibujar_segmentos_tendencia(axes[0], segmentos_tendencia, umbral_actual,
+                                mdates.date2num(df.index[0]), mdates.date2num(df.index[-1]), es_segunda_ma)
     
     # Etiquetas de MA eliminadas por solicitud del usuario
     
@@ -322,7 +242,16 @@ def calcular_lineas_tendencia_ma(axes, df):
     
     return segmentos_ma1, segmentos_ma2
 
-""" --- Función para detectar convergencias entre MAs (sin RSI) ---"""
+def convergencias_historicas(periodo_ma1, periodo_ma2, longitud_segmento=None):
+    """Convergencias MA sobre el histórico completo (calculadas una sola vez)"""
+    clave = (periodo_ma1, periodo_ma2, longitud_segmento or longitud_segmento_ventana())
+    if clave not in _cache_convergencias:
+        _cache_convergencias[clave] = detectar_convergencias_ma(
+            df_indicadores, segmentos_historicos(periodo_ma1, clave[2]), segmentos_historicos(periodo_ma2, clave[2]),
+            UMBRAL_MA1, UMBRAL_MA2)
+    return _cache_convergencias[clave]
+
+""" --- Función para marcar convergencias entre MAs (sin RSI) ---"""
 def marcar_convergencias_doble_ma_rsi(axes, df, segmentos_ma1, segmentos_ma2):
     """Detecta y marca convergencias específicas entre tendencias de las dos MAs con persistencia"""
     import matplotlib.dates as mdates
@@ -332,88 +261,14 @@ def marcar_convergencias_doble_ma_rsi(axes, df, segmentos_ma1, segmentos_ma2):
     if not (mostrar_ma.get() and mostrar_ma2.get()) or not segmentos_ma1 or not segmentos_ma2:
         return convergencias_persistentes  # Devolver las existentes si no hay condiciones
     
-    convergencias_detectadas = []
-    
-    # Función para obtener la tendencia en un timestamp específico
-    def obtener_tendencia_en_timestamp(segmentos, timestamp, es_ma2=False):
-        for segmento in segmentos:
-            if segmento['inicio_timestamp'] <= timestamp <= segmento['fin_timestamp']:
-                umbral_actual = UMBRAL_MA2 if es_ma2 else UMBRAL_MA1  # Usar umbral específico
-                if segmento['pendiente'] > umbral_actual:
-                    return 'alcista'
-                elif segmento['pendiente'] < -umbral_actual:
-                    return 'bajista'
-                else:
-                    return 'lateral'
-        return None
-    
-    # Función para detectar cambios de dirección en MA2
-    def detectar_cambios_direccion_ma2():
-        cambios = []
-        umbral_actual = UMBRAL_MA2  # Usar umbral específico para MA2
-        for i in range(1, len(segmentos_ma2)):
-            segmento_anterior = segmentos_ma2[i-1]
-            segmento_actual = segmentos_ma2[i]
-            
-            # Clasificar tendencias usando umbral específico de MA2
-            tend_anterior = 'alcista' if segmento_anterior['pendiente'] > umbral_actual else ('bajista' if segmento_anterior['pendiente'] < -umbral_actual else 'lateral')
-            tend_actual = 'alcista' if segmento_actual['pendiente'] > umbral_actual else ('bajista' if segmento_actual['pendiente'] < -umbral_actual else 'lateral')
-            
-            # Detectar cambios significativos
-            if (tend_anterior != 'bajista' and tend_actual == 'bajista') or \
-               (tend_anterior != 'alcista' and tend_actual == 'alcista'):
-                cambios.append({
-                    'timestamp': segmento_actual['inicio_timestamp'],
-                    'direccion_nueva': tend_actual,
-                    'direccion_anterior': tend_anterior
-                })
-        return cambios
-    
-    # Obtener cambios de dirección en MA2
-    cambios_ma2 = detectar_cambios_direccion_ma2()
-    
-    # Para cada cambio de dirección en MA2, verificar condiciones
-    for cambio in cambios_ma2:
-        timestamp = cambio['timestamp']
-        
-        # Verificar RSI en ese momento
-        try:
-            rsi_valor = df.loc[timestamp, 'RSI']
-        except KeyError:
-            # Si no hay dato exacto, buscar el más cercano
-            idx_cercano = df.index.get_indexer([timestamp], method='nearest')[0]
-            timestamp_cercano = df.index[idx_cercano]
-            rsi_valor = df.loc[timestamp_cercano, 'RSI']
-            timestamp = timestamp_cercano
-        
-        # Obtener tendencia de MA1 en ese momento (usar umbral específico MA1)
-        tendencia_ma1 = obtener_tendencia_en_timestamp(segmentos_ma1, timestamp, es_ma2=False)
-        
-        # CONDICIÓN 1: MA1 bajista + MA2 cambia a bajista (sin RSI)
-        if (tendencia_ma1 == 'bajista' and 
-            cambio['direccion_nueva'] == 'bajista'):
-            
-            convergencias_detectadas.append({
-                'timestamp': timestamp,
-                'tipo': 'VENTA_CONVERGENCIA',
-                'rsi': rsi_valor,
-                'ma1_tendencia': tendencia_ma1,
-                'ma2_cambio': cambio['direccion_nueva'],
-                'descripcion': 'MA1↘ + MA2→↘'
-            })
-        
-        # CONDICIÓN 2: MA1 alcista + MA2 cambia a alcista (sin RSI)
-        elif (tendencia_ma1 == 'alcista' and 
-              cambio['direccion_nueva'] == 'alcista'):
-            
-            convergencias_detectadas.append({
-                'timestamp': timestamp,
-                'tipo': 'COMPRA_CONVERGENCIA',
-                'rsi': rsi_valor,
-                'ma1_tendencia': tendencia_ma1,
-                'ma2_cambio': cambio['direccion_nueva'],
-                'descripcion': 'MA1↗ + MA2→↗'
-            })
+    if df_indicadores is not None and df.index[0] in df_indicadores.index:
+        # Ventana del histórico cargado: tomar las convergencias ya detectadas en su rango
+        convergencias_detectadas = [
+            conv for conv in convergencias_historicas(ma_periodo.get(), ma2_periodo.get())
+            if df.index[0] <= conv['timestamp'] <= df.index[-1]
+        ]
+    else:
+        convergencias_detectadas = detectar_convergencias_ma(df, segmentos_ma1, segmentos_ma2, UMBRAL_MA1, UMBRAL_MA2)
     
     # Análisis de pendientes para debugging
     if segmentos_ma1 or segmentos_ma2:
@@ -445,42 +300,10 @@ def marcar_convergencias_doble_ma_rsi(axes, df, segmentos_ma1, segmentos_ma2):
             print(f"  [-] Bajistas: {bajistas} ({bajistas/len(todas_pendientes)*100:.1f}%)")
             print(f"  ⚪ Laterales: {laterales} ({laterales/len(todas_pendientes)*100:.1f}%)")
     
-    # Sistema de convergencias persistentes con filtro de señales consecutivas
-    
-    # Agregar nuevas convergencias a la lista persistente (evitar duplicados)
-    for conv in convergencias_detectadas:
-        # Verificar si ya existe una convergencia muy cercana en tiempo (dentro de 5 segundos)
-        es_nueva = True
-        for conv_existente in convergencias_persistentes:
-            tiempo_diff = abs((conv['timestamp'] - conv_existente['timestamp']).total_seconds())
-            if tiempo_diff < 5 and conv['tipo'] == conv_existente['tipo']:
-                es_nueva = False
-                break
-        
-        # Solo agregar si es realmente nueva
-        if es_nueva:
-            convergencias_persistentes.append(conv)
-    
-    # Limpiar convergencias muy antiguas (más de 30 minutos)
-    tiempo_actual = df.index[-1]
-    convergencias_persistentes[:] = [
-        conv for conv in convergencias_persistentes 
-        if (tiempo_actual - conv['timestamp']).total_seconds() < 1800  # 30 minutos
-    ]
-    
-    # FILTRADO DE SEÑALES CONSECUTIVAS DEL MISMO TIPO
-    # Ordenar convergencias por tiempo para aplicar filtro correctamente
-    convergencias_ordenadas = sorted(convergencias_persistentes, key=lambda x: x['timestamp'])
-    
-    convergencias_filtradas = []
-    ultimo_tipo = None
-    
-    for conv in convergencias_ordenadas:
-        # Solo agregar si es diferente al tipo anterior (filtro de consecutivas)
-        if conv['tipo'] != ultimo_tipo:
-            convergencias_filtradas.append(conv)
-            ultimo_tipo = conv['tipo']
-        # Si es del mismo tipo que la anterior, se omite (filtrado)
+    # Sistema de convergencias persistentes (sin duplicados a menos de 5 s, máximo
+    # 30 minutos) con filtro de señales consecutivas del mismo tipo
+    acumular_convergencias(convergencias_persistentes, convergencias_detectadas, df.index[-1])
+    convergencias_filtradas = filtrar_consecutivas(convergencias_persistentes)
     
     # Dibujar las convergencias filtradas
     for conv in convergencias_filtradas:
@@ -539,68 +362,24 @@ def marcar_extremos_rsi(axes, df):
     if not mostrar_extremos_rsi.get():
         return
     
-    # Función para encontrar períodos continuos
-    def encontrar_periodos_continuos(mask):
-        """Encuentra períodos continuos donde la máscara es True"""
-        periodos = []
-        inicio = None
-        
-        for i, valor in enumerate(mask):
-            if valor and inicio is None:
-                # Comenzar un nuevo período
-                inicio = i
-            elif not valor and inicio is not None:
-                # Terminar el período actual
-                periodos.append((inicio, i-1))
-                inicio = None
-        
-        # Si el período continúa hasta el final
-        if inicio is not None:
-            periodos.append((inicio, len(mask)-1))
-        
-        return periodos
-    
-    # Encontrar períodos continuos de sobrecompra (RSI > 70)
-    sobrecompra_mask = df['RSI'] > 70
-    periodos_sobrecompra = encontrar_periodos_continuos(sobrecompra_mask.values)
-    
-    # Marcar el MÁXIMO valor durante cada período de sobrecompra
-    for inicio_idx, fin_idx in periodos_sobrecompra:
-        periodo_data = df.iloc[inicio_idx:fin_idx+1]
-        if len(periodo_data) > 0:
-            max_precio = periodo_data['Close'].max()
-            max_idx = periodo_data['Close'].idxmax()
-            max_date = mdates.date2num(max_idx)
-            
-            # Línea vertical roja para el máximo del período
-            axes[0].axvline(x=max_date, color='red', linestyle='-', linewidth=2, alpha=0.8)
-            
-            # Etiqueta con el valor máximo
-            axes[0].annotate(f'MAX: {max_precio:.4f}', 
-                            xy=(max_date, max_precio),
+    # Máximo de cada período continuo de sobrecompra (RSI > 70) y mínimo de
+    # cada período de sobreventa (RSI < 30)
+    for extremo in extremos_rsi(df):
+        fecha = mdates.date2num(extremo['timestamp'])
+        if extremo['tipo'] == 'MAX':
+            # Línea vertical roja y etiqueta con el valor máximo
+            axes[0].axvline(x=fecha, color='red', linestyle='-', linewidth=2, alpha=0.8)
+            axes[0].annotate(f'MAX: {extremo["precio"]:.4f}', 
+                            xy=(fecha, extremo['precio']),
                             xytext=(8, 15), textcoords='offset points',
                             bbox=dict(boxstyle='round,pad=0.3', facecolor='red', alpha=0.8),
                             fontsize=8, color='white', weight='bold',
                             arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0.1'))
-    
-    # Encontrar períodos continuos de sobreventa (RSI < 30)
-    sobreventa_mask = df['RSI'] < 30
-    periodos_sobreventa = encontrar_periodos_continuos(sobreventa_mask.values)
-    
-    # Marcar el MÍNIMO valor durante cada período de sobreventa
-    for inicio_idx, fin_idx in periodos_sobreventa:
-        periodo_data = df.iloc[inicio_idx:fin_idx+1]
-        if len(periodo_data) > 0:
-            min_precio = periodo_data['Close'].min()
-            min_idx = periodo_data['Close'].idxmin()
-            min_date = mdates.date2num(min_idx)
-            
-            # Línea vertical verde para el mínimo del período
-            axes[0].axvline(x=min_date, color='green', linestyle='-', linewidth=2, alpha=0.8)
-            
-            # Etiqueta con el valor mínimo
-            axes[0].annotate(f'MIN: {min_precio:.4f}', 
-                            xy=(min_date, min_precio),
+        else:
+            # Línea vertical verde y etiqueta con el valor mínimo
+            axes[0].axvline(x=fecha, color='green', linestyle='-', linewidth=2, alpha=0.8)
+            axes[0].annotate(f'MIN: {extremo["precio"]:.4f}', 
+                            xy=(fecha, extremo['precio']),
                             xytext=(8, -25), textcoords='offset points',
                             bbox=dict(boxstyle='round,pad=0.3', facecolor='green', alpha=0.8),
                             fontsize=8, color='white', weight='bold',
@@ -614,44 +393,8 @@ def marcar_convergencias_rsi_macd(axes, df):
     if not mostrar_convergencias_rsi_macd.get():
         return
     
-    convergencias = []
-    
-    # Detectar cruces entre MACD y línea de señal
-    macd_prev = df['MACD'].shift(1)
-    signal_prev = df['Signal'].shift(1)
-    
-    # Cruce alcista: MACD cruza SOBRE la línea de señal (de abajo hacia arriba)
-    # MACD anterior < Signal anterior Y MACD actual >= Signal actual
-    cruces_alcistas = (macd_prev < signal_prev) & (df['MACD'] >= df['Signal'])
-    
-    # Cruce bajista: MACD cruza DEBAJO de la línea de señal (de arriba hacia abajo)
-    # MACD anterior > Signal anterior Y MACD actual <= Signal actual
-    cruces_bajistas = (macd_prev > signal_prev) & (df['MACD'] <= df['Signal'])
-    
-    # Combinar todos los cruces
-    cruces_macd = cruces_alcistas | cruces_bajistas
-    
-    # Para cada cruce, verificar si RSI está en zona extrema
-    for idx in df[cruces_macd].index:
-        rsi_valor = df.loc[idx, 'RSI']
-        macd_valor = df.loc[idx, 'MACD']
-        signal_valor = df.loc[idx, 'Signal']
-        close_valor = df.loc[idx, 'Close']
-        
-        # Verificar si RSI está en zona extrema
-        if rsi_valor > 70 or rsi_valor < 30:
-            # Determinar tipo de cruce
-            es_cruce_alcista = cruces_alcistas[idx] if idx in cruces_alcistas.index else False
-            
-            convergencias.append({
-                'timestamp': idx,
-                'rsi': rsi_valor,
-                'macd': macd_valor,
-                'signal': signal_valor,
-                'close': close_valor,
-                'zona_rsi': 'sobrecompra' if rsi_valor > 70 else 'sobreventa',
-                'cruce_macd': 'alcista' if es_cruce_alcista else 'bajista'
-            })
+    # Cruces MACD/señal con el RSI en zona extrema (> 70 o < 30)
+    convergencias = cruces_rsi_macd(df)
     
     # Marcar las convergencias en todos los paneles
     for conv in convergencias:
@@ -811,7 +554,7 @@ def cargar_datos():
         
     try:
         df = obtener_historico_binance("CSV_DATA", INTERVAL)
-        df = procesar_indicadores(df)
+        df = con_indicadores(df)
         
         for widget in frame_chart.winfo_children():
             widget.destroy()
@@ -896,13 +639,16 @@ def actualizar_grafico():
         if not archivo_csv_seleccionado:
             root.after(1000, actualizar_grafico)  # Intentar de nuevo en 1 segundo
             return
+        if render_slider_en_curso():
+            root.after(1000, actualizar_grafico)  # El slider ya está redibujando su posición
+            return
             
         tiempo_seleccionado = tiempo_var.get()
         limit = TIEMPO_OPTIONS[tiempo_seleccionado]
         try:
             plt.style.use('dark_background')  # Fondo oscuro también al actualizar
             df = obtener_historico_binance("CSV_DATA", INTERVAL, limit)
-            df = procesar_indicadores(df)
+            df = con_indicadores(df)
             
             for ax in axes:
                 ax.clear()
@@ -911,16 +657,10 @@ def actualizar_grafico():
             import matplotlib.dates as mdates
             df_plot = df.reset_index()
             df_plot['Date'] = mdates.date2num(df_plot['Close time'])
-            ohlc = df_plot[['Date', 'Open', 'High', 'Low', 'Close']].values
-
-            # Calcular ancho de barra (80% del intervalo)
-            if len(df_plot['Date']) > 1:
-                interval_width = (df_plot['Date'][1] - df_plot['Date'][0]) * 0.8
-            else:
-                interval_width = 0.0008  # valor por defecto
-
-            from mplfinance.original_flavor import candlestick_ohlc
-            candlestick_ohlc(axes[0], ohlc, width=interval_width, colorup='g', colordown='r')
+    
+            # Velas agregadas a una por columna de píxeles (dos colecciones)
+            dibujar_velas_lod(axes[0], df_plot['Date'], df_plot['Open'], df_plot['High'],
+                              df_plot['Low'], df_plot['Close'], colorup='g', colordown='r')
             
             # Agregar MA seleccionada si está activada
             if mostrar_ma.get():
@@ -984,7 +724,7 @@ def actualizar_grafico():
             axes[1].fill_between(df_plot['Date'], 0, 30, alpha=0.1, color='green')
             axes[1].set_title('RSI (Zonas extremas resaltadas)')
             axes[1].set_ylabel('RSI')
-            axes[1].legend()
+            axes[1].legend(loc='upper left')  # Posición fija: 'best' recorre todos los artistas
             axes[1].set_ylim(0, 100)
             
             # Panel 2: MACD
@@ -992,17 +732,10 @@ def actualizar_grafico():
             axes[2].plot(df_plot['Date'], df_plot['Signal'], color='orange', label='Signal')
             axes[2].axhline(0, color='grey', linestyle='--')
             macd_delta = df_plot['MACD'] - df_plot['Signal']
-            axes[2].bar(
-                df_plot['Date'],
-                macd_delta,
-                width=interval_width,
-                color=['green' if v >= 0 else 'red' for v in macd_delta],
-                alpha=0.5,
-                label='MACD Delta'
-            )
+            dibujar_histograma_lod(axes[2], df_plot['Date'], macd_delta, alpha=0.5, label='MACD Delta')
             axes[2].set_title('MACD')
             axes[2].set_ylabel('MACD')
-            axes[2].legend()
+            axes[2].legend(loc='upper left')
             
             # Aplicar el mismo formato de fecha a todos los paneles
             for ax in axes:
@@ -1162,15 +895,16 @@ def configurar_slider_tiempo():
     slider_tiempo.config(from_=0, to=max_posicion)
     slider_tiempo.set(max_posicion)  # Iniciar al final (datos más recientes)
 
-def obtener_datos_por_posicion(posicion=None):
+def obtener_datos_por_posicion(posicion=None, limit=None):
     """Obtiene un subconjunto de datos basado en la posición del slider"""
     global df_completo
     
-    if df_completo is None:
+    if df_completo is None or df_indicadores is None:
         return None
     
-    tiempo_seleccionado = tiempo_var.get()
-    limit = TIEMPO_OPTIONS[tiempo_seleccionado]
+    if limit is None:
+        tiempo_seleccionado = tiempo_var.get()
+        limit = TIEMPO_OPTIONS[tiempo_seleccionado]
     
     if posicion is None:
         # Si no se especifica posición, usar la posición actual del slider
@@ -1180,19 +914,88 @@ def obtener_datos_por_posicion(posicion=None):
     inicio_idx = int(posicion)
     fin_idx = min(inicio_idx + limit, len(df_completo))
     
-    # Obtener subconjunto de datos
-    df_subset = df_completo.iloc[inicio_idx:fin_idx].copy()
+    # Corte sin copia del histórico con indicadores ya calculados
+    df_subset = df_indicadores.iloc[inicio_idx:fin_idx]
     
     return df_subset
 
+""" --- Planificador de renderizado del slider ---"""
+# Arrastrar el slider genera un evento por cada valor intermedio. Los eventos
+# se agrupan (debounce), los datos del frame se preparan en un hilo de fondo y
+# solo se dibuja, en el hilo de Tk, la posición pedida más reciente.
+SLIDER_DEBOUNCE_MS = 150
+_render_after_id = None  # Render programado y aún no lanzado
+_render_generacion = 0  # Aumenta con cada petición: los trabajos anteriores quedan obsoletos
+_render_futuro = None
+_render_executor = ThreadPoolExecutor(max_workers=1)  # Un solo hilo: los trabajos no compiten
+
+def programar_render(inmediato=False):
+    """Pide redibujar la posición actual del slider (agrupando eventos seguidos)"""
+    global _render_after_id
+    if _render_after_id is not None:
+        root.after_cancel(_render_after_id)
+    _render_after_id = root.after(0 if inmediato else SLIDER_DEBOUNCE_MS, _lanzar_render)
+
+def render_slider_en_curso():
+    """True si hay un render del slider programado, calculándose o por dibujar"""
+    return _render_after_id is not None or _render_futuro is not None
+
+def _lanzar_render():
+    """Lee la configuración en el hilo de Tk y encarga el cálculo del frame al hilo de fondo"""
+    global _render_after_id, _render_generacion, _render_futuro
+    _render_after_id = None
+    if df_indicadores is None:
+        return
+    
+    _render_generacion += 1
+    if _render_futuro is not None:
+        _render_futuro.cancel()  # Si aún no empezó, no llega a ejecutarse
+    
+    # Las variables de Tk solo se leen desde el hilo de la interfaz
+    ma1 = ma_periodo.get() if mostrar_ma.get() and mostrar_lineas_tendencia_ma1.get() else None
+    ma2 = ma2_periodo.get() if mostrar_ma2.get() and mostrar_lineas_tendencia_ma2.get() else None
+    parametros = {
+        'posicion': int(slider_tiempo.get()),
+        'limit': TIEMPO_OPTIONS[tiempo_var.get()],
+        'ma1': ma1,
+        'ma2': ma2,
+        'convergencias': bool(ma1 and ma2 and mostrar_convergencias_ma_rsi.get()),
+        'longitud_segmento': longitud_segmento_ventana(),
+    }
+    _render_futuro = _render_executor.submit(_calcular_frame, _render_generacion, parametros)
+
+def _calcular_frame(generacion, parametros):
+    """Hilo de fondo: corte de la ventana y segmentos/convergencias de la caché del histórico"""
+    if generacion != _render_generacion:
+        return  # Ya se pidió una posición más reciente
+    try:
+        df = obtener_datos_por_posicion(parametros['posicion'], parametros['limit'])
+        for periodo_ma in (parametros['ma1'], parametros['ma2']):
+            if periodo_ma and generacion == _render_generacion:
+                segmentos_historicos(periodo_ma, parametros['longitud_segmento'])
+        if parametros['convergencias'] and generacion == _render_generacion:
+            convergencias_historicas(parametros['ma1'], parametros['ma2'], parametros['longitud_segmento'])
+    except Exception as e:
+        print(f"Error al preparar el gráfico del slider: {e}")
+        df = None
+    root.after(0, _dibujar_frame, generacion, df)
+
+def _dibujar_frame(generacion, df):
+    """Hilo de Tk: dibuja el frame solo si sigue siendo el más reciente"""
+    global _render_futuro
+    if generacion != _render_generacion:
+        return
+    _render_futuro = None
+    if df is not None and len(df) > 0:
+        actualizar_grafico_manual(df)
+
 def on_slider_change(value):
     """Callback cuando cambia el slider"""
-    if not actualizando:
-        # Forzar actualización del gráfico con nueva posición
-        actualizar_grafico_manual()
+    programar_render()
 
-def actualizar_grafico_manual():
-    """Actualiza el gráfico manualmente basado en la posición del slider"""
+def actualizar_grafico_manual(df=None):
+    """Actualiza el gráfico manualmente basado en la posición del slider
+    (df: ventana ya preparada por el planificador; None = leer la posición actual)"""
     global axes, mostrar_ma, ma_periodo, archivo_csv_seleccionado
     
     if not archivo_csv_seleccionado or df_completo is None:
@@ -1202,11 +1005,12 @@ def actualizar_grafico_manual():
         plt.style.use('dark_background')
         
         # Obtener datos según posición del slider
-        df = obtener_datos_por_posicion()
+        if df is None:
+            df = obtener_datos_por_posicion()
         if df is None or len(df) == 0:
             return
             
-        df = procesar_indicadores(df)
+        df = con_indicadores(df)
         
         for ax in axes:
             ax.clear()
@@ -1215,16 +1019,10 @@ def actualizar_grafico_manual():
         import matplotlib.dates as mdates
         df_plot = df.reset_index()
         df_plot['Date'] = mdates.date2num(df_plot['Close time'])
-        ohlc = df_plot[['Date', 'Open', 'High', 'Low', 'Close']].values
-
-        # Calcular ancho de barra (80% del intervalo)
-        if len(df_plot['Date']) > 1:
-            interval_width = (df_plot['Date'][1] - df_plot['Date'][0]) * 0.8
-        else:
-            interval_width = 0.0008
 
-        from mplfinance.original_flavor import candlestick_ohlc
-        candlestick_ohlc(axes[0], ohlc, width=interval_width, colorup='g', colordown='r')
+        # Velas agregadas a una por columna de píxeles (dos colecciones)
+        dibujar_velas_lod(axes[0], df_plot['Date'], df_plot['Open'], df_plot['High'],
+                          df_plot['Low'], df_plot['Close'], colorup='g', colordown='r')
         
         # Agregar MA seleccionada si está activada
         if mostrar_ma.get():
@@ -1268,7 +1066,7 @@ def actualizar_grafico_manual():
         axes[1].fill_between(df_plot['Date'], 0, 30, alpha=0.1, color='green')
         axes[1].set_title('RSI (Zonas extremas resaltadas)')
         axes[1].set_ylabel('RSI')
-        axes[1].legend()
+        axes[1].legend(loc='upper left')  # Posición fija: 'best' recorre todos los artistas
         axes[1].set_ylim(0, 100)
         
         # Panel 2: MACD
@@ -1276,17 +1074,10 @@ def actualizar_grafico_manual():
         axes[2].plot(df_plot['Date'], df_plot['Signal'], color='orange', label='Signal')
         axes[2].axhline(0, color='grey', linestyle='--')
         macd_delta = df_plot['MACD'] - df_plot['Signal']
-        axes[2].bar(
-            df_plot['Date'],
-            macd_delta,
-            width=interval_width,
-            color=['green' if v >= 0 else 'red' for v in macd_delta],
-            alpha=0.5,
-            label='MACD Delta'
-        )
+        dibujar_histograma_lod(axes[2], df_plot['Date'], macd_delta, alpha=0.5, label='MACD Delta')
         axes[2].set_title('MACD')
         axes[2].set_ylabel('MACD')
-        axes[2].legend()
+        axes[2].legend(loc='upper left')
         
         # Aplicar formato de fecha
         for ax in axes:
@@ -1324,7 +1115,7 @@ def actualizar_grafico_manual():
 
 def seleccionar_archivo():
     """Abre un diálogo para seleccionar archivo CSV"""
-    global archivo_csv_seleccionado, df_completo, fecha_inicio_datos, fecha_fin_datos, total_registros
+    global archivo_csv_seleccionado, df_completo, df_indicadores, fecha_inicio_datos, fecha_fin_datos, total_registros
     
     filetypes = [
         ('CSV files', '*.csv'),
@@ -1341,6 +1132,7 @@ def seleccionar_archivo():
         # Resetear variables cuando se selecciona nuevo archivo
         archivo_csv_seleccionado = filename
         df_completo = None
+        df_indicadores = None
         fecha_inicio_datos = None
         fecha_fin_datos = None
         total_registros = 0
@@ -1362,6 +1154,7 @@ def detener_app():
     try:
         # Detener actualizaciones
         actualizando = False
+        _render_executor.shutdown(wait=False, cancel_futures=True)
         
         # Cancelar tareas pendientes de tkinter
         if hasattr(root, 'after_idle'):
@@ -1451,9 +1244,9 @@ if __name__ == "__main__":
     slider_tiempo.pack(side=tk.LEFT, padx=(10, 20), fill=tk.X, expand=True)
     
     ttk.Button(frame_slider, text="Más recientes", 
-              command=lambda: [slider_tiempo.set(slider_tiempo.cget('to')), actualizar_grafico_manual()]).pack(side=tk.LEFT, padx=5)
+              command=lambda: [slider_tiempo.set(slider_tiempo.cget('to')), programar_render(inmediato=True)]).pack(side=tk.LEFT, padx=5)
     ttk.Button(frame_slider, text="Más antiguos", 
-              command=lambda: [slider_tiempo.set(0), actualizar_grafico_manual()]).pack(side=tk.LEFT, padx=5)
+              command=lambda: [slider_tiempo.set(0), programar_render(inmediato=True)]).pack(side=tk.LEFT, padx=5)
 
     frame_controls = ttk.Frame(root)
     frame_controls.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
@@ -8,11 +8,14 @@ import numpy as np
 import matplotlib.pyplot as plt
 from datetime import datetime
 import os
+from indicator_cache import cached_indicator
+from trading_bot import PositionTracker, BacktestEngine as BaseBacktestEngine
 
 class TechnicalIndicators:
     """Clase para calcular indicadores técnicos ampliados"""
     
     @staticmethod
+    @cached_indicator('rsi')
     def rsi(prices, period=14):
         """Calcula el RSI (Relative Strength Index)"""
         delta = prices.diff()
@@ -23,16 +26,19 @@ class TechnicalIndicators:
         return rsi
     
     @staticmethod
+    @cached_indicator('moving_average')
     def moving_average(prices, period):
         """Calcula Media Móvil Simple"""
         return prices.rolling(window=period).mean()
     
     @staticmethod
+    @cached_indicator('ema')
     def ema(prices, period):
         """Calcula Media Móvil Exponencial"""
         return prices.ewm(span=period).mean()
     
     @staticmethod
+    @cached_indicator('macd')
     def macd(prices, fast=12, slow=26, signal=9):
         """Calcula MACD (Moving Average Convergence Divergence)"""
         exp1 = prices.ewm(span=fast).mean()
@@ -43,6 +49,7 @@ class TechnicalIndicators:
         return macd_line, signal_line, histogram
     
     @staticmethod
+    @cached_indicator('bollinger_bands')
     def bollinger_bands(prices, period=20, std_dev=2):
         """Calcula Bandas de Bollinger"""
         ma = prices.rolling(window=period).mean()
@@ -52,6 +59,7 @@ class TechnicalIndicators:
         return upper, ma, lower
     
     @staticmethod
+    @cached_indicator('stochastic')
     def stochastic(high, low, close, k_period=14, d_period=3):
         """Calcula el oscilador estocástico"""
         lowest_low = low.rolling(window=k_period).min()
@@ -61,11 +69,13 @@ class TechnicalIndicators:
         return k_percent, d_percent
     
     @staticmethod
+    @cached_indicator('momentum')
     def momentum(prices, period=10):
         """Calcula el momentum"""
         return prices.diff(period)
     
     @staticmethod
+    @cached_indicator('price_change_rate')
     def price_change_rate(prices, period=1):
         """Calcula tasa de cambio de precio"""
         return (prices.pct_change(period) * 100)
@@ -87,11 +97,16 @@ class EnhancedTradingStrategy:
         self.position = None
         self.entry_price = 0
         self.entry_time = None
+        self.tracker = PositionTracker()
         
         # Configuración de sensibilidad
         self.min_signals_for_entry = 1  # Reducido de 2 a 1
         self.min_signals_for_exit = 1   # Reducido de 2 a 1
         
+        # Gestión de riesgo
+        self.stop_loss_pct = 0.015   # Stop loss más ajustado (1.5%)
+        self.take_profit_pct = 0.01  # Take profit al 1%
+        
     def generate_signals(self, df):
         """Genera señales de compra y venta mejoradas"""
         signals = pd.DataFrame(index=df.index)
@@ -100,7 +115,7 @@ class EnhancedTradingStrategy:
         signals['low'] = df['low']
         signals['signal'] = 0
         signals['position'] = 0
-        signals['signal_strength'] = 0  # Nueva columna para fuerza de señal
+        signals['signal_strength'] = 0.0  # Nueva columna para fuerza de señal
         signals['signal_type'] = ''     # Tipo de señal que activó la operación
         
         # Calcular todos los indicadores
@@ -132,333 +147,216 @@ class EnhancedTradingStrategy:
         signals['momentum'] = TechnicalIndicators.momentum(df['close'])
         signals['price_change'] = TechnicalIndicators.price_change_rate(df['close'])
         
-        # Generar señales con lógica mejorada
-        for i in range(2, len(signals)):  # Comenzar desde 2 para tener datos previos
-            
-            # Obtener valores actuales y previos
-            current_price = signals['price'].iloc[i]
-            prev_price = signals['price'].iloc[i-1]
-            
-            # Calcular señales de entrada múltiples
-            buy_signals = self._calculate_buy_signals(signals, i)
-            sell_signals = self._calculate_sell_signals(signals, i)
+        # Fuerza de cada señal calculada sobre columnas completas (0 = inactiva)
+        buy_signals = self._calculate_buy_signals(signals)
+        sell_signals = self._calculate_sell_signals(signals)
+        
+        # Sumar en el mismo orden de las señales para obtener exactamente los mismos totales
+        total_buy_strength = np.zeros(len(signals))
+        for strength in buy_signals.values():
+            total_buy_strength = total_buy_strength + strength
+        total_sell_strength = np.zeros(len(signals))
+        for strength in sell_signals.values():
+            total_sell_strength = total_sell_strength + strength
+        
+        strong_buy = sum((v >= 0.7).astype(int) for v in buy_signals.values())
+        medium_buy = sum((v >= 0.4).astype(int) for v in buy_signals.values())
+        strong_sell = sum((v >= 0.7).astype(int) for v in sell_signals.values())
+        
+        # Entrar si hay al menos 1 señal fuerte O 2 señales medianas
+        can_buy = (total_buy_strength >= 0.7) | (strong_buy >= 1) | (medium_buy >= 2)
+        # Salir por señales técnicas (stop loss y take profit dependen de la entrada)
+        can_sell = (total_sell_strength >= 0.6) | (strong_sell >= 1)
+        
+        # Máquina de estados de posición: único tramo secuencial
+        prices = signals['price'].tolist()
+        can_buy = can_buy.tolist()
+        can_sell = can_sell.tolist()
+        n = len(signals)
+        signal = np.zeros(n, dtype=np.int64)
+        position = np.zeros(n, dtype=np.int64)
+        signal_strength = np.zeros(n)
+        signal_type = [''] * n
+        
+        tracker = self.tracker
+        tracker.reset()
+        for i in range(2, n):  # Comenzar desde 2 para tener datos previos
+            current_price = prices[i]
             
-            # Verificar condiciones especiales
-            stop_loss_triggered = self._check_stop_loss(signals, i)
-            take_profit_triggered = self._check_take_profit(signals, i)
-            
-            # Lógica de decisión mejorada
-            current_position = signals['position'].iloc[i-1]
-            
-            if current_position == 0:  # Sin posición
-                # Buscar señales de compra
-                total_buy_strength = sum(buy_signals.values())
-                strong_signals = [k for k, v in buy_signals.items() if v >= 0.7]
-                
-                # Entrar si hay al menos 1 señal fuerte O 2 señales medianas
-                if (total_buy_strength >= 0.7 or len(strong_signals) >= 1 or 
-                    sum(1 for v in buy_signals.values() if v >= 0.4) >= 2):
-                    
-                    signals.loc[signals.index[i], 'signal'] = 1
-                    signals.loc[signals.index[i], 'position'] = 1
-                    signals.loc[signals.index[i], 'signal_strength'] = total_buy_strength
-                    signals.loc[signals.index[i], 'signal_type'] = f"BUY: {', '.join(strong_signals)}"
-                else:
-                    signals.loc[signals.index[i], 'position'] = 0
+            if not tracker.in_position:  # Sin posición
+                if can_buy[i]:
+                    tracker.open(i, current_price)
+                    signal[i] = 1
+                    signal_strength[i] = total_buy_strength[i]
+                    strong_signals = [k for k, v in buy_signals.items() if v[i] >= 0.7]
+                    signal_type[i] = f"BUY: {', '.join(strong_signals)}"
                     
             else:  # Con posición larga
-                # Buscar señales de venta
-                total_sell_strength = sum(sell_signals.values())
-                strong_sell_signals = [k for k, v in sell_signals.items() if v >= 0.7]
+                stop_loss_triggered = tracker.loss_pct(current_price) >= self.stop_loss_pct
+                take_profit_triggered = tracker.profit_pct(current_price) >= self.take_profit_pct
                 
-                # Salir por señales técnicas, stop loss o take profit
-                if (stop_loss_triggered or take_profit_triggered or 
-                    total_sell_strength >= 0.6 or len(strong_sell_signals) >= 1):
-                    
-                    signals.loc[signals.index[i], 'signal'] = -1
-                    signals.loc[signals.index[i], 'position'] = 0
+                if stop_loss_triggered or take_profit_triggered or can_sell[i]:
+                    tracker.close()
+                    signal[i] = -1
                     
                     exit_reason = []
                     if stop_loss_triggered: exit_reason.append("STOP_LOSS")
                     if take_profit_triggered: exit_reason.append("TAKE_PROFIT")
-                    if strong_sell_signals: exit_reason.extend(strong_sell_signals)
+                    exit_reason.extend(k for k, v in sell_signals.items() if v[i] >= 0.7)
                     
-                    signals.loc[signals.index[i], 'signal_strength'] = total_sell_strength
-                    signals.loc[signals.index[i], 'signal_type'] = f"SELL: {', '.join(exit_reason)}"
-                else:
-                    signals.loc[signals.index[i], 'position'] = 1
+                    signal_strength[i] = total_sell_strength[i]
+                    signal_type[i] = f"SELL: {', '.join(exit_reason)}"
+            
+            position[i] = 1 if tracker.in_position else 0
+        
+        signals['signal'] = signal
+        signals['position'] = position
+        signals['signal_strength'] = signal_strength
+        signals['signal_type'] = signal_type
         
         return signals
     
-    def _calculate_buy_signals(self, signals, i):
-        """Calcula múltiples señales de compra con ponderaciones"""
+    @staticmethod
+    def _add_chain(signals_dict, *options):
+        """Agrega una cadena if/elif: cada (nombre, condición, peso) solo aplica si no aplicó una anterior"""
+        taken = np.zeros(len(options[0][1]), dtype=bool)
+        for name, condition, weight in options:
+            active = condition & ~taken
+            signals_dict[name] = np.where(active, weight, 0.0)
+            taken |= active
+    
+    @staticmethod
+    def _columns(signals):
+        """Columnas actuales y previas como arrays (las comparaciones con NaN dan False)"""
+        cols = {name: signals[name].to_numpy(dtype=float) for name in
+                ('rsi', 'rsi_fast', 'ma9', 'ma21', 'price', 'bb_upper', 'bb_middle', 'bb_lower',
+                 'macd', 'macd_signal', 'stoch_k', 'momentum', 'price_change')}
+        for name in ('rsi', 'ma9', 'ma21', 'macd', 'macd_signal', 'price'):
+            cols[f'prev_{name}'] = signals[name].shift(1).to_numpy(dtype=float)
+        cols['price_3_ago'] = signals['price'].shift(3).to_numpy(dtype=float)
+        return cols
+    
+    def _calculate_buy_signals(self, signals):
+        """Calcula múltiples señales de compra con ponderaciones (una columna por señal)"""
+        c = self._columns(signals)
         buy_signals = {}
         
-        # Valores actuales y previos
-        current_rsi = signals['rsi'].iloc[i]
-        prev_rsi = signals['rsi'].iloc[i-1]
-        current_rsi_fast = signals['rsi_fast'].iloc[i]
-        
-        current_ma9 = signals['ma9'].iloc[i]
-        current_ma21 = signals['ma21'].iloc[i]
-        prev_ma9 = signals['ma9'].iloc[i-1]
-        prev_ma21 = signals['ma21'].iloc[i-1]
-        
-        current_price = signals['price'].iloc[i]
-        bb_lower = signals['bb_lower'].iloc[i]
-        bb_middle = signals['bb_middle'].iloc[i]
-        
-        current_macd = signals['macd'].iloc[i]
-        current_macd_signal = signals['macd_signal'].iloc[i]
-        prev_macd = signals['macd'].iloc[i-1]
-        prev_macd_signal = signals['macd_signal'].iloc[i-1]
-        
-        stoch_k = signals['stoch_k'].iloc[i]
-        momentum = signals['momentum'].iloc[i]
-        price_change = signals['price_change'].iloc[i]
-        
         # 1. RSI Signals (múltiples niveles)
-        if current_rsi < self.rsi_extreme_oversold:
-            buy_signals['RSI_EXTREME'] = 1.0  # Señal muy fuerte
-        elif current_rsi < self.rsi_oversold and prev_rsi >= self.rsi_oversold:
-            buy_signals['RSI_OVERSOLD'] = 0.8  # Señal fuerte
-        elif current_rsi < self.rsi_oversold:
-            buy_signals['RSI_LOW'] = 0.5  # Señal media
+        self._add_chain(buy_signals,
+            ('RSI_EXTREME', c['rsi'] < self.rsi_extreme_oversold, 1.0),  # Señal muy fuerte
+            ('RSI_OVERSOLD', (c['rsi'] < self.rsi_oversold) & (c['prev_rsi'] >= self.rsi_oversold), 0.8),  # Señal fuerte
+            ('RSI_LOW', c['rsi'] < self.rsi_oversold, 0.5))  # Señal media
         
         # 2. RSI rápido
-        if current_rsi_fast < 25:
-            buy_signals['RSI_FAST'] = 0.6
+        buy_signals['RSI_FAST'] = np.where(c['rsi_fast'] < 25, 0.6, 0.0)
         
         # 3. Media Móvil Signals
-        if current_ma9 > current_ma21 and prev_ma9 <= prev_ma21:
-            buy_signals['MA_GOLDEN_CROSS'] = 0.9  # Cruce dorado
-        elif current_ma9 > current_ma21:
-            buy_signals['MA_BULLISH'] = 0.4  # Tendencia alcista
+        self._add_chain(buy_signals,
+            ('MA_GOLDEN_CROSS', (c['ma9'] > c['ma21']) & (c['prev_ma9'] <= c['prev_ma21']), 0.9),  # Cruce dorado
+            ('MA_BULLISH', c['ma9'] > c['ma21'], 0.4))  # Tendencia alcista
         
         # 4. MACD Signals
-        if current_macd > current_macd_signal and prev_macd <= prev_macd_signal:
-            buy_signals['MACD_CROSS'] = 0.8  # Cruce alcista
-        elif current_macd > current_macd_signal:
-            buy_signals['MACD_BULLISH'] = 0.4
+        self._add_chain(buy_signals,
+            ('MACD_CROSS', (c['macd'] > c['macd_signal']) & (c['prev_macd'] <= c['prev_macd_signal']), 0.8),  # Cruce alcista
+            ('MACD_BULLISH', c['macd'] > c['macd_signal'], 0.4))
         
         # 5. Bollinger Bands
-        if current_price <= bb_lower:
-            buy_signals['BB_OVERSOLD'] = 0.7  # Precio en banda inferior
-        elif current_price < bb_middle:
-            buy_signals['BB_BELOW_MIDDLE'] = 0.3
+        self._add_chain(buy_signals,
+            ('BB_OVERSOLD', c['price'] <= c['bb_lower'], 0.7),  # Precio en banda inferior
+            ('BB_BELOW_MIDDLE', c['price'] < c['bb_middle'], 0.3))
         
         # 6. Estocástico
-        if stoch_k < 20:
-            buy_signals['STOCH_OVERSOLD'] = 0.6
+        buy_signals['STOCH_OVERSOLD'] = np.where(c['stoch_k'] < 20, 0.6, 0.0)
         
         # 7. Momentum
-        if momentum > 0 and price_change > 0.1:
-            buy_signals['MOMENTUM_POSITIVE'] = 0.5
+        buy_signals['MOMENTUM_POSITIVE'] = np.where((c['momentum'] > 0) & (c['price_change'] > 0.1), 0.5, 0.0)
         
         # 8. Rebote rápido (precio cae y sube rápidamente)
-        if i >= 3:
-            price_3_ago = signals['price'].iloc[i-3]
-            if current_price > price_3_ago and signals['price'].iloc[i-1] < price_3_ago:
-                buy_signals['QUICK_BOUNCE'] = 0.6
+        buy_signals['QUICK_BOUNCE'] = np.where(
+            (c['price'] > c['price_3_ago']) & (c['prev_price'] < c['price_3_ago']), 0.6, 0.0)
         
         return buy_signals
     
-    def _calculate_sell_signals(self, signals, i):
-        """Calcula múltiples señales de venta con ponderaciones"""
+    def _calculate_sell_signals(self, signals):
+        """Calcula múltiples señales de venta con ponderaciones (una columna por señal)"""
+        c = self._columns(signals)
         sell_signals = {}
         
-        # Valores actuales y previos
-        current_rsi = signals['rsi'].iloc[i]
-        prev_rsi = signals['rsi'].iloc[i-1]
-        current_rsi_fast = signals['rsi_fast'].iloc[i]
-        
-        current_ma9 = signals['ma9'].iloc[i]
-        current_ma21 = signals['ma21'].iloc[i]
-        prev_ma9 = signals['ma9'].iloc[i-1]
-        prev_ma21 = signals['ma21'].iloc[i-1]
-        
-        current_price = signals['price'].iloc[i]
-        bb_upper = signals['bb_upper'].iloc[i]
-        bb_middle = signals['bb_middle'].iloc[i]
-        
-        current_macd = signals['macd'].iloc[i]
-        current_macd_signal = signals['macd_signal'].iloc[i]
-        prev_macd = signals['macd'].iloc[i-1]
-        prev_macd_signal = signals['macd_signal'].iloc[i-1]
-        
-        stoch_k = signals['stoch_k'].iloc[i]
-        momentum = signals['momentum'].iloc[i]
-        price_change = signals['price_change'].iloc[i]
-        
         # 1. RSI Signals
-        if current_rsi > self.rsi_extreme_overbought:
-            sell_signals['RSI_EXTREME'] = 1.0
-        elif current_rsi > self.rsi_overbought and prev_rsi <= self.rsi_overbought:
-            sell_signals['RSI_OVERBOUGHT'] = 0.8
-        elif current_rsi > self.rsi_overbought:
-            sell_signals['RSI_HIGH'] = 0.5
+        self._add_chain(sell_signals,
+            ('RSI_EXTREME', c['rsi'] > self.rsi_extreme_overbought, 1.0),
+            ('RSI_OVERBOUGHT', (c['rsi'] > self.rsi_overbought) & (c['prev_rsi'] <= self.rsi_overbought), 0.8),
+            ('RSI_HIGH', c['rsi'] > self.rsi_overbought, 0.5))
         
         # 2. RSI rápido
-        if current_rsi_fast > 75:
-            sell_signals['RSI_FAST'] = 0.6
+        sell_signals['RSI_FAST'] = np.where(c['rsi_fast'] > 75, 0.6, 0.0)
         
         # 3. Media Móvil Signals
-        if current_ma9 < current_ma21 and prev_ma9 >= prev_ma21:
-            sell_signals['MA_DEATH_CROSS'] = 0.9
-        elif current_ma9 < current_ma21:
-            sell_signals['MA_BEARISH'] = 0.4
+        self._add_chain(sell_signals,
+            ('MA_DEATH_CROSS', (c['ma9'] < c['ma21']) & (c['prev_ma9'] >= c['prev_ma21']), 0.9),
+            ('MA_BEARISH', c['ma9'] < c['ma21'], 0.4))
         
         # 4. MACD Signals
-        if current_macd < current_macd_signal and prev_macd >= prev_macd_signal:
-            sell_signals['MACD_CROSS'] = 0.8
-        elif current_macd < current_macd_signal:
-            sell_signals['MACD_BEARISH'] = 0.4
+        self._add_chain(sell_signals,
+            ('MACD_CROSS', (c['macd'] < c['macd_signal']) & (c['prev_macd'] >= c['prev_macd_signal']), 0.8),
+            ('MACD_BEARISH', c['macd'] < c['macd_signal'], 0.4))
         
         # 5. Bollinger Bands
-        if current_price >= bb_upper:
-            sell_signals['BB_OVERBOUGHT'] = 0.7
-        elif current_price > bb_middle:
-            sell_signals['BB_ABOVE_MIDDLE'] = 0.3
+        self._add_chain(sell_signals,
+            ('BB_OVERBOUGHT', c['price'] >= c['bb_upper'], 0.7),
+            ('BB_ABOVE_MIDDLE', c['price'] > c['bb_middle'], 0.3))
         
         # 6. Estocástico
-        if stoch_k > 80:
-            sell_signals['STOCH_OVERBOUGHT'] = 0.6
+        sell_signals['STOCH_OVERBOUGHT'] = np.where(c['stoch_k'] > 80, 0.6, 0.0)
         
         # 7. Momentum negativo
-        if momentum < 0 and price_change < -0.1:
-            sell_signals['MOMENTUM_NEGATIVE'] = 0.5
+        sell_signals['MOMENTUM_NEGATIVE'] = np.where((c['momentum'] < 0) & (c['price_change'] < -0.1), 0.5, 0.0)
         
         # 8. Caída rápida
-        if i >= 3:
-            price_3_ago = signals['price'].iloc[i-3]
-            if current_price < price_3_ago and signals['price'].iloc[i-1] > price_3_ago:
-                sell_signals['QUICK_DROP'] = 0.6
+        sell_signals['QUICK_DROP'] = np.where(
+            (c['price'] < c['price_3_ago']) & (c['prev_price'] > c['price_3_ago']), 0.6, 0.0)
         
         return sell_signals
-    
-    def _check_stop_loss(self, signals, index, stop_loss_pct=0.015):  # Reducido a 1.5%
-        """Verifica stop loss más ajustado"""
-        if signals['position'].iloc[index-1] == 1:
-            for j in range(index-1, -1, -1):
-                if signals['signal'].iloc[j] == 1:
-                    entry_price = signals['price'].iloc[j]
-                    current_price = signals['price'].iloc[index]
-                    loss_pct = (entry_price - current_price) / entry_price
-                    return loss_pct >= stop_loss_pct
-        return False
-    
-    def _check_take_profit(self, signals, index, take_profit_pct=0.01):  # Take profit al 1%
-        """Verifica take profit para asegurar ganancias"""
-        if signals['position'].iloc[index-1] == 1:
-            for j in range(index-1, -1, -1):
-                if signals['signal'].iloc[j] == 1:
-                    entry_price = signals['price'].iloc[j]
-                    current_price = signals['price'].iloc[index]
-                    profit_pct = (current_price - entry_price) / entry_price
-                    return profit_pct >= take_profit_pct
-        return False
 
 # Resto del código del BacktestEngine y TradingBot se mantiene igual...
 # Solo necesitamos cambiar la estrategia
 
-class BacktestEngine:
-    """Motor de backtesting (sin cambios)"""
+class BacktestEngine(BaseBacktestEngine):
+    """Motor de backtesting (el de trading_bot, registrando además el tipo de señal)"""
     
-    def __init__(self, initial_usdt=1000, commission=0.001):
-        self.initial_usdt = initial_usdt
-        self.commission = commission
-        self.reset()
-    
-    def reset(self):
+    def reset(self, capacity=0):
         """Resetea el estado del backtest"""
-        self.usdt_balance = self.initial_usdt
-        self.bnb_balance = 0
-        self.trades = []
-        self.current_position = None
-        self.entry_price = 0
-        self.entry_time = None
+        super().reset(capacity)
+        self._signal_type = np.full(capacity, '', dtype=object)
         
     def run_backtest(self, signals_df):
         """Ejecuta el backtesting"""
-        self.reset()
-        
-        for i, row in signals_df.iterrows():
-            if row['signal'] == 1 and self.current_position is None:
-                self._execute_buy(row['price'], i, row.get('signal_type', ''))
-            elif row['signal'] == -1 and self.current_position == 'long':
-                self._execute_sell(row['price'], i, row.get('signal_type', ''))
-        
-        if self.current_position == 'long':
-            last_price = signals_df['price'].iloc[-1]
-            last_time = signals_df.index[-1]
-            self._execute_sell(last_price, last_time, 'FORCE_CLOSE', force_close=True)
-        
-        return self._calculate_results()
+        if 'signal_type' in signals_df:
+            self._row_signal_types = signals_df['signal_type'].to_numpy()
+        else:
+            self._row_signal_types = np.full(len(signals_df), '', dtype=object)
+        return super().run_backtest(signals_df)
     
-    def _execute_buy(self, price, timestamp, signal_type=''):
-        """Ejecuta una operación de compra"""
-        if self.usdt_balance > 10:
-            usdt_to_spend = self.usdt_balance * 0.95
-            commission_cost = usdt_to_spend * self.commission
-            net_usdt = usdt_to_spend - commission_cost
-            bnb_bought = net_usdt / price
-            
-            self.bnb_balance += bnb_bought
-            self.usdt_balance -= usdt_to_spend
-            
-            self.current_position = 'long'
-            self.entry_price = price
-            self.entry_time = timestamp
-            
-            trade = {
-                'type': 'BUY',
-                'timestamp': timestamp,
-                'price': price,
-                'bnb_amount': bnb_bought,
-                'usdt_amount': usdt_to_spend,
-                'commission': commission_cost,
-                'usdt_balance': self.usdt_balance,
-                'bnb_balance': self.bnb_balance,
-                'signal_type': signal_type
-            }
-            self.trades.append(trade)
+    def _record(self, is_buy, row, **values):
+        """Registra el trade junto con su tipo de señal"""
+        k = super()._record(is_buy, row, **values)
+        self._signal_type[k] = self._row_signal_types[row]
+        return k
     
-    def _execute_sell(self, price, timestamp, signal_type='', force_close=False):
+    def _execute_sell(self, price, row, force_close=False):
         """Ejecuta una operación de venta"""
-        if self.bnb_balance > 0:
-            usdt_received = self.bnb_balance * price
-            commission_cost = usdt_received * self.commission
-            net_usdt = usdt_received - commission_cost
-            
-            if self.entry_price > 0:
-                pnl_pct = ((price - self.entry_price) / self.entry_price) * 100
-            else:
-                pnl_pct = 0
-            
-            self.usdt_balance += net_usdt
-            bnb_sold = self.bnb_balance
-            self.bnb_balance = 0
-            
-            trade = {
-                'type': 'SELL',
-                'timestamp': timestamp,
-                'price': price,
-                'bnb_amount': bnb_sold,
-                'usdt_amount': usdt_received,
-                'commission': commission_cost,
-                'pnl_pct': pnl_pct,
-                'entry_price': self.entry_price,
-                'entry_time': self.entry_time,
-                'usdt_balance': self.usdt_balance,
-                'bnb_balance': self.bnb_balance,
-                'force_close': force_close,
-                'signal_type': signal_type
-            }
-            self.trades.append(trade)
-            
-            self.current_position = None
-            self.entry_price = 0
-            self.entry_time = None
+        n_trades = self._n_trades
+        super()._execute_sell(price, row, force_close)
+        if force_close and self._n_trades > n_trades:
+            self._signal_type[n_trades] = 'FORCE_CLOSE'
+    
+    def _build_trades(self, index):
+        """Añade el tipo de señal a cada trade y a trades_df (tras los campos de compra)"""
+        super()._build_trades(index)
+        signal_types = self._signal_type[:self._n_trades]
+        self.trades_df.insert(len(self.BUY_COLUMNS), 'signal_type', signal_types)
+        for trade, signal_type in zip(self.trades, signal_types):
+            trade['signal_type'] = signal_type
     
     def _calculate_results(self):
         """Calcula los resultados del backtesting"""
@@ -507,6 +405,7 @@ class BacktestEngine:
             'final_bnb_balance': self.bnb_balance,
             'total_commission': total_commission,
             'trades_list': self.trades,
+            'trades_df': self.trades_df,
             'buy_signal_analysis': buy_signal_types,
             'sell_signal_analysis': sell_signal_types
         }
@@ -1,4 +1,8 @@
 """Module for fetching and analyzing Binance historical data."""
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import requests
 import pandas as pd
 
@@ -67,7 +71,12 @@ def macd(values, fast=12, slow=26, signal=9):
 
 # Aplicar la estrategia y generar señales
 def backtest_estrategia(df):
-    """_summary_Aplica la estrategia de trading y genera señales de compra/venta."""
+    """_summary_Aplica la estrategia de trading y genera señales de compra/venta.
+
+    Las reglas se evalúan en una sola pasada con máscaras booleanas
+    desplazadas una barra (sin bucle por fila); cualquier comparación con NaN
+    es False, como en la versión fila a fila.
+    """
 
     window_ma = 50
     window_rsi = 14
@@ -76,36 +85,129 @@ def backtest_estrategia(df):
     df["RSI"] = rsi(df["Close"], window_rsi)
     df["MACD"], df["Signal"] = macd(df["Close"])
 
-    df["Buy"] = False
-    df["Sell"] = False
-
-    for i in range(1, len(df)):
-        if df["Close"].iloc[i] > df["MA"].iloc[i]:  # Precio arriba MA
-            if (
-                df["RSI"].iloc[i - 1] < 30 and df["RSI"].iloc[i] >= 30
-            ):  # RSI cruza sobre 30
-                if (
-                    df["MACD"].iloc[i] > df["Signal"].iloc[i]
-                    and df["MACD"].iloc[i - 1] <= df["Signal"].iloc[i - 1]
-                ):  # Cruce MACD alcista
-                    df["Buy"].iloc[i] = True
-
-        if df["Close"].iloc[i] < df["MA"].iloc[i]:  # Precio abajo MA
-            if (
-                df["RSI"].iloc[i - 1] > 70 and df["RSI"].iloc[i] <= 70
-            ):  # RSI cruza bajo 70
-                if (
-                    df["MACD"].iloc[i] < df["Signal"].iloc[i]
-                    and df["MACD"].iloc[i - 1] >= df["Signal"].iloc[i - 1]
-                ):  # Cruce MACD bajista
-                    df["Sell"].iloc[i] = True
+    rsi_prev = df["RSI"].shift(1)
+    macd_prev = df["MACD"].shift(1)
+    signal_prev = df["Signal"].shift(1)
+
+    rsi_cruza_sobre_30 = (rsi_prev < 30) & (df["RSI"] >= 30)
+    rsi_cruza_bajo_70 = (rsi_prev > 70) & (df["RSI"] <= 70)
+    macd_alcista = (df["MACD"] > df["Signal"]) & (macd_prev <= signal_prev)
+    macd_bajista = (df["MACD"] < df["Signal"]) & (macd_prev >= signal_prev)
+
+    # Precio arriba MA + RSI cruza sobre 30 + cruce MACD alcista
+    df["Buy"] = (df["Close"] > df["MA"]) & rsi_cruza_sobre_30 & macd_alcista
+    # Precio abajo MA + RSI cruza bajo 70 + cruce MACD bajista
+    df["Sell"] = (df["Close"] < df["MA"]) & rsi_cruza_bajo_70 & macd_bajista
 
     return df
 
+
+def cargar_historico_local(symbol, interval, data_dir="."):
+    """_summary_Carga el CSV local más reciente binance_{symbol}_{interval}_*.csv
+    (formato de binance_downloader.py) con las columnas de obtener_historico_binance."""
+    pattern = os.path.join(data_dir, f"binance_{symbol.upper()}_{interval}_*.csv")
+    files = sorted(glob.glob(pattern))
+    if not files:
+        raise FileNotFoundError(f"No hay datos locales para {symbol} {interval} ({pattern})")
+
+    df = pd.read_csv(files[-1])
+    df = df.rename(columns={
+        "open": "Open",
+        "high": "High",
+        "low": "Low",
+        "close": "Close",
+        "volume": "Volume",
+        "trades_count": "Number of trades",
+    })
+    df["datetime"] = pd.to_datetime(df["datetime"])
+    df.set_index("datetime", inplace=True)
+    return df
+
+
+def pares_locales(data_dir="."):
+    """_summary_Pares (symbol, interval) con al menos un CSV local."""
+    pairs = set()
+    for path in glob.glob(os.path.join(data_dir, "binance_*_*_*.csv")):
+        parts = os.path.basename(path).split("_")
+        if len(parts) >= 5:
+            pairs.add((parts[1], parts[2]))
+    return sorted(pairs)
+
+
+def _backtest_local(symbol, interval, data_dir):
+    return backtest_estrategia(cargar_historico_local(symbol, interval, data_dir))
+
+
+def backtest_lote(pairs=None, data_dir=".", max_workers=None):
+    """_summary_Evalúa la estrategia sobre varios pares (symbol, interval) en paralelo
+    a partir de los CSV locales.
+
+    Args:
+        pairs: lista de (symbol, interval); None = todos los pares locales
+        data_dir: carpeta de los CSV de binance_downloader.py
+        max_workers: procesos en paralelo (por defecto núcleos disponibles)
+
+    Returns:
+        tuple: (dict {(symbol, interval): DataFrame con señales},
+                DataFrame resumen con velas, compras, ventas o error por par)
+    """
+    pairs = pares_locales(data_dir) if pairs is None else list(pairs)
+    results = {}
+    rows = []
+    if not pairs:
+        return results, pd.DataFrame(columns=["symbol", "interval", "velas", "compras", "ventas", "error"])
+
+    max_workers = max_workers or min(len(pairs), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_backtest_local, symbol, interval, data_dir) for symbol, interval in pairs]
+        for (symbol, interval), future in zip(pairs, futures):
+            row = {"symbol": symbol, "interval": interval, "velas": 0, "compras": 0, "ventas": 0, "error": ""}
+            try:
+                df = future.result()
+                results[(symbol, interval)] = df
+                row.update(velas=len(df), compras=int(df["Buy"].sum()), ventas=int(df["Sell"].sum()))
+            except Exception as e:
+                row["error"] = f"{type(e).__name__}: {e}"
+            rows.append(row)
+
+    return results, pd.DataFrame(rows)
+
+
+def parsear_pares_lote(args, data_dir="."):
+    """_summary_Convierte argumentos SYMBOL:INTERVAL en pares (symbol, interval).
+
+    Lanza ValueError si un argumento no tiene la forma SYMBOL:INTERVAL o si el
+    intervalo no aparece entre los CSV locales (pares_locales).
+    """
+    intervalos = {interval for _, interval in pares_locales(data_dir)}
+    pairs = []
+    for arg in args:
+        symbol, sep, interval = arg.partition(":")
+        if not sep or not symbol or not interval:
+            raise ValueError(f"'{arg}' no tiene la forma SYMBOL:INTERVAL")
+        if interval not in intervalos:
+            conocidos = ", ".join(sorted(intervalos)) or "ninguno"
+            raise ValueError(f"intervalo '{interval}' sin CSV locales (disponibles: {conocidos})")
+        pairs.append((symbol, interval))
+    return pairs
+
+
 # Ejecución principal
 if __name__ == "__main__":
     import sys
 
+    # Modo lote sobre los CSV locales: --batch [SYMBOL:INTERVAL ...]
+    if len(sys.argv) >= 2 and sys.argv[1] == "--batch":
+        try:
+            batch_pairs = parsear_pares_lote(sys.argv[2:]) or None
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            print("Uso: python entry_analisys.py --batch [SYMBOL:INTERVAL ...]", file=sys.stderr)
+            sys.exit(2)
+        _, resumen = backtest_lote(batch_pairs)
+        print(resumen.to_string(index=False))
+        sys.exit(0)
+
     # Permite pasar símbolo e intervalo como argumentos desde chart_ui.py
     if len(sys.argv) >= 3:
         SYMBOL = sys.argv[1]
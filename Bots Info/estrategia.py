@@ -1,63 +1,93 @@
+import numpy as np
 import pandas as pd
+import matplotlib.dates as mdates
+
+
+def _cruce_arriba(a, b, a_prev, b_prev):
+    """a cruza por encima de b entre la barra anterior y la actual"""
+    return (a > b) & (a_prev <= b_prev)
+
+
+def _cruce_abajo(a, b, a_prev, b_prev):
+    """a cruza por debajo de b entre la barra anterior y la actual"""
+    return (a < b) & (a_prev >= b_prev)
+
 
 def detectar_entradas(df):
     """
     Marca en el DataFrame las señales de compra/venta y salida según las reglas.
     Añade columnas 'Buy', 'Sell', 'Exit' y 'Region' (para sombrear).
+    Las reglas se evalúan sobre columnas completas (sin bucle por fila).
     """
     df = df.copy()
     window_ma = 50
 
     df['MA50'] = df['Close'].rolling(window=window_ma).mean()
-    df['Buy'] = False
-    df['Sell'] = False
-    df['Exit'] = False
-    df['Region'] = None
-
-    for i in range(1, len(df)):
-        # --- Reglas de Compra ---
-        if (
-            df['Close'].iloc[i] > df['MA50'].iloc[i] and
-            df['RSI'].iloc[i] < 70 and
-            df['RSI'].iloc[i-1] < 30 and df['RSI'].iloc[i] >= 30 and
-            df['MACD'].iloc[i] > df['Signal'].iloc[i] and
-            df['MACD'].iloc[i-1] <= df['Signal'].iloc[i-1]
-        ):
-            df.at[df.index[i], 'Buy'] = True
-            df.at[df.index[i], 'Region'] = 'buy'
-
-        # --- Reglas de Venta ---
-        if (
-            df['Close'].iloc[i] < df['MA50'].iloc[i] and
-            df['RSI'].iloc[i] > 30 and
-            df['RSI'].iloc[i-1] > 70 and df['RSI'].iloc[i] <= 70 and
-            df['MACD'].iloc[i] < df['Signal'].iloc[i] and
-            df['MACD'].iloc[i-1] >= df['Signal'].iloc[i-1]
-        ):
-            df.at[df.index[i], 'Sell'] = True
-            df.at[df.index[i], 'Region'] = 'sell'
-
-        # --- Reglas de Salida ---
-        # Salida de compra: RSI cruza por encima de 30 o MACD cruza bajista
-        if (
-            df['Buy'].iloc[i-1] and (
-                df['RSI'].iloc[i-1] < 70 and df['RSI'].iloc[i] >= 70 or
-                (df['MACD'].iloc[i] < df['Signal'].iloc[i] and df['MACD'].iloc[i-1] >= df['Signal'].iloc[i-1])
-            )
-        ):
-            df.at[df.index[i], 'Exit'] = True
-
-        # Salida de venta: RSI cruza por debajo de 30 o MACD cruza alcista
-        if (
-            df['Sell'].iloc[i-1] and (
-                df['RSI'].iloc[i-1] > 30 and df['RSI'].iloc[i] <= 30 or
-                (df['MACD'].iloc[i] > df['Signal'].iloc[i] and df['MACD'].iloc[i-1] <= df['Signal'].iloc[i-1])
-            )
-        ):
-            df.at[df.index[i], 'Exit'] = True
+
+    close = df['Close'].to_numpy(dtype=float)
+    ma50 = df['MA50'].to_numpy(dtype=float)
+    rsi = df['RSI'].to_numpy(dtype=float)
+    macd = df['MACD'].to_numpy(dtype=float)
+    signal = df['Signal'].to_numpy(dtype=float)
+    # Valores de la barra anterior (la primera barra nunca genera señal)
+    rsi_prev = np.r_[np.nan, rsi[:-1]]
+    macd_prev = np.r_[np.nan, macd[:-1]]
+    signal_prev = np.r_[np.nan, signal[:-1]]
+
+    macd_alcista = _cruce_arriba(macd, signal, macd_prev, signal_prev)
+    macd_bajista = _cruce_abajo(macd, signal, macd_prev, signal_prev)
+    rsi_sale_sobreventa = (rsi_prev < 30) & (rsi >= 30)
+    rsi_sale_sobrecompra = (rsi_prev > 70) & (rsi <= 70)
+
+    # --- Reglas de Compra ---
+    buy = (close > ma50) & (rsi < 70) & rsi_sale_sobreventa & macd_alcista
+
+    # --- Reglas de Venta ---
+    sell = (close < ma50) & (rsi > 30) & rsi_sale_sobrecompra & macd_bajista
+
+    # --- Reglas de Salida ---
+    buy_prev = np.r_[False, buy[:-1]]
+    sell_prev = np.r_[False, sell[:-1]]
+    # Salida de compra: RSI cruza por encima de 70 o MACD cruza bajista
+    exit_buy = buy_prev & (((rsi_prev < 70) & (rsi >= 70)) | macd_bajista)
+    # Salida de venta: RSI cruza por debajo de 30 o MACD cruza alcista
+    exit_sell = sell_prev & (((rsi_prev > 30) & (rsi <= 30)) | macd_alcista)
+
+    df['Buy'] = buy
+    df['Sell'] = sell
+    df['Exit'] = exit_buy | exit_sell
+    df['Region'] = pd.Series(np.select([sell, buy], ['sell', 'buy'], default=None),
+                             index=df.index, dtype=object)
 
     return df
 
+
+def _tramos(mask):
+    """
+    Agrupa las barras marcadas consecutivas.
+    Devuelve (inicios, finales) como posiciones de fila de cada tramo.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    cambios = np.diff(np.r_[0, mask.astype(np.int8), 0])
+    return np.flatnonzero(cambios == 1), np.flatnonzero(cambios == -1) - 1
+
+
+def _sombrear(ax, x, mask, color, alpha):
+    """
+    Sombrea, en toda la altura del panel, el intervalo [x[i-1], x[i]] de cada
+    barra marcada. Las barras consecutivas se unen en un solo tramo y todos los
+    tramos se dibujan como una única colección.
+    """
+    mask = np.asarray(mask, dtype=bool).copy()
+    mask[0] = False  # La primera barra no tiene intervalo anterior
+    inicios, finales = _tramos(mask)
+    if len(inicios) == 0:
+        return
+    xranges = [(x[a - 1], x[b] - x[a - 1]) for a, b in zip(inicios, finales)]
+    ax.broken_barh(xranges, (0, 1), transform=ax.get_xaxis_transform(),
+                   facecolors=color, alpha=alpha, linewidth=0)
+
+
 def sombrear_regiones(axes, df):
     """
     Sombrea las regiones de compra (verde) y venta (rojo) en el gráfico de precios (axes[0]).
@@ -65,22 +95,36 @@ def sombrear_regiones(axes, df):
     Sombrea MACD (azul) en el gráfico de MACD (axes[2]).
     Sombrea MA50 (violeta) en el gráfico de velas y MA (axes[0]).
     """
+    if len(df) < 2:
+        return
+    if isinstance(df.index, pd.DatetimeIndex):
+        x = mdates.date2num(df.index)
+    else:
+        x = df.index.to_numpy(dtype=float)
+
+    close = df['Close'].to_numpy(dtype=float)
+    ma50 = df['MA50'].to_numpy(dtype=float)
+    rsi = df['RSI'].to_numpy(dtype=float)
+    macd = df['MACD'].to_numpy(dtype=float)
+    signal = df['Signal'].to_numpy(dtype=float)
+    close_prev = np.r_[np.nan, close[:-1]]
+    ma50_prev = np.r_[np.nan, ma50[:-1]]
+    rsi_prev = np.r_[np.nan, rsi[:-1]]
+    macd_prev = np.r_[np.nan, macd[:-1]]
+    signal_prev = np.r_[np.nan, signal[:-1]]
+
     # Panel 0: Compra/Venta y MA50
-    for i in range(1, len(df)):
-        if df['Region'].iloc[i] == 'buy':
-            axes[0].axvspan(df.index[i-1], df.index[i], color='green', alpha=0.2)
-        elif df['Region'].iloc[i] == 'sell':
-            axes[0].axvspan(df.index[i-1], df.index[i], color='red', alpha=0.2)
-        # MA50 cruce en panel de velas
-        if (df['Close'].iloc[i] > df['MA50'].iloc[i] and df['Close'].iloc[i-1] <= df['MA50'].iloc[i-1]) or \
-           (df['Close'].iloc[i] < df['MA50'].iloc[i] and df['Close'].iloc[i-1] >= df['MA50'].iloc[i-1]):
-            axes[0].axvspan(df.index[i-1], df.index[i], color='violet', alpha=0.10)
+    region = df['Region'].to_numpy()
+    _sombrear(axes[0], x, region == 'buy', 'green', 0.2)
+    _sombrear(axes[0], x, region == 'sell', 'red', 0.2)
+    # MA50 cruce en panel de velas
+    cruce_ma50 = (_cruce_arriba(close, ma50, close_prev, ma50_prev) |
+                  _cruce_abajo(close, ma50, close_prev, ma50_prev))
+    _sombrear(axes[0], x, cruce_ma50, 'violet', 0.10)
     # Panel 1: RSI
-    for i in range(1, len(df)):
-        if (df['RSI'].iloc[i-1] < 30 and df['RSI'].iloc[i] >= 30) or (df['RSI'].iloc[i-1] > 70 and df['RSI'].iloc[i] <= 70):
-            axes[1].axvspan(df.index[i-1], df.index[i], color='yellow', alpha=0.15)
+    cruce_rsi = ((rsi_prev < 30) & (rsi >= 30)) | ((rsi_prev > 70) & (rsi <= 70))
+    _sombrear(axes[1], x, cruce_rsi, 'yellow', 0.15)
     # Panel 2: MACD
-    for i in range(1, len(df)):
-        if (df['MACD'].iloc[i] > df['Signal'].iloc[i] and df['MACD'].iloc[i-1] <= df['Signal'].iloc[i-1]) or \
-           (df['MACD'].iloc[i] < df['Signal'].iloc[i] and df['MACD'].iloc[i-1] >= df['Signal'].iloc[i-1]):
-            axes[2].axvspan(df.index[i-1], df.index[i], color='blue', alpha=0.12)
\ No newline at end of file
+    cruce_macd = (_cruce_arriba(macd, signal, macd_prev, signal_prev) |
+                  _cruce_abajo(macd, signal, macd_prev, signal_prev))
+    _sombrear(axes[2], x, cruce_macd, 'blue', 0.12)
@@ -7,6 +7,7 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from trading_bot import TechnicalIndicators, BacktestEngine
+import strategy_kernel as kernel
 
 class HybridFastStrategy:
     """Estrategia híbrida rápida con lo mejor de cada enfoque"""
@@ -22,6 +23,13 @@ class HybridFastStrategy:
         self.buy_threshold = 2.0        # Score mínimo para comprar
         self.sell_threshold = 1.8       # Score mínimo para vender
         
+        # Salidas rápidas (solo para entradas dentro de la ventana de barras)
+        self.stop_pct = 0.018           # Stop loss rápido (1.8%)
+        self.profit_pct = 0.012         # Take profit rápido (1.2%)
+        self.quick_exit_lookback = 100
+        self.abs_exit_usdt = 1.2        # Salir si el precio varía >= 1.2 USDT
+        self.abs_exit_lookback = 200
+        
     def generate_signals(self, df):
         """Genera señales rápidas y efectivas"""
         signals = pd.DataFrame(index=df.index)
@@ -51,188 +59,88 @@ class HybridFastStrategy:
         
         print("   Generando señales...")
         
-        # Generar señales con lógica simplificada pero efectiva
-        for i in range(50, len(signals)):  # Empezar después de indicadores estables
+        columns = {name: signals[name].to_numpy(dtype=float) for name in
+                   ('price', 'rsi', 'rsi_fast', 'ma9', 'ma21', 'macd', 'macd_signal',
+                    'bb_upper', 'bb_middle', 'bb_lower')}
+        buy_score = kernel.evaluate_score(self._fast_buy_spec(), columns)
+        sell_score = kernel.evaluate_score(self._fast_sell_spec(), columns)
+        
+        result = kernel.run_state_machine(
+            columns['price'], buy_score, sell_score,
+            start=50,  # Empezar después de indicadores estables
+            buy_threshold=self.buy_threshold, sell_threshold=self.sell_threshold,
+            min_gap=self.min_time_between_trades, last_trade=self.last_trade_time,
+            stop_pct=self.stop_pct, take_pct=self.profit_pct,
+            stop_lookback=self.quick_exit_lookback, take_lookback=self.quick_exit_lookback,
+            abs_exit=self.abs_exit_usdt, abs_lookback=self.abs_exit_lookback)
+        self.last_trade_time = result['last_trade']
+        
+        signal = result['signal']
+        prices = columns['price']
+        signal_type = [''] * len(signals)
+        entry_price = None
+        for i in np.flatnonzero(signal):
+            if signal[i] == 1:
+                entry_price = prices[i]
+                signal_type[i] = f"BUY(Score:{buy_score[i]:.1f})"
+                continue
             
-            if self._time_filter(i):
-                
-                # Calcular scores simplificados
-                buy_score = self._fast_buy_score(signals, i)
-                sell_score = self._fast_sell_score(signals, i)
-                
-                current_position = signals['position'].iloc[i-1]
-                
-                if current_position == 0:  # Sin posición
-                    if buy_score >= self.buy_threshold:
-                        signals.loc[signals.index[i], 'signal'] = 1
-                        signals.loc[signals.index[i], 'position'] = 1
-                        signals.loc[signals.index[i], 'signal_type'] = f"BUY(Score:{buy_score:.1f})"
-                        self.last_trade_time = i
-                    else:
-                        signals.loc[signals.index[i], 'position'] = 0
-                        
-                else:  # Con posición
-                    # Verificar condiciones de salida
-                    stop_loss = self._quick_stop_loss(signals, i)
-                    take_profit = self._quick_take_profit(signals, i)
-                    # Nueva condición: salir si la variación absoluta del precio >= 1.2 USDT
-                    price_move = self._exit_by_abs_price(signals, i, abs_usdt=1.2)
-                    
-                    # Si cualquiera de las condiciones se cumple, salir
-                    if sell_score >= self.sell_threshold or stop_loss or take_profit or price_move:
-                        signals.loc[signals.index[i], 'signal'] = -1
-                        signals.loc[signals.index[i], 'position'] = 0
-
-                        # Construir lista de razones para mayor trazabilidad
-                        reasons = []
-                        if sell_score >= self.sell_threshold:
-                            reasons.append("TECHNICAL")
-                        if stop_loss:
-                            reasons.append("STOP_LOSS")
-                        if take_profit:
-                            reasons.append("TAKE_PROFIT")
-                        if price_move:
-                            reasons.append("PRICE_MOVE>=1.2")
-
-                        reason_str = "+".join(reasons) if reasons else "TECHNICAL"
-                        signals.loc[signals.index[i], 'signal_type'] = f"SELL({reason_str})"
-                        self.last_trade_time = i
-                    else:
-                        signals.loc[signals.index[i], 'position'] = 1
-            else:
-                # Mantener posición anterior
-                signals.loc[signals.index[i], 'position'] = signals['position'].iloc[i-1]
+            # Construir lista de razones para mayor trazabilidad
+            reasons = []
+            if result['reasons'][i] & kernel.TECHNICAL:
+                reasons.append("TECHNICAL")
+            if result['reasons'][i] & kernel.STOP_LOSS:
+                reasons.append("STOP_LOSS")
+            if result['reasons'][i] & kernel.TAKE_PROFIT:
+                reasons.append("TAKE_PROFIT")
+            if result['reasons'][i] & kernel.PRICE_MOVE:
+                reasons.append("PRICE_MOVE>=1.2")
+                # Debug: imprimir cuando se active la salida por precio absoluto
+                price_diff = abs(prices[i] - entry_price)
+                print(f"🔴 SALIDA POR PRECIO ABSOLUTO: {signals.index[i]} - Entrada: ${entry_price:.2f} -> Actual: ${prices[i]:.2f} (Δ: ${price_diff:.2f})")
+            
+            reason_str = "+".join(reasons) if reasons else "TECHNICAL"
+            signal_type[i] = f"SELL({reason_str})"
+        
+        signals['signal'] = signal
+        signals['position'] = result['position']
+        signals['signal_type'] = signal_type
         
         return signals
     
-    def _time_filter(self, i):
-        """Filtro de tiempo simple"""
-        if self.last_trade_time is None:
-            return True
-        return (i - self.last_trade_time) >= self.min_time_between_trades
-    
-    def _fast_buy_score(self, signals, i):
+    def _fast_buy_spec(self):
         """Scoring rápido para compra (0-4)"""
-        score = 0
-        
-        # RSI (peso alto)
-        rsi = signals['rsi'].iloc[i]
-        if rsi < 20:
-            score += 2.0    # Muy fuerte
-        elif rsi < self.rsi_oversold:
-            score += 1.5    # Fuerte
-        elif rsi < 35:
-            score += 0.5    # Débil
-        
-        # Bandas de Bollinger
-        price = signals['price'].iloc[i]
-        bb_lower = signals['bb_lower'].iloc[i]
-        bb_middle = signals['bb_middle'].iloc[i]
-        
-        if price <= bb_lower:
-            score += 1.0    # En soporte
-        elif price < bb_middle:
-            score += 0.3    # Debajo de media
-        
-        # Medias Móviles
-        ma9 = signals['ma9'].iloc[i]
-        ma21 = signals['ma21'].iloc[i]
-        
-        if ma9 > ma21:
-            score += 0.5    # Tendencia alcista
-        
-        # MACD
-        macd = signals['macd'].iloc[i]
-        macd_signal = signals['macd_signal'].iloc[i]
-        
-        if macd > macd_signal:
-            score += 0.5    # MACD alcista
-        
-        # RSI rápido como confirmación
-        rsi_fast = signals['rsi_fast'].iloc[i]
-        if rsi_fast < 30:
-            score += 0.3
-        
-        return score
+        return [
+            # RSI (peso alto)
+            [((('rsi', '<', 20),), 2.0),                   # Muy fuerte
+             ((('rsi', '<', self.rsi_oversold),), 1.5),    # Fuerte
+             ((('rsi', '<', 35),), 0.5)],                  # Débil
+            # Bandas de Bollinger
+            [((('price', '<=', 'bb_lower'),), 1.0),        # En soporte
+             ((('price', '<', 'bb_middle'),), 0.3)],       # Debajo de media
+            # Medias Móviles
+            [((('ma9', '>', 'ma21'),), 0.5)],              # Tendencia alcista
+            # MACD
+            [((('macd', '>', 'macd_signal'),), 0.5)],      # MACD alcista
+            # RSI rápido como confirmación
+            [((('rsi_fast', '<', 30),), 0.3)],
+        ]
     
-    def _fast_sell_score(self, signals, i):
+    def _fast_sell_spec(self):
         """Scoring rápido para venta"""
-        score = 0
-        
-        # RSI
-        rsi = signals['rsi'].iloc[i]
-        if rsi > 80:
-            score += 2.0
-        elif rsi > self.rsi_overbought:
-            score += 1.5
-        elif rsi > 65:
-            score += 0.5
-        
-        # Bandas de Bollinger
-        price = signals['price'].iloc[i]
-        bb_upper = signals['bb_upper'].iloc[i]
-        bb_middle = signals['bb_middle'].iloc[i]
-        
-        if price >= bb_upper:
-            score += 1.0
-        elif price > bb_middle:
-            score += 0.3
-        
-        # Medias Móviles
-        ma9 = signals['ma9'].iloc[i]
-        ma21 = signals['ma21'].iloc[i]
-        
-        if ma9 < ma21:
-            score += 0.5
-        
-        # MACD
-        macd = signals['macd'].iloc[i]
-        macd_signal = signals['macd_signal'].iloc[i]
-        
-        if macd < macd_signal:
-            score += 0.5
-        
-        return score
-    
-    def _quick_stop_loss(self, signals, index, stop_pct=0.018):
-        """Stop loss rápido (1.8%)"""
-        if signals['position'].iloc[index-1] == 1:
-            for j in range(index-1, max(0, index-100), -1):  # Buscar max 100 períodos atrás
-                if signals['signal'].iloc[j] == 1:
-                    entry_price = signals['price'].iloc[j]
-                    current_price = signals['price'].iloc[index]
-                    loss_pct = (entry_price - current_price) / entry_price
-                    return loss_pct >= stop_pct
-        return False
-    
-    def _quick_take_profit(self, signals, index, profit_pct=0.012):
-        """Take profit rápido (1.2%)"""
-        if signals['position'].iloc[index-1] == 1:
-            for j in range(index-1, max(0, index-100), -1):
-                if signals['signal'].iloc[j] == 1:
-                    entry_price = signals['price'].iloc[j]
-                    current_price = signals['price'].iloc[index]
-                    profit = (current_price - entry_price) / entry_price
-                    return profit >= profit_pct
-        return False
-
-    def _exit_by_abs_price(self, signals, index, abs_usdt=1.2):
-        """Exit when absolute price variation from entry >= abs_usdt (USDT)."""
-        # Solo aplicar si había posición previa
-        if signals['position'].iloc[index-1] == 1:
-            for j in range(index-1, max(0, index-200), -1):  # buscar hasta 200 pasos atrás
-                if signals['signal'].iloc[j] == 1:
-                    entry_price = signals['price'].iloc[j]
-                    current_price = signals['price'].iloc[index]
-                    price_diff = abs(current_price - entry_price)
-                    # Variación absoluta en USDT (valor absoluto)
-                    if price_diff >= abs_usdt:
-                        # Debug: imprimir cuando se active esta condición
-                        timestamp = signals.index[index]
-                        print(f"🔴 SALIDA POR PRECIO ABSOLUTO: {timestamp} - Entrada: ${entry_price:.2f} -> Actual: ${current_price:.2f} (Δ: ${price_diff:.2f})")
-                        return True
-                    return False
-        return False
+        return [
+            # RSI
+            [((('rsi', '>', 80),), 2.0),
+             ((('rsi', '>', self.rsi_overbought),), 1.5),
+             ((('rsi', '>', 65),), 0.5)],
+            # Bandas de Bollinger
+            [((('price', '>=', 'bb_upper'),), 1.0),
+             ((('price', '>', 'bb_middle'),), 0.3)],
+            # Medias Móviles
+            [((('ma9', '<', 'ma21'),), 0.5)],
+            # MACD
+            [((('macd', '<', 'macd_signal'),), 0.5)],
+        ]
 
 class HybridTradingBot:
     """Bot híbrido rápido"""
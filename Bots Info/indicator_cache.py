@@ -0,0 +1,166 @@
+"""
+Caché compartida de indicadores técnicos
+Memoriza los resultados de TechnicalIndicators por huella de los datos,
+indicador y parámetros, con expulsión LRU en memoria y un nivel opcional en
+disco. Cambiar de estrategia o repetir un backtest sobre el mismo CSV reutiliza
+los indicadores ya calculados.
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(series):
+    """Huella del contenido de una serie (valores, índice, nombre y tipo)"""
+    # sha256 suele estar acelerado por hardware: es el más rápido de hashlib aquí
+    h = hashlib.sha256()
+    h.update(str((series.name, str(series.dtype), len(series))).encode())
+    values = series.to_numpy()
+    if values.dtype == object:
+        values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    h.update(memoryview(np.ascontiguousarray(values)))
+    index = series.index
+    if isinstance(index, pd.DatetimeIndex):
+        h.update(str(index.dtype).encode())
+        h.update(memoryview(np.ascontiguousarray(index.asi8)))
+    elif isinstance(index, pd.RangeIndex):
+        h.update(str((index.start, index.stop, index.step)).encode())
+    else:
+        h.update(memoryview(pd.util.hash_pandas_object(index, index=False).to_numpy()))
+    return h.hexdigest()
+
+
+def _copy(value):
+    """Copia de un resultado para que el llamador no pueda modificar la caché"""
+    if isinstance(value, tuple):
+        return tuple(v.copy() for v in value)
+    return value.copy()
+
+
+class IndicatorCache:
+    """
+    Caché LRU de resultados de indicadores.
+
+    Las claves son (indicador, función que lo calcula, parámetros y huellas de
+    las series de entrada).
+    Con disk_dir se guarda además cada resultado en un pickle, de modo que
+    sobrevive entre ejecuciones del programa.
+    """
+
+    def __init__(self, max_entries=64, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def enable_disk(self, disk_dir):
+        """Activa el nivel en disco en disk_dir (None para desactivarlo)"""
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self.disk_dir = disk_dir
+
+    def get_or_compute(self, key, compute):
+        """Devuelve el resultado cacheado de key o lo calcula con compute()"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(self._entries[key])
+
+        value = self._load_from_disk(key)
+        if value is None:
+            value = compute()
+            self._save_to_disk(key, value)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.disk_hits += 1
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return _copy(value)
+
+    def clear(self):
+        """Vacía el nivel en memoria"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Aciertos en memoria y disco, cálculos realizados y entradas actuales"""
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+        }
+
+    def _disk_path(self, key):
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.disk_dir, f"{key[0]}_{digest}.pkl")
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_pickle(path)
+        except Exception:
+            return None
+
+    def _save_to_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp"
+        pd.to_pickle(value, tmp_path)
+        os.replace(tmp_path, path)
+
+
+# Instancia compartida por todas las clases TechnicalIndicators
+INDICATOR_CACHE = IndicatorCache()
+
+
+def cached_indicator(name, cache=None):
+    """
+    Decorador para funciones de indicadores cuyos argumentos son series de
+    pandas y parámetros escalares. Los parámetros por defecto se normalizan,
+    así rsi(p) y rsi(p, period=14) comparten entrada. La clave incluye el
+    módulo y el nombre cualificado de la función: dos implementaciones del
+    mismo indicador (p. ej. las TechnicalIndicators de trading_bot y de
+    enhanced_trading_bot) nunca se devuelven resultados entre sí.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        owner = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = []
+            for arg_name, value in bound.arguments.items():
+                if isinstance(value, pd.Series):
+                    params.append((arg_name, fingerprint(value)))
+                else:
+                    params.append((arg_name, value))
+            key = (name, owner, tuple(params))
+            return (cache or INDICATOR_CACHE).get_or_compute(key, lambda: func(*args, **kwargs))
+
+        return wrapper
+    return decorator
@@ -8,6 +8,7 @@ import numpy as np
 from datetime import datetime
 import os
 from trading_bot import TechnicalIndicators, BacktestEngine
+import strategy_kernel as kernel
 
 class OptimizedTradingStrategy:
     """Estrategia optimizada basada en confluencia de señales de alta calidad"""
@@ -73,230 +74,137 @@ class OptimizedTradingStrategy:
             signals['volume_ma'] = df['volume'].rolling(window=20).mean()
             signals['volume_ratio'] = df['volume'] / signals['volume_ma']
         
-        # Generar señales con lógica optimizada
-        for i in range(100, len(signals)):  # Comenzar después de tener suficientes datos
-            
-            if self._time_and_market_filter(signals, i):
-                
-                # Calcular scores de calidad
-                buy_score = self._calculate_optimized_buy_score(signals, i)
-                sell_score = self._calculate_optimized_sell_score(signals, i)
-                
-                signals.loc[signals.index[i], 'buy_score'] = buy_score
-                signals.loc[signals.index[i], 'sell_score'] = sell_score
-                
-                current_position = signals['position'].iloc[i-1]
-                
-                if current_position == 0:  # Sin posición
-                    # Entrada solo con score muy alto Y confluencia de señales
-                    if buy_score >= self.min_buy_score and self._confirm_buy_confluence(signals, i):
-                        signals.loc[signals.index[i], 'signal'] = 1
-                        signals.loc[signals.index[i], 'position'] = 1
-                        signals.loc[signals.index[i], 'signal_type'] = self._get_detailed_buy_reason(signals, i)
-                        self.last_trade_time = i
-                    else:
-                        signals.loc[signals.index[i], 'position'] = 0
-                        
-                else:  # Con posición
-                    # Verificar condiciones de salida
-                    stop_loss = self._check_dynamic_stop_loss(signals, i)
-                    take_profit = self._check_dynamic_take_profit(signals, i)
-                    technical_exit = sell_score >= self.min_sell_score
-                    
-                    if stop_loss or take_profit or technical_exit:
-                        signals.loc[signals.index[i], 'signal'] = -1
-                        signals.loc[signals.index[i], 'position'] = 0
-                        
-                        exit_reasons = []
-                        if stop_loss: exit_reasons.append("STOP_LOSS")
-                        if take_profit: exit_reasons.append("TAKE_PROFIT")
-                        if technical_exit: exit_reasons.append("TECHNICAL")
-                        
-                        signals.loc[signals.index[i], 'signal_type'] = f"SELL: {', '.join(exit_reasons)}"
-                        self.last_trade_time = i
-                    else:
-                        signals.loc[signals.index[i], 'position'] = 1
+        # Puntuaciones y filtros sobre columnas completas; máquina de estados compilada
+        columns = self._kernel_columns(signals)
+        buy_score = kernel.evaluate_score(self._optimized_buy_spec(columns), columns, cap=5.0)
+        sell_score = kernel.evaluate_score(self._optimized_sell_spec(), columns, cap=5.0)
+        confluence = kernel.evaluate_score(self._buy_confluence_spec(), columns) >= 3
+        
+        result = kernel.run_state_machine(
+            columns['price'], buy_score, sell_score,
+            start=100,  # Comenzar después de tener suficientes datos
+            buy_threshold=self.min_buy_score, sell_threshold=self.min_sell_score,
+            min_gap=self.min_time_between_trades, last_trade=self.last_trade_time,
+            entry_mask=confluence, filter_mask=self._market_filter(columns),
+            stop_pct=self._dynamic_stop_pct(columns), take_pct=self._dynamic_take_profit_pct(columns))
+        self.last_trade_time = result['last_trade']
+        
+        # Los scores solo se registran en las barras que pasaron los filtros
+        evaluated = result['evaluated']
+        signals['buy_score'] = np.where(evaluated, buy_score, 0.0)
+        signals['sell_score'] = np.where(evaluated, sell_score, 0.0)
+        
+        signal = result['signal']
+        signal_type = [''] * len(signals)
+        for i in np.flatnonzero(signal):
+            if signal[i] == 1:
+                signal_type[i] = self._get_detailed_buy_reason(signals, i)
             else:
-                # Mantener posición anterior
-                signals.loc[signals.index[i], 'position'] = signals['position'].iloc[i-1]
+                reasons = result['reasons'][i]
+                exit_reasons = []
+                if reasons & kernel.STOP_LOSS: exit_reasons.append("STOP_LOSS")
+                if reasons & kernel.TAKE_PROFIT: exit_reasons.append("TAKE_PROFIT")
+                if reasons & kernel.TECHNICAL: exit_reasons.append("TECHNICAL")
+                signal_type[i] = f"SELL: {', '.join(exit_reasons)}"
+        
+        signals['signal'] = signal
+        signals['position'] = result['position']
+        signals['signal_type'] = signal_type
         
         return signals
     
-    def _time_and_market_filter(self, signals, i):
-        """Filtro combinado de tiempo y condiciones de mercado"""
-        # Filtro de tiempo
-        if self.last_trade_time is not None:
-            if (i - self.last_trade_time) < self.min_time_between_trades:
-                return False
-        
-        # Filtro de volatilidad excesiva
-        if i >= 20:
-            current_vol = signals['volatility'].iloc[i]
-            avg_vol = signals['volatility'].iloc[i-20:i].mean()
-            if current_vol > avg_vol * 2:  # Evitar volatilidad extrema
-                return False
-        
-        # Filtro de Bollinger Band width (evitar mercados muy planos)
-        bb_width = signals['bb_width'].iloc[i]
-        if bb_width < 0.01:  # Mercado muy lateral
-            return False
-        
-        return True
+    def _kernel_columns(self, signals):
+        """Columnas y derivados que usan las especificaciones de puntuación y los filtros"""
+        names = ['price', 'rsi', 'rsi_short', 'ma5', 'ma10', 'ma20', 'ma50', 'macd', 'macd_signal',
+                 'macd_histogram', 'bb_upper', 'bb_middle', 'bb_lower', 'bb_width',
+                 'price_change_5', 'price_change_10', 'volatility']
+        if 'volume_ratio' in signals.columns:
+            names.append('volume_ratio')
+        columns = {name: signals[name].to_numpy(dtype=float) for name in names}
+        
+        columns['macd_histogram_prev'] = kernel.shifted(columns['macd_histogram'])
+        columns['price_trend'] = columns['price'] - kernel.shifted(columns['price'], 10)
+        columns['rsi_trend'] = columns['rsi'] - kernel.shifted(columns['rsi'], 10)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns['bb_position'] = (columns['price'] - columns['bb_lower']) / (columns['bb_middle'] - columns['bb_lower'])
+        columns['avg_volatility'] = kernel.window_mean(columns['volatility'], 20)
+        return columns
     
-    def _calculate_optimized_buy_score(self, signals, i):
+    def _market_filter(self, columns):
+        """Filtro de condiciones de mercado (el filtro de tiempo lo aplica el kernel)"""
+        # Evitar volatilidad extrema
+        extreme_volatility = columns['volatility'] > columns['avg_volatility'] * 2
+        # Evitar mercados muy planos (Bollinger Band width)
+        flat_market = columns['bb_width'] < 0.01
+        return ~extreme_volatility & ~flat_market
+    
+    def _optimized_buy_spec(self, columns):
         """Score optimizado para compras (0-5)"""
-        score = 0
-        
-        # RSI multi-timeframe con pesos optimizados
-        rsi = signals['rsi'].iloc[i]
-        rsi_short = signals['rsi_short'].iloc[i]
-        rsi_long = signals['rsi_long'].iloc[i]
-        
-        # Score RSI con múltiples confirmaciones
-        if rsi < self.rsi_strong_oversold and rsi_short < 25:
-            score += 2.0  # Muy fuerte: ambos RSI muy bajos
-        elif rsi < self.rsi_oversold:
-            if rsi_short < rsi:  # RSI corto más bajo = momentum bajista terminando
-                score += 1.5
-            else:
-                score += 1.0
-        
-        # Divergencia RSI (precio baja pero RSI sube)
-        if i >= 10:
-            price_trend = signals['price'].iloc[i] - signals['price'].iloc[i-10]
-            rsi_trend = rsi - signals['rsi'].iloc[i-10]
-            if price_trend < 0 and rsi_trend > 0:  # Divergencia bullish
-                score += 0.8
-        
-        # Moving Averages con jerarquía clara
-        ma5 = signals['ma5'].iloc[i]
-        ma10 = signals['ma10'].iloc[i]
-        ma20 = signals['ma20'].iloc[i]
-        ma50 = signals['ma50'].iloc[i]
-        price = signals['price'].iloc[i]
-        
-        # Estructura de MA alcista
-        if ma5 > ma10 > ma20 > ma50:
-            score += 1.0  # Alineación perfect alcista
-        elif ma5 > ma10 > ma20:
-            score += 0.6  # Tendencia alcista corto plazo
-        elif ma5 > ma10:
-            score += 0.3  # Momentum alcista básico
-        
-        # Precio cerca del soporte de MA
-        if price < ma20 and price > ma20 * 0.999:  # Precio tocando MA20
-            score += 0.5
-        
-        # MACD optimizado
-        macd = signals['macd'].iloc[i]
-        macd_signal = signals['macd_signal'].iloc[i]
-        macd_hist = signals['macd_histogram'].iloc[i]
-        macd_hist_prev = signals['macd_histogram'].iloc[i-1]
-        
-        if macd > macd_signal and macd_hist > macd_hist_prev:
-            score += 0.8  # MACD alcista con momentum creciente
-        elif macd > macd_signal:
-            score += 0.4
-        
-        # Bollinger Bands táctical
-        bb_lower = signals['bb_lower'].iloc[i]
-        bb_middle = signals['bb_middle'].iloc[i]
-        bb_position = (price - bb_lower) / (bb_middle - bb_lower)
-        
-        if price <= bb_lower * 1.001:  # Muy cerca del soporte BB
-            score += 1.0
-        elif bb_position < 0.2:  # En quintil inferior
-            score += 0.5
-        
-        # Momentum reversal
-        price_change_5 = signals['price_change_5'].iloc[i]
-        price_change_10 = signals['price_change_10'].iloc[i]
-        
-        if price_change_10 < -0.2 and price_change_5 > -0.1:  # Ralentización de caída
-            score += 0.4
-        
+        spec = [
+            # RSI multi-timeframe con pesos optimizados
+            [((('rsi', '<', self.rsi_strong_oversold), ('rsi_short', '<', 25)), 2.0),  # Muy fuerte: ambos RSI muy bajos
+             ((('rsi', '<', self.rsi_oversold), ('rsi_short', '<', 'rsi')), 1.5),  # RSI corto más bajo = momentum bajista terminando
+             ((('rsi', '<', self.rsi_oversold),), 1.0)],
+            # Divergencia RSI (precio baja pero RSI sube)
+            [((('price_trend', '<', 0), ('rsi_trend', '>', 0)), 0.8)],
+            # Estructura de MA alcista
+            [((('ma5', '>', 'ma10'), ('ma10', '>', 'ma20'), ('ma20', '>', 'ma50')), 1.0),  # Alineación perfect alcista
+             ((('ma5', '>', 'ma10'), ('ma10', '>', 'ma20')), 0.6),  # Tendencia alcista corto plazo
+             ((('ma5', '>', 'ma10'),), 0.3)],  # Momentum alcista básico
+            # Precio tocando MA20
+            [((('price', '<', 'ma20'), ('price', '>', 'ma20', 0.999)), 0.5)],
+            # MACD optimizado
+            [((('macd', '>', 'macd_signal'), ('macd_histogram', '>', 'macd_histogram_prev')), 0.8),  # Momentum creciente
+             ((('macd', '>', 'macd_signal'),), 0.4)],
+            # Bollinger Bands táctical
+            [((('price', '<=', 'bb_lower', 1.001),), 1.0),  # Muy cerca del soporte BB
+             ((('bb_position', '<', 0.2),), 0.5)],  # En quintil inferior
+            # Momentum reversal: ralentización de caída
+            [((('price_change_10', '<', -0.2), ('price_change_5', '>', -0.1)), 0.4)],
+        ]
         # Volume confirmation (si disponible)
-        if 'volume_ratio' in signals.columns:
-            vol_ratio = signals['volume_ratio'].iloc[i]
-            if vol_ratio > 1.2:  # Volumen por encima del promedio
-                score += 0.3
-        
-        return min(score, 5.0)  # Cap en 5.0
+        if 'volume_ratio' in columns:
+            spec.append([((('volume_ratio', '>', 1.2),), 0.3)])
+        return spec
     
-    def _calculate_optimized_sell_score(self, signals, i):
+    def _optimized_sell_spec(self):
         """Score optimizado para ventas"""
-        score = 0
-        
-        # RSI con multiple confirmations
-        rsi = signals['rsi'].iloc[i]
-        rsi_short = signals['rsi_short'].iloc[i]
-        
-        if rsi > self.rsi_strong_overbought and rsi_short > 75:
-            score += 2.0
-        elif rsi > self.rsi_overbought:
-            if rsi_short > rsi:
-                score += 1.5
-            else:
-                score += 1.0
-        
-        # MA structure bearish
-        ma5 = signals['ma5'].iloc[i]
-        ma10 = signals['ma10'].iloc[i]
-        ma20 = signals['ma20'].iloc[i]
-        price = signals['price'].iloc[i]
-        
-        if ma5 < ma10 < ma20:
-            score += 1.0
-        elif ma5 < ma10:
-            score += 0.5
-        
-        # Resistencia en MA
-        if price > ma20 and price < ma20 * 1.001:
-            score += 0.5
-        
-        # MACD bearish
-        macd = signals['macd'].iloc[i]
-        macd_signal = signals['macd_signal'].iloc[i]
-        macd_hist = signals['macd_histogram'].iloc[i]
-        macd_hist_prev = signals['macd_histogram'].iloc[i-1]
-        
-        if macd < macd_signal and macd_hist < macd_hist_prev:
-            score += 0.8
-        
-        # BB resistance
-        bb_upper = signals['bb_upper'].iloc[i]
-        if price >= bb_upper * 0.999:
-            score += 1.0
-        
-        return min(score, 5.0)
+        return [
+            # RSI con multiple confirmations
+            [((('rsi', '>', self.rsi_strong_overbought), ('rsi_short', '>', 75)), 2.0),
+             ((('rsi', '>', self.rsi_overbought), ('rsi_short', '>', 'rsi')), 1.5),
+             ((('rsi', '>', self.rsi_overbought),), 1.0)],
+            # MA structure bearish
+            [((('ma5', '<', 'ma10'), ('ma10', '<', 'ma20')), 1.0),
+             ((('ma5', '<', 'ma10'),), 0.5)],
+            # Resistencia en MA
+            [((('price', '>', 'ma20'), ('price', '<', 'ma20', 1.001)), 0.5)],
+            # MACD bearish
+            [((('macd', '<', 'macd_signal'), ('macd_histogram', '<', 'macd_histogram_prev')), 0.8)],
+            # BB resistance
+            [((('price', '>=', 'bb_upper', 0.999),), 1.0)],
+        ]
     
-    def _confirm_buy_confluence(self, signals, i):
-        """Confirma confluencia de al menos 3 indicadores para compra"""
-        confirmations = 0
-        
-        # 1. RSI confirmation
-        if signals['rsi'].iloc[i] < self.rsi_oversold:
-            confirmations += 1
-        
-        # 2. Price vs BB
-        if signals['price'].iloc[i] <= signals['bb_lower'].iloc[i] * 1.002:
-            confirmations += 1
-        
-        # 3. MACD positive
-        if signals['macd'].iloc[i] > signals['macd_signal'].iloc[i]:
-            confirmations += 1
-        
-        # 4. MA structure
-        if signals['ma5'].iloc[i] > signals['ma10'].iloc[i]:
-            confirmations += 1
-        
-        # 5. Recent momentum change
-        if i >= 5:
-            recent_change = signals['price_change_5'].iloc[i]
-            if recent_change > -0.5:  # No está cayendo fuertemente
-                confirmations += 1
-        
-        return confirmations >= 3
+    def _buy_confluence_spec(self):
+        """Confluencia para compra: se requieren al menos 3 confirmaciones"""
+        return [
+            [((('rsi', '<', self.rsi_oversold),), 1)],            # 1. RSI confirmation
+            [((('price', '<=', 'bb_lower', 1.002),), 1)],         # 2. Price vs BB
+            [((('macd', '>', 'macd_signal'),), 1)],               # 3. MACD positive
+            [((('ma5', '>', 'ma10'),), 1)],                       # 4. MA structure
+            [((('price_change_5', '>', -0.5),), 1)],              # 5. No está cayendo fuertemente
+        ]
+    
+    def _dynamic_stop_pct(self, columns):
+        """Stop loss adaptativo basado en volatilidad (1.5% base, máximo 2x)"""
+        base_stop = 0.015
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vol_multiplier = np.minimum(columns['volatility'] / columns['avg_volatility'], 2.0)
+        return base_stop * vol_multiplier
+    
+    def _dynamic_take_profit_pct(self, columns):
+        """Take profit escalonado: 2%, o 1% si el RSI alto sugiere ralentización"""
+        return np.where(columns['rsi'] > 60, 0.01, 0.02)
     
     def _get_detailed_buy_reason(self, signals, i):
         """Genera razón detallada de compra"""
@@ -318,46 +226,6 @@ class OptimizedTradingStrategy:
         
         score = signals['buy_score'].iloc[i]
         return f"BUY({score:.1f}): {', '.join(reasons)}"
-    
-    def _check_dynamic_stop_loss(self, signals, index):
-        """Stop loss dinámico basado en volatilidad"""
-        if signals['position'].iloc[index-1] == 1:
-            for j in range(index-1, -1, -1):
-                if signals['signal'].iloc[j] == 1:
-                    entry_price = signals['price'].iloc[j]
-                    current_price = signals['price'].iloc[index]
-                    
-                    # Stop loss adaptativo basado en volatilidad
-                    volatility = signals['volatility'].iloc[index]
-                    avg_volatility = signals['volatility'].iloc[max(0, index-20):index].mean()
-                    
-                    base_stop = 0.015  # 1.5% base
-                    vol_multiplier = min(volatility / avg_volatility, 2.0)  # Max 2x
-                    dynamic_stop = base_stop * vol_multiplier
-                    
-                    loss_pct = (entry_price - current_price) / entry_price
-                    return loss_pct >= dynamic_stop
-        return False
-    
-    def _check_dynamic_take_profit(self, signals, index):
-        """Take profit dinámico basado en momentum"""
-        if signals['position'].iloc[index-1] == 1:
-            for j in range(index-1, -1, -1):
-                if signals['signal'].iloc[j] == 1:
-                    entry_price = signals['price'].iloc[j]
-                    current_price = signals['price'].iloc[index]
-                    
-                    profit_pct = (current_price - entry_price) / entry_price
-                    
-                    # Take profit escalonado
-                    if profit_pct >= 0.02:  # 2% ganancia
-                        return True
-                    elif profit_pct >= 0.01:  # 1% ganancia
-                        # Solo tomar si momentum se está debilitando
-                        rsi = signals['rsi'].iloc[index]
-                        if rsi > 60:  # RSI alto sugiere ralentización
-                            return True
-        return False
 
 # Usar las mismas clases BacktestEngine y Bot estructura
 class OptimizedTradingBot:
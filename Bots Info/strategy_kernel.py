@@ -0,0 +1,222 @@
+"""
+Kernel compilado para estrategias de puntuación (Balanceada, Optimizada, Híbrida)
+Las estrategias describen sus puntuaciones de compra/venta de forma declarativa;
+las puntuaciones se evalúan sobre columnas completas con NumPy y la máquina de
+estados (filtro de tiempo, entrada, stop loss, take profit, salida técnica)
+corre sobre arrays float64 planos. Si Numba está instalado la máquina de
+estados se compila a código nativo; si no, se usa el mismo bucle en Python
+sobre listas.
+"""
+
+import operator
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Bits de razón de salida (se combinan en la columna reasons)
+TECHNICAL = 1
+STOP_LOSS = 2
+TAKE_PROFIT = 4
+PRICE_MOVE = 8
+
+_OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def condition_mask(conditions, columns):
+    """
+    Evalúa una lista de comparaciones unidas con AND.
+
+    Cada comparación es (izquierda, operador, derecha) o
+    (izquierda, operador, derecha, factor): izquierda/derecha son nombres de
+    columna o constantes y la derecha se multiplica por factor si se indica.
+    Como en las versiones fila a fila, cualquier comparación con NaN es False.
+    """
+    mask = None
+    for comparison in conditions:
+        left, op, right = comparison[:3]
+        left_values = columns[left] if isinstance(left, str) else left
+        right_values = columns[right] if isinstance(right, str) else right
+        if len(comparison) > 3:
+            right_values = right_values * comparison[3]
+        result = _OPERATORS[op](left_values, right_values)
+        mask = result if mask is None else (mask & result)
+    return mask
+
+
+def evaluate_score(spec, columns, cap=None):
+    """
+    Calcula la puntuación de cada barra a partir de una especificación.
+
+    spec es una lista de reglas; cada regla es una cadena if/elif
+    [(condiciones, peso), ...] donde solo suma la primera opción que se cumple.
+    Los pesos se suman en el orden de la especificación, igual que la versión
+    fila a fila, por lo que el resultado es idéntico bit a bit.
+    """
+    n = len(next(iter(columns.values())))
+    score = np.zeros(n)
+    for rule in spec:
+        taken = np.zeros(n, dtype=bool)
+        contribution = np.zeros(n)
+        for conditions, weight in rule:
+            active = condition_mask(conditions, columns) & ~taken
+            contribution[active] = weight
+            taken |= active
+        score = score + contribution
+    if cap is not None:
+        score = np.minimum(score, cap)
+    return score
+
+
+def _state_machine(price, buy_score, sell_score, entry_ok, filter_ok, stop_pct, take_pct,
+                   start, buy_threshold, sell_threshold, min_gap, last_trade,
+                   stop_lookback, take_lookback, abs_exit, abs_lookback,
+                   signal, position, reasons, evaluated):
+    """Bucle secuencial de la estrategia; devuelve el índice del último trade"""
+    n = len(price)
+    in_position = False
+    entry_price = 0.0
+    entry_index = 0
+    for i in range(start, n):
+        # Filtro de tiempo mínimo entre trades y de condiciones de mercado
+        if i - last_trade < min_gap or not filter_ok[i]:
+            position[i] = 1 if in_position else 0
+            continue
+        evaluated[i] = True
+        current_price = price[i]
+
+        if not in_position:
+            if buy_score[i] >= buy_threshold and entry_ok[i]:
+                signal[i] = 1
+                in_position = True
+                entry_price = current_price
+                entry_index = i
+                last_trade = i
+        else:
+            held = i - entry_index
+            reason = 0
+            if sell_score[i] >= sell_threshold:
+                reason |= 1
+            if held < stop_lookback and (entry_price - current_price) / entry_price >= stop_pct[i]:
+                reason |= 2
+            if held < take_lookback and (current_price - entry_price) / entry_price >= take_pct[i]:
+                reason |= 4
+            if held < abs_lookback and abs(current_price - entry_price) >= abs_exit:
+                reason |= 8
+            if reason != 0:
+                signal[i] = -1
+                reasons[i] = reason
+                in_position = False
+                last_trade = i
+
+        position[i] = 1 if in_position else 0
+    return last_trade
+
+
+if NUMBA_AVAILABLE:
+    _compiled_state_machine = njit(cache=True)(_state_machine)
+
+
+def _as_array(value, n):
+    """Escalar o None (sin límite) → array float64 por barra"""
+    if value is None:
+        return np.full(n, np.inf)
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (n,)).copy()
+
+
+def run_state_machine(price, buy_score, sell_score, start, buy_threshold, sell_threshold,
+                      min_gap, last_trade=None, entry_mask=None, filter_mask=None,
+                      stop_pct=None, take_pct=None, stop_lookback=None, take_lookback=None,
+                      abs_exit=None, abs_lookback=None):
+    """
+    Ejecuta la máquina de estados de las estrategias de puntuación.
+
+    Args:
+        price, buy_score, sell_score: arrays float64 por barra
+        start: primera barra evaluada
+        buy_threshold, sell_threshold: puntuación mínima para entrar/salir
+        min_gap: barras mínimas entre trades
+        last_trade: índice del último trade previo (None = ninguno)
+        entry_mask: confirmación adicional para entrar (bool por barra)
+        filter_mask: barras donde se permite operar (bool por barra)
+        stop_pct, take_pct: escalar o array por barra (None = desactivado)
+        stop_lookback, take_lookback: solo aplicar stop/take si la entrada fue
+            hace menos de estas barras (None = sin límite)
+        abs_exit: salir si |precio - entrada| >= abs_exit (None = desactivado)
+        abs_lookback: ventana de barras para abs_exit (None = sin límite)
+
+    Returns:
+        dict con 'signal', 'position', 'reasons' (bits TECHNICAL/STOP_LOSS/
+        TAKE_PROFIT/PRICE_MOVE), 'evaluated' (barras que pasaron los filtros)
+        y 'last_trade' (None si no hubo trades).
+    """
+    price = np.ascontiguousarray(price, dtype=np.float64)
+    n = len(price)
+    no_limit = n + 1
+    no_trade = -(int(min_gap) + 1)  # Cualquier barra pasa el filtro de tiempo
+    args = (
+        price,
+        np.ascontiguousarray(buy_score, dtype=np.float64),
+        np.ascontiguousarray(sell_score, dtype=np.float64),
+        np.ones(n, dtype=bool) if entry_mask is None else np.ascontiguousarray(entry_mask, dtype=bool),
+        np.ones(n, dtype=bool) if filter_mask is None else np.ascontiguousarray(filter_mask, dtype=bool),
+        _as_array(stop_pct, n),
+        _as_array(take_pct, n),
+        int(start), float(buy_threshold), float(sell_threshold), int(min_gap),
+        no_trade if last_trade is None else int(last_trade),
+        no_limit if stop_lookback is None else int(stop_lookback),
+        no_limit if take_lookback is None else int(take_lookback),
+        np.inf if abs_exit is None else float(abs_exit),
+        no_limit if abs_lookback is None else int(abs_lookback),
+    )
+    signal = np.zeros(n, dtype=np.int64)
+    position = np.zeros(n, dtype=np.int64)
+    reasons = np.zeros(n, dtype=np.int64)
+    evaluated = np.zeros(n, dtype=bool)
+
+    if NUMBA_AVAILABLE:
+        final_last_trade = _compiled_state_machine(*args, signal, position, reasons, evaluated)
+    else:
+        # Fallback: el mismo bucle sobre listas (acceso por índice mucho más rápido que en arrays)
+        list_args = tuple(a.tolist() if isinstance(a, np.ndarray) else a for a in args)
+        outputs = ([0] * n, [0] * n, [0] * n, [False] * n)
+        final_last_trade = _state_machine(*list_args, *outputs)
+        signal[:], position[:], reasons[:], evaluated[:] = outputs
+
+    return {
+        'signal': signal,
+        'position': position,
+        'reasons': reasons,
+        'evaluated': evaluated,
+        'last_trade': None if last_trade is None and final_last_trade == no_trade else int(final_last_trade),
+    }
+
+
+def window_mean(values, window):
+    """
+    Media de los 'window' valores anteriores a cada barra.
+    Equivale a .iloc[i-window:i].mean() cuando la ventana no tiene NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if len(values) > window:
+        result[window:] = np.lib.stride_tricks.sliding_window_view(values[:-1], window).sum(axis=1) / window
+    return result
+
+
+def shifted(values, periods=1):
+    """Valores de 'periods' barras atrás (NaN al principio)"""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if len(values) > periods:
+        result[periods:] = values[:-periods]
+    return result
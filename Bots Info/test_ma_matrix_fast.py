@@ -2,12 +2,82 @@
 """
 Test rápido de matriz combinatoria MA1 x MA2 - VERSIÓN SILENCIOSA
 Solo muestra progreso esencial y resultados finales
+
+Modos:
+- 'rejilla': evalúa las 400 combinaciones
+- 'adaptativo': evalúa una rejilla gruesa y refina alrededor de las mejores
+  celdas hasta que dejan de aparecer vecinas nuevas (menos backtests)
 """
 
+import itertools
+import os
+import sys
 import numpy as np
 import pandas as pd
 import time
+
+# MAConvergenceBot y el evaluador por tramos viven en convergence-bot
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'convergence-bot'))
 from ma_convergence_bot import MAConvergenceBot
+from walk_forward import SliceEvaluator
+
+CSV_FILE = 'binance_BNBUSDT_1s_20251018_234757.csv'
+MODO = 'adaptativo'  # 'rejilla' o 'adaptativo'
+
+EMPTY_RESULT = {
+    'retorno_pct': 0.0,
+    'total_trades': 0,
+    'capital_final': 1000.0,
+    'win_rate': 0.0,
+    'convergencias_detectadas': 0,
+    'convergencias_filtradas': 0
+}
+
+
+def adaptive_search(evaluate, n_ma1, n_ma2, stride=4, top_k=8, radius=2, metric='retorno_pct'):
+    """
+    Búsqueda de grueso a fino sobre la rejilla de índices (i, j).
+
+    1. Evalúa una rejilla gruesa (cada 'stride' pasos, más los extremos).
+    2. Evalúa las vecinas no probadas (a distancia 'radius') de las top_k
+       mejores celdas; repite hasta que las top_k no tengan vecinas nuevas.
+
+    Cada celda se evalúa sobre los datos completos: con tramos cortos los
+    mejores resultados (a menudo una sola compra cerrada al final de los
+    datos) no se ven, y la criba por tramos descarta justo esas celdas.
+
+    Args:
+        evaluate: función (i, j) -> dict de resultado de run_backtest
+        n_ma1, n_ma2: tamaño de la rejilla
+        stride: separación de la rejilla gruesa
+        top_k: celdas cuya vecindad se explora en cada ronda
+        radius: distancia de vecindad (en pasos de la rejilla)
+        metric: campo del resultado a maximizar
+
+    Returns:
+        dict {(i, j): resultado} con todas las celdas evaluadas
+    """
+    evaluated = {}
+
+    def visit(cells):
+        for cell in cells:
+            if cell not in evaluated:
+                evaluated[cell] = evaluate(*cell)
+
+    rows = sorted(set(range(0, n_ma1, stride)) | {n_ma1 - 1})
+    cols = sorted(set(range(0, n_ma2, stride)) | {n_ma2 - 1})
+    visit(itertools.product(rows, cols))
+
+    offsets = list(itertools.product(range(-radius, radius + 1), repeat=2))
+    while True:
+        top = sorted(evaluated, key=lambda c: evaluated[c][metric], reverse=True)[:top_k]
+        new_cells = [(i + di, j + dj) for i, j in top for di, dj in offsets
+                     if 0 <= i + di < n_ma1 and 0 <= j + dj < n_ma2
+                     and (i + di, j + dj) not in evaluated]
+        if not new_cells:
+            return evaluated
+        visit(dict.fromkeys(new_cells))
+
 
 def main():
     # Configuración de la matriz
@@ -21,88 +91,90 @@ def main():
     
     total_combinations = len(umbrales_ma1) * len(umbrales_ma2)
     
-    print(f"📁 Usando archivo: binance_BNBUSDT_1s_20251018_234757.csv")
+    print(f"📁 Usando archivo: {CSV_FILE}")
     print(f"\n🧪 TEST MATRIZ COMBINATORIA MA1 x MA2 (OPTIMIZADA)")
     print(f"   MA1: MA7, MA2: MA25")
     print(f"   Rango umbrales: {umbral_start:.4f} - {umbral_end:.1f}")
     print(f"   Pasos: {num_steps} x {num_steps}")
     print(f"   Total combinaciones: {total_combinations}")
+    print(f"   Modo: {MODO}")
     print(f"=" * 80)
     
     start_time = time.time()
     results = []
     
-    for i, umbral_ma1 in enumerate(umbrales_ma1):
-        for j, umbral_ma2 in enumerate(umbrales_ma2):
-            combination_num = i * len(umbrales_ma2) + j + 1
-            elapsed = time.time() - start_time
-            print(f"🔄 [{combination_num:3d}/400] MA1={umbral_ma1:.4f} | MA2={umbral_ma2:.4f} - {elapsed:.1f}s")
+    # Cargar datos e indicadores una sola vez; los segmentos de las MAs se
+    # comparten entre todas las combinaciones (solo cambia su clasificación)
+    loader = MAConvergenceBot(ma1_period="MA7", ma2_period="MA25", verbose=False)
+    if not loader.load_data(CSV_FILE):
+        print(f"❌ No se pudieron cargar datos de {CSV_FILE}")
+        return
+    evaluator = SliceEvaluator(loader.data, "MA7", "MA25", take_profit=0.002, stop_loss=0.001)
+    n_rows = len(loader.data)
+    
+    def evaluate(i, j):
+        umbral_ma1 = umbrales_ma1[i]
+        umbral_ma2 = umbrales_ma2[j]
+        combination_num = len(results) + 1
+        elapsed = time.time() - start_time
+        print(f"🔄 [{combination_num:3d}/{total_combinations}] MA1={umbral_ma1:.4f} | MA2={umbral_ma2:.4f} - {elapsed:.1f}s")
+        
+        try:
+            # Ejecutar backtest SIN output
+            result = evaluator.run(0, n_rows, umbral_ma1, umbral_ma2)
+            
+            # Verificar que el resultado no sea None
+            if result is None:
+                result = EMPTY_RESULT
             
-            try:
-                # Crear bot con configuración específica
-                bot = MAConvergenceBot(
-                    ma1_period="MA7",
-                    ma2_period="MA25",
-                    umbral_ma1=umbral_ma1,
-                    umbral_ma2=umbral_ma2,
-                    take_profit=0.002,
-                    stop_loss=0.001,
-                    verbose=False  # CLAVE: Sin salida verbose
-                )
-                
-                # Ejecutar backtest SIN output
-                result = bot.run_backtest('binance_BNBUSDT_1s_20251018_234757.csv')
-                
-                # Verificar que el resultado no sea None
-                if result is None:
-                    result = {
-                        'retorno_pct': 0.0,
-                        'total_trades': 0,
-                        'capital_final': 1000.0,
-                        'win_rate': 0.0,
-                        'convergencias_detectadas': 0,
-                        'convergencias_filtradas': 0
-                    }
-                
-                # Guardar solo los resultados esenciales
-                results.append({
-                    'umbral_ma1': umbral_ma1,
-                    'umbral_ma2': umbral_ma2,
-                    'retorno_pct': result.get('retorno_pct', 0.0),
-                    'total_trades': result.get('total_trades', 0),
-                    'capital_final': result.get('capital_final', 1000.0),
-                    'win_rate': result.get('win_rate', 0.0),
-                    'convergencias_detectadas': result.get('convergencias_detectadas', 0),
-                    'convergencias_filtradas': result.get('convergencias_filtradas', 0)
-                })
-                
-                # Mostrar resultado si es rentable
-                retorno = result.get('retorno_pct', 0.0)
-                trades = result.get('total_trades', 0)
-                if retorno > 0:
-                    print(f"    💰 RENTABLE: {retorno:+.2f}% | {trades} trades")
-                
-                # Mostrar estimación de tiempo restante cada 10 iteraciones
-                if combination_num % 10 == 0:
-                    avg_time_per_combo = elapsed / combination_num
-                    remaining_combos = total_combinations - combination_num
-                    eta_seconds = avg_time_per_combo * remaining_combos
-                    eta_minutes = eta_seconds / 60
-                    rentables_hasta_ahora = len([r for r in results if r['retorno_pct'] > 0])
-                    print(f"    📊 Promedio: {avg_time_per_combo:.1f}s/combo | ETA: {eta_minutes:.1f}min | Rentables: {rentables_hasta_ahora}")
-                
-            except Exception as e:
-                print(f"❌ Error en MA1={umbral_ma1:.4f}, MA2={umbral_ma2:.4f}: {str(e)}")
-                results.append({
-                    'umbral_ma1': umbral_ma1,
-                    'umbral_ma2': umbral_ma2,
-                    'retorno_pct': -999,  # Marca de error
-                    'total_trades': 0,
-                    'capital_final': 0,
-                    'win_rate': 0,
-                    'convergencias_detectadas': 0,
-                    'convergencias_filtradas': 0
-                })
+            # Guardar solo los resultados esenciales
+            results.append({
+                'umbral_ma1': umbral_ma1,
+                'umbral_ma2': umbral_ma2,
+                'retorno_pct': result.get('retorno_pct', 0.0),
+                'total_trades': result.get('total_trades', 0),
+                'capital_final': result.get('capital_final', 1000.0),
+                'win_rate': result.get('win_rate', 0.0),
+                'convergencias_detectadas': result.get('convergencias_detectadas', 0),
+                'convergencias_filtradas': result.get('convergencias_filtradas', 0)
+            })
+            
+            # Mostrar resultado si es rentable
+            retorno = result.get('retorno_pct', 0.0)
+            trades = result.get('total_trades', 0)
+            if retorno > 0:
+                print(f"    💰 RENTABLE: {retorno:+.2f}% | {trades} trades")
+            
+            # Mostrar estimación de tiempo restante cada 10 iteraciones (solo rejilla)
+            if MODO == 'rejilla' and combination_num % 10 == 0:
+                avg_time_per_combo = elapsed / combination_num
+                remaining_combos = total_combinations - combination_num
+                eta_seconds = avg_time_per_combo * remaining_combos
+                eta_minutes = eta_seconds / 60
+                rentables_hasta_ahora = len([r for r in results if r['retorno_pct'] > 0])
+                print(f"    📊 Promedio: {avg_time_per_combo:.1f}s/combo | ETA: {eta_minutes:.1f}min | Rentables: {rentables_hasta_ahora}")
+            
+        except Exception as e:
+            print(f"❌ Error en MA1={umbral_ma1:.4f}, MA2={umbral_ma2:.4f}: {str(e)}")
+            results.append({
+                'umbral_ma1': umbral_ma1,
+                'umbral_ma2': umbral_ma2,
+                'retorno_pct': -999,  # Marca de error
+                'total_trades': 0,
+                'capital_final': 0,
+                'win_rate': 0,
+                'convergencias_detectadas': 0,
+                'convergencias_filtradas': 0
+            })
+        return results[-1]
+    
+    if MODO == 'adaptativo':
+        adaptive_search(evaluate, len(umbrales_ma1), len(umbrales_ma2))
+        print(f"\n🎯 Búsqueda adaptativa: {len(results)}/{total_combinations} combinaciones evaluadas")
+    else:
+        for i in range(len(umbrales_ma1)):
+            for j in range(len(umbrales_ma2)):
+                evaluate(i, j)
     
     # Analizar resultados
     elapsed_time = time.time() - start_time
@@ -9,11 +9,13 @@ import numpy as np
 import matplotlib.pyplot as plt
 from datetime import datetime
 import os
+from indicator_cache import cached_indicator
 
 class TechnicalIndicators:
     """Clase para calcular indicadores técnicos"""
     
     @staticmethod
+    @cached_indicator('rsi')
     def rsi(prices, period=14):
         """Calcula el RSI (Relative Strength Index)"""
         delta = prices.diff()
@@ -24,11 +26,13 @@ class TechnicalIndicators:
         return rsi
     
     @staticmethod
+    @cached_indicator('moving_average')
     def moving_average(prices, period):
         """Calcula Media Móvil Simple"""
         return prices.rolling(window=period).mean()
     
     @staticmethod
+    @cached_indicator('macd')
     def macd(prices, fast=12, slow=26, signal=9):
         """Calcula MACD (Moving Average Convergence Divergence)"""
         exp1 = prices.ewm(span=fast).mean()
@@ -39,6 +43,7 @@ class TechnicalIndicators:
         return macd_line, signal_line, histogram
     
     @staticmethod
+    @cached_indicator('bollinger_bands')
     def bollinger_bands(prices, period=20, std_dev=2):
         """Calcula Bandas de Bollinger"""
         ma = prices.rolling(window=period).mean()
@@ -47,6 +52,43 @@ class TechnicalIndicators:
         lower = ma - (std * std_dev)
         return upper, ma, lower
 
+class PositionTracker:
+    """
+    Estado de la posición abierta de las estrategias que recorren las barras
+    en Python (TradingStrategy y EnhancedTradingStrategy). Lleva hacia adelante
+    el precio e índice de entrada, de modo que las comprobaciones de salida son
+    O(1) por barra en lugar de buscar hacia atrás la última señal de compra.
+    Las estrategias sobre strategy_kernel (balanced, optimized, hybrid) llevan
+    ese mismo estado dentro del bucle compilado de run_state_machine.
+    """
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """Sin posición"""
+        self.in_position = False
+        self.entry_price = 0.0
+        self.entry_index = None
+    
+    def open(self, index, price):
+        """Registra una entrada en la barra index"""
+        self.in_position = True
+        self.entry_price = price
+        self.entry_index = index
+    
+    def close(self):
+        """Registra la salida"""
+        self.reset()
+    
+    def loss_pct(self, price):
+        """Pérdida relativa respecto a la entrada (positiva si el precio bajó)"""
+        return (self.entry_price - price) / self.entry_price
+    
+    def profit_pct(self, price):
+        """Ganancia relativa respecto a la entrada (positiva si el precio subió)"""
+        return (price - self.entry_price) / self.entry_price
+
 class TradingStrategy:
     """Estrategia de trading basada en RSI, MA y MACD"""
     
@@ -56,6 +98,7 @@ class TradingStrategy:
         self.position = None  # 'long', 'short', None
         self.entry_price = 0
         self.entry_time = None
+        self.tracker = PositionTracker()
     
     def generate_signals(self, df):
         """Genera señales de compra y venta"""
@@ -74,6 +117,8 @@ class TradingStrategy:
         signals['macd_signal'] = signal_line
         signals['macd_histogram'] = histogram
         
+        self.tracker.reset()
+        
         # Generar señales de entrada y salida
         for i in range(1, len(signals)):
             current_rsi = signals['rsi'].iloc[i]
@@ -106,12 +151,14 @@ class TradingStrategy:
                 if buy_signals >= 2 and signals['position'].iloc[i-1] == 0:
                     signals.loc[signals.index[i], 'signal'] = 1
                     signals.loc[signals.index[i], 'position'] = 1
+                    self.tracker.open(i, signals['price'].iloc[i])
                 
                 # Señal de venta: al menos 2 indicadores bajistas O stop loss
                 sell_signals = sum([rsi_sell, ma_bearish, macd_bearish])
                 if (sell_signals >= 2 or self._check_stop_loss(signals, i)) and signals['position'].iloc[i-1] == 1:
                     signals.loc[signals.index[i], 'signal'] = -1
                     signals.loc[signals.index[i], 'position'] = 0
+                    self.tracker.close()
                 else:
                     # Mantener posición anterior
                     signals.loc[signals.index[i], 'position'] = signals['position'].iloc[i-1]
@@ -120,54 +167,70 @@ class TradingStrategy:
     
     def _check_stop_loss(self, signals, index, stop_loss_pct=0.02):
         """Verifica si se debe ejecutar stop loss (2% de pérdida)"""
-        if signals['position'].iloc[index-1] == 1:  # Si tenemos posición larga
-            # Buscar el precio de entrada (última señal de compra)
-            for j in range(index-1, -1, -1):
-                if signals['signal'].iloc[j] == 1:
-                    entry_price = signals['price'].iloc[j]
-                    current_price = signals['price'].iloc[index]
-                    loss_pct = (entry_price - current_price) / entry_price
-                    return loss_pct >= stop_loss_pct
+        if signals['position'].iloc[index-1] == 1 and self.tracker.in_position:  # Si tenemos posición larga
+            return self.tracker.loss_pct(signals['price'].iloc[index]) >= stop_loss_pct
         return False
 
 class BacktestEngine:
     """Motor de backtesting"""
     
+    # Campos de cada tipo de trade; TRADE_COLUMNS es el orden de las columnas del CSV de resultados
+    BUY_COLUMNS = ['type', 'timestamp', 'price', 'bnb_amount', 'usdt_amount', 'commission',
+                   'usdt_balance', 'bnb_balance']
+    SELL_COLUMNS = ['type', 'timestamp', 'price', 'bnb_amount', 'usdt_amount', 'commission',
+                    'pnl_pct', 'entry_price', 'entry_time', 'usdt_balance', 'bnb_balance', 'force_close']
+    TRADE_COLUMNS = BUY_COLUMNS + ['pnl_pct', 'entry_price', 'entry_time', 'force_close']
+    
     def __init__(self, initial_usdt=1000, commission=0.001):
         self.initial_usdt = initial_usdt
         self.commission = commission  # 0.1% comisión por operación
         self.reset()
     
-    def reset(self):
-        """Resetea el estado del backtest"""
+    def reset(self, capacity=0):
+        """Resetea el estado del backtest y reserva espacio para 'capacity' trades"""
         self.usdt_balance = self.initial_usdt
         self.bnb_balance = 0
         self.trades = []
+        self.trades_df = None
         self.current_position = None
         self.entry_price = 0
         self.entry_time = None
         
+        # Trades en arrays preasignados (timestamp/entry_time como posición de fila)
+        self._n_trades = 0
+        self._is_buy = np.zeros(capacity, dtype=bool)
+        self._row = np.zeros(capacity, dtype=np.int64)
+        self._entry_row = np.full(capacity, -1, dtype=np.int64)
+        self._force_close = np.zeros(capacity, dtype=bool)
+        self._values = {name: np.full(capacity, np.nan) for name in
+                        ('price', 'bnb_amount', 'usdt_amount', 'commission',
+                         'usdt_balance', 'bnb_balance', 'pnl_pct', 'entry_price')}
+        
     def run_backtest(self, signals_df):
-        """Ejecuta el backtesting"""
-        self.reset()
+        """Ejecuta el backtesting procesando solo las filas con señal"""
+        signal = signals_df['signal'].to_numpy()
+        prices = signals_df['price'].to_numpy()
+        events = np.flatnonzero(signal)
+        
+        # Como máximo un trade por evento más el cierre forzado final
+        self.reset(capacity=len(events) + 1)
         
-        for i, row in signals_df.iterrows():
-            if row['signal'] == 1 and self.current_position is None:
+        for i in events:
+            if signal[i] == 1 and self.current_position is None:
                 # Señal de compra
-                self._execute_buy(row['price'], i)
-            elif row['signal'] == -1 and self.current_position == 'long':
+                self._execute_buy(prices[i], i)
+            elif signal[i] == -1 and self.current_position == 'long':
                 # Señal de venta
-                self._execute_sell(row['price'], i)
+                self._execute_sell(prices[i], i)
         
         # Si termina con posición abierta, cerrarla al último precio
         if self.current_position == 'long':
-            last_price = signals_df['price'].iloc[-1]
-            last_time = signals_df.index[-1]
-            self._execute_sell(last_price, last_time, force_close=True)
+            self._execute_sell(prices[-1], len(signals_df) - 1, force_close=True)
         
+        self._build_trades(signals_df.index)
         return self._calculate_results()
     
-    def _execute_buy(self, price, timestamp):
+    def _execute_buy(self, price, row):
         """Ejecuta una operación de compra"""
         if self.usdt_balance > 10:  # Mínimo para operar
             # Calcular cantidad a comprar (usar todo el saldo USDT disponible)
@@ -183,21 +246,12 @@ class BacktestEngine:
             # Registrar trade
             self.current_position = 'long'
             self.entry_price = price
-            self.entry_time = timestamp
+            self.entry_time = row
             
-            trade = {
-                'type': 'BUY',
-                'timestamp': timestamp,
-                'price': price,
-                'bnb_amount': bnb_bought,
-                'usdt_amount': usdt_to_spend,
-                'commission': commission_cost,
-                'usdt_balance': self.usdt_balance,
-                'bnb_balance': self.bnb_balance
-            }
-            self.trades.append(trade)
-    
-    def _execute_sell(self, price, timestamp, force_close=False):
+            self._record(True, row, price=price, bnb_amount=bnb_bought, usdt_amount=usdt_to_spend,
+                         commission=commission_cost)
+    
+    def _execute_sell(self, price, row, force_close=False):
         """Ejecuta una operación de venta"""
         if self.bnb_balance > 0:
             # Vender todo el BNB
@@ -217,27 +271,56 @@ class BacktestEngine:
             self.bnb_balance = 0
             
             # Registrar trade
-            trade = {
-                'type': 'SELL',
-                'timestamp': timestamp,
-                'price': price,
-                'bnb_amount': bnb_sold,
-                'usdt_amount': usdt_received,
-                'commission': commission_cost,
-                'pnl_pct': pnl_pct,
-                'entry_price': self.entry_price,
-                'entry_time': self.entry_time,
-                'usdt_balance': self.usdt_balance,
-                'bnb_balance': self.bnb_balance,
-                'force_close': force_close
-            }
-            self.trades.append(trade)
+            k = self._record(False, row, price=price, bnb_amount=bnb_sold, usdt_amount=usdt_received,
+                             commission=commission_cost, pnl_pct=pnl_pct, entry_price=self.entry_price)
+            self._entry_row[k] = self.entry_time
+            self._force_close[k] = force_close
             
             # Resetear posición
             self.current_position = None
             self.entry_price = 0
             self.entry_time = None
     
+    def _record(self, is_buy, row, **values):
+        """Escribe un trade en la siguiente posición de los arrays; devuelve su índice"""
+        k = self._n_trades
+        self._is_buy[k] = is_buy
+        self._row[k] = row
+        values['usdt_balance'] = self.usdt_balance
+        values['bnb_balance'] = self.bnb_balance
+        for name, value in values.items():
+            self._values[name][k] = value
+        self._n_trades += 1
+        return k
+    
+    def _build_trades(self, index):
+        """Convierte los arrays en trades_df (una sola vez) y en la lista de trades"""
+        n = self._n_trades
+        is_buy = self._is_buy[:n]
+        entry_row = self._entry_row[:n]
+        
+        timestamps = index[self._row[:n]]
+        columns = {
+            'type': np.where(is_buy, 'BUY', 'SELL'),
+            'timestamp': timestamps,
+            **{name: values[:n] for name, values in self._values.items()},
+            # Las compras no tienen entrada ni cierre forzado: NaT / NaN
+            'entry_time': pd.Series(index[np.maximum(entry_row, 0)]).where(entry_row >= 0).to_numpy(),
+            'force_close': pd.Series(self._force_close[:n], dtype=object).where(~is_buy).to_numpy(),
+        }
+        self.trades_df = pd.DataFrame({name: columns[name] for name in self.TRADE_COLUMNS})
+        
+        # Lista de dicts para los consumidores existentes (las compras no llevan campos de venta)
+        fields = {name: columns[name].tolist() for name in self._values}
+        fields['type'] = columns['type'].tolist()
+        fields['timestamp'] = list(timestamps)
+        fields['entry_time'] = [index[r] if r >= 0 else None for r in entry_row.tolist()]
+        fields['force_close'] = self._force_close[:n].tolist()
+        self.trades = [
+            {name: fields[name][k] for name in (self.BUY_COLUMNS if buy else self.SELL_COLUMNS)}
+            for k, buy in enumerate(is_buy.tolist())
+        ]
+    
     def _calculate_results(self):
         """Calcula los resultados del backtesting"""
         if not self.trades:
@@ -283,7 +366,8 @@ class BacktestEngine:
             'final_usdt_balance': self.usdt_balance,
             'final_bnb_balance': self.bnb_balance,
             'total_commission': total_commission,
-            'trades_list': self.trades
+            'trades_list': self.trades,
+            'trades_df': self.trades_df
         }
         
         return results
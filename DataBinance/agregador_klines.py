@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Motor de agregación de velas (klines)
+Construye velas OHLCV de timeframes superiores (1m, 5m, 15m, 1h, 4h, 1d)
+a partir del intervalo más fino almacenado, en una sola pasada vectorizada,
+y las mantiene incrementalmente a medida que llegan nuevas velas base.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Duración de cada intervalo de Binance en milisegundos
+INTERVALOS_MS = {
+    '1s': 1000,
+    '1m': 60 * 1000,
+    '3m': 3 * 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '2h': 2 * 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '6h': 6 * 60 * 60 * 1000,
+    '8h': 8 * 60 * 60 * 1000,
+    '12h': 12 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+}
+
+# Nombres de columnas por formato: CSV de DataBinance (API) y CSV de Bots Info
+FORMATO_API = {
+    'tiempo': 'Open_Time', 'open': 'Open', 'high': 'High', 'low': 'Low',
+    'close': 'Close', 'volume': 'Volume', 'trades': 'Number_of_Trades',
+}
+FORMATO_BOTS = {
+    'tiempo': 'datetime', 'open': 'open', 'high': 'high', 'low': 'low',
+    'close': 'close', 'volume': 'volume', 'trades': 'trades_count',
+}
+
+# Columnas adicionales que se agregan por suma si existen
+COLUMNAS_SUMA_EXTRA = ['Quote_Asset_Volume', 'Taker_Buy_Base', 'Taker_Buy_Quote']
+
+
+def detectar_formato(df):
+    """Detecta el formato de columnas del DataFrame (API o Bots Info)"""
+    if 'Open_Time' in df.columns:
+        return FORMATO_API
+    if 'datetime' in df.columns:
+        return FORMATO_BOTS
+    raise ValueError("Formato de velas no reconocido: se esperaba 'Open_Time' o 'datetime'")
+
+
+def _tiempos_ms(serie):
+    """Convierte una columna de tiempos (datetime, texto o ms) a int64 en milisegundos"""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.to_numpy(dtype=np.int64)
+    tiempos = pd.to_datetime(serie)
+    return tiempos.to_numpy(dtype='datetime64[ms]').astype(np.int64)
+
+
+def _a_arrays(df, formato):
+    """Extrae las columnas OHLCV como arrays float64 (tiempo en ms como int64)"""
+    arrays = {'tiempo': _tiempos_ms(df[formato['tiempo']])}
+    for clave in ('open', 'high', 'low', 'close', 'volume'):
+        arrays[clave] = df[formato[clave]].to_numpy(dtype=np.float64)
+    if formato['trades'] in df.columns:
+        arrays['trades'] = df[formato['trades']].to_numpy(dtype=np.float64)
+    for col in COLUMNAS_SUMA_EXTRA:
+        if col in df.columns:
+            arrays[col] = df[col].to_numpy(dtype=np.float64)
+    return arrays
+
+
+def _agregar_arrays(arrays, paso_ms):
+    """
+    Agrega arrays OHLCV ordenados por tiempo en cubetas de paso_ms.
+    Una sola pasada con np.ufunc.reduceat: open=primero, high=máximo,
+    low=mínimo, close=último, volumen/trades/extras=suma.
+    """
+    tiempo = arrays['tiempo']
+    if len(tiempo) == 0:
+        return {clave: valores[:0] for clave, valores in arrays.items()}
+
+    cubetas = tiempo - (tiempo % paso_ms)
+    inicios = np.flatnonzero(np.r_[True, cubetas[1:] != cubetas[:-1]])
+    finales = np.r_[inicios[1:], len(tiempo)] - 1
+
+    resultado = {
+        'tiempo': cubetas[inicios],
+        'open': arrays['open'][inicios],
+        'high': np.maximum.reduceat(arrays['high'], inicios),
+        'low': np.minimum.reduceat(arrays['low'], inicios),
+        'close': arrays['close'][finales],
+    }
+    for clave, valores in arrays.items():
+        if clave not in resultado:
+            resultado[clave] = np.add.reduceat(valores, inicios)
+    return resultado
+
+
+def _a_dataframe(arrays, formato, paso_ms):
+    """Reconstruye un DataFrame con el formato de columnas de origen"""
+    df = pd.DataFrame({formato['tiempo']: pd.to_datetime(arrays['tiempo'], unit='ms')})
+    for clave in ('open', 'high', 'low', 'close', 'volume'):
+        df[formato[clave]] = arrays[clave]
+    if 'trades' in arrays:
+        df[formato['trades']] = arrays['trades'].astype(np.int64)
+    if formato is FORMATO_API:
+        df['Close_Time'] = pd.to_datetime(arrays['tiempo'] + paso_ms - 1, unit='ms')
+    for col in COLUMNAS_SUMA_EXTRA:
+        if col in arrays:
+            df[col] = arrays[col]
+    return df
+
+
+def resamplear_klines(df, intervalo):
+    """
+    Construye velas de 'intervalo' a partir de un DataFrame de velas más finas.
+    Acepta el formato de DataBinance (Open_Time, Open, ...) o el de Bots Info
+    (datetime, open, ...) y devuelve el resultado en el mismo formato.
+    """
+    if intervalo not in INTERVALOS_MS:
+        raise ValueError(f"Intervalo no soportado: {intervalo}")
+    formato = detectar_formato(df)
+    arrays = _a_arrays(df, formato)
+    orden = np.argsort(arrays['tiempo'], kind='stable')
+    if np.any(orden != np.arange(len(orden))):
+        arrays = {clave: valores[orden] for clave, valores in arrays.items()}
+    paso_ms = INTERVALOS_MS[intervalo]
+    return _a_dataframe(_agregar_arrays(arrays, paso_ms), formato, paso_ms)
+
+
+def derivar_timeframes(df, intervalos=('1m', '5m', '15m', '1h', '4h', '1d')):
+    """
+    Deriva varios timeframes a partir del más fino disponible.
+    Cada nivel se construye desde el anterior cuando es múltiplo exacto
+    (1s -> 1m -> 5m -> 15m -> 1h -> 4h -> 1d), de modo que solo el primer
+    nivel recorre todas las velas base.
+    """
+    formato = detectar_formato(df)
+    arrays = _a_arrays(df, formato)
+    orden = np.argsort(arrays['tiempo'], kind='stable')
+    arrays = {clave: valores[orden] for clave, valores in arrays.items()}
+
+    resultados = {}
+    fuente, paso_fuente = arrays, None
+    for intervalo in sorted(intervalos, key=lambda tf: INTERVALOS_MS[tf]):
+        paso_ms = INTERVALOS_MS[intervalo]
+        if paso_fuente is not None and paso_ms % paso_fuente != 0:
+            fuente, paso_fuente = arrays, None
+        agregados = _agregar_arrays(fuente, paso_ms)
+        resultados[intervalo] = _a_dataframe(agregados, formato, paso_ms)
+        fuente, paso_fuente = agregados, paso_ms
+    return resultados
+
+
+class AgregadorKlines:
+    """
+    Mantiene velas de varios timeframes a partir de un flujo de velas base.
+
+    Las barras cerradas se guardan por timeframe; la barra en curso se
+    acumula con las velas base cerradas y se completa al consultar con la
+    última vela base abierta, sin contar dos veces su volumen.
+    """
+
+    def __init__(self, intervalo_base='1m', destinos=('5m', '15m', '1h', '4h', '1d'), max_barras=1000):
+        if intervalo_base not in INTERVALOS_MS:
+            raise ValueError(f"Intervalo base no soportado: {intervalo_base}")
+        self.intervalo_base = intervalo_base
+        self.paso_base = INTERVALOS_MS[intervalo_base]
+        for tf in destinos:
+            if INTERVALOS_MS[tf] % self.paso_base != 0:
+                raise ValueError(f"{tf} no es múltiplo de {intervalo_base}")
+        self.destinos = tuple(destinos)
+        self.max_barras = max_barras
+
+        self._cerradas = {tf: [] for tf in self.destinos}
+        self._parcial = {tf: None for tf in self.destinos}
+        self._cursor = {tf: None for tf in self.destinos}
+        self._vela_abierta = None
+
+    def sembrar(self, tf, df):
+        """
+        Inicializa un timeframe con historial descargado (formato API).
+        La última barra se descarta porque Binance la devuelve abierta; se
+        reconstruye desde las velas base a partir de inicio_base_requerido().
+        """
+        arrays = _a_arrays(df, detectar_formato(df))
+        n = len(arrays['tiempo']) - 1
+        if n < 0:
+            return
+        self._cerradas[tf] = [
+            {clave: valores[i].item() for clave, valores in arrays.items()}
+            for i in range(max(0, n - self.max_barras), n)
+        ]
+        self._parcial[tf] = None
+        self._cursor[tf] = int(arrays['tiempo'][n])
+
+    def inicio_base_requerido(self):
+        """Open time (ms) de la primera vela base que falta procesar, o None"""
+        cursores = [c for c in self._cursor.values() if c is not None]
+        return min(cursores) if cursores else None
+
+    def agregar(self, df_base, ultima_abierta=True):
+        """
+        Procesa nuevas velas base. Con ultima_abierta=True la última fila se
+        trata como vela en curso (así la devuelve get_klines) y solo se usa
+        para la vista, nunca se acumula.
+        """
+        if df_base is None or len(df_base) == 0:
+            return
+        arrays = _a_arrays(df_base, detectar_formato(df_base))
+        if ultima_abierta:
+            self._vela_abierta = {clave: valores[-1].item() for clave, valores in arrays.items()}
+            arrays = {clave: valores[:-1] for clave, valores in arrays.items()}
+        else:
+            self._vela_abierta = None
+
+        for tf in self.destinos:
+            self._agregar_tf(tf, arrays)
+
+    def _agregar_tf(self, tf, arrays):
+        """Acumula velas base cerradas en el timeframe tf"""
+        paso_ms = INTERVALOS_MS[tf]
+        cursor = self._cursor[tf]
+        if cursor is not None:
+            mascara = arrays['tiempo'] >= cursor
+            if not mascara.all():
+                arrays = {clave: valores[mascara] for clave, valores in arrays.items()}
+        if len(arrays['tiempo']) == 0:
+            return
+
+        agregados = _agregar_arrays(arrays, paso_ms)
+        barras = [
+            {clave: valores[i].item() for clave, valores in agregados.items()}
+            for i in range(len(agregados['tiempo']))
+        ]
+        parcial = self._parcial[tf]
+        if parcial is not None and parcial['tiempo'] == barras[0]['tiempo']:
+            barras[0] = _combinar(parcial, barras[0])
+        elif parcial is not None:
+            self._cerradas[tf].append(parcial)
+
+        fin_datos = int(arrays['tiempo'][-1]) + self.paso_base
+        ultima = barras[-1]
+        if ultima['tiempo'] + paso_ms <= fin_datos:
+            self._cerradas[tf].extend(barras)
+            self._parcial[tf] = None
+        else:
+            self._cerradas[tf].extend(barras[:-1])
+            self._parcial[tf] = ultima
+
+        exceso = len(self._cerradas[tf]) - self.max_barras
+        if exceso > 0:
+            del self._cerradas[tf][:exceso]
+        self._cursor[tf] = fin_datos
+
+    def barra_actual(self, tf):
+        """Barra en curso de tf, incluyendo la vela base abierta si aplica"""
+        parcial = self._parcial[tf]
+        abierta = self._vela_abierta
+        if abierta is not None:
+            paso_ms = INTERVALOS_MS[tf]
+            abierta = dict(abierta, tiempo=abierta['tiempo'] - abierta['tiempo'] % paso_ms)
+            if self._cursor[tf] is not None and abierta['tiempo'] + paso_ms <= self._cursor[tf]:
+                abierta = None
+        if parcial is None:
+            return abierta
+        if abierta is None or abierta['tiempo'] != parcial['tiempo']:
+            return parcial
+        return _combinar(parcial, abierta)
+
+    def dataframe(self, tf):
+        """Devuelve las barras de tf (cerradas + en curso) en formato API"""
+        barras = list(self._cerradas[tf])
+        actual = self.barra_actual(tf)
+        if actual is not None and (not barras or actual['tiempo'] > barras[-1]['tiempo']):
+            barras.append(actual)
+        barras = barras[-self.max_barras:]
+        if not barras:
+            return pd.DataFrame(columns=list(FORMATO_API.values()) + ['Close_Time'])
+        arrays = {clave: np.array([b[clave] for b in barras]) for clave in barras[0]}
+        return _a_dataframe(arrays, FORMATO_API, INTERVALOS_MS[tf])
+
+
+def _combinar(anterior, siguiente):
+    """Combina dos barras consecutivas de la misma cubeta"""
+    combinada = dict(anterior)
+    combinada['high'] = max(anterior['high'], siguiente['high'])
+    combinada['low'] = min(anterior['low'], siguiente['low'])
+    combinada['close'] = siguiente['close']
+    for clave, valor in siguiente.items():
+        if clave not in ('tiempo', 'open', 'high', 'low', 'close'):
+            combinada[clave] = anterior.get(clave, 0.0) + valor
+    return combinada
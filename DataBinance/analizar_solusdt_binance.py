@@ -2,9 +2,13 @@ import pandas as pd
 import numpy as np
 from binance.client import Client
 from datetime import datetime, timedelta
+from pathlib import Path
 import json
 import os
 
+from registrador_profundidad import leer_snapshots, serie_desequilibrio
+from pipeline_timeframes import ejecutar_pipeline
+
 # ============================================================================
 # CONFIGURACIÓN INICIAL
 # ============================================================================
@@ -53,28 +57,6 @@ def descargar_klines(symbol, interval, limit=500):
         print(f"Error descargando {interval}: {e}")
         return None
 
-# Descargar múltiples timeframes
-print("📊 Descargando datos de velas...")
-print("-" * 60)
-
-df_1m = descargar_klines('SOLUSDT', Client.KLINE_INTERVAL_1MINUTE, limit=1000)
-print(f"✓ 1m: {len(df_1m)} velas")
-
-df_5m = descargar_klines('SOLUSDT', Client.KLINE_INTERVAL_5MINUTE, limit=1000)
-print(f"✓ 5m: {len(df_5m)} velas")
-
-df_15m = descargar_klines('SOLUSDT', Client.KLINE_INTERVAL_15MINUTE, limit=1000)
-print(f"✓ 15m: {len(df_15m)} velas")
-
-df_1h = descargar_klines('SOLUSDT', Client.KLINE_INTERVAL_1HOUR, limit=1000)
-print(f"✓ 1h: {len(df_1h)} velas")
-
-df_4h = descargar_klines('SOLUSDT', Client.KLINE_INTERVAL_4HOUR, limit=1000)
-print(f"✓ 4h: {len(df_4h)} velas")
-
-df_1d = descargar_klines('SOLUSDT', Client.KLINE_INTERVAL_1DAY, limit=300)
-print(f"✓ 1d: {len(df_1d)} velas")
-
 # ============================================================================
 # 2. CALCULAR INDICADORES TÉCNICOS
 # ============================================================================
@@ -123,15 +105,31 @@ def calcular_indicadores(df):
     
     return df
 
-print("\n📈 Calculando indicadores técnicos...")
+# ============================================================================
+# DESCARGA Y CÁLCULO EN PARALELO POR TIMEFRAME
+# ============================================================================
+
+print("📊 Descargando datos de velas y calculando indicadores...")
 print("-" * 60)
 
-dataframes = {'1m': df_1m, '5m': df_5m, '15m': df_15m, '1h': df_1h, '4h': df_4h, '1d': df_1d}
-for timeframe, df in dataframes.items():
-    if df is not None:
-        df = calcular_indicadores(df)
-        dataframes[timeframe] = df
-        print(f"✓ Indicadores calculados para {timeframe}")
+timeframes = {
+    '1m': (Client.KLINE_INTERVAL_1MINUTE, 1000),
+    '5m': (Client.KLINE_INTERVAL_5MINUTE, 1000),
+    '15m': (Client.KLINE_INTERVAL_15MINUTE, 1000),
+    '1h': (Client.KLINE_INTERVAL_1HOUR, 1000),
+    '4h': (Client.KLINE_INTERVAL_4HOUR, 1000),
+    '1d': (Client.KLINE_INTERVAL_1DAY, 300),
+}
+
+dataframes, tiempos, total = ejecutar_pipeline(
+    timeframes,
+    lambda tf, interval, limit: descargar_klines('SOLUSDT', interval, limit=limit),
+    lambda tf, df: calcular_indicadores(df),
+    callback=print
+)
+for timeframe in timeframes:
+    if timeframe in dataframes:
+        print(f"✓ {timeframe}: {len(dataframes[timeframe])} velas")
 
 # ============================================================================
 # 3. OBTENER INFORMACIÓN DE MERCADO EN TIEMPO REAL
@@ -225,6 +223,28 @@ summary_data["OrderBook"] = {
     "Top_Ask": ask_prices[0] if ask_prices else None,
 }
 
+# Serie de desequilibrio del libro si hay una grabación de registrador_profundidad.py
+grabaciones = sorted(Path('.').glob("SOLUSDT_depth_*.bin"))
+if grabaciones:
+    serie_libro = serie_desequilibrio(leer_snapshots(grabaciones[-1]))
+    if len(serie_libro) > 0:
+        serie_filename = f"SOLUSDT_ORDERBOOK_{timestamp}.csv"
+        serie_libro.to_csv(serie_filename, index=False)
+        print(f"✓ {serie_filename} ({len(serie_libro)} instantáneas de {grabaciones[-1].name})")
+        
+        summary_data["OrderBook_Series"] = {
+            "Archivo": grabaciones[-1].name,
+            "Snapshots": int(len(serie_libro)),
+            "Desde": serie_libro['Time'].iloc[0].isoformat(),
+            "Hasta": serie_libro['Time'].iloc[-1].isoformat(),
+            "Imbalance_Mean": float(serie_libro['Imbalance'].mean()),
+            "Imbalance_Last": float(serie_libro['Imbalance'].iloc[-1]),
+            "Imbalance_Std": float(serie_libro['Imbalance'].std()),
+            "Bid_Ask_Ratio_Mean": float(serie_libro['Bid_Ask_Ratio'].mean()),
+            "Spread_Mean": float(serie_libro['Spread'].mean()),
+            "Pct_Tiempo_Presion_Compradora": float((serie_libro['Imbalance'] > 0).mean() * 100),
+        }
+
 # Guardar resumen en JSON
 summary_filename = f"SOLUSDT_SUMMARY_{timestamp}.json"
 with open(summary_filename, 'w') as f:
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Figuras de matplotlib como gráficos vectoriales de reportlab
+Un renderer de grabación recorre la figura una vez y guarda sus trazados y
+textos en puntos; el flowable FiguraVectorial los reproduce directamente
+sobre el canvas del PDF, sin pasar por PNG ni archivos temporales. La
+grabación es una lista de tuplas simples: se puede hacer en el hilo de Tk y
+montar el PDF con ella en otro hilo.
+Requisitos: pip install matplotlib reportlab
+"""
+
+from matplotlib.backend_bases import GraphicsContextBase, RendererBase
+from matplotlib.font_manager import weight_dict
+from matplotlib.path import Path
+from reportlab.pdfbase.pdfmetrics import getAscentDescent, stringWidth
+from reportlab.pdfgen.canvas import FILL_NON_ZERO
+from reportlab.platypus import Flowable
+
+CAPS = {'butt': 0, 'round': 1, 'projecting': 2}
+JOINS = {'miter': 0, 'round': 1, 'bevel': 2}
+
+# Caracteres que matplotlib usa y no existen en las fuentes estándar del PDF
+REEMPLAZOS_TEXTO = str.maketrans({'−': '-'})
+
+
+def fuente_pdf(prop):
+    """Fuente estándar del PDF (Helvetica) equivalente a un FontProperties"""
+    peso = prop.get_weight()
+    negrita = (weight_dict.get(peso, 400) if isinstance(peso, str) else peso) >= 600
+    cursiva = prop.get_style() in ('italic', 'oblique')
+    if negrita and cursiva:
+        return 'Helvetica-BoldOblique'
+    if negrita:
+        return 'Helvetica-Bold'
+    if cursiva:
+        return 'Helvetica-Oblique'
+    return 'Helvetica'
+
+
+def _limpiar_texto(s, ismath):
+    if ismath:
+        s = s.replace('$', '')
+    return s.translate(REEMPLAZOS_TEXTO)
+
+
+class RendererGrabacion(RendererBase):
+    """
+    Renderer que guarda las operaciones de dibujo en lugar de pintarlas.
+
+    matplotlib trabaja en píxeles de la figura (dpi de la figura); aquí se
+    convierten a puntos (1/72") con el origen abajo a la izquierda, como en
+    el PDF. Las medidas de texto se calculan con las métricas de Helvetica
+    para que leyendas y títulos se maqueten con la fuente que se escribe.
+    Las imágenes (imshow) no se graban.
+    """
+
+    def __init__(self, ancho_px, alto_px, dpi):
+        super().__init__()
+        self.ancho_px = ancho_px
+        self.alto_px = alto_px
+        self.dpi = dpi
+        self.escala = 72.0 / dpi
+        self.operaciones = []
+
+    def flipy(self):
+        return False
+
+    def get_canvas_width_height(self):
+        return self.ancho_px, self.alto_px
+
+    def points_to_pixels(self, points):
+        return points * self.dpi / 72.0
+
+    def new_gc(self):
+        return GraphicsContextBase()
+
+    def _recorte(self, gc):
+        rect = gc.get_clip_rectangle()
+        if rect is None:
+            return None
+        x, y, w, h = rect.bounds
+        e = self.escala
+        return (x * e, y * e, w * e, h * e)
+
+    def _color_trazo(self, gc):
+        r, g, b, a = gc.get_rgb()
+        if gc.get_forced_alpha():
+            a = gc.get_alpha()
+        return (r, g, b, a)
+
+    def draw_path(self, gc, path, transform, rgbFace=None):
+        relleno = None
+        if rgbFace is not None:
+            alpha = gc.get_alpha() if gc.get_forced_alpha() else (rgbFace[3] if len(rgbFace) > 3 else 1.0)
+            if alpha > 0:
+                relleno = (rgbFace[0], rgbFace[1], rgbFace[2], alpha)
+        trazo = self._color_trazo(gc)
+        grosor = gc.get_linewidth()
+        if trazo[3] <= 0 or grosor <= 0:
+            trazo = None
+        if relleno is None and trazo is None:
+            return
+
+        e = self.escala
+        segmentos = [(codigo, tuple(v * e for v in vertices))
+                     for vertices, codigo in path.iter_segments(transform, remove_nans=True)]
+        if not segmentos:
+            return
+        offset, guiones = gc.get_dashes()
+        self.operaciones.append((
+            'trazado', segmentos, relleno, trazo, grosor,
+            (offset or 0, list(guiones)) if guiones is not None else None,
+            CAPS.get(gc.get_capstyle(), 0), JOINS.get(gc.get_joinstyle(), 0),
+            self._recorte(gc),
+        ))
+
+    def draw_text(self, gc, x, y, s, prop, angle, ismath=False, mtext=None):
+        texto = _limpiar_texto(s, ismath)
+        if not texto:
+            return
+        e = self.escala
+        self.operaciones.append((
+            'texto', x * e, y * e, texto, fuente_pdf(prop), prop.get_size_in_points(),
+            self._color_trazo(gc), angle, self._recorte(gc),
+        ))
+
+    def get_text_width_height_descent(self, s, prop, ismath):
+        texto = _limpiar_texto(s, ismath)
+        fuente = fuente_pdf(prop)
+        tamano = prop.get_size_in_points()
+        ascenso, descenso = getAscentDescent(fuente, tamano)
+        a_px = self.dpi / 72.0
+        return (stringWidth(texto, fuente, tamano) * a_px,
+                (ascenso - descenso) * a_px, -descenso * a_px)
+
+    def draw_image(self, gc, x, y, im, transform=None):
+        pass
+
+
+class GrabacionFigura:
+    """Operaciones de dibujo de una figura y su tamaño en puntos"""
+
+    def __init__(self, operaciones, ancho, alto):
+        self.operaciones = operaciones
+        self.ancho = ancho
+        self.alto = alto
+
+
+def grabar_figura(fig):
+    """
+    Graba una figura de matplotlib (ya maquetada) como operaciones vectoriales.
+    Debe llamarse desde el hilo que posee la figura (el de Tk en la GUI).
+    """
+    ancho_px, alto_px = fig.bbox.size
+    renderer = RendererGrabacion(ancho_px, alto_px, fig.dpi)
+    fig.draw(renderer)
+    return GrabacionFigura(renderer.operaciones, ancho_px * renderer.escala, alto_px * renderer.escala)
+
+
+class FiguraVectorial(Flowable):
+    """
+    Flowable de reportlab que reproduce una GrabacionFigura.
+
+    Si solo se indica el ancho, el alto mantiene la proporción de la figura.
+    """
+
+    def __init__(self, grabacion, width, height=None):
+        super().__init__()
+        self.grabacion = grabacion
+        self.width = width
+        self.height = height if height is not None else width * grabacion.alto / grabacion.ancho
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        canv = self.canv
+        canv.saveState()
+        canv.scale(self.width / self.grabacion.ancho, self.height / self.grabacion.alto)
+        # El recorte solo cambia entre grupos de artistas (ejes, leyendas...):
+        # se abre un estado nuevo solo cuando cambia
+        recorte_actual = None
+        for operacion in self.grabacion.operaciones:
+            recorte = operacion[-1]
+            if recorte != recorte_actual:
+                if recorte_actual is not None:
+                    canv.restoreState()
+                if recorte is not None:
+                    canv.saveState()
+                    clip = canv.beginPath()
+                    clip.rect(*recorte)
+                    canv.clipPath(clip, stroke=0, fill=0)
+                recorte_actual = recorte
+            if operacion[0] == 'trazado':
+                self._trazado(*operacion[1:-1])
+            else:
+                self._texto(*operacion[1:-1])
+        if recorte_actual is not None:
+            canv.restoreState()
+        canv.restoreState()
+
+    def _trazado(self, segmentos, relleno, trazo, grosor, guiones, cap, join):
+        canv = self.canv
+        p = canv.beginPath()
+        x0 = y0 = 0.0
+        for codigo, v in segmentos:
+            if codigo == Path.MOVETO:
+                p.moveTo(*v)
+            elif codigo == Path.LINETO:
+                p.lineTo(*v)
+            elif codigo == Path.CURVE3:
+                # Cuadrática -> cúbica equivalente
+                cx, cy, x, y = v
+                p.curveTo(x0 + 2 / 3 * (cx - x0), y0 + 2 / 3 * (cy - y0),
+                          x + 2 / 3 * (cx - x), y + 2 / 3 * (cy - y), x, y)
+            elif codigo == Path.CURVE4:
+                p.curveTo(*v)
+            elif codigo == Path.CLOSEPOLY:
+                p.close()
+                continue
+            x0, y0 = v[-2], v[-1]
+
+        if relleno is not None:
+            canv.setFillColorRGB(*relleno[:3])
+            canv.setFillAlpha(relleno[3])
+        if trazo is not None:
+            canv.setStrokeColorRGB(*trazo[:3])
+            canv.setStrokeAlpha(trazo[3])
+            canv.setLineWidth(grosor)
+            canv.setLineCap(cap)
+            canv.setLineJoin(join)
+            if guiones is not None:
+                canv.setDash(guiones[1], guiones[0])
+            else:
+                canv.setDash([], 0)
+        canv.drawPath(p, stroke=trazo is not None, fill=relleno is not None, fillMode=FILL_NON_ZERO)
+
+    def _texto(self, x, y, texto, fuente, tamano, color, angulo):
+        canv = self.canv
+        canv.saveState()
+        canv.setFillColorRGB(*color[:3])
+        canv.setFillAlpha(color[3])
+        canv.setFont(fuente, tamano)
+        canv.translate(x, y)
+        if angulo:
+            canv.rotate(angulo)
+        canv.drawString(0, 0, texto)
+        canv.restoreState()
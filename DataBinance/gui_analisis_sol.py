@@ -3,21 +3,24 @@
 GUI Profesional para Análisis Técnico SOL/USDT
 Interfaz gráfica con descarga de datos, análisis y visualización de gráficos
 Genera reportes PDF con gráficos incluidos
-Requisitos: pip install pandas numpy matplotlib python-binance reportlab pillow
+Requisitos: pip install pandas numpy matplotlib python-binance reportlab
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 from datetime import datetime
 from pathlib import Path
 import threading
+import time
 import os
-import io
+
+from agregador_klines import AgregadorKlines, INTERVALOS_MS
+from registrador_profundidad import leer_snapshots, serie_desequilibrio
+from pipeline_timeframes import ejecutar_pipeline
 
 try:
     from binance.client import Client
@@ -29,10 +32,10 @@ try:
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, Table, TableStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
     from reportlab.lib import colors
     from reportlab.lib.enums import TA_CENTER
-    from PIL import Image as PILImage
+    from figura_vectorial import grabar_figura, FiguraVectorial
     REPORTLAB_AVAILABLE = True
 except ImportError:
     REPORTLAB_AVAILABLE = False
@@ -50,6 +53,8 @@ class AnalisisSolUSDT:
         self.fuente_datos = "descargados"
         self.archivo_info = {}
         self.ultimo_timestamp = None
+        self.agregador = None
+        self.tiempo_ultima_descarga = None
     
     def limpiar_archivos_antiguos(self, directorio='.', callback=None):
         """Elimina archivos antiguos, mantiene solo los más recientes por timeframe"""
@@ -99,38 +104,36 @@ class AnalisisSolUSDT:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             self.ultimo_timestamp = timestamp
             
-            for tf, (interval, limit) in timeframes.items():
-                if callback:
-                    callback(f"Descargando {tf} ({limit} candles)...")
-                
+            if callback:
+                callback(f"Descargando {len(timeframes)} timeframes en paralelo...")
+            
+            def descargar(tf, interval, limit):
                 klines = client.get_klines(symbol='SOLUSDT', interval=interval, limit=limit)
-                
-                df = pd.DataFrame(klines, columns=[
-                    'Open_Time', 'Open', 'High', 'Low', 'Close', 'Volume',
-                    'Close_Time', 'Quote_Asset_Volume', 'Number_of_Trades',
-                    'Taker_Buy_Base', 'Taker_Buy_Quote', 'Ignore'
-                ])
-                
-                df['Open_Time'] = pd.to_datetime(df['Open_Time'], unit='ms')
-                df['Close_Time'] = pd.to_datetime(df['Close_Time'], unit='ms')
-                df['Open'] = df['Open'].astype(float)
-                df['High'] = df['High'].astype(float)
-                df['Low'] = df['Low'].astype(float)
-                df['Close'] = df['Close'].astype(float)
-                df['Volume'] = df['Volume'].astype(float)
-                
+                return self._klines_a_dataframe(klines)
+            
+            def procesar(tf, df):
                 self._calcular_indicadores(df)
+                df.to_csv(f'SOLUSDT_{tf}_{timestamp}.csv', index=False)
+                return df
+            
+            dataframes, tiempos, total = ejecutar_pipeline(timeframes, descargar, procesar, callback)
+            
+            for tf, df in dataframes.items():
                 self.dataframes[tf] = df
-                
-                filename = f'SOLUSDT_{tf}_{timestamp}.csv'
-                df.to_csv(filename, index=False)
-                
                 self.archivo_info[tf] = {
-                    'archivo': filename,
+                    'archivo': f'SOLUSDT_{tf}_{timestamp}.csv',
                     'timestamp': timestamp,
                     'fecha': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    'registros': len(df)
+                    'registros': len(df),
+                    'tiempo_descarga': tiempos[tf]['descarga'],
+                    'tiempo_calculo': tiempos[tf]['calculo']
                 }
+            self.tiempo_ultima_descarga = total
+            
+            # Sembrar el agregador para que las actualizaciones solo pidan velas 1m
+            self.agregador = AgregadorKlines('1m', [tf for tf in timeframes if tf != '1m'])
+            for tf in self.agregador.destinos:
+                self.agregador.sembrar(tf, self.dataframes[tf])
             
             # Eliminar archivos antiguos después de descargar
             if callback:
@@ -150,6 +153,85 @@ class AnalisisSolUSDT:
         except Exception as e:
             raise Exception(f"Error descargando datos: {str(e)}")
     
+    def actualizar_datos(self, callback=None):
+        """
+        Actualiza todos los timeframes pidiendo solo velas 1m nuevas.
+        Los timeframes superiores se derivan con el agregador incremental;
+        si no hay una descarga previa se hace la descarga completa.
+        """
+        if self.agregador is None or '1m' not in self.dataframes:
+            return self.descargar_datos(callback)
+        
+        # Sin ningún timeframe sembrado (p. ej. llegaron vacíos) el agregador no
+        # tiene desde dónde continuar: descarga completa
+        inicio_base = self.agregador.inicio_base_requerido()
+        if inicio_base is None:
+            return self.descargar_datos(callback)
+        
+        try:
+            client = Client(api_key=API_KEY, api_secret=API_SECRET)
+            
+            df_1m = self.dataframes['1m']
+            ultimo_1m = int(df_1m['Open_Time'].iloc[-1].value // 1_000_000)
+            inicio = min(inicio_base, ultimo_1m)
+            
+            klines = []
+            while True:
+                if callback:
+                    callback(f"Descargando 1m desde {pd.to_datetime(inicio, unit='ms')}...")
+                lote = client.get_klines(symbol='SOLUSDT', interval=Client.KLINE_INTERVAL_1MINUTE,
+                                         startTime=inicio, limit=1000)
+                klines.extend(lote)
+                if len(lote) < 1000:
+                    break
+                inicio = lote[-1][0] + INTERVALOS_MS['1m']
+            
+            if not klines:
+                return True
+            
+            nuevas = self._klines_a_dataframe(klines)
+            self.agregador.agregar(nuevas, ultima_abierta=True)
+            
+            # 1m: reemplazar solapamiento con las velas nuevas y recortar a 1000
+            df_1m = pd.concat([df_1m[df_1m['Open_Time'] < nuevas['Open_Time'].iloc[0]], nuevas],
+                              ignore_index=True).tail(1000).reset_index(drop=True)
+            actualizados = {'1m': df_1m}
+            for tf in self.agregador.destinos:
+                actualizados[tf] = self.agregador.dataframe(tf)
+            
+            for tf, df in actualizados.items():
+                self._calcular_indicadores(df)
+                self.dataframes[tf] = df
+                self.archivo_info.setdefault(tf, {}).update({
+                    'fecha': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    'registros': len(df)
+                })
+            
+            if callback:
+                callback(f"✓ Actualizado con {len(klines)} velas 1m")
+            
+            self.fuente_datos = "online"
+            return True
+        except Exception as e:
+            raise Exception(f"Error actualizando datos: {str(e)}")
+    
+    def _klines_a_dataframe(self, klines):
+        """Convierte la respuesta de get_klines a DataFrame tipado"""
+        df = pd.DataFrame(klines, columns=[
+            'Open_Time', 'Open', 'High', 'Low', 'Close', 'Volume',
+            'Close_Time', 'Quote_Asset_Volume', 'Number_of_Trades',
+            'Taker_Buy_Base', 'Taker_Buy_Quote', 'Ignore'
+        ])
+        
+        df['Open_Time'] = pd.to_datetime(df['Open_Time'], unit='ms')
+        df['Close_Time'] = pd.to_datetime(df['Close_Time'], unit='ms')
+        df['Open'] = df['Open'].astype(float)
+        df['High'] = df['High'].astype(float)
+        df['Low'] = df['Low'].astype(float)
+        df['Close'] = df['Close'].astype(float)
+        df['Volume'] = df['Volume'].astype(float)
+        return df
+    
     def cargar_datos_locales(self, directorio='.', callback=None):
         """Carga datos desde CSVs locales más recientes"""
         try:
@@ -315,9 +397,30 @@ class AnalisisSolUSDT:
                 'confianza': self._calcular_confianza_short(df_1h, current)
             }
         
+        analisis['libro_ordenes'] = self._analizar_profundidad()
+        
         self.resultados = analisis
         return analisis
     
+    def _analizar_profundidad(self, directorio='.'):
+        """Resume la serie de desequilibrio de la última grabación del libro"""
+        grabaciones = sorted(Path(directorio).glob("SOLUSDT_depth_*.bin"))
+        if not grabaciones:
+            return {}
+        
+        serie = serie_desequilibrio(leer_snapshots(grabaciones[-1]))
+        if len(serie) == 0:
+            return {}
+        
+        return {
+            'archivo': grabaciones[-1].name,
+            'snapshots': int(len(serie)),
+            'imbalance_medio': float(serie['Imbalance'].mean()),
+            'imbalance_actual': float(serie['Imbalance'].iloc[-1]),
+            'ratio_medio': float(serie['Bid_Ask_Ratio'].mean()),
+            'spread_medio': float(serie['Spread'].mean()),
+        }
+    
     def _calcular_confianza_long(self, df_1h, current_price):
         """Calcula confianza de estrategia LONG"""
         last = df_1h.iloc[-1]
@@ -383,6 +486,11 @@ class GUIAnalisisSol:
         self.root.configure(bg='#2b2b2b')
         
         self.analizador = AnalisisSolUSDT()
+        # Figura de la pestaña Gráficos y su grabación vectorial para el PDF,
+        # asociadas a los datos 1h con los que se dibujaron
+        self.figura_graficos = None
+        self.clave_graficos = None
+        self.grabacion_graficos = None
         self.crear_interfaz()
     
     def crear_interfaz(self):
@@ -397,6 +505,12 @@ class GUIAnalisisSol:
             command=self.descargar_datos
         ).pack(side=tk.LEFT, padx=5)
         
+        ttk.Button(
+            self.panel_controles,
+            text="🔄 Actualizar",
+            command=self.actualizar_datos
+        ).pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(
             self.panel_controles,
             text="💾 Cargar Local",
@@ -521,7 +635,7 @@ class GUIAnalisisSol:
                     self.actualizar_fuente("Online ☁️")
                     self.actualizar_timestamp(self.analizador.ultimo_timestamp)
                     self.mostrar_info_archivos()
-                    messagebox.showinfo("Éxito", "Datos descargados exitosamente\n(Archivos antiguos eliminados)")
+                    messagebox.showinfo("Éxito", f"Datos descargados exitosamente en {self.analizador.tiempo_ultima_descarga:.2f}s\n(Archivos antiguos eliminados)")
                 except Exception as e:
                     self.actualizar_estado("✗ Error")
                     messagebox.showerror("Error", str(e))
@@ -531,6 +645,30 @@ class GUIAnalisisSol:
         except Exception as e:
             messagebox.showerror("Error", str(e))
     
+    def actualizar_datos(self):
+        """Actualiza datos descargando solo velas 1m nuevas"""
+        if not BINANCE_AVAILABLE:
+            messagebox.showerror("Error", "Binance API no disponible\nInstala: pip install python-binance")
+            return
+        
+        self.actualizar_estado("⏳ Actualizando datos...")
+        
+        def callback(msg):
+            self.actualizar_estado(f"⏳ {msg}")
+        
+        def run_update():
+            try:
+                self.analizador.actualizar_datos(callback)
+                self.actualizar_estado("✓ Datos actualizados")
+                self.actualizar_fuente("Online ☁️")
+                self.mostrar_info_archivos()
+            except Exception as e:
+                self.actualizar_estado("✗ Error")
+                messagebox.showerror("Error", str(e))
+        
+        thread = threading.Thread(target=run_update, daemon=True)
+        thread.start()
+    
     def cargar_locales(self):
         """Carga datos locales"""
         try:
@@ -571,240 +709,230 @@ class GUIAnalisisSol:
             texto += f"  Timestamp: {info['timestamp']}\n"
             texto += f"  Fecha/Hora: {info['fecha']}\n"
             texto += f"  Registros: {info['registros']:,}\n"
+            if 'tiempo_descarga' in info:
+                texto += f"  Tiempos: descarga {info['tiempo_descarga']:.2f}s | indicadores {info['tiempo_calculo']:.2f}s\n"
             texto += "─" * 70 + "\n"
         
         self.text_archivos.insert(tk.END, texto)
         self.notebook.select(4)  # Cambiar a pestaña de archivos
     
-    def guardar_reporte_pdf(self):
-        """Genera y guarda un reporte en PDF con gráficos"""
-        try:
-            if not REPORTLAB_AVAILABLE:
-                raise Exception("Requiere: pip install reportlab pillow")
-            
-            # Crear PDF
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            pdf_filename = f"reporte_SOLUSDT_{timestamp}.pdf"
-            doc = SimpleDocTemplate(pdf_filename, pagesize=A4)
-            story = []
-            
-            # Estilos
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                textColor=colors.HexColor("#001AFF"),
-                spaceAfter=30,
-                alignment=TA_CENTER
-            )
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=14,
-                textColor=colors.HexColor('#001AFF'),
-                spaceAfter=12,
-                spaceBefore=12
-            )
-            normal_style = ParagraphStyle(
-                'CustomNormal',
-                parent=styles['Normal'],
-                fontSize=10,
-                spaceAfter=6
-            )
-            
-            # Título
-            story.append(Paragraph("ANÁLISIS TÉCNICO SOL/USDT", title_style))
-            story.append(Spacer(1, 0.3 * inch))
-            
-            # Resumen
-            story.append(Paragraph("📊 RESUMEN EJECUTIVO", heading_style))
-            resultado = self.analizador.resultados
-            
-            resumen_data = [
-                ["Precio Actual:", f"${resultado['precio_actual']:.2f}"],
-                ["Timestamp:", resultado['timestamp']],
-                ["Fuente de Datos:", resultado['fuente'].upper()],
-                ["Confianza LONG:", f"{resultado['recomendaciones_long'].get('confianza', 0):.0f}%"],
-                ["Confianza SHORT:", f"{resultado['recomendaciones_short'].get('confianza', 0):.0f}%"],
-            ]
-            
-            resumen_table = Table(resumen_data, colWidths=[2*inch, 4*inch])
-            resumen_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor("#000000")),
-                ('TEXTCOLOR', (0, 0), (0, -1), colors.white),
-                ('TEXTCOLOR', (1, 0), (1, -1), colors.black),
-                ('BACKGROUND', (1, 0), (1, -1), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-            ]))
-            story.append(resumen_table)
-            story.append(Spacer(1, 0.3 * inch))
-            
-            # Archivos utilizados
-            story.append(Paragraph("📁 ARCHIVOS UTILIZADOS", heading_style))
-            archivos_data = [["Timeframe", "Archivo", "Registros"]]
-            for tf in sorted(resultado['archivo_info'].keys()):
-                info = resultado['archivo_info'][tf]
-                archivos_data.append([tf.upper(), info['archivo'], f"{info['registros']:,}"])
-            
-            archivos_table = Table(archivos_data, colWidths=[1*inch, 3*inch, 1.5*inch])
-            archivos_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00FFFF')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-                ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-            ]))
-            story.append(archivos_table)
-            story.append(PageBreak())
-            
-            # Indicadores
-            story.append(Paragraph("📈 INDICADORES TÉCNICOS", heading_style))
-            indicadores_data = [["Timeframe", "RSI", "Estado", "MACD", "Signal"]]
-            for tf in ['1m', '5m', '15m', '1h', '4h', '1d']:
-                if tf in resultado['rsi']:
-                    rsi = resultado['rsi'][tf]
-                    macd = resultado['macd'].get(tf, {})
-                    indicadores_data.append([
-                        tf.upper(),
-                        f"{rsi['valor']:.2f}",
-                        rsi['estado'],
-                        f"{macd.get('valor', 0):.6f}",
-                        f"{macd.get('signal', 0):.6f}"
-                    ])
-            
-            indicadores_table = Table(indicadores_data, colWidths=[1*inch, 1*inch, 1.2*inch, 1.4*inch, 1.4*inch])
-            indicadores_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00FFFF')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-            ]))
-            story.append(indicadores_table)
-            story.append(Spacer(1, 0.3 * inch))
-            
-            # Estrategias
-            story.append(Paragraph("🎯 ESTRATEGIAS OPERATIVAS", heading_style))
-            
-            long = resultado.get('recomendaciones_long', {})
-            short = resultado.get('recomendaciones_short', {})
-            
-            estrategias_data = [
-                ["CONCEPTO", "LONG", "SHORT"],
-                ["Confianza", f"{long.get('confianza', 0):.0f}%", f"{short.get('confianza', 0):.0f}%"],
-                ["Entrada 1", f"${long.get('entrada_1', 0):.2f}", f"${short.get('entrada_1', 0):.2f}"],
-                ["Entrada 2", f"${long.get('entrada_2', 0):.2f}", f"${short.get('entrada_2', 0):.2f}"],
-                ["Target 1", f"${long.get('target_1', 0):.2f}", f"${short.get('target_1', 0):.2f}"],
-                ["Target 2", f"${long.get('target_2', 0):.2f}", f"${short.get('target_2', 0):.2f}"],
-                ["Stop Loss", f"${long.get('stop_loss', 0):.2f}", f"${short.get('stop_loss', 0):.2f}"],
-                ["Riesgo", f"-{long.get('riesgo', 0):.2f}%", f"+{short.get('riesgo', 0):.2f}%"],
-                ["Ganancia", f"+{long.get('ganancia', 0):.2f}%", f"+{short.get('ganancia', 0):.2f}%"],
-            ]
-            
-            estrategias_table = Table(estrategias_data, colWidths=[2*inch, 2*inch, 2*inch])
-            estrategias_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00FFFF')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                ('BACKGROUND', (1, 1), (1, -1), colors.HexColor('#90EE90')),
-                ('BACKGROUND', (2, 1), (2, -1), colors.HexColor('#FFB6C6')),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-                ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-            ]))
-            story.append(estrategias_table)
-            story.append(PageBreak())
-            
-            # Gráficos
-            story.append(Paragraph("📊 GRÁFICOS TÉCNICOS", heading_style))
-            
-            if '1h' in self.analizador.dataframes:
-                df_1h = self.analizador.dataframes['1h']
-                
-                # Generar gráfico
-                fig = plt.Figure(figsize=(7, 5), dpi=100, facecolor='white')
-                
-                ax1 = fig.add_subplot(2, 2, 1)
-                ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['Close'].iloc[-50:], label='Close', color='cyan', linewidth=2)
-                ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MA7'].iloc[-50:], label='MA7', color='yellow', alpha=0.7)
-                ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MA25'].iloc[-50:], label='MA25', color='orange', alpha=0.7)
-                ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MA99'].iloc[-50:], label='MA99', color='red', alpha=0.7)
-                ax1.set_title('Precio y Medias Móviles', fontsize=10, fontweight='bold')
-                ax1.legend(loc='best', fontsize=8)
-                ax1.grid(alpha=0.2)
-                ax1.set_facecolor('#f5f5f5')
-                
-                ax2 = fig.add_subplot(2, 2, 2)
-                ax2.plot(range(len(df_1h)-50, len(df_1h)), df_1h['RSI'].iloc[-50:], color='cyan', linewidth=2)
-                ax2.axhline(y=70, color='red', linestyle='--', alpha=0.5, label='Sobrecompra')
-                ax2.axhline(y=30, color='green', linestyle='--', alpha=0.5, label='Sobreventa')
-                ax2.fill_between(range(len(df_1h)-50, len(df_1h)), 30, 70, alpha=0.1, color='gray')
-                ax2.set_title('RSI(14)', fontsize=10, fontweight='bold')
-                ax2.legend(loc='best', fontsize=8)
-                ax2.set_ylim(0, 100)
-                ax2.grid(alpha=0.2)
-                ax2.set_facecolor('#f5f5f5')
-                
-                ax3 = fig.add_subplot(2, 2, 3)
-                ax3.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MACD'].iloc[-50:], label='MACD', color='cyan', linewidth=2)
-                ax3.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MACD_Signal'].iloc[-50:], label='Signal', color='red', linewidth=2)
-                ax3.bar(range(len(df_1h)-50, len(df_1h)), df_1h['MACD_Histogram'].iloc[-50:], label='Histogram', color='gray', alpha=0.3)
-                ax3.axhline(y=0, color='black', linestyle='-', alpha=0.3)
-                ax3.set_title('MACD', fontsize=10, fontweight='bold')
-                ax3.legend(loc='best', fontsize=8)
-                ax3.grid(alpha=0.2)
-                ax3.set_facecolor('#f5f5f5')
-                
-                ax4 = fig.add_subplot(2, 2, 4)
-                colors_vol = ['green' if df_1h['Close'].iloc[i] >= df_1h['Open'].iloc[i] else 'red' 
-                              for i in range(len(df_1h)-50, len(df_1h))]
-                ax4.bar(range(len(df_1h)-50, len(df_1h)), df_1h['Volume'].iloc[-50:], color=colors_vol, alpha=0.7)
-                ax4.set_title('Volumen', fontsize=10, fontweight='bold')
-                ax4.grid(alpha=0.2, axis='y')
-                ax4.set_facecolor('#f5f5f5')
-                
-                fig.tight_layout()
-                
-                # Convertir figura a imagen
-                img_buffer = io.BytesIO()
-                fig.savefig(img_buffer, format='png', dpi=100, bbox_inches='tight')
-                img_buffer.seek(0)
-                
-                # Agregar imagen al PDF
-                temp_img_path = f"temp_graph_{timestamp}.png"
-                with open(temp_img_path, 'wb') as f:
-                    f.write(img_buffer.getvalue())
-                
-                story.append(Image(temp_img_path, width=7*inch, height=5*inch))
-                story.append(Spacer(1, 0.2 * inch))
-                
-                plt.close(fig)
-            
-            # Footer
-            story.append(Spacer(1, 0.3 * inch))
-            footer_text = f"Reporte generado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Sistema de Análisis SOL/USDT"
-            story.append(Paragraph(footer_text, normal_style))
-            
-            # Generar PDF
-            doc.build(story)
-            
-            # Eliminar archivo temporal después de generar el PDF
-            if os.path.exists(temp_img_path):
-                os.remove(temp_img_path)
- 
-            return pdf_filename
-        except Exception as e:
-            raise Exception(f"Error generando PDF: {str(e)}")
+    def _clave_graficos(self):
+        """Identifica los datos 1h graficados: si no cambia, la figura sigue valiendo"""
+        df_1h = self.analizador.dataframes.get('1h')
+        if df_1h is None or df_1h.empty:
+            return None
+        return (len(df_1h), df_1h.index[-1], float(df_1h['Close'].iloc[-1]))
+    
+    def _grabacion_graficos(self):
+        """
+        Gráficos del reporte como operaciones vectoriales (en el hilo de Tk).
+        Se graba la figura ya dibujada por generar_graficos y la grabación se
+        reutiliza mientras los datos 1h no cambien.
+        """
+        clave = self._clave_graficos()
+        if clave is None:
+            return None
+        if self.grabacion_graficos is not None and self.grabacion_graficos[0] == clave:
+            return self.grabacion_graficos[1]
+        
+        fig = self.figura_graficos if self.clave_graficos == clave else None
+        if fig is None:
+            fig = self.crear_figura_graficos(self.analizador.dataframes['1h'])
+        grabacion = grabar_figura(fig)
+        self.grabacion_graficos = (clave, grabacion)
+        return grabacion
+    
+    def guardar_reporte_pdf(self, callback=None):
+        """
+        Genera el reporte PDF en segundo plano.
+        
+        En el hilo de Tk solo se graban los gráficos (vectoriales, sin PNG
+        intermedio); el documento se monta y escribe en un hilo aparte.
+        
+        Args:
+            callback: función (pdf_filename, segundos, error) que se llama en
+                el hilo de Tk al terminar
+        
+        Returns:
+            str: nombre del PDF que se está generando
+        """
+        if not REPORTLAB_AVAILABLE:
+            raise Exception("Requiere: pip install reportlab")
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        pdf_filename = f"reporte_SOLUSDT_{timestamp}.pdf"
+        resultado = self.analizador.resultados
+        grabacion = self._grabacion_graficos()
+        
+        def run_pdf():
+            inicio = time.perf_counter()
+            error = None
+            try:
+                self._construir_pdf(pdf_filename, resultado, grabacion)
+            except Exception as e:
+                error = f"Error generando PDF: {str(e)}"
+            if callback:
+                self.root.after(0, callback, pdf_filename, time.perf_counter() - inicio, error)
+        
+        thread = threading.Thread(target=run_pdf, daemon=True)
+        thread.start()
+        return pdf_filename
+    
+    def _construir_pdf(self, pdf_filename, resultado, grabacion):
+        """Monta y escribe el PDF (sin tocar widgets: corre fuera del hilo de Tk)"""
+        doc = SimpleDocTemplate(pdf_filename, pagesize=A4)
+        story = []
+        
+        # Estilos
+        styles = getSampleStyleSheet()
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor("#001AFF"),
+            spaceAfter=30,
+            alignment=TA_CENTER
+        )
+        heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#001AFF'),
+            spaceAfter=12,
+            spaceBefore=12
+        )
+        normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=10,
+            spaceAfter=6
+        )
+        
+        # Título
+        story.append(Paragraph("ANÁLISIS TÉCNICO SOL/USDT", title_style))
+        story.append(Spacer(1, 0.3 * inch))
+        
+        # Resumen
+        story.append(Paragraph("📊 RESUMEN EJECUTIVO", heading_style))
+        
+        resumen_data = [
+            ["Precio Actual:", f"${resultado['precio_actual']:.2f}"],
+            ["Timestamp:", resultado['timestamp']],
+            ["Fuente de Datos:", resultado['fuente'].upper()],
+            ["Confianza LONG:", f"{resultado['recomendaciones_long'].get('confianza', 0):.0f}%"],
+            ["Confianza SHORT:", f"{resultado['recomendaciones_short'].get('confianza', 0):.0f}%"],
+        ]
+        
+        resumen_table = Table(resumen_data, colWidths=[2*inch, 4*inch])
+        resumen_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor("#000000")),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.white),
+            ('TEXTCOLOR', (1, 0), (1, -1), colors.black),
+            ('BACKGROUND', (1, 0), (1, -1), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+        ]))
+        story.append(resumen_table)
+        story.append(Spacer(1, 0.3 * inch))
+        
+        # Archivos utilizados
+        story.append(Paragraph("📁 ARCHIVOS UTILIZADOS", heading_style))
+        archivos_data = [["Timeframe", "Archivo", "Registros"]]
+        for tf in sorted(resultado['archivo_info'].keys()):
+            info = resultado['archivo_info'][tf]
+            archivos_data.append([tf.upper(), info['archivo'], f"{info['registros']:,}"])
+        
+        archivos_table = Table(archivos_data, colWidths=[1*inch, 3*inch, 1.5*inch])
+        archivos_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00FFFF')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+        ]))
+        story.append(archivos_table)
+        story.append(PageBreak())
+        
+        # Indicadores
+        story.append(Paragraph("📈 INDICADORES TÉCNICOS", heading_style))
+        indicadores_data = [["Timeframe", "RSI", "Estado", "MACD", "Signal"]]
+        for tf in ['1m', '5m', '15m', '1h', '4h', '1d']:
+            if tf in resultado['rsi']:
+                rsi = resultado['rsi'][tf]
+                macd = resultado['macd'].get(tf, {})
+                indicadores_data.append([
+                    tf.upper(),
+                    f"{rsi['valor']:.2f}",
+                    rsi['estado'],
+                    f"{macd.get('valor', 0):.6f}",
+                    f"{macd.get('signal', 0):.6f}"
+                ])
+        
+        indicadores_table = Table(indicadores_data, colWidths=[1*inch, 1*inch, 1.2*inch, 1.4*inch, 1.4*inch])
+        indicadores_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00FFFF')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+        ]))
+        story.append(indicadores_table)
+        story.append(Spacer(1, 0.3 * inch))
+        
+        # Estrategias
+        story.append(Paragraph("🎯 ESTRATEGIAS OPERATIVAS", heading_style))
+        
+        long = resultado.get('recomendaciones_long', {})
+        short = resultado.get('recomendaciones_short', {})
+        
+        estrategias_data = [
+            ["CONCEPTO", "LONG", "SHORT"],
+            ["Confianza", f"{long.get('confianza', 0):.0f}%", f"{short.get('confianza', 0):.0f}%"],
+            ["Entrada 1", f"${long.get('entrada_1', 0):.2f}", f"${short.get('entrada_1', 0):.2f}"],
+            ["Entrada 2", f"${long.get('entrada_2', 0):.2f}", f"${short.get('entrada_2', 0):.2f}"],
+            ["Target 1", f"${long.get('target_1', 0):.2f}", f"${short.get('target_1', 0):.2f}"],
+            ["Target 2", f"${long.get('target_2', 0):.2f}", f"${short.get('target_2', 0):.2f}"],
+            ["Stop Loss", f"${long.get('stop_loss', 0):.2f}", f"${short.get('stop_loss', 0):.2f}"],
+            ["Riesgo", f"-{long.get('riesgo', 0):.2f}%", f"+{short.get('riesgo', 0):.2f}%"],
+            ["Ganancia", f"+{long.get('ganancia', 0):.2f}%", f"+{short.get('ganancia', 0):.2f}%"],
+        ]
+        
+        estrategias_table = Table(estrategias_data, colWidths=[2*inch, 2*inch, 2*inch])
+        estrategias_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00FFFF')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('BACKGROUND', (1, 1), (1, -1), colors.HexColor('#90EE90')),
+            ('BACKGROUND', (2, 1), (2, -1), colors.HexColor('#FFB6C6')),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+        ]))
+        story.append(estrategias_table)
+        story.append(PageBreak())
+        
+        # Gráficos
+        story.append(Paragraph("📊 GRÁFICOS TÉCNICOS", heading_style))
+        
+        if grabacion is not None:
+            story.append(FiguraVectorial(grabacion, width=doc.width))
+            story.append(Spacer(1, 0.2 * inch))
+        
+        # Footer
+        story.append(Spacer(1, 0.3 * inch))
+        footer_text = f"Reporte generado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Sistema de Análisis SOL/USDT"
+        story.append(Paragraph(footer_text, normal_style))
+        
+        # Generar PDF
+        doc.build(story)
     
     def generar_analisis(self):
         """Genera análisis y gráficos"""
@@ -819,18 +947,25 @@ class GUIAnalisisSol:
             self.actualizar_estado("⏳ Generando gráficos...")
             self.generar_graficos()
             
-            # Generar PDF
-            self.actualizar_estado("⏳ Generando reporte PDF...")
-            pdf_file = self.guardar_reporte_pdf()
-            
             self.notebook.select(0)
             
-            self.actualizar_estado("✓ Análisis completado")
-            messagebox.showinfo("Éxito", f"Análisis generado exitosamente\n\nReporte PDF: {pdf_file}")
+            # El PDF se escribe en segundo plano: la GUI queda libre mientras tanto
+            self.actualizar_estado("⏳ Generando reporte PDF...")
+            self.guardar_reporte_pdf(self._reporte_terminado)
         except Exception as e:
             self.actualizar_estado("✗ Error")
             messagebox.showerror("Error", str(e))
     
+    def _reporte_terminado(self, pdf_file, segundos, error):
+        """Aviso de fin del reporte PDF (en el hilo de Tk)"""
+        if error:
+            self.actualizar_estado("✗ Error")
+            messagebox.showerror("Error", error)
+            return
+        tamano_kb = os.path.getsize(pdf_file) / 1024
+        self.actualizar_estado(f"✓ Análisis completado (PDF en {segundos:.2f}s)")
+        messagebox.showinfo("Éxito", f"Análisis generado exitosamente\n\nReporte PDF: {pdf_file} ({tamano_kb:.0f} KB)")
+    
     def mostrar_resumen(self):
         """Muestra resumen de análisis"""
         self.text_resumen.delete(1.0, tk.END)
@@ -897,6 +1032,14 @@ class GUIAnalisisSol:
                 texto += f"  Signal: {macd.get('signal', 0):.6f}\n"
                 texto += "-" * 70 + "\n"
         
+        libro = resultado.get('libro_ordenes', {})
+        if libro:
+            texto += f"\nLIBRO DE ÓRDENES ({libro['archivo']}, {libro['snapshots']:,} instantáneas):\n"
+            texto += f"  Imbalance medio: {libro['imbalance_medio']:+.3f}\n"
+            texto += f"  Imbalance actual: {libro['imbalance_actual']:+.3f}\n"
+            texto += f"  Bid/Ask ratio medio: {libro['ratio_medio']:.2f}\n"
+            texto += f"  Spread medio: {libro['spread_medio']:.4f}\n"
+        
         self.text_indicadores.insert(tk.END, texto)
     
     def mostrar_estrategias(self):
@@ -976,63 +1119,74 @@ Elige la estrategia con MAYOR confianza.
             messagebox.showwarning("Advertencia", "No hay datos para graficar")
             return
         
+        # Mismos datos 1h que la figura mostrada: no hace falta volver a dibujarla
+        clave = self._clave_graficos()
+        if self.figura_graficos is not None and clave == self.clave_graficos:
+            return
+        
         for widget in self.tab_graficos.winfo_children():
             widget.destroy()
+        self.figura_graficos = None
         
         try:
-            fig = Figure(figsize=(14, 8), dpi=100, facecolor='#2b2b2b')
-            
-            ax1 = fig.add_subplot(2, 2, 1)
-            df_1h = self.analizador.dataframes['1h']
-            ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['Close'].iloc[-50:], label='Close', color='cyan', linewidth=2)
-            ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MA7'].iloc[-50:], label='MA7', color='yellow', alpha=0.7)
-            ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MA25'].iloc[-50:], label='MA25', color='orange', alpha=0.7)
-            ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MA99'].iloc[-50:], label='MA99', color='red', alpha=0.7)
-            ax1.set_title('SOL/USDT 1H - Precio y Medias Móviles', color='cyan', fontsize=12, fontweight='bold')
-            ax1.legend(loc='best', facecolor='#1e1e1e', edgecolor='white', labelcolor='cyan')
-            ax1.grid(alpha=0.2)
-            ax1.set_facecolor('#1e1e1e')
-            ax1.tick_params(colors='white')
-            
-            ax2 = fig.add_subplot(2, 2, 2)
-            ax2.plot(range(len(df_1h)-50, len(df_1h)), df_1h['RSI'].iloc[-50:], color='cyan', linewidth=2)
-            ax2.axhline(y=70, color='red', linestyle='--', alpha=0.5, label='Sobrecompra')
-            ax2.axhline(y=30, color='green', linestyle='--', alpha=0.5, label='Sobreventa')
-            ax2.fill_between(range(len(df_1h)-50, len(df_1h)), 30, 70, alpha=0.1, color='gray')
-            ax2.set_title('RSI(14) 1H', color='cyan', fontsize=12, fontweight='bold')
-            ax2.legend(loc='best', facecolor='#1e1e1e', edgecolor='white', labelcolor='cyan')
-            ax2.set_ylim(0, 100)
-            ax2.grid(alpha=0.2)
-            ax2.set_facecolor('#1e1e1e')
-            ax2.tick_params(colors='white')
-            
-            ax3 = fig.add_subplot(2, 2, 3)
-            ax3.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MACD'].iloc[-50:], label='MACD', color='cyan', linewidth=2)
-            ax3.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MACD_Signal'].iloc[-50:], label='Signal', color='red', linewidth=2)
-            ax3.bar(range(len(df_1h)-50, len(df_1h)), df_1h['MACD_Histogram'].iloc[-50:], label='Histogram', color='gray', alpha=0.3)
-            ax3.axhline(y=0, color='white', linestyle='-', alpha=0.3)
-            ax3.set_title('MACD 1H', color='cyan', fontsize=12, fontweight='bold')
-            ax3.legend(loc='best', facecolor='#1e1e1e', edgecolor='white', labelcolor='cyan')
-            ax3.grid(alpha=0.2)
-            ax3.set_facecolor('#1e1e1e')
-            ax3.tick_params(colors='white')
-            
-            ax4 = fig.add_subplot(2, 2, 4)
-            colors = ['green' if df_1h['Close'].iloc[i] >= df_1h['Open'].iloc[i] else 'red' 
-                      for i in range(len(df_1h)-50, len(df_1h))]
-            ax4.bar(range(len(df_1h)-50, len(df_1h)), df_1h['Volume'].iloc[-50:], color=colors, alpha=0.7)
-            ax4.set_title('Volumen 1H', color='cyan', fontsize=12, fontweight='bold')
-            ax4.grid(alpha=0.2, axis='y')
-            ax4.set_facecolor('#1e1e1e')
-            ax4.tick_params(colors='white')
-            
-            fig.tight_layout()
-            
+            fig = self.crear_figura_graficos(self.analizador.dataframes['1h'])
             canvas = FigureCanvasTkAgg(fig, master=self.tab_graficos)
             canvas.draw()
             canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            self.figura_graficos = fig
+            self.clave_graficos = clave
         except Exception as e:
             messagebox.showerror("Error", f"Error mostrando gráficos: {str(e)}")
+    
+    def crear_figura_graficos(self, df_1h):
+        """Figura de 4 paneles (precio y MAs, RSI, MACD, volumen) de las últimas 50 velas 1h"""
+        fig = Figure(figsize=(14, 8), dpi=100, facecolor='#2b2b2b')
+        
+        ax1 = fig.add_subplot(2, 2, 1)
+        ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['Close'].iloc[-50:], label='Close', color='cyan', linewidth=2)
+        ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MA7'].iloc[-50:], label='MA7', color='yellow', alpha=0.7)
+        ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MA25'].iloc[-50:], label='MA25', color='orange', alpha=0.7)
+        ax1.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MA99'].iloc[-50:], label='MA99', color='red', alpha=0.7)
+        ax1.set_title('SOL/USDT 1H - Precio y Medias Móviles', color='cyan', fontsize=12, fontweight='bold')
+        ax1.legend(loc='best', facecolor='#1e1e1e', edgecolor='white', labelcolor='cyan')
+        ax1.grid(alpha=0.2)
+        ax1.set_facecolor('#1e1e1e')
+        ax1.tick_params(colors='white')
+        
+        ax2 = fig.add_subplot(2, 2, 2)
+        ax2.plot(range(len(df_1h)-50, len(df_1h)), df_1h['RSI'].iloc[-50:], color='cyan', linewidth=2)
+        ax2.axhline(y=70, color='red', linestyle='--', alpha=0.5, label='Sobrecompra')
+        ax2.axhline(y=30, color='green', linestyle='--', alpha=0.5, label='Sobreventa')
+        ax2.fill_between(range(len(df_1h)-50, len(df_1h)), 30, 70, alpha=0.1, color='gray')
+        ax2.set_title('RSI(14) 1H', color='cyan', fontsize=12, fontweight='bold')
+        ax2.legend(loc='best', facecolor='#1e1e1e', edgecolor='white', labelcolor='cyan')
+        ax2.set_ylim(0, 100)
+        ax2.grid(alpha=0.2)
+        ax2.set_facecolor('#1e1e1e')
+        ax2.tick_params(colors='white')
+        
+        ax3 = fig.add_subplot(2, 2, 3)
+        ax3.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MACD'].iloc[-50:], label='MACD', color='cyan', linewidth=2)
+        ax3.plot(range(len(df_1h)-50, len(df_1h)), df_1h['MACD_Signal'].iloc[-50:], label='Signal', color='red', linewidth=2)
+        ax3.bar(range(len(df_1h)-50, len(df_1h)), df_1h['MACD_Histogram'].iloc[-50:], label='Histogram', color='gray', alpha=0.3)
+        ax3.axhline(y=0, color='white', linestyle='-', alpha=0.3)
+        ax3.set_title('MACD 1H', color='cyan', fontsize=12, fontweight='bold')
+        ax3.legend(loc='best', facecolor='#1e1e1e', edgecolor='white', labelcolor='cyan')
+        ax3.grid(alpha=0.2)
+        ax3.set_facecolor('#1e1e1e')
+        ax3.tick_params(colors='white')
+        
+        ax4 = fig.add_subplot(2, 2, 4)
+        colors = ['green' if df_1h['Close'].iloc[i] >= df_1h['Open'].iloc[i] else 'red' 
+                  for i in range(len(df_1h)-50, len(df_1h))]
+        ax4.bar(range(len(df_1h)-50, len(df_1h)), df_1h['Volume'].iloc[-50:], color=colors, alpha=0.7)
+        ax4.set_title('Volumen 1H', color='cyan', fontsize=12, fontweight='bold')
+        ax4.grid(alpha=0.2, axis='y')
+        ax4.set_facecolor('#1e1e1e')
+        ax4.tick_params(colors='white')
+        
+        fig.tight_layout()
+        return fig
 
 
 def main():
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Pipeline concurrente de descarga y cálculo de indicadores por timeframe
+Todas las descargas se lanzan a la vez y el cálculo de cada timeframe entra
+en un pool de trabajo en cuanto llegan sus datos, de modo que el tiempo total
+queda cerca del timeframe más lento en lugar de la suma de todos.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def ejecutar_pipeline(tareas, descargar, procesar, callback=None, max_calculo=None):
+    """
+    Ejecuta descarga + procesamiento para varios timeframes en paralelo.
+
+    Args:
+        tareas: dict {timeframe: argumentos de descarga (tupla)}
+        descargar: función (tf, *args) -> DataFrame (o None si falló)
+        procesar: función (tf, df) -> DataFrame con indicadores
+        callback: función opcional para mensajes de progreso y tiempos
+        max_calculo: workers del pool de cálculo (por defecto núcleos disponibles)
+
+    Returns:
+        tuple: (dict {tf: DataFrame}, dict {tf: {'descarga', 'calculo', 'total'}},
+                tiempo total en segundos)
+    """
+    inicio = time.perf_counter()
+    resultados = {}
+    tiempos = {tf: {} for tf in tareas}
+
+    def _medir(etapa, tf, funcion, *args):
+        t0 = time.perf_counter()
+        valor = funcion(tf, *args)
+        tiempos[tf][etapa] = time.perf_counter() - t0
+        return valor
+
+    max_calculo = max_calculo or min(len(tareas), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=len(tareas)) as pool_descarga, \
+         ThreadPoolExecutor(max_workers=max_calculo) as pool_calculo:
+        descargas = {
+            pool_descarga.submit(_medir, 'descarga', tf, descargar, *args): tf
+            for tf, args in tareas.items()
+        }
+
+        calculos = {}
+        for futuro in as_completed(descargas):
+            tf = descargas[futuro]
+            df = futuro.result()
+            if callback:
+                callback(f"✓ {tf} descargado en {tiempos[tf]['descarga']:.2f}s")
+            if df is None:
+                continue
+            calculos[pool_calculo.submit(_medir, 'calculo', tf, procesar, df)] = tf
+
+        for futuro in as_completed(calculos):
+            tf = calculos[futuro]
+            resultados[tf] = futuro.result()
+            tiempos[tf]['total'] = tiempos[tf]['descarga'] + tiempos[tf]['calculo']
+            if callback:
+                callback(f"✓ {tf} indicadores en {tiempos[tf]['calculo']:.2f}s")
+
+    total = time.perf_counter() - inicio
+    if callback and resultados:
+        mas_lento = max(resultados, key=lambda tf: tiempos[tf]['total'])
+        callback(f"⏱️ Total {total:.2f}s (más lento: {mas_lento} {tiempos[mas_lento]['total']:.2f}s)")
+
+    # Mantener el orden original de los timeframes
+    resultados = {tf: resultados[tf] for tf in tareas if tf in resultados}
+    return resultados, tiempos, total
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Registrador de profundidad (order book) para SOL/USDT
+Mantiene un libro de órdenes local aplicando el stream diff-depth de Binance
+sobre un snapshot REST, y guarda instantáneas de los primeros niveles a una
+cadencia configurable en un archivo binario compacto.
+Requisitos: pip install numpy pandas python-binance
+"""
+
+import heapq
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'DPTH'
+
+
+class LadoLibro:
+    """
+    Un lado del libro (bids o asks): dict {clave: cantidad} más un heap de claves.
+    Cambiar la cantidad de un nivel o eliminarlo es O(1) en el dict y un nivel
+    nuevo es O(log n) en el heap. Los niveles eliminados se quedan en el heap
+    y se descartan de forma perezosa al leer los mejores niveles; cuando las
+    claves muertas superan a las vivas el heap se reconstruye (O(n), amortizado
+    entre todas esas eliminaciones). Los bids se guardan con precio negado
+    para que el mejor nivel sea siempre el mínimo del heap.
+    """
+
+    def __init__(self, es_bid):
+        self.signo = -1.0 if es_bid else 1.0
+        self.niveles = {}
+        self._heap = []
+        self._en_heap = set()
+
+    def cargar(self, niveles):
+        """Reemplaza el lado completo con [[precio, cantidad], ...]"""
+        self.niveles = {self.signo * float(p): float(q) for p, q in niveles if float(q) > 0}
+        self._heap = sorted(self.niveles)  # Una lista ordenada ya es un heap válido
+        self._en_heap = set(self._heap)
+
+    def actualizar(self, precio, cantidad):
+        """Aplica un nivel del diff: cantidad 0 elimina el nivel"""
+        clave = self.signo * precio
+        if cantidad == 0:
+            if self.niveles.pop(clave, None) is not None and len(self._heap) > 2 * len(self.niveles) + 64:
+                self._compactar()
+            return
+        if clave not in self._en_heap:
+            heapq.heappush(self._heap, clave)
+            self._en_heap.add(clave)
+        self.niveles[clave] = cantidad
+
+    def _compactar(self):
+        self._heap = [clave for clave in self._heap if clave in self.niveles]
+        heapq.heapify(self._heap)
+        self._en_heap = set(self._heap)
+
+    def top(self, n):
+        """Arrays (precios, cantidades) de los n mejores niveles, rellenando con NaN"""
+        precios = np.full(n, np.nan)
+        cantidades = np.full(n, np.nan)
+        # Extraer hasta n niveles vivos (las claves muertas que salen se descartan)
+        # y devolverlos al heap: O((n + muertas) log n)
+        mejores = []
+        while self._heap and len(mejores) < n:
+            clave = heapq.heappop(self._heap)
+            if clave in self.niveles:
+                mejores.append(clave)
+            else:
+                self._en_heap.discard(clave)
+        for clave in mejores:
+            heapq.heappush(self._heap, clave)
+        k = len(mejores)
+        precios[:k] = np.asarray(mejores) * self.signo
+        cantidades[:k] = [self.niveles[clave] for clave in mejores]
+        return precios, cantidades
+
+    def __len__(self):
+        return len(self.niveles)
+
+
+class LibroOrdenes:
+    """Libro de órdenes local sincronizado con lastUpdateId de Binance"""
+
+    def __init__(self):
+        self.bids = LadoLibro(es_bid=True)
+        self.asks = LadoLibro(es_bid=False)
+        self.last_update_id = None
+        self.sincronizado = False
+
+    def cargar_snapshot(self, snapshot):
+        """Carga la respuesta de get_order_book"""
+        self.bids.cargar(snapshot['bids'])
+        self.asks.cargar(snapshot['asks'])
+        self.last_update_id = snapshot['lastUpdateId']
+        self.sincronizado = False
+
+    def aplicar_diff(self, evento):
+        """
+        Aplica un evento depthUpdate (campos U, u, b, a).
+        Devuelve False si se perdió la secuencia y hay que recargar el snapshot.
+        """
+        if self.last_update_id is None:
+            return False
+        if evento['u'] <= self.last_update_id:
+            return True  # Evento anterior al snapshot
+        if not self.sincronizado:
+            if not (evento['U'] <= self.last_update_id + 1 <= evento['u']):
+                return False
+            self.sincronizado = True
+        elif evento['U'] != self.last_update_id + 1:
+            return False
+
+        for precio, cantidad in evento['b']:
+            self.bids.actualizar(float(precio), float(cantidad))
+        for precio, cantidad in evento['a']:
+            self.asks.actualizar(float(precio), float(cantidad))
+        self.last_update_id = evento['u']
+        return True
+
+
+def dtype_snapshot(niveles):
+    """Registro binario de una instantánea con 'niveles' por lado"""
+    return np.dtype([
+        ('timestamp', '<i8'),
+        ('last_update_id', '<i8'),
+        ('bid_precio', '<f8', (niveles,)),
+        ('bid_cantidad', '<f8', (niveles,)),
+        ('ask_precio', '<f8', (niveles,)),
+        ('ask_cantidad', '<f8', (niveles,)),
+    ])
+
+
+class ArchivoProfundidad:
+    """Archivo de instantáneas: cabecera 'DPTH' + niveles, luego registros fijos"""
+
+    def __init__(self, ruta, niveles=20):
+        self.ruta = ruta
+        self.niveles = niveles
+        self.dtype = dtype_snapshot(niveles)
+        try:
+            with open(ruta, 'rb') as f:
+                existente = _leer_cabecera(f)
+            if existente != niveles:
+                raise ValueError(f"{ruta} tiene {existente} niveles, no {niveles}")
+        except FileNotFoundError:
+            with open(ruta, 'wb') as f:
+                f.write(MAGIC + np.uint16(niveles).tobytes())
+
+    def agregar(self, libro, timestamp_ms):
+        """Agrega una instantánea del libro"""
+        registro = np.zeros(1, dtype=self.dtype)
+        registro['timestamp'] = timestamp_ms
+        registro['last_update_id'] = libro.last_update_id
+        registro['bid_precio'][0], registro['bid_cantidad'][0] = libro.bids.top(self.niveles)
+        registro['ask_precio'][0], registro['ask_cantidad'][0] = libro.asks.top(self.niveles)
+        with open(self.ruta, 'ab') as f:
+            registro.tofile(f)
+
+
+def _leer_cabecera(f):
+    if f.read(4) != MAGIC:
+        raise ValueError("No es un archivo de profundidad válido")
+    return int(np.frombuffer(f.read(2), dtype=np.uint16)[0])
+
+
+def leer_snapshots(ruta):
+    """Carga todas las instantáneas de un archivo como array estructurado"""
+    with open(ruta, 'rb') as f:
+        niveles = _leer_cabecera(f)
+        return np.fromfile(f, dtype=dtype_snapshot(niveles))
+
+
+def serie_desequilibrio(snapshots, niveles=5):
+    """
+    Calcula la serie temporal de presión del libro a partir de las instantáneas.
+    Usa los mismos conceptos que el resumen de analizar_solusdt_binance.py
+    (Bid_Pressure/Ask_Pressure sobre los primeros 'niveles').
+    """
+    bid_pressure = np.nansum(snapshots['bid_cantidad'][:, :niveles], axis=1)
+    ask_pressure = np.nansum(snapshots['ask_cantidad'][:, :niveles], axis=1)
+    total = bid_pressure + ask_pressure
+    top_bid = snapshots['bid_precio'][:, 0]
+    top_ask = snapshots['ask_precio'][:, 0]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(ask_pressure > 0, bid_pressure / ask_pressure, 0.0)
+        imbalance = np.where(total > 0, (bid_pressure - ask_pressure) / total, 0.0)
+
+    return pd.DataFrame({
+        'Time': pd.to_datetime(snapshots['timestamp'], unit='ms'),
+        'Bid_Pressure': bid_pressure,
+        'Ask_Pressure': ask_pressure,
+        'Bid_Ask_Ratio': ratio,
+        'Imbalance': imbalance,
+        'Top_Bid': top_bid,
+        'Top_Ask': top_ask,
+        'Spread': top_ask - top_bid,
+    })
+
+
+class RegistradorProfundidad:
+    """
+    Graba el libro de SYMBOL usando el websocket diff-depth de Binance.
+    Los eventos se aplican en el hilo del websocket; un hilo aparte guarda
+    una instantánea cada 'cadencia' segundos.
+    """
+
+    def __init__(self, client, symbol='SOLUSDT', ruta=None, niveles=20, cadencia=1.0, callback=None,
+                 max_reintentos=5):
+        self.client = client
+        self.symbol = symbol
+        self.niveles = niveles
+        self.cadencia = cadencia
+        self.callback = callback
+        self.max_reintentos = max_reintentos
+        self.ruta = ruta or f"{symbol}_depth_{datetime.now().strftime('%Y%m%d_%H%M%S')}.bin"
+        self.archivo = ArchivoProfundidad(self.ruta, niveles)
+
+        self.libro = LibroOrdenes()
+        self.lock = threading.Lock()
+        self.pendientes = []
+        self.snapshots_guardados = 0
+        self.activo = False
+        self._twm = None
+
+    def _log(self, mensaje):
+        if self.callback:
+            self.callback(mensaje)
+
+    def _resincronizar(self):
+        """
+        Descarga un snapshot REST y reaplica los eventos recibidos mientras tanto.
+        Si el snapshot falla o es más antiguo que el stream se reintenta con
+        espera creciente, hasta max_reintentos veces. Devuelve si se sincronizó.
+        """
+        for intento in range(1, self.max_reintentos + 1):
+            try:
+                snapshot = self.client.get_order_book(symbol=self.symbol, limit=1000)
+            except Exception as e:
+                self._log(f"⚠️ Error descargando snapshot ({intento}/{self.max_reintentos}): {e}")
+            else:
+                with self.lock:
+                    self.libro.cargar_snapshot(snapshot)
+                    pendientes, self.pendientes = self.pendientes, []
+                    for evento in pendientes:
+                        if not self.libro.aplicar_diff(evento):
+                            # Snapshot más antiguo que el stream: reintentar
+                            self.libro.last_update_id = None
+                            break
+                    sincronizado = self.libro.last_update_id is not None
+                    if not sincronizado:
+                        # Los eventos siguen siendo necesarios para el próximo snapshot
+                        self.pendientes = pendientes + self.pendientes
+                if sincronizado:
+                    self._log(f"Libro sincronizado (lastUpdateId={snapshot['lastUpdateId']})")
+                    return True
+                self._log(f"⚠️ Snapshot desfasado del stream ({intento}/{self.max_reintentos})")
+            time.sleep(min(0.5 * 2 ** (intento - 1), 10.0))
+        self._log(f"❌ No se pudo sincronizar el libro tras {self.max_reintentos} intentos")
+        return False
+
+    def _resincronizar_o_detener(self):
+        """Resincronización en segundo plano: si se agotan los intentos, se detiene la grabación"""
+        if not self._resincronizar():
+            self.detener()
+
+    def _on_mensaje(self, mensaje):
+        """Callback del websocket diff-depth"""
+        evento = mensaje.get('data', mensaje)
+        if evento.get('e') != 'depthUpdate':
+            return
+        with self.lock:
+            if self.libro.last_update_id is None:
+                self.pendientes.append(evento)
+                return
+            if not self.libro.aplicar_diff(evento):
+                self.libro.last_update_id = None
+                self.pendientes = [evento]
+                threading.Thread(target=self._resincronizar_o_detener, daemon=True).start()
+
+    def _bucle_snapshots(self):
+        siguiente = time.time()
+        while self.activo:
+            siguiente += self.cadencia
+            with self.lock:
+                listo = self.libro.last_update_id is not None and len(self.libro.bids) > 0
+                if listo:
+                    self.archivo.agregar(self.libro, int(time.time() * 1000))
+            if listo:
+                self.snapshots_guardados += 1
+            time.sleep(max(0.0, siguiente - time.time()))
+
+    def iniciar(self):
+        """Arranca el websocket y la grabación"""
+        from binance import ThreadedWebsocketManager
+
+        self.activo = True
+        self._twm = ThreadedWebsocketManager()
+        self._twm.start()
+        self._twm.start_depth_socket(callback=self._on_mensaje, symbol=self.symbol, interval=100)
+        if not self._resincronizar():
+            self.detener()
+            raise RuntimeError(f"No se pudo sincronizar el libro de {self.symbol}")
+        threading.Thread(target=self._bucle_snapshots, daemon=True).start()
+        self._log(f"Grabando profundidad de {self.symbol} en {self.ruta}")
+
+    def detener(self):
+        """Detiene la grabación"""
+        self.activo = False
+        if self._twm is not None:
+            self._twm.stop()
+            self._twm = None
+        self._log(f"✓ {self.snapshots_guardados} instantáneas guardadas en {self.ruta}")
+
+
+def main():
+    """Graba la profundidad de SOLUSDT durante unos minutos"""
+    from binance.client import Client
+
+    minutos = 10
+    registrador = RegistradorProfundidad(Client(), 'SOLUSDT', niveles=20, cadencia=1.0, callback=print)
+    registrador.iniciar()
+    try:
+        time.sleep(minutos * 60)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        registrador.detener()
+
+    serie = serie_desequilibrio(leer_snapshots(registrador.ruta))
+    print(serie.describe().to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -6,15 +6,73 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import threading
 import time
+import os
+import sys
 from datetime import datetime, timedelta
 from trailing_stop_bot import TrailingStopBot
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 import pandas as pd
 import numpy as np
 from collections import deque
 
+# Caché de klines compartida con los bots de convergence-bot
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'convergence-bot'))
+from kline_cache import KlineCache
+from live_chart import LiveLineChart
+
+class WilderRSI:
+    """
+    RSI de Wilder incremental.
+
+    Guarda el último precio y las medias de subidas/bajadas: cada precio nuevo
+    actualiza el RSI en O(1). Las primeras 'period' variaciones se promedian
+    (semilla) y después se aplica el suavizado de Wilder.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        self.last_price = None
+        self.count = 0          # Variaciones procesadas
+        self.avg_gain = 0.0     # Suma durante la semilla, media después
+        self.avg_loss = 0.0
+        self.value = None
+
+    def _advance(self, price):
+        """Estado tras añadir price, sin modificar el actual"""
+        if self.last_price is None:
+            return price, 0, 0.0, 0.0, None
+        delta = price - self.last_price
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        count = self.count + 1
+        period = self.period
+        if count < period:
+            return price, count, self.avg_gain + gain, self.avg_loss + loss, None
+        if count == period:
+            avg_gain = (self.avg_gain + gain) / period
+            avg_loss = (self.avg_loss + loss) / period
+        else:
+            avg_gain = (self.avg_gain * (period - 1) + gain) / period
+            avg_loss = (self.avg_loss * (period - 1) + loss) / period
+        value = 100.0 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss))
+        return price, count, avg_gain, avg_loss, value
+
+    def update(self, price):
+        """Añade un precio cerrado y devuelve el RSI (None durante la semilla)"""
+        self.last_price, self.count, self.avg_gain, self.avg_loss, self.value = self._advance(price)
+        return self.value
+
+    def preview(self, price):
+        """RSI si el siguiente precio fuera price (p. ej. la vela abierta), sin guardarlo"""
+        return self._advance(price)[4]
+
+
 class TrailingStopBotGUI:
     def __init__(self, root):
         self.root = root
@@ -36,9 +94,21 @@ class TrailingStopBotGUI:
         self.time_history = deque(maxlen=60)
         self.rsi_7_history = deque(maxlen=60)
         self.rsi_14_history = deque(maxlen=60)
-        # Series de ticks (precio en tiempo real)
-        self.tick_prices = deque(maxlen=300)  # ~5 minutos a 1s
-        self.tick_times = deque(maxlen=300)
+        # RSI incremental sobre los cierres de 1 min: una entrada de historial
+        # por vela cerrada y un punto en vivo (vela abierta) que mueve cada tick
+        self.rsi_7 = WilderRSI(7)
+        self.rsi_14 = WilderRSI(14)
+        self.rsi_times = deque(maxlen=60)
+        self.rsi_live_time = None
+        self.rsi_live_price = None
+        self._rsi_backgrounds = None
+        # Series de ticks (precio en tiempo real): buffer circular de
+        # self.tick_chart (~5 minutos a 1s); solo se redibuja el último tick pendiente
+        self.tick_capacity = 300
+        self._tick_redraw_pending = False
+        
+        # Caché de klines (solo pide velas nuevas al cruzar el cierre de minuto)
+        self.kline_cache = KlineCache(None)
         
         # Crear interfaz
         self.create_widgets()
@@ -46,42 +116,6 @@ class TrailingStopBotGUI:
         # Iniciar actualización de GUI
         self.start_gui_update()
     
-    def calculate_rsi(self, prices, period=14):
-        """Calcula el RSI (Relative Strength Index)."""
-        if len(prices) < period + 1:
-            return None
-        
-        deltas = np.diff(prices)
-        seed = deltas[:period]
-        up = seed[seed >= 0].sum() / period
-        down = -seed[seed < 0].sum() / period
-        
-        if down == 0:
-            return 100
-        
-        rs = up / down
-        rsi = 100 - (100 / (1 + rs))
-        
-        # RSI for remaining data
-        for delta in deltas[period:]:
-            if delta > 0:
-                upval = delta
-                downval = 0
-            else:
-                upval = 0
-                downval = -delta
-            
-            up = (up * (period - 1) + upval) / period
-            down = (down * (period - 1) + downval) / period
-            
-            if down == 0:
-                rsi = 100
-            else:
-                rs = up / down
-                rsi = 100 - (100 / (1 + rs))
-        
-        return rsi
-    
     def create_widgets(self):
         """Crea todos los widgets de la interfaz."""
         
@@ -400,38 +434,44 @@ class TrailingStopBotGUI:
         
         # Crear figura de matplotlib
         self.fig = Figure(figsize=(12, 8), dpi=100)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=main_frame)
+        
+        # Los artistas (líneas, bandas, leyendas) se crean una sola vez; las
+        # actualizaciones solo cambian sus datos
         
-        # Subplot 1: Precio (velas)
+        # Subplot 1: Precio (ticks en tiempo real con blitting)
         self.ax1 = self.fig.add_subplot(311)
-        self.ax1.set_title('BNB/USDT - Precio (1 min)', fontsize=12, fontweight='bold')
+        self.ax1.set_title('BNB/USDT - Precio (ticks)', fontsize=12, fontweight='bold')
         self.ax1.set_ylabel('Precio (USDT)', fontsize=10)
-        self.ax1.grid(True, alpha=0.3)
+        self.tick_chart = LiveLineChart(
+            self.canvas, self.ax1, capacity=self.tick_capacity, color='blue', linewidth=1.8,
+            label='Tick', marker_color='red', value_format='${:.2f}',
+            date_format=None, autofmt_xdate=False
+        )
+        self.ax1.legend(loc='upper left', fontsize=8)
+        self.ax1.tick_params(axis='x', rotation=45, labelsize=8)
         
         # Subplot 2: RSI 7
         self.ax2 = self.fig.add_subplot(312)
         self.ax2.set_title('RSI 7 periodos', fontsize=11, fontweight='bold')
         self.ax2.set_ylabel('RSI', fontsize=10)
-        self.ax2.axhline(y=70, color='r', linestyle='--', alpha=0.5, label='Sobrecompra')
-        self.ax2.axhline(y=30, color='g', linestyle='--', alpha=0.5, label='Sobreventa')
-        self.ax2.set_ylim(0, 100)
-        self.ax2.grid(True, alpha=0.3)
-        self.ax2.legend(loc='upper right', fontsize=8)
+        (self.rsi_7_line,) = self.ax2.plot([], [], color='purple', linewidth=2, label='RSI 7', animated=True)
+        self._setup_rsi_axis(self.ax2)
         
         # Subplot 3: RSI 14
         self.ax3 = self.fig.add_subplot(313)
         self.ax3.set_title('RSI 14 periodos', fontsize=11, fontweight='bold')
         self.ax3.set_ylabel('RSI', fontsize=10)
         self.ax3.set_xlabel('Tiempo', fontsize=10)
-        self.ax3.axhline(y=70, color='r', linestyle='--', alpha=0.5, label='Sobrecompra')
-        self.ax3.axhline(y=30, color='g', linestyle='--', alpha=0.5, label='Sobreventa')
-        self.ax3.set_ylim(0, 100)
-        self.ax3.grid(True, alpha=0.3)
-        self.ax3.legend(loc='upper right', fontsize=8)
+        (self.rsi_14_line,) = self.ax3.plot([], [], color='orange', linewidth=2, label='RSI 14', animated=True)
+        self._setup_rsi_axis(self.ax3)
         
+        # Layout calculado una sola vez
         self.fig.tight_layout()
+        # Las líneas de RSI se repintan con blitting en cada tick
+        self.canvas.mpl_connect('draw_event', self._on_charts_draw)
         
         # Canvas para la figura
-        self.canvas = FigureCanvasTkAgg(self.fig, master=main_frame)
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
@@ -452,7 +492,8 @@ class TrailingStopBotGUI:
                     client = temp_bot.client
                 else:
                     client = self.bot.client
-                klines = client.get_klines(symbol='BNBUSDT', interval='1m', limit=60)
+                self.kline_cache.client = client
+                klines = self.kline_cache.get_klines(symbol='BNBUSDT', interval='1m', limit=60)
                 times = []
                 prices = []
                 for k in klines:
@@ -460,92 +501,122 @@ class TrailingStopBotGUI:
                     close_price = float(k[4])
                     times.append(timestamp)
                     prices.append(close_price)
-                # Calcular RSI
-                rsi_7 = rsi_14 = None
-                if len(prices) >= 15:
-                    prices_array = np.array(prices)
-                    rsi_7 = self.calculate_rsi(prices_array[-15:], period=7)
-                    rsi_14 = self.calculate_rsi(prices_array, period=14)
-                self.root.after(0, self._apply_charts, times, prices, rsi_7, rsi_14)
+                self.root.after(0, self._apply_charts, times, prices)
             except Exception as e:
                 self.root.after(0, self.log_message, f"✗ Error actualizando gráficos: {e}", "ERROR")
         threading.Thread(target=run, daemon=True).start()
 
-    def _apply_charts(self, times, prices, rsi_7, rsi_14):
+    def _setup_rsi_axis(self, ax):
+        """Niveles, bandas y formato fijos de un eje de RSI (se crean una sola vez)."""
+        ax.axhline(y=70, color='r', linestyle='--', alpha=0.5, label='Sobrecompra')
+        ax.axhline(y=30, color='g', linestyle='--', alpha=0.5, label='Sobreventa')
+        ax.axhline(y=50, color='gray', linestyle=':', alpha=0.3)
+        ax.axhspan(70, 100, alpha=0.1, color='red')
+        ax.axhspan(0, 30, alpha=0.1, color='green')
+        ax.set_ylim(0, 100)
+        ax.grid(True, alpha=0.3)
+        ax.legend(loc='upper right', fontsize=8)
+        ax.xaxis_date()
+        ax.tick_params(axis='x', rotation=45, labelsize=8)
+    
+    def _update_rsi(self, times, prices):
+        """
+        Alimenta el RSI incremental con las velas cerradas nuevas (todas menos
+        la última, que sigue abierta). Si la serie no enlaza con la última
+        vela procesada (p. ej. tras una pausa larga) se reinicia.
+        """
+        closed = list(zip(times[:-1], prices[:-1]))
+        last_time = self.rsi_times[-1] if self.rsi_times else None
+        if last_time is not None and not any(t == last_time for t, _ in closed):
+            self.rsi_7.reset()
+            self.rsi_14.reset()
+            self.rsi_times.clear()
+            self.rsi_7_history.clear()
+            self.rsi_14_history.clear()
+            last_time = None
+        for t, price in closed:
+            if last_time is not None and t <= last_time:
+                continue
+            rsi_7 = self.rsi_7.update(price)
+            rsi_14 = self.rsi_14.update(price)
+            self.rsi_times.append(t)
+            self.rsi_7_history.append(np.nan if rsi_7 is None else rsi_7)
+            self.rsi_14_history.append(np.nan if rsi_14 is None else rsi_14)
+        self.rsi_live_time = times[-1]
+        self.rsi_live_price = prices[-1]
+
+    def _set_rsi_lines(self):
+        """Datos de las líneas de RSI: historial por vela + punto en vivo con el último precio."""
+        if self.rsi_live_time is None:
+            return False
+        x = mdates.date2num(list(self.rsi_times) + [self.rsi_live_time])
+        for line, rsi, history in ((self.rsi_7_line, self.rsi_7, self.rsi_7_history),
+                                   (self.rsi_14_line, self.rsi_14, self.rsi_14_history)):
+            live = rsi.preview(self.rsi_live_price)
+            line.set_data(x, list(history) + [np.nan if live is None else live])
+        return True
+
+    def _set_rsi_axes(self):
+        """Títulos y rango X de los ejes de RSI (solo al refrescar las velas)."""
+        x0 = mdates.date2num(self.rsi_times[0] if self.rsi_times else self.rsi_live_time)
+        x1 = mdates.date2num(self.rsi_live_time)
+        if x1 <= x0:
+            x0, x1 = x1 - 1 / 1440, x1 + 1 / 1440
+        for ax, line, title in ((self.ax2, self.rsi_7_line, 'RSI 7 periodos'),
+                                (self.ax3, self.rsi_14_line, 'RSI 14 periodos')):
+            ax.set_xlim(x0, x1)
+            value = line.get_ydata()[-1]
+            if not np.isnan(value):
+                ax.set_title(f'{title}: {value:.2f}', fontsize=11, fontweight='bold')
+
+    def _draw_rsi_lines(self):
+        for ax, line in ((self.ax2, self.rsi_7_line), (self.ax3, self.rsi_14_line)):
+            ax.draw_artist(line)
+            self.canvas.blit(ax.bbox)
+
+    def _on_charts_draw(self, event):
+        """Tras un dibujado completo: guardar el fondo de los ejes de RSI y pintar sus líneas."""
+        self._rsi_backgrounds = [self.canvas.copy_from_bbox(ax.bbox) for ax in (self.ax2, self.ax3)]
+        self._draw_rsi_lines()
+
+    def _apply_charts(self, times, prices):
         """Aplica los datos recibidos a los gráficos (UI thread)."""
         if not times or not prices:
             return
         # Actualizar historial
         self.time_history = deque(times, maxlen=60)
         self.price_history = deque(prices, maxlen=60)
-        if rsi_7 is not None:
-            self.rsi_7_history.append(rsi_7)
-        if rsi_14 is not None:
-            self.rsi_14_history.append(rsi_14)
-        # Limpiar y dibujar
-        self.ax1.clear(); self.ax2.clear(); self.ax3.clear()
-        self.ax1.plot(times, prices, color='blue', linewidth=2, label='Precio')
-        self.ax1.scatter(times[-1:], prices[-1:], color='red', s=100, zorder=5, label='Actual')
-        self.ax1.set_title(f'BNB/USDT - Precio: ${prices[-1]:.2f}', fontsize=12, fontweight='bold')
-        self.ax1.set_ylabel('Precio (USDT)', fontsize=10)
-        self.ax1.grid(True, alpha=0.3)
-        self.ax1.legend(loc='upper left', fontsize=8)
-        self.ax1.tick_params(axis='x', rotation=45, labelsize=8)
-        # RSI 7
-        if len(self.rsi_7_history) > 0:
-            rsi_7_list = list(self.rsi_7_history)
-            times_rsi = list(self.time_history)[-len(rsi_7_list):]
-            self.ax2.plot(times_rsi, rsi_7_list, color='purple', linewidth=2, label='RSI 7')
-            self.ax2.axhline(y=70, color='r', linestyle='--', alpha=0.5, label='Sobrecompra')
-            self.ax2.axhline(y=30, color='g', linestyle='--', alpha=0.5, label='Sobreventa')
-            self.ax2.axhline(y=50, color='gray', linestyle=':', alpha=0.3)
-            self.ax2.fill_between(times_rsi, 70, 100, alpha=0.1, color='red')
-            self.ax2.fill_between(times_rsi, 0, 30, alpha=0.1, color='green')
-            self.ax2.set_title(f'RSI 7 periodos: {rsi_7_list[-1]:.2f}', fontsize=11, fontweight='bold')
-            self.ax2.set_ylabel('RSI', fontsize=10)
-            self.ax2.set_ylim(0, 100)
-            self.ax2.grid(True, alpha=0.3)
-            self.ax2.legend(loc='upper right', fontsize=8)
-            self.ax2.tick_params(axis='x', rotation=45, labelsize=8)
-        # RSI 14
-        if len(self.rsi_14_history) > 0:
-            rsi_14_list = list(self.rsi_14_history)
-            times_rsi = list(self.time_history)[-len(rsi_14_list):]
-            self.ax3.plot(times_rsi, rsi_14_list, color='orange', linewidth=2, label='RSI 14')
-            self.ax3.axhline(y=70, color='r', linestyle='--', alpha=0.5, label='Sobrecompra')
-            self.ax3.axhline(y=30, color='g', linestyle='--', alpha=0.5, label='Sobreventa')
-            self.ax3.axhline(y=50, color='gray', linestyle=':', alpha=0.3)
-            self.ax3.fill_between(times_rsi, 70, 100, alpha=0.1, color='red')
-            self.ax3.fill_between(times_rsi, 0, 30, alpha=0.1, color='green')
-            self.ax3.set_title(f'RSI 14 periodos: {rsi_14_list[-1]:.2f}', fontsize=11, fontweight='bold')
-            self.ax3.set_ylabel('RSI', fontsize=10)
-            self.ax3.set_xlabel('Tiempo', fontsize=10)
-            self.ax3.set_ylim(0, 100)
-            self.ax3.grid(True, alpha=0.3)
-            self.ax3.legend(loc='upper right', fontsize=8)
-            self.ax3.tick_params(axis='x', rotation=45, labelsize=8)
-        self.fig.tight_layout()
-        self.canvas.draw()
+        self._update_rsi(times, prices)
+        # Actualizar datos de las líneas persistentes
+        self._set_rsi_lines()
+        self._set_rsi_axes()
+        if len(self.tick_chart.prices) == 0:
+            # Sin ticks todavía: el eje de precio arranca con las velas de 1 min
+            self.tick_chart.extend(prices, times)
+        else:
+            self.canvas.draw_idle()
 
     def _apply_tick(self, price):
         """Aplica un tick de precio a la UI (sin IO)."""
-        now = datetime.now()
-        self.tick_prices.append(price)
-        self.tick_times.append(now)
         self.current_price_var.set(f"${price:.2f}")
-        # Redibujar eje de precio
-        self.ax1.clear()
-        times = list(self.tick_times)
-        prices = list(self.tick_prices)
-        self.ax1.plot(times, prices, color='blue', linewidth=1.8, label='Tick')
-        self.ax1.scatter(times[-1:], prices[-1:], color='red', s=60, zorder=5, label='Actual')
-        self.ax1.set_title(f'BNB/USDT - Precio (ticks): ${prices[-1]:.2f}', fontsize=12, fontweight='bold')
-        self.ax1.set_ylabel('Precio (USDT)', fontsize=10)
-        self.ax1.grid(True, alpha=0.3)
-        self.ax1.legend(loc='upper left', fontsize=8)
-        self.ax1.tick_params(axis='x', rotation=45, labelsize=8)
-        self.fig.tight_layout()
-        self.canvas.draw()
+        self.tick_chart.append(price, datetime.now(), redraw=False)
+        self.rsi_live_price = price
+        # Agrupar ticks: un solo redibujado por ciclo del loop de Tk, con el último tick
+        if not self._tick_redraw_pending:
+            self._tick_redraw_pending = True
+            self.root.after_idle(self._redraw_ticks)
+
+    def _redraw_ticks(self):
+        """Redibuja el precio y el punto en vivo del RSI con el último tick pendiente (blit si cabe)."""
+        self._tick_redraw_pending = False
+        rsi_ready = self._set_rsi_lines()
+        full_redraws = self.tick_chart.full_redraws
+        self.tick_chart.refresh()
+        if rsi_ready and self._rsi_backgrounds and self.tick_chart.full_redraws == full_redraws:
+            # Sin redibujado completo: repintar solo las líneas de RSI sobre su fondo
+            for background in self._rsi_backgrounds:
+                self.canvas.restore_region(background)
+            self._draw_rsi_lines()
     
     def force_update_balances(self):
         """Fuerza la actualización de saldos."""
@@ -832,6 +903,7 @@ class TrailingStopBotGUI:
                         )
                         price = temp_bot.get_current_price()
                     if price:
+                        self.kline_cache.update_price('BNBUSDT', price)
                         self.root.after(0, self._apply_tick, price)
                 except Exception:
                     pass
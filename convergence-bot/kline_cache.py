@@ -0,0 +1,150 @@
+"""
+Caché de velas (klines) con TTL hasta el cierre de la vela
+Evita repetir get_klines cada pocos segundos: entre cierres de vela no se
+consulta la API (o solo la vela abierta, si se configura open_ttl) y al cruzar
+un cierre se piden únicamente las velas nuevas, que se fusionan con las ya
+guardadas.
+"""
+
+import threading
+import time
+from collections import deque
+
+# Duración de cada intervalo de Binance en milisegundos
+INTERVAL_MS = {
+    '1s': 1000,
+    '1m': 60 * 1000,
+    '3m': 3 * 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '2h': 2 * 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '6h': 6 * 60 * 60 * 1000,
+    '8h': 8 * 60 * 60 * 1000,
+    '12h': 12 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+}
+
+
+class _Entry:
+    """Velas cacheadas de una clave (symbol, interval, limit)"""
+
+    def __init__(self, limit):
+        self.closed = deque(maxlen=max(limit - 1, 1))
+        self.open = None
+        self.open_fetched_at = 0.0
+
+
+class KlineCache:
+    """
+    Caché compartida delante de client.get_klines.
+
+    Devuelve las velas en el mismo formato que la API (lista de listas), por
+    lo que los llamadores solo cambian client.get_klines por cache.get_klines.
+    """
+
+    def __init__(self, client, open_ttl=None):
+        """
+        Args:
+            client: Cliente de Binance
+            open_ttl: Segundos tras los cuales se vuelve a pedir solo la vela
+                abierta (limit=1). None = no pedir nada hasta el próximo cierre.
+        """
+        self.client = client
+        self.open_ttl = open_ttl
+        self.requests = 0
+        self.hits = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_klines(self, symbol, interval, limit=500):
+        """Equivalente a client.get_klines(symbol=, interval=, limit=) con caché"""
+        key = (symbol, interval, limit)
+        step = INTERVAL_MS[interval]
+        now_ms = time.time() * 1000
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry.open is None and not entry.closed):
+                entry = _Entry(limit)
+                self._merge(entry, self._fetch(symbol, interval, limit))
+                self._entries[key] = entry
+            elif entry.open is None or now_ms >= entry.open[0] + step:
+                # Se cerró al menos una vela: pedir solo desde la última abierta
+                start = entry.open[0] if entry.open is not None else entry.closed[-1][0]
+                missing = int((now_ms - start) // step) + 1
+                fetch_limit = min(max(missing, 1), limit)
+                if missing > limit:
+                    entry = _Entry(limit)
+                    self._entries[key] = entry
+                    self._merge(entry, self._fetch(symbol, interval, limit))
+                else:
+                    self._merge(entry, self._fetch(symbol, interval, fetch_limit, start))
+            elif self.open_ttl is not None and time.time() - entry.open_fetched_at >= self.open_ttl:
+                self._merge(entry, self._fetch(symbol, interval, 1))
+            else:
+                self.hits += 1
+
+            klines = [list(k) for k in entry.closed]
+            if entry.open is not None:
+                klines.append(list(entry.open))
+            return klines[-limit:]
+
+    def update_price(self, symbol, price):
+        """
+        Ajusta la vela abierta de todas las claves de symbol con un precio ya
+        conocido (p. ej. del ticker), sin hacer peticiones.
+        """
+        with self._lock:
+            for (entry_symbol, _, _), entry in self._entries.items():
+                if entry_symbol != symbol or entry.open is None:
+                    continue
+                entry.open[4] = str(price)
+                if price > float(entry.open[2]):
+                    entry.open[2] = str(price)
+                if price < float(entry.open[3]):
+                    entry.open[3] = str(price)
+
+    def invalidate(self, symbol=None):
+        """Descarta las entradas de symbol (o todas)"""
+        with self._lock:
+            for key in [k for k in self._entries if symbol is None or k[0] == symbol]:
+                del self._entries[key]
+
+    def stats(self):
+        """Peticiones realizadas, consultas servidas desde caché y tasa de ahorro"""
+        total = self.requests + self.hits
+        return {
+            'requests': self.requests,
+            'hits': self.hits,
+            'saved_pct': (self.hits / total * 100) if total else 0.0,
+        }
+
+    def _fetch(self, symbol, interval, limit, start_time=None):
+        params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+        if start_time is not None:
+            params['startTime'] = int(start_time)
+        self.requests += 1
+        return self.client.get_klines(**params)
+
+    def _merge(self, entry, klines):
+        """Fusiona velas nuevas: todas menos la última quedan como cerradas"""
+        if not klines:
+            return
+        if len(klines) == 1 and entry.open is not None and klines[0][0] == entry.open[0]:
+            entry.open = list(klines[0])
+            entry.open_fetched_at = time.time()
+            return
+
+        candidates = list(klines[:-1])
+        if entry.open is not None and klines[0][0] > entry.open[0]:
+            # La vela abierta anterior quedó fuera de la respuesta: se cerró
+            candidates.insert(0, entry.open)
+        first_new = candidates[0][0] if candidates else klines[-1][0]
+        while entry.closed and entry.closed[-1][0] >= first_new:
+            entry.closed.pop()
+        entry.closed.extend(list(k) for k in candidates)
+        entry.open = list(klines[-1])
+        entry.open_fetched_at = time.time()
@@ -0,0 +1,204 @@
+"""
+Gráfico de precios en tiempo real con artistas persistentes y blitting
+Los puntos se guardan en un buffer circular de tamaño fijo y cada tick solo
+actualiza los datos de la línea (set_data) y repinta la línea (y, si se
+piden, el marcador y el texto del último precio) sobre el fondo guardado.
+El gráfico completo (ejes, etiquetas, rejilla) solo se vuelve a dibujar
+cuando los datos salen del rango visible de los ejes.
+"""
+
+from datetime import datetime
+
+import matplotlib.dates as mdates
+import numpy as np
+from matplotlib.ticker import FormatStrFormatter
+from matplotlib.transforms import Bbox
+
+
+class RingBuffer:
+    """
+    Buffer circular de floats con vista contigua sin copias.
+
+    Cada valor se escribe dos veces (posición i e i + capacidad), así los
+    últimos 'capacidad' valores siempre forman un tramo contiguo del array.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity)
+        self._next = 0
+        self._size = 0
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._data[self._next + self.capacity] = value
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def view(self):
+        """Valores en orden de llegada (vista de solo lectura, sin copia)"""
+        start = self._next if self._size == self.capacity else 0
+        view = self._data[start:start + self._size]
+        view.flags.writeable = False
+        return view
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+
+class LiveLineChart:
+    """
+    Línea de precio en tiempo real sobre un eje de matplotlib.
+
+    Los límites de los ejes se fijan con holgura (x_headroom, y_headroom): los
+    ticks que caen dentro solo repintan la línea con blitting; al salir del
+    rango se recalculan los límites y se hace un redibujado completo, tras el
+    cual se guarda de nuevo el fondo.
+    """
+
+    def __init__(self, canvas, ax, capacity=100, color='#00ff88', linewidth=2,
+                 y_margin=0.02, y_headroom=0.10, x_headroom=0.25, min_x_span_s=60,
+                 label=None, marker_color=None, marker_size=8, value_format=None, value_fontsize=11,
+                 date_format='%H:%M:%S', autofmt_xdate=True):
+        """
+        Args:
+            canvas: canvas de matplotlib (FigureCanvasTkAgg en la GUI)
+            ax: eje donde se dibuja la línea
+            capacity: puntos visibles (buffer circular)
+            y_margin: margen vertical mínimo sobre el rango de precios
+            y_headroom: holgura vertical extra al recalcular límites
+            x_headroom: fracción de la ventana que se deja libre a la derecha
+            min_x_span_s: ancho mínimo del eje X en segundos
+            label: etiqueta de la línea (para la leyenda)
+            marker_color: si se indica, marca el último punto con este color
+            marker_size: tamaño del marcador del último punto
+            value_format: formato del último precio, mostrado arriba a la
+                derecha del eje (p. ej. '${:.2f}'); None = no mostrarlo
+            value_fontsize: tamaño de fuente de ese texto
+            date_format: formato de las fechas del eje X (None = automático)
+            autofmt_xdate: rotar las fechas con fig.autofmt_xdate (solo para
+                figuras de un eje: en subplots oculta las fechas de los demás)
+        """
+        self.canvas = canvas
+        self.ax = ax
+        self.times = RingBuffer(capacity)
+        self.prices = RingBuffer(capacity)
+        self.y_margin = y_margin
+        self.y_headroom = y_headroom
+        self.x_headroom = x_headroom
+        self.min_x_span = min_x_span_s / 86400.0  # Unidades de date2num (días)
+        self.value_format = value_format
+        self.full_redraws = 0
+        self.blits = 0
+        self._background = None
+        self._blit_box = ax.bbox
+
+        # Artistas persistentes: se excluyen del dibujado normal y se pintan aparte
+        (self.line,) = ax.plot([], [], color=color, linewidth=linewidth, label=label, animated=True)
+        self.animated = [self.line]
+        self.marker = None
+        if marker_color is not None:
+            (self.marker,) = ax.plot([], [], 'o', color=marker_color, markersize=marker_size,
+                                     zorder=5, label='Actual', animated=True)
+            self.animated.append(self.marker)
+        self.value_text = None
+        if value_format is not None:
+            # Texto corto aparte del título: repintar el título entero en cada tick es lo más caro
+            self.value_text = ax.text(1.0, 1.01, '', transform=ax.transAxes, ha='right', va='bottom',
+                                      fontsize=value_fontsize, fontweight='bold', animated=True)
+            self.animated.append(self.value_text)
+
+        ax.grid(True, alpha=0.3)
+        ax.xaxis_date()
+        if date_format:
+            ax.xaxis.set_major_formatter(mdates.DateFormatter(date_format))
+        ax.yaxis.set_major_formatter(FormatStrFormatter('%.2f'))
+        if autofmt_xdate:
+            ax.figure.autofmt_xdate()
+
+        # Cualquier dibujado completo (p. ej. al redimensionar) renueva el fondo
+        self._draw_cid = canvas.mpl_connect('draw_event', self._on_draw)
+
+    def append(self, price, timestamp=None, redraw=True):
+        """Añade un punto y actualiza el gráfico (blit o redibujado completo)"""
+        timestamp = timestamp or datetime.now()
+        self.times.append(mdates.date2num(timestamp))
+        self.prices.append(price)
+        if redraw:
+            self.refresh()
+
+    def extend(self, prices, timestamps, redraw=True):
+        """Añade varios puntos (p. ej. historial inicial) con un solo redibujado"""
+        for price, timestamp in zip(prices, timestamps):
+            self.append(price, timestamp, redraw=False)
+        if redraw:
+            self.refresh()
+
+    def refresh(self):
+        """Dibuja el estado actual: blit si cabe en los ejes, si no redibujado completo"""
+        if not len(self.prices):
+            return
+        x = self.times.view()
+        y = self.prices.view()
+        self.line.set_data(x, y)
+        if self.marker is not None:
+            self.marker.set_data(x[-1:], y[-1:])
+        if self.value_text is not None:
+            self.value_text.set_text(self.value_format.format(y[-1]))
+
+        if self._background is None or self._out_of_range(x, y):
+            self._rescale(x, y)
+            self.canvas.draw()  # _on_draw guarda el fondo y pinta la línea
+            self.full_redraws += 1
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_animated()
+            self.canvas.blit(self._blit_box)
+            self.blits += 1
+
+    def clear(self):
+        """Vacía los datos y fuerza un redibujado completo en el próximo punto"""
+        self.times.clear()
+        self.prices.clear()
+        self.line.set_data([], [])
+        if self.marker is not None:
+            self.marker.set_data([], [])
+        self._background = None
+
+    def _out_of_range(self, x, y):
+        x_min, x_max = self.ax.get_xlim()
+        y_min, y_max = self.ax.get_ylim()
+        if x[-1] > x_max or y.min() < y_min or y.max() > y_max:
+            return True
+        # El rango de precios se ha estrechado mucho: reajustar para no aplanar la línea
+        price_range = y.max() - y.min()
+        return price_range > 0 and price_range < (y_max - y_min) / 4
+
+    def _rescale(self, x, y):
+        span = max(x[-1] - x[0], self.min_x_span)
+        self.ax.set_xlim(x[0], x[0] + span * (1 + self.x_headroom))
+
+        min_price = y.min()
+        max_price = y.max()
+        price_range = max_price - min_price
+        margin = price_range * (self.y_margin + self.y_headroom) if price_range > 0 else 1
+        self.ax.set_ylim(min_price - margin, max_price + margin)
+
+    def _draw_animated(self):
+        for artist in self.animated:
+            self.ax.figure.draw_artist(artist)
+
+    def _on_draw(self, event):
+        box = self.ax.bbox
+        if self.value_text is not None:
+            # La región a repintar incluye la franja del texto sobre el eje
+            height = self.value_text.get_fontsize() * self.ax.figure.dpi / 72 * 1.6
+            box = Bbox.from_extents(box.x0, box.y0, box.x1, box.y1 + height)
+        self._blit_box = box
+        self._background = self.canvas.copy_from_bbox(box)
+        self._draw_animated()
+        self.canvas.blit(box)
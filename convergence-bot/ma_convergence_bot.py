@@ -5,9 +5,11 @@ Estrategia basada en el análisis de scalping de chart_Scalping_analisys_umbral_
 
 import pandas as pd
 import numpy as np
-import talib
 from datetime import datetime, timedelta
 import os
+from bisect import bisect_left, insort
+from tick_store import TickStoreReader
+import scalping_core
 
 class MAConvergenceBot:
     def __init__(self, initial_capital=1000.0, ma1_period="MA7", ma2_period="MA25", 
@@ -68,6 +70,10 @@ class MAConvergenceBot:
         self.min_time_between_trades = 45  # segundos
         
         self.data = None
+        
+        # Segmentos sin clasificar por columna MA; asignar un dict compartido
+        # entre bots que usan los mismos datos evita recalcularlos
+        self.segment_cache = None
     
     @classmethod
     def get_optimized_config(cls):
@@ -172,223 +178,81 @@ class MAConvergenceBot:
             return False
     
     def _calculate_indicators(self):
-        """Calcula indicadores técnicos necesarios"""
-        # Calcular todas las MAs disponibles
-        for period in [3, 7, 14, 25, 50, 99]:
-            self.data[f'MA{period}'] = talib.SMA(self.data['Close'].values, timeperiod=period)
-        
-        # Calcular RSI y MACD para referencia
-        self.data['RSI'] = talib.RSI(self.data['Close'].values, timeperiod=14)
-        macd_line, signal_line, _ = talib.MACD(self.data['Close'].values, 
-                                              fastperiod=12, slowperiod=26, signalperiod=9)
-        self.data['MACD'] = macd_line
-        self.data['Signal'] = signal_line
+        """Calcula indicadores técnicos necesarios (MAs, RSI y MACD de referencia)"""
+        scalping_core.procesar_indicadores(self.data)
     
     def _calculate_ma_segments(self, ma_column, umbral):
         """
         Calcula segmentos de tendencia para una MA específica
         Replica la lógica de calcular_lineas_tendencia_ma_individual
         """
-        ma_values = self.data[ma_column].dropna()
-        
-        if len(ma_values) < 10:
-            return []
-        
-        # Calcular pendientes móviles
-        ventana = 3
-        pendientes_locales = []
-        indices_validos = []
-        
-        for i in range(ventana, len(ma_values) - ventana):
-            inicio_idx = i - ventana // 2
-            fin_idx = i + ventana // 2
-            
-            x_window = np.arange(fin_idx - inicio_idx + 1)
-            y_window = ma_values.iloc[inicio_idx:fin_idx+1].values
-            
-            if len(x_window) > 1 and not np.any(np.isnan(y_window)):
-                try:
-                    pendiente = np.polyfit(x_window, y_window, 1)[0]
-                    pendientes_locales.append(pendiente)
-                    indices_validos.append(i)
-                except:
-                    continue
-        
-        if len(pendientes_locales) < 3:
-            return []
-        
-        # Crear segmentos adaptativos
-        longitud_segmento = max(20, len(ma_values) // 10)
-        cambios_tendencia = [0]
-        
-        # Puntos de división fijos
-        for i in range(longitud_segmento, len(ma_values), longitud_segmento):
-            cambios_tendencia.append(i)
-        
-        # Detectar cambios significativos de pendiente
-        umbral_cambio = max(np.std(pendientes_locales) * 0.8, 0.00005)
-        
-        for i in range(1, len(pendientes_locales)):
-            cambio_pendiente = abs(pendientes_locales[i] - pendientes_locales[i-1])
-            cambio_direccion = (pendientes_locales[i-1] > 0 and pendientes_locales[i] < 0) or \
-                              (pendientes_locales[i-1] < 0 and pendientes_locales[i] > 0)
-            
-            if (cambio_pendiente > umbral_cambio or cambio_direccion) and \
-               indices_validos[i] not in cambios_tendencia:
-                cambios_tendencia.append(indices_validos[i])
-        
-        # Ordenar y agregar final
-        cambios_tendencia = sorted(list(set(cambios_tendencia)))
-        cambios_tendencia.append(len(ma_values) - 1)
-        
-        # Crear segmentos de tendencia
-        segmentos_tendencia = []
-        for i in range(len(cambios_tendencia) - 1):
-            inicio_idx = cambios_tendencia[i]
-            fin_idx = cambios_tendencia[i + 1]
-            
-            if fin_idx > inicio_idx:
-                inicio_timestamp = ma_values.index[inicio_idx]
-                fin_timestamp = ma_values.index[fin_idx]
-                inicio_valor = ma_values.iloc[inicio_idx]
-                fin_valor = ma_values.iloc[fin_idx]
-                
-                # Calcular pendiente del segmento
-                x_vals = np.arange(fin_idx - inicio_idx + 1)
-                y_vals = ma_values.iloc[inicio_idx:fin_idx+1].values
-                
-                if len(x_vals) > 1 and not np.any(np.isnan(y_vals)):
-                    try:
-                        pendiente = np.polyfit(x_vals, y_vals, 1)[0]
-                        
-                        # Determinar dirección según umbral
-                        if pendiente > umbral:
-                            direccion = 'alcista'
-                        elif pendiente < -umbral:
-                            direccion = 'bajista'
-                        else:
-                            direccion = 'lateral'
-                        
-                        segmentos_tendencia.append({
-                            'inicio_idx': inicio_idx,
-                            'fin_idx': fin_idx,
-                            'inicio_timestamp': inicio_timestamp,
-                            'fin_timestamp': fin_timestamp,
-                            'inicio_valor': inicio_valor,
-                            'fin_valor': fin_valor,
-                            'pendiente': pendiente,
-                            'direccion': direccion
-                        })
-                    except:
-                        continue
-        
-        return segmentos_tendencia
+        if self.segment_cache is not None and ma_column in self.segment_cache:
+            segmentos = self.segment_cache[ma_column]
+        else:
+            segmentos = self.segment_ma(self.data[ma_column].dropna())
+            if self.segment_cache is not None:
+                self.segment_cache[ma_column] = segmentos
+        return self.classify_segments(segmentos, umbral)
     
-    def _get_trend_at_timestamp(self, segmentos, timestamp):
-        """Obtiene la tendencia de una MA en un timestamp específico"""
-        for segmento in segmentos:
-            if segmento['inicio_timestamp'] <= timestamp <= segmento['fin_timestamp']:
-                return segmento['direccion']
-        return None
+    @staticmethod
+    def local_slopes(ma_values, ventana=3):
+        """
+        Pendientes locales (ajuste lineal de 'ventana' puntos centrados) para
+        cada posición i en [ventana, len - ventana). Solo dependen de los valores
+        vecinos, por lo que pueden calcularse una vez sobre la serie completa y
+        reutilizarse en cualquier ventana de datos que la contenga.
+        """
+        return scalping_core.pendientes_locales(ma_values, ventana)
     
-    def _detect_ma2_direction_changes(self, segmentos_ma2):
-        """Detecta cambios de dirección en MA2"""
-        cambios = []
+    @staticmethod
+    def segment_ma(ma_values, local_slopes=None):
+        """
+        Divide una MA en segmentos de tendencia con su pendiente.
+        Los segmentos no dependen del umbral (ver classify_segments), así que
+        se pueden compartir entre bots que solo cambian umbral_ma1/umbral_ma2.
         
-        for i in range(1, len(segmentos_ma2)):
-            segmento_anterior = segmentos_ma2[i-1]
-            segmento_actual = segmentos_ma2[i]
-            
-            # Verificar si hay cambio de dirección significativo
-            if (segmento_anterior['direccion'] != segmento_actual['direccion'] and
-                segmento_actual['direccion'] in ['alcista', 'bajista']):
-                
-                cambios.append({
-                    'timestamp': segmento_actual['inicio_timestamp'],
-                    'direccion_anterior': segmento_anterior['direccion'],
-                    'direccion_nueva': segmento_actual['direccion'],
-                    'pendiente_anterior': segmento_anterior['pendiente'],
-                    'pendiente_nueva': segmento_actual['pendiente']
-                })
-        
-        return cambios
+        Args:
+            ma_values: Serie de la MA sin NaN
+            local_slopes: Pendientes locales ya calculadas para estos valores
+                (mismo largo, ver local_slopes); None = calcularlas
+        """
+        return scalping_core.segmentar_ma(ma_values, pendientes=local_slopes)
+    
+    @staticmethod
+    def classify_segments(segmentos, umbral):
+        """Asigna la dirección de cada segmento según el umbral de pendiente"""
+        return scalping_core.clasificar_segmentos(segmentos, umbral)
     
     def _detect_convergences(self, segmentos_ma1, segmentos_ma2):
         """
         Detecta convergencias entre MA1 y MA2
-        Replica la lógica de marcar_convergencias_doble_ma_rsi
+        (MA1 bajista + MA2 cambia a bajista = VENTA, alcista = COMPRA)
         """
-        convergencias_detectadas = []
-        
-        # Detectar cambios de dirección en MA2
-        cambios_ma2 = self._detect_ma2_direction_changes(segmentos_ma2)
-        
-        # Para cada cambio de dirección en MA2, verificar condiciones
-        for cambio in cambios_ma2:
-            timestamp = cambio['timestamp']
-            
-            # Obtener RSI en ese momento para referencia
-            try:
-                idx = self.data.index[self.data.index >= timestamp][0]
-                rsi_valor = self.data.loc[idx, 'RSI']
-                close_valor = self.data.loc[idx, 'Close']
-            except:
-                continue
-            
-            # Obtener tendencia de MA1 en ese momento
-            tendencia_ma1 = self._get_trend_at_timestamp(segmentos_ma1, timestamp)
-            
-            # CONDICIÓN 1: MA1 bajista + MA2 cambia a bajista (VENTA)
-            if (tendencia_ma1 == 'bajista' and 
-                cambio['direccion_nueva'] == 'bajista'):
-                
-                convergencias_detectadas.append({
-                    'timestamp': timestamp,
-                    'tipo': 'VENTA_CONVERGENCIA',
-                    'rsi': rsi_valor,
-                    'close': close_valor,
-                    'ma1_tendencia': tendencia_ma1,
-                    'ma2_cambio': cambio['direccion_nueva'],
-                    'descripcion': 'MA1↘ + MA2→↘'
-                })
-            
-            # CONDICIÓN 2: MA1 alcista + MA2 cambia a alcista (COMPRA)
-            elif (tendencia_ma1 == 'alcista' and 
-                  cambio['direccion_nueva'] == 'alcista'):
-                
-                convergencias_detectadas.append({
-                    'timestamp': timestamp,
-                    'tipo': 'COMPRA_CONVERGENCIA',
-                    'rsi': rsi_valor,
-                    'close': close_valor,
-                    'ma1_tendencia': tendencia_ma1,
-                    'ma2_cambio': cambio['direccion_nueva'],
-                    'descripcion': 'MA1↗ + MA2→↗'
-                })
-        
-        return convergencias_detectadas
+        return scalping_core.detectar_convergencias_ma(self.data, segmentos_ma1, segmentos_ma2,
+                                                       self.umbral_ma1, self.umbral_ma2)
     
     def _filter_consecutive_signals(self, convergencias):
         """
         Filtra señales consecutivas del mismo tipo
         Replica el sistema de filtrado del archivo original
         """
-        # Agregar nuevas convergencias a la lista persistente (evitar duplicados)
+        # Agregar nuevas convergencias a la lista persistente (evitar duplicados:
+        # otra convergencia a menos de 5 s). Los instantes existentes se
+        # mantienen ordenados para buscar solo los vecinos con bisect.
+        existentes = sorted(pd.Timestamp(c['timestamp']).value for c in self.convergencias_persistentes)
         for conv in convergencias:
-            es_nueva = True
-            for conv_existente in self.convergencias_persistentes:
-                # Convertir timestamps a valores comparables
-                try:
-                    tiempo_diff = abs((pd.Timestamp(conv['timestamp']) - pd.Timestamp(conv_existente['timestamp'])).total_seconds())
-                    if tiempo_diff < 5:
-                        es_nueva = False
-                        break
-                except:
-                    # Si hay error en la conversión, considerar como nueva
-                    continue
+            try:
+                instante = pd.Timestamp(conv['timestamp']).value
+            except:
+                # Si hay error en la conversión, considerar como nueva
+                self.convergencias_persistentes.append(conv)
+                continue
             
-            if es_nueva:
+            i = bisect_left(existentes, instante)
+            vecinos = existentes[max(i - 1, 0):i + 1]
+            if all(abs(instante - vecino) / 1e9 >= 5 for vecino in vecinos):
                 self.convergencias_persistentes.append(conv)
+                insort(existentes, instante)
         
         # Limpiar convergencias muy antiguas (más de 30 minutos)
         if self.convergencias_persistentes:
@@ -501,8 +365,16 @@ class MAConvergenceBot:
         
         return True
     
-    def run_backtest(self, csv_file=None):
-        """Ejecuta el backtesting de la estrategia"""
+    def run_backtest(self, csv_file=None, tick_file=None):
+        """
+        Ejecuta el backtesting de la estrategia
+        
+        Args:
+            csv_file: CSV de velas a cargar (opcional si ya hay datos)
+            tick_file: Archivo de ticks (tick_store) del mismo período. Si se
+                indica, el take profit y el stop loss se evalúan tick a tick
+                dentro de cada vela mientras hay posición abierta.
+        """
         if csv_file:
             if not self.load_data(csv_file):
                 # Retornar resultado válido en lugar de None
@@ -554,29 +426,60 @@ class MAConvergenceBot:
         convergencias_ordenadas = sorted(convergencias_filtradas, 
                                        key=lambda x: pd.Timestamp(x['timestamp']))
         
+        conv_times = [pd.Timestamp(conv['timestamp']) for conv in convergencias_ordenadas]
+        
         # Procesar datos row by row para simular trading en tiempo real
+        # (sobre arrays/listas: iloc por fila domina el tiempo del backtest)
+        closes = self.data['Close'].to_numpy()
+        times = list(self.data.index)
         convergencia_idx = 0
         processed_count = 0
         
+        # Cursor de ticks para evaluar TP/SL dentro de la vela
+        tick_cursor = None
+        if tick_file:
+            index_ms = self.data.index.values.astype('datetime64[ms]').astype(np.int64)
+            bar_ms = int(np.median(np.diff(index_ms))) if len(index_ms) > 1 else 1000
+            tick_cursor = TickStoreReader(tick_file).cursor(int(index_ms[min(50, len(index_ms) - 1)]))
+            if self.verbose:
+                print(f"TP/SL a resolución de tick desde {tick_file}")
+        
         if self.verbose:
             print("Iniciando simulación de trading...")
         
         for i in range(50, len(self.data)):  # Empezar después de que las MAs estén estables
-            current_row = self.data.iloc[i]
-            current_time = self.data.index[i]
-            current_price = current_row['Close']
+            current_time = times[i]
+            current_price = closes[i]
             
             # Mostrar progreso cada 1000 registros
             processed_count += 1
             if self.verbose and processed_count % 1000 == 0:
                 print(f"Procesados: {processed_count}/{len(self.data)-50} registros...")
             
+            # Salidas por TP/SL usando el recorrido de ticks de la vela
+            if tick_cursor is not None and self.position == 'LONG':
+                bar_end_ms = int(index_ms[i]) + bar_ms
+                take_profit_price = self.entry_price * (1 + self.take_profit)
+                stop_loss_price = self.entry_price * (1 - self.stop_loss)
+                cross = tick_cursor.first_cross(bar_end_ms, upper=take_profit_price, lower=stop_loss_price)
+                if cross is not None:
+                    cross_ms, cross_price, kind = cross
+                    exit_time = pd.Timestamp(cross_ms, unit='ms')
+                    if kind == 'upper':
+                        self._execute_sell(take_profit_price, exit_time, "TAKE_PROFIT")
+                    else:
+                        self._execute_sell(cross_price, exit_time, "STOP_LOSS")
+                    if self.verbose:
+                        trade = self.trades[-1]
+                        print(f"{trade['reason']} en tick: ${trade['price']:.4f} en {exit_time} "
+                              f"| P&L: {trade['pnl_pct']:+.2f}%")
+            
             # Verificar si hay una convergencia en este timestamp
             signal_type = None
             
             while (convergencia_idx < len(convergencias_ordenadas)):
                 conv = convergencias_ordenadas[convergencia_idx]
-                conv_time = pd.Timestamp(conv['timestamp'])
+                conv_time = conv_times[convergencia_idx]
                 
                 # Si la convergencia es anterior o igual al tiempo actual
                 if conv_time <= current_time:
@@ -592,6 +495,9 @@ class MAConvergenceBot:
                 if signal_type == 'COMPRA_CONVERGENCIA':
                     if self.position is None:
                         success = self._execute_buy(current_price, current_time)
+                        if success and tick_cursor is not None:
+                            # La entrada ocurre al cierre: los ticks cuentan desde la vela siguiente
+                            tick_cursor.skip_to(int(index_ms[i]) + bar_ms)
                         if success and self.verbose:
                             print(f"COMPRA ejecutada: ${current_price:.4f} en {current_time}")
                 
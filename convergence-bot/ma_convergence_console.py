@@ -12,6 +12,7 @@ from datetime import datetime
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceOrderException
 from ma_convergence_bot import MAConvergenceBot
+from kline_cache import KlineCache
 import pandas as pd
 import talib
 
@@ -24,6 +25,7 @@ class MAConvergenceConsoleBot:
         
         # Cliente Binance
         self.client = Client(self.api_key, self.api_secret, testnet=True)
+        self.kline_cache = KlineCache(self.client)
         
         # Configuración
         self.symbol = "BNBUSDT"
@@ -64,8 +66,13 @@ class MAConvergenceConsoleBot:
     def analyze_market(self):
         """Analizar mercado y retornar señal"""
         try:
-            # Obtener datos históricos
-            klines = self.client.get_klines(
+            # Precio actual del ticker: la vela abierta de la caché se ajusta con él
+            # para que TP/SL y los fills no usen un precio congelado hasta el cierre
+            ticker = self.client.get_symbol_ticker(symbol=self.symbol)
+            self.kline_cache.update_price(self.symbol, float(ticker['price']))
+            
+            # Obtener datos históricos (desde caché hasta el cierre de la vela)
+            klines = self.kline_cache.get_klines(
                 symbol=self.symbol,
                 interval=Client.KLINE_INTERVAL_1MINUTE,
                 limit=100
@@ -14,11 +14,13 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
-from matplotlib.ticker import FormatStrFormatter
 import numpy as np
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceOrderException
 from ma_convergence_bot import MAConvergenceBot
+from kline_cache import KlineCache
+from live_chart import LiveLineChart
+from ui_pump import LogView, MessagePump
 import talib
 
 class MAConvergenceGUI:
@@ -38,10 +40,12 @@ class MAConvergenceGUI:
         self.balance_bnb = 0.0
         self.current_price = 0.0
         
-        # Datos para gráfico
-        self.price_data = []
-        self.time_data = []
+        # Datos para gráfico (buffer circular dentro de LiveLineChart)
         self.max_data_points = 100
+        self._chart_dirty = False
+        
+        # Líneas que conserva el log (las más antiguas se descartan)
+        self.max_log_lines = 1000
         
         # Cola para comunicación entre threads
         self.message_queue = queue.Queue()
@@ -55,8 +59,21 @@ class MAConvergenceGUI:
         # Inicializar valores por defecto
         self.load_default_config()
         
-        # Iniciar actualizaciones
-        self.root.after(100, self.process_queue)
+        # Iniciar actualizaciones: cada frame agrupa los precios en un redibujado
+        # y las líneas de log en una inserción
+        self.pump = MessagePump(
+            self.root, self.message_queue,
+            handlers={
+                'price_update': self.queue_price,
+                'signal': self.process_signal,
+                'log': self.log_message,
+                'error': lambda message: self.log_message(f"❌ {message}"),
+                'balance_update': self.update_balances,
+            },
+            flushers=(self.flush_chart, self.log_view.flush)
+        )
+        self.pump.start()
+        self.root.after(1000, self.update_ui_stats)
     
     def setup_style(self):
         """Configurar estilo dark theme"""
@@ -196,6 +213,11 @@ class MAConvergenceGUI:
                                      bg='#2b2b2b', fg='white')
         self.position_label.pack(pady=2)
         
+        # Rendimiento de la interfaz (duración de los frames del bombeo de mensajes)
+        self.ui_label = tk.Label(status_frame, text="UI: -",
+                               bg='#2b2b2b', fg='#888888', font=('Arial', 8))
+        self.ui_label.pack(pady=2)
+        
         # Frame derecho - Balances
         balance_frame = tk.LabelFrame(parent, text="💰 Balances", 
                                     bg='#2b2b2b', fg='white', font=('Arial', 10, 'bold'))
@@ -231,6 +253,7 @@ class MAConvergenceGUI:
         self.ax.set_ylabel('Precio (USDT)', color='white')
         
         self.canvas = FigureCanvasTkAgg(self.fig, master=chart_frame)
+        self.price_chart = LiveLineChart(self.canvas, self.ax, capacity=self.max_data_points)
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
@@ -245,6 +268,7 @@ class MAConvergenceGUI:
                                                  bg='#1e1e1e', fg='white',
                                                  font=('Consolas', 9))
         self.log_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.log_view = LogView(self.log_text, max_lines=self.max_log_lines)
     
     def load_default_config(self):
         """Cargar configuración por defecto"""
@@ -358,6 +382,7 @@ class MAConvergenceGUI:
             
             # Crear cliente
             self.client = Client(api_key, api_secret, testnet=self.testnet_var.get())
+            kline_cache = KlineCache(self.client)
             
             # Configurar bot MA
             ma_bot = MAConvergenceBot(
@@ -377,10 +402,11 @@ class MAConvergenceGUI:
                     current_price = float(ticker['price'])
                     
                     # Actualizar datos del gráfico
-                    self.message_queue.put(('price_update', current_price))
+                    self.message_queue.put(('price_update', current_price, datetime.now()))
                     
-                    # Obtener datos históricos para análisis
-                    klines = self.client.get_klines(
+                    # Obtener datos históricos para análisis (caché hasta el cierre de la vela)
+                    kline_cache.update_price(self.symbol_var.get(), current_price)
+                    klines = kline_cache.get_klines(
                         symbol=self.symbol_var.get(),
                         interval=Client.KLINE_INTERVAL_1MINUTE,
                         limit=100
@@ -484,50 +510,20 @@ class MAConvergenceGUI:
         self.usdt_label.configure(text=f"USDT: ${usdt_balance:.2f}")
         self.bnb_label.configure(text=f"BNB: {bnb_balance:.6f}")
     
-    def update_chart(self, price):
-        """Actualizar gráfico de precios"""
-        current_time = datetime.now()
-        
-        self.time_data.append(current_time)
-        self.price_data.append(price)
-        
-        # Mantener solo los últimos puntos
-        if len(self.time_data) > self.max_data_points:
-            self.time_data = self.time_data[-self.max_data_points:]
-            self.price_data = self.price_data[-self.max_data_points:]
-        
-        # Actualizar gráfico
-        self.ax.clear()
-        self.ax.plot(self.time_data, self.price_data, color='#00ff88', linewidth=2)
-        self.ax.set_facecolor('#1e1e1e')
-        self.ax.tick_params(colors='white')
-        self.ax.set_xlabel('Tiempo', color='white')
-        self.ax.set_ylabel('Precio (USDT)', color='white')
-        self.ax.grid(True, alpha=0.3)
-        
-        # Configurar formato del eje Y para evitar notación científica
-        if len(self.price_data) > 0:
-            min_price = min(self.price_data)
-            max_price = max(self.price_data)
-            price_range = max_price - min_price
-            
-            # Establecer límites del eje Y con un pequeño margen
-            margin = price_range * 0.02 if price_range > 0 else 1
-            self.ax.set_ylim(min_price - margin, max_price + margin)
-            
-            # Formato de números sin notación científica
-            from matplotlib.ticker import FormatStrFormatter
-            self.ax.yaxis.set_major_formatter(FormatStrFormatter('%.2f'))
-        
-        # Formato de fecha en eje X
-        if len(self.time_data) > 1:
-            self.fig.autofmt_xdate()
-        
-        self.canvas.draw()
-        
-        # Actualizar precio en GUI
+    def queue_price(self, price, timestamp=None):
+        """Añadir un precio al gráfico sin redibujar (se pinta al final del frame)"""
+        self.price_chart.append(price, timestamp or datetime.now(), redraw=False)
         self.current_price = price
-        self.price_label.configure(text=f"Precio: ${price:.4f}")
+        self._chart_dirty = True
+    
+    def flush_chart(self):
+        """Redibujar una vez los precios acumulados en el frame (solo la línea; completo al salir de rango)"""
+        if not self._chart_dirty:
+            return False
+        self._chart_dirty = False
+        self.price_chart.refresh()
+        self.price_label.configure(text=f"Precio: ${self.current_price:.4f}")
+        return True
     
     def process_signal(self, signal_type, price):
         """Procesar señal de trading"""
@@ -547,41 +543,19 @@ class MAConvergenceGUI:
                                        fg='#51cf66' if pnl > 0 else '#ff6b6b')
                 self.log_message(f"🔴 VENTA ejecutada a ${price:.4f} | P&L: {pnl:+.2f}%")
     
-    def process_queue(self):
-        """Procesar mensajes de la cola"""
-        try:
-            while True:
-                message = self.message_queue.get_nowait()
-                msg_type = message[0]
-                
-                if msg_type == 'price_update':
-                    self.update_chart(message[1])
-                    
-                elif msg_type == 'signal':
-                    self.process_signal(message[1], message[2])
-                    
-                elif msg_type == 'log':
-                    self.log_message(message[1])
-                    
-                elif msg_type == 'error':
-                    self.log_message(f"❌ {message[1]}")
-                    
-                elif msg_type == 'balance_update':
-                    self.update_balances(message[1])
-                    
-        except queue.Empty:
-            pass
-        
-        # Programar siguiente check
-        self.root.after(100, self.process_queue)
+    def update_ui_stats(self):
+        """Mostrar la duración de los frames del bombeo de mensajes (cada segundo)"""
+        stats = self.pump.stats()
+        text = f"UI: {stats['avg_ms']:.1f} ms/frame (máx {stats['max_ms']:.1f})"
+        if self.log_view.dropped:
+            text += f" | log descartado: {self.log_view.dropped}"
+        self.ui_label.configure(text=text)
+        self.root.after(1000, self.update_ui_stats)
     
     def log_message(self, message):
-        """Agregar mensaje al log"""
+        """Agregar mensaje al log (se inserta en bloque al final del frame)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        full_message = f"[{timestamp}] {message}\n"
-        
-        self.log_text.insert(tk.END, full_message)
-        self.log_text.see(tk.END)
+        self.log_view.append(f"[{timestamp}] {message}")
 
 def main():
     """Función principal"""
@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceOrderException
 from ma_convergence_bot import MAConvergenceBot
+from kline_cache import KlineCache
 import numpy as np
 import talib
 
@@ -28,6 +29,7 @@ class MAConvergenceLiveBot:
         self.client = Client(api_key, api_secret, testnet=testnet)
         self.symbol = symbol
         self.testnet = testnet
+        self.kline_cache = KlineCache(self.client)
         
         # Bot MA Convergence con configuración optimizada
         self.ma_bot = MAConvergenceBot(verbose=True)
@@ -74,7 +76,7 @@ class MAConvergenceLiveBot:
     def get_klines_data(self, interval='1m', limit=200):
         """Obtiene datos de velas recientes"""
         try:
-            klines = self.client.get_klines(
+            klines = self.kline_cache.get_klines(
                 symbol=self.symbol,
                 interval=interval,
                 limit=limit
@@ -253,6 +255,9 @@ class MAConvergenceLiveBot:
                     time.sleep(self.check_interval)
                     continue
                 
+                # La vela abierta cacheada se actualiza con el precio del ticker
+                self.kline_cache.update_price(self.symbol, current_price)
+                
                 print(f"[{check_count:4d}] {current_time.strftime('%H:%M:%S')} | "
                       f"Precio: ${current_price:.4f} | "
                       f"Posición: {self.position or 'None'}")
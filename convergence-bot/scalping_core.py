@@ -0,0 +1,323 @@
+"""
+Núcleo de análisis de los gráficos de scalping (sin interfaz)
+Indicadores, segmentos de tendencia de las MAs, convergencias MA1/MA2,
+extremos de RSI y cruces MACD en zona extrema. Solo depende de NumPy, pandas
+y TA-Lib: lo comparten chart_Scalping_analisys.py,
+chart_Scalping_analisys_umbral_fijo.py, chart_scalping_backtest.py y
+MAConvergenceBot, y se puede ejecutar sin pantalla.
+
+Las pendientes locales (una regresión por barra) se resuelven por lotes con
+un único lstsq y el mismo escalado que np.polyfit: el resultado es idéntico
+bit a bit a llamar a polyfit punto a punto, incluido el signo de las
+pendientes casi nulas de los tramos planos (que cuenta como cambio de
+dirección).
+"""
+
+import numpy as np
+import pandas as pd
+import talib  # pylint: disable=no-member
+
+PERIODOS_MA = (3, 7, 14, 25, 50, 99)
+
+
+def sma(values, window):
+    """Media móvil simple de TA-Lib como pd.Series"""
+    return pd.Series(talib.SMA(values.values, timeperiod=window), index=values.index)  # pylint: disable=no-member
+
+
+def rsi(values, window=14):
+    """RSI de TA-Lib como pd.Series"""
+    return pd.Series(talib.RSI(values.values, timeperiod=window), index=values.index)  # pylint: disable=no-member
+
+
+def macd(values, fast=12, slow=26, signal=9):
+    """Líneas MACD y de señal de TA-Lib como pd.Series"""
+    macd_line, signal_line, _ = talib.MACD(values.values, fastperiod=fast, slowperiod=slow, signalperiod=signal)  # pylint: disable=no-member
+    return pd.Series(macd_line, index=values.index), pd.Series(signal_line, index=values.index)
+
+
+def procesar_indicadores(df):
+    """Añade a df las columnas MA3..MA99, RSI, MACD y Signal"""
+    for periodo in PERIODOS_MA:
+        df[f"MA{periodo}"] = sma(df["Close"], periodo)
+    df["RSI"] = rsi(df["Close"], 14)
+    df["MACD"], df["Signal"] = macd(df["Close"])
+    return df
+
+
+def pendientes_ajuste(valores, inicios, longitud):
+    """
+    Pendiente de la recta de mínimos cuadrados de cada ventana
+    valores[inicio:inicio + longitud], para todos los inicios a la vez.
+    Reproduce np.polyfit(np.arange(longitud), ventana, 1)[0]; para ventanas
+    de más de 3 puntos el lote puede diferir de polyfit en el último bit.
+    """
+    inicios = np.asarray(inicios, dtype=np.int64)
+    if not len(inicios):
+        return np.empty(0)
+    x = np.arange(longitud, dtype=float)
+    lhs = np.vander(x, 2)
+    escala = np.sqrt((lhs * lhs).sum(axis=0))
+    ventanas = np.asarray(valores, dtype=float)[inicios[None, :] + np.arange(longitud)[:, None]]
+    coeficientes = np.linalg.lstsq(lhs / escala, ventanas, rcond=longitud * np.finfo(float).eps)[0]
+    return coeficientes[0] / escala[0]
+
+
+def pendientes_locales(ma_values, ventana=3):
+    """
+    Pendientes locales (ajuste lineal de 'ventana' puntos centrados) para cada
+    posición i en [ventana, len - ventana); NaN fuera de ese rango o si la
+    ventana tiene NaN. Solo dependen de los valores vecinos, por lo que pueden
+    calcularse una vez sobre la serie completa y reutilizarse en cualquier
+    ventana de datos que la contenga.
+    """
+    valores = np.asarray(ma_values, dtype=float)
+    pendientes = np.full(len(valores), np.nan)
+    posiciones = np.arange(ventana, len(valores) - ventana)
+    if not len(posiciones):
+        return pendientes
+    inicios = posiciones - ventana // 2
+    longitud = ventana // 2 * 2 + 1
+    validas = ~np.isnan(valores[inicios[:, None] + np.arange(longitud)]).any(axis=1)
+    pendientes[posiciones[validas]] = pendientes_ajuste(valores, inicios[validas], longitud)
+    return pendientes
+
+
+def segmentar_ma(ma_values, longitud_segmento=None, pendientes=None):
+    """
+    Divide una MA (sin NaN) en segmentos rectos: cortes fijos cada
+    longitud_segmento puntos (por defecto max(20, len // 10)) más los puntos
+    donde la pendiente local cambia de forma significativa o de signo.
+
+    Los segmentos no dependen de ningún umbral de pendiente (ver
+    clasificar_segmentos), así que se pueden compartir entre análisis que solo
+    cambian los umbrales.
+
+    Args:
+        ma_values: Serie de la MA sin NaN (índice temporal)
+        longitud_segmento: separación de los cortes fijos
+        pendientes: pendientes locales ya calculadas para estos valores
+            (mismo largo, ver pendientes_locales); None = calcularlas
+
+    Returns:
+        list: dicts con inicio_idx, fin_idx, inicio_timestamp, fin_timestamp,
+              inicio_valor, fin_valor, pendiente y longitud
+    """
+    if len(ma_values) < 10:  # Necesitamos suficientes datos
+        return []
+
+    valores = ma_values.to_numpy(dtype=float)
+    n = len(valores)
+    ventana = 3  # Ventana pequeña para mayor sensibilidad
+    if pendientes is None:
+        pendientes = pendientes_locales(valores, ventana)
+    rango = np.arange(ventana, n - ventana)
+    indices_validos = rango[~np.isnan(pendientes[rango])]
+    pendientes_validas = pendientes[indices_validos]
+
+    if len(pendientes_validas) < 3:
+        return []
+
+    # Cortes fijos más cambios significativos de pendiente o de dirección
+    longitud_segmento = longitud_segmento or max(20, n // 10)
+    umbral_cambio = max(np.std(pendientes_validas) * 0.8, 0.00005)
+    anterior = pendientes_validas[:-1]
+    actual = pendientes_validas[1:]
+    cambio_direccion = ((anterior > 0) & (actual < 0)) | ((anterior < 0) & (actual > 0))
+    cambios = indices_validos[1:][(np.abs(actual - anterior) > umbral_cambio) | cambio_direccion]
+    cortes = np.append(np.union1d(np.arange(0, n, longitud_segmento), cambios), n - 1)
+
+    inicios = cortes[:-1]
+    fines = cortes[1:]
+    conservar = fines > inicios
+    inicios = inicios[conservar]
+    fines = fines[conservar]
+
+    # Pendiente de cada segmento completo (hay pocos: polyfit exacto por segmento)
+    pendientes_segmento = [np.polyfit(np.arange(fin - inicio + 1), valores[inicio:fin + 1], 1)[0]
+                           for inicio, fin in zip(inicios, fines)]
+
+    indice = ma_values.index
+    return [{
+        'inicio_idx': int(inicio),
+        'fin_idx': int(fin),
+        'inicio_timestamp': indice[inicio],
+        'fin_timestamp': indice[fin],
+        'inicio_valor': valores[inicio],
+        'fin_valor': valores[fin],
+        'pendiente': pendiente,
+        'longitud': int(fin - inicio + 1),
+    } for inicio, fin, pendiente in zip(inicios, fines, pendientes_segmento)]
+
+
+def clasificar_pendiente(pendiente, umbral):
+    """'alcista', 'bajista' o 'lateral' según el umbral de la MA"""
+    if pendiente > umbral:
+        return 'alcista'
+    elif pendiente < -umbral:
+        return 'bajista'
+    return 'lateral'
+
+
+def clasificar_segmentos(segmentos, umbral):
+    """Copia de los segmentos con su dirección ('direccion') según el umbral"""
+    return [{**segmento, 'direccion': clasificar_pendiente(segmento['pendiente'], umbral)}
+            for segmento in segmentos]
+
+
+def segmentos_en_rango(segmentos, inicio, fin):
+    """Segmentos (consecutivos y ordenados) que se solapan con [inicio, fin]"""
+    fines = pd.DatetimeIndex([segmento['fin_timestamp'] for segmento in segmentos])
+    inicios = pd.DatetimeIndex([segmento['inicio_timestamp'] for segmento in segmentos])
+    return segmentos[fines.searchsorted(inicio, side='left'):inicios.searchsorted(fin, side='right')]
+
+
+def tendencia_en(segmentos, timestamp, umbral, fines=None):
+    """
+    Dirección de la MA en un timestamp: la del primer segmento que lo contiene
+    (None si ninguno). Los segmentos son consecutivos y ordenados, así que
+    basta una búsqueda binaria; fines permite reutilizar la lista de finales.
+    """
+    if fines is None:
+        fines = pd.DatetimeIndex([segmento['fin_timestamp'] for segmento in segmentos])
+    i = fines.searchsorted(timestamp, side='left')
+    if i < len(segmentos) and segmentos[i]['inicio_timestamp'] <= timestamp:
+        return clasificar_pendiente(segmentos[i]['pendiente'], umbral)
+    return None
+
+
+def detectar_convergencias_ma(df, segmentos_ma1, segmentos_ma2, umbral_ma1, umbral_ma2):
+    """
+    Convergencias entre tendencias de las dos MAs: MA2 cambia de dirección
+    (hacia alcista o bajista) hacia la misma tendencia que tiene MA1 en ese
+    momento. MA1↘ + MA2→↘ es venta; MA1↗ + MA2→↗ es compra.
+
+    Args:
+        df: DataFrame con RSI y Close (índice temporal ordenado)
+        segmentos_ma1, segmentos_ma2: salida de segmentar_ma
+        umbral_ma1, umbral_ma2: umbrales de pendiente de cada MA
+
+    Returns:
+        list: dicts con timestamp, tipo, rsi, close, ma1_tendencia,
+              ma2_cambio y descripcion, en orden temporal
+    """
+    convergencias = []
+    fines_ma1 = pd.DatetimeIndex([segmento['fin_timestamp'] for segmento in segmentos_ma1])
+
+    for segmento_anterior, segmento_actual in zip(segmentos_ma2[:-1], segmentos_ma2[1:]):
+        tend_anterior = clasificar_pendiente(segmento_anterior['pendiente'], umbral_ma2)
+        tend_actual = clasificar_pendiente(segmento_actual['pendiente'], umbral_ma2)
+        # Solo cambios significativos (hacia alcista o hacia bajista)
+        if tend_actual == tend_anterior or tend_actual == 'lateral':
+            continue
+
+        # RSI y precio en ese momento (si no hay dato exacto, el más cercano)
+        timestamp = segmento_actual['inicio_timestamp']
+        posicion = df.index.get_indexer([timestamp])[0]
+        if posicion < 0:
+            posicion = df.index.get_indexer([timestamp], method='nearest')[0]
+            timestamp = df.index[posicion]
+
+        tendencia_ma1 = tendencia_en(segmentos_ma1, timestamp, umbral_ma1, fines_ma1)
+        if tendencia_ma1 == tend_actual:
+            venta = tend_actual == 'bajista'
+            convergencias.append({
+                'timestamp': timestamp,
+                'tipo': 'VENTA_CONVERGENCIA' if venta else 'COMPRA_CONVERGENCIA',
+                'rsi': df['RSI'].iat[posicion],
+                'close': df['Close'].iat[posicion],
+                'ma1_tendencia': tendencia_ma1,
+                'ma2_cambio': tend_actual,
+                'descripcion': 'MA1↘ + MA2→↘' if venta else 'MA1↗ + MA2→↗'
+            })
+
+    return convergencias
+
+
+def acumular_convergencias(persistentes, nuevas, tiempo_actual, separacion_s=5, max_edad_s=1800):
+    """
+    Añade a persistentes (en el sitio) las convergencias nuevas que no
+    repiten tipo a menos de separacion_s segundos de una existente, y descarta
+    las de más de max_edad_s segundos respecto a tiempo_actual.
+    """
+    for conv in nuevas:
+        es_nueva = all(
+            conv['tipo'] != existente['tipo']
+            or abs((conv['timestamp'] - existente['timestamp']).total_seconds()) >= separacion_s
+            for existente in persistentes
+        )
+        if es_nueva:
+            persistentes.append(conv)
+
+    persistentes[:] = [conv for conv in persistentes
+                       if (tiempo_actual - conv['timestamp']).total_seconds() < max_edad_s]
+    return persistentes
+
+
+def filtrar_consecutivas(convergencias):
+    """En orden temporal, omite las señales del mismo tipo que la anterior"""
+    filtradas = []
+    ultimo_tipo = None
+    for conv in sorted(convergencias, key=lambda c: c['timestamp']):
+        if conv['tipo'] != ultimo_tipo:
+            filtradas.append(conv)
+            ultimo_tipo = conv['tipo']
+    return filtradas
+
+
+def periodos_continuos(mask):
+    """Tramos (inicio, fin) inclusivos, en posiciones, donde mask es True"""
+    bordes = np.diff(np.concatenate(([0], np.asarray(mask, dtype=np.int8), [0])))
+    return list(zip(np.flatnonzero(bordes == 1).tolist(), (np.flatnonzero(bordes == -1) - 1).tolist()))
+
+
+def extremos_rsi(df, sobrecompra=70, sobreventa=30):
+    """
+    Máximo del cierre en cada período continuo de sobrecompra (RSI > 70) y
+    mínimo en cada período de sobreventa (RSI < 30).
+
+    Returns:
+        list: dicts con tipo ('MAX' o 'MIN'), timestamp (primera barra con ese
+              valor) y precio
+    """
+    cierre = df['Close'].to_numpy(dtype=float)
+    valores_rsi = df['RSI'].to_numpy(dtype=float)
+    extremos = []
+    for tipo, mascara, seleccionar in (('MAX', valores_rsi > sobrecompra, np.argmax),
+                                       ('MIN', valores_rsi < sobreventa, np.argmin)):
+        for inicio, fin in periodos_continuos(mascara):
+            posicion = inicio + int(seleccionar(cierre[inicio:fin + 1]))
+            extremos.append({'tipo': tipo, 'timestamp': df.index[posicion], 'precio': cierre[posicion]})
+    return extremos
+
+
+def cruces_rsi_macd(df, sobrecompra=70, sobreventa=30):
+    """
+    Cruces del MACD con su línea de señal que ocurren con el RSI en zona
+    extrema.
+
+    Returns:
+        list: dicts con timestamp, rsi, macd, signal, close, zona_rsi
+              ('sobrecompra'/'sobreventa') y cruce_macd ('alcista'/'bajista')
+    """
+    linea_macd = df['MACD'].to_numpy(dtype=float)
+    senal = df['Signal'].to_numpy(dtype=float)
+    valores_rsi = df['RSI'].to_numpy(dtype=float)
+    macd_prev = np.concatenate(([np.nan], linea_macd[:-1]))
+    senal_prev = np.concatenate(([np.nan], senal[:-1]))
+
+    # Alcista: MACD pasa de debajo a encima (o igual) de la señal; bajista al revés
+    alcistas = (macd_prev < senal_prev) & (linea_macd >= senal)
+    bajistas = (macd_prev > senal_prev) & (linea_macd <= senal)
+    extremo = (valores_rsi > sobrecompra) | (valores_rsi < sobreventa)
+
+    cierre = df['Close'].to_numpy(dtype=float)
+    return [{
+        'timestamp': df.index[i],
+        'rsi': valores_rsi[i],
+        'macd': linea_macd[i],
+        'signal': senal[i],
+        'close': cierre[i],
+        'zona_rsi': 'sobrecompra' if valores_rsi[i] > sobrecompra else 'sobreventa',
+        'cruce_macd': 'alcista' if alcistas[i] else 'bajista',
+    } for i in np.flatnonzero((alcistas | bajistas) & extremo)]
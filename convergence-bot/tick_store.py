@@ -0,0 +1,409 @@
+"""
+Almacén binario de ticks (aggTrades) para backtests a resolución de tick
+Descarga aggTrades de Binance, los guarda en bloques compactos con precios y
+timestamps codificados por deltas, y los reproduce en streaming sin cargar
+todo el archivo en memoria.
+"""
+
+import os
+import struct
+import numpy as np
+
+MAGIC = b'TICK'
+VERSION = 1
+
+# Cabecera de archivo: magic, versión, decimales de precio y cantidad, largo del símbolo
+_FILE_HEADER = struct.Struct('<4sHBBH')
+# Cabecera de bloque: n ticks, primer/último ts, primer precio, primer/último id, códigos de dtype
+_BLOCK_HEADER = struct.Struct('<IqqqqqBBB')
+
+_SIGNED_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+_UNSIGNED_DTYPES = [np.uint8, np.uint16, np.uint32, np.uint64]
+
+
+def _smallest_code(values, dtypes):
+    """Devuelve el índice del dtype más pequeño que representa todos los valores"""
+    if len(values) == 0:
+        return 0
+    lo, hi = int(values.min()), int(values.max())
+    for code, dtype in enumerate(dtypes):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return code
+    raise OverflowError("Valores fuera de rango para int64")
+
+
+def _decimals_from_step(step):
+    """Número de decimales de un tickSize/stepSize de Binance ('0.01000000' -> 2)"""
+    step = step.rstrip('0')
+    return len(step.split('.')[1]) if '.' in step else 0
+
+
+class TickStoreWriter:
+    """Escribe ticks en bloques delta-codificados"""
+
+    def __init__(self, path, symbol, price_decimals=8, qty_decimals=8, block_size=65536):
+        self.path = path
+        self.symbol = symbol
+        self.price_decimals = price_decimals
+        self.qty_decimals = qty_decimals
+        self.block_size = block_size
+        self.price_scale = 10 ** price_decimals
+        self.qty_scale = 10 ** qty_decimals
+        self.ticks_written = 0
+
+        self._pending = []
+        self._pending_count = 0
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            # Reanudar: verificar que la configuración coincide con el archivo
+            with open(path, 'rb') as f:
+                header = _read_file_header(f)
+            if (header['symbol'], header['price_decimals'], header['qty_decimals']) != \
+               (symbol, price_decimals, qty_decimals):
+                raise ValueError(f"El archivo {path} pertenece a otra configuración: {header}")
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'wb')
+            symbol_bytes = symbol.encode('ascii')
+            self._file.write(_FILE_HEADER.pack(MAGIC, VERSION, price_decimals, qty_decimals,
+                                               len(symbol_bytes)))
+            self._file.write(symbol_bytes)
+
+    def append(self, ids, timestamps, prices, quantities, buyer_maker):
+        """
+        Agrega ticks en orden cronológico.
+        prices/quantities en unidades reales (float o texto de la API).
+        """
+        chunk = {
+            'id': np.asarray(ids, dtype=np.int64),
+            'ts': np.asarray(timestamps, dtype=np.int64),
+            'price': np.rint(np.asarray(prices, dtype=np.float64) * self.price_scale).astype(np.int64),
+            'qty': np.rint(np.asarray(quantities, dtype=np.float64) * self.qty_scale).astype(np.int64),
+            'maker': np.asarray(buyer_maker, dtype=bool),
+        }
+        self._pending.append(chunk)
+        self._pending_count += len(chunk['ts'])
+        while self._pending_count >= self.block_size:
+            self._write_block(self.block_size)
+
+    def append_agg_trades(self, trades):
+        """Agrega una página de la respuesta de get_aggregate_trades"""
+        if not trades:
+            return
+        self.append(
+            [t['a'] for t in trades],
+            [t['T'] for t in trades],
+            [t['p'] for t in trades],
+            [t['q'] for t in trades],
+            [t['m'] for t in trades],
+        )
+
+    def _write_block(self, count):
+        """Escribe los primeros 'count' ticks pendientes como un bloque"""
+        merged = {k: np.concatenate([c[k] for c in self._pending]) for k in self._pending[0]}
+        block = {k: v[:count] for k, v in merged.items()}
+        rest = {k: v[count:] for k, v in merged.items()}
+        self._pending = [rest] if len(rest['ts']) else []
+        self._pending_count = len(rest['ts'])
+
+        ts_delta = np.diff(block['ts'])
+        price_delta = np.diff(block['price'])
+        ts_code = _smallest_code(ts_delta, _SIGNED_DTYPES)
+        price_code = _smallest_code(price_delta, _SIGNED_DTYPES)
+        qty_code = _smallest_code(block['qty'], _UNSIGNED_DTYPES)
+
+        self._file.write(_BLOCK_HEADER.pack(
+            count, int(block['ts'][0]), int(block['ts'][-1]), int(block['price'][0]),
+            int(block['id'][0]), int(block['id'][-1]), ts_code, price_code, qty_code))
+        self._file.write(ts_delta.astype(_SIGNED_DTYPES[ts_code]).tobytes())
+        self._file.write(price_delta.astype(_SIGNED_DTYPES[price_code]).tobytes())
+        self._file.write(block['qty'].astype(_UNSIGNED_DTYPES[qty_code]).tobytes())
+        self._file.write(np.packbits(block['maker']).tobytes())
+        self.ticks_written += count
+
+    def flush(self):
+        """Escribe los ticks pendientes como un bloque parcial"""
+        if self._pending_count:
+            self._write_block(self._pending_count)
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _read_file_header(f):
+    magic, version, price_decimals, qty_decimals, symbol_len = _FILE_HEADER.unpack(
+        f.read(_FILE_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError("No es un archivo de ticks válido")
+    if version != VERSION:
+        raise ValueError(f"Versión de archivo no soportada: {version}")
+    return {
+        'symbol': f.read(symbol_len).decode('ascii'),
+        'price_decimals': price_decimals,
+        'qty_decimals': qty_decimals,
+    }
+
+
+class TickStoreReader:
+    """Lee un archivo de ticks bloque a bloque"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = _read_file_header(f)
+            self._data_offset = f.tell()
+        self.symbol = header['symbol']
+        self.price_decimals = header['price_decimals']
+        self.qty_decimals = header['qty_decimals']
+        self.price_scale = 10 ** self.price_decimals
+        self.qty_scale = 10 ** self.qty_decimals
+
+    def _block_headers(self, f):
+        """Recorre las cabeceras de bloque devolviendo (cabecera, tamaño del cuerpo)"""
+        f.seek(self._data_offset)
+        while True:
+            raw = f.read(_BLOCK_HEADER.size)
+            if len(raw) < _BLOCK_HEADER.size:
+                return
+            count, first_ts, last_ts, first_price, first_id, last_id, ts_c, price_c, qty_c = \
+                _BLOCK_HEADER.unpack(raw)
+            body = ((count - 1) * (np.dtype(_SIGNED_DTYPES[ts_c]).itemsize +
+                                   np.dtype(_SIGNED_DTYPES[price_c]).itemsize) +
+                    count * np.dtype(_UNSIGNED_DTYPES[qty_c]).itemsize +
+                    (count + 7) // 8)
+            yield {
+                'count': count, 'first_ts': first_ts, 'last_ts': last_ts,
+                'first_price': first_price, 'first_id': first_id, 'last_id': last_id,
+                'codes': (ts_c, price_c, qty_c),
+            }, body
+
+    def _decode(self, header, raw):
+        """Decodifica el cuerpo de un bloque a arrays"""
+        count = header['count']
+        ts_c, price_c, qty_c = header['codes']
+        ts_dtype = np.dtype(_SIGNED_DTYPES[ts_c])
+        price_dtype = np.dtype(_SIGNED_DTYPES[price_c])
+        qty_dtype = np.dtype(_UNSIGNED_DTYPES[qty_c])
+
+        offset = 0
+        ts_delta = np.frombuffer(raw, ts_dtype, count - 1, offset)
+        offset += ts_delta.nbytes
+        price_delta = np.frombuffer(raw, price_dtype, count - 1, offset)
+        offset += price_delta.nbytes
+        qty = np.frombuffer(raw, qty_dtype, count, offset)
+        offset += qty.nbytes
+        maker = np.unpackbits(np.frombuffer(raw, np.uint8, (count + 7) // 8, offset))[:count]
+
+        ts = np.empty(count, dtype=np.int64)
+        ts[0] = header['first_ts']
+        np.cumsum(ts_delta, out=ts[1:])
+        ts[1:] += header['first_ts']
+
+        price = np.empty(count, dtype=np.int64)
+        price[0] = header['first_price']
+        np.cumsum(price_delta, out=price[1:])
+        price[1:] += header['first_price']
+
+        return {
+            'ts': ts,
+            'price': price / self.price_scale,
+            'qty': qty.astype(np.int64) / self.qty_scale,
+            'maker': maker.astype(bool),
+        }
+
+    def iter_blocks(self, start_ms=None, end_ms=None):
+        """
+        Genera bloques de ticks como dict de arrays (ts, price, qty, maker).
+        Los bloques fuera de [start_ms, end_ms) se saltan sin decodificar.
+        """
+        with open(self.path, 'rb') as f:
+            for header, body in self._block_headers(f):
+                if (start_ms is not None and header['last_ts'] < start_ms) or \
+                   (end_ms is not None and header['first_ts'] >= end_ms):
+                    f.seek(body, os.SEEK_CUR)
+                    if end_ms is not None and header['first_ts'] >= end_ms:
+                        return
+                    continue
+                block = self._decode(header, f.read(body))
+                if start_ms is not None or end_ms is not None:
+                    lo = 0 if start_ms is None else np.searchsorted(block['ts'], start_ms, 'left')
+                    hi = len(block['ts']) if end_ms is None else np.searchsorted(block['ts'], end_ms, 'left')
+                    block = {k: v[lo:hi] for k, v in block.items()}
+                if len(block['ts']):
+                    yield block
+
+    def replay(self, start_ms=None, end_ms=None):
+        """Iterador de ticks (ts, price, qty, buyer_maker) en orden cronológico"""
+        for block in self.iter_blocks(start_ms, end_ms):
+            yield from zip(block['ts'].tolist(), block['price'].tolist(),
+                           block['qty'].tolist(), block['maker'].tolist())
+
+    def cursor(self, start_ms=None):
+        """Cursor secuencial para consultas de barreras (ver TickCursor)"""
+        return TickCursor(self.iter_blocks(start_ms))
+
+    def last_id(self):
+        """Último id de aggTrade almacenado (para reanudar la descarga) o None"""
+        last = None
+        with open(self.path, 'rb') as f:
+            for header, body in self._block_headers(f):
+                last = header['last_id']
+                f.seek(body, os.SEEK_CUR)
+        return last
+
+    def time_range(self):
+        """(primer ts, último ts) del archivo o (None, None) si está vacío"""
+        first = last = None
+        with open(self.path, 'rb') as f:
+            for header, body in self._block_headers(f):
+                if first is None:
+                    first = header['first_ts']
+                last = header['last_ts']
+                f.seek(body, os.SEEK_CUR)
+        return first, last
+
+
+class TickCursor:
+    """
+    Avanza por los ticks en orden temporal respondiendo, de forma vectorizada
+    por bloque, qué barrera de precio se toca primero en un intervalo.
+    """
+
+    def __init__(self, blocks):
+        self._blocks = blocks
+        self._block = None
+        self._pos = 0
+
+    def _current(self):
+        while self._block is None or self._pos >= len(self._block['ts']):
+            self._block = next(self._blocks, None)
+            self._pos = 0
+            if self._block is None:
+                return None
+        return self._block
+
+    def skip_to(self, ts_ms):
+        """Descarta los ticks anteriores a ts_ms"""
+        while True:
+            block = self._current()
+            if block is None:
+                return
+            idx = int(np.searchsorted(block['ts'], ts_ms, 'left'))
+            if idx < len(block['ts']):
+                self._pos = max(self._pos, idx)
+                return
+            self._pos = len(block['ts'])
+
+    def first_cross(self, end_ms, upper=None, lower=None):
+        """
+        Consume ticks con ts < end_ms y devuelve (ts, precio, 'upper'|'lower')
+        del primero que cumple price >= upper o price <= lower, o None.
+        Tras un cruce el cursor queda en el tick siguiente.
+        """
+        while True:
+            block = self._current()
+            if block is None:
+                return None
+            ts = block['ts']
+            hi = int(np.searchsorted(ts, end_ms, 'left'))
+            if hi <= self._pos:
+                return None
+            prices = block['price'][self._pos:hi]
+            hit = np.zeros(len(prices), dtype=bool)
+            if upper is not None:
+                hit |= prices >= upper
+            if lower is not None:
+                hit |= prices <= lower
+            idx = np.flatnonzero(hit)
+            if len(idx):
+                j = self._pos + int(idx[0])
+                price = float(block['price'][j])
+                self._pos = j + 1
+                kind = 'upper' if upper is not None and price >= upper else 'lower'
+                return int(ts[j]), price, kind
+            self._pos = hi
+            if hi < len(ts):
+                return None
+
+
+def ingest_agg_trades(client, symbol, path, start_ms, end_ms, block_size=65536, verbose=True):
+    """
+    Descarga aggTrades de [start_ms, end_ms) y los agrega al archivo de ticks.
+    Si el archivo ya existe, reanuda desde el último id almacenado.
+
+    Returns:
+        int: número de ticks agregados
+    """
+    info = client.get_symbol_info(symbol)
+    filters = {f['filterType']: f for f in info['filters']}
+    price_decimals = _decimals_from_step(filters['PRICE_FILTER']['tickSize'])
+    qty_decimals = _decimals_from_step(filters['LOT_SIZE']['stepSize'])
+
+    from_id = None
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        last = TickStoreReader(path).last_id()
+        from_id = None if last is None else last + 1
+
+    added = 0
+    with TickStoreWriter(path, symbol, price_decimals, qty_decimals, block_size) as writer:
+        window_start = start_ms
+        while from_id is None and window_start < end_ms:
+            # La API limita startTime/endTime a ventanas de 1 hora
+            window_end = min(window_start + 3600 * 1000, end_ms) - 1
+            trades = client.get_aggregate_trades(symbol=symbol, startTime=window_start,
+                                                 endTime=window_end, limit=1000)
+            if trades:
+                writer.append_agg_trades(trades)
+                added += len(trades)
+                from_id = trades[-1]['a'] + 1
+            else:
+                window_start = window_end + 1
+
+        while from_id is not None:
+            trades = client.get_aggregate_trades(symbol=symbol, fromId=from_id, limit=1000)
+            trades = [t for t in trades if t['T'] < end_ms]
+            if not trades:
+                break
+            writer.append_agg_trades(trades)
+            added += len(trades)
+            from_id = trades[-1]['a'] + 1
+            if verbose and added % 100000 < len(trades):
+                print(f"📥 {added:,} ticks descargados")
+
+    if verbose:
+        print(f"✅ {added:,} ticks guardados en {path}")
+    return added
+
+
+def main():
+    """Descarga las últimas horas de aggTrades de BNBUSDT a un archivo de ticks"""
+    import time
+    from binance.client import Client
+
+    symbol = 'BNBUSDT'
+    hours = 6
+    end_ms = int(time.time() * 1000)
+    start_ms = end_ms - hours * 3600 * 1000
+    path = f"ticks_{symbol}.tick"
+
+    print(f"🚀 Descargando {hours}h de aggTrades de {symbol} → {path}")
+    ingest_agg_trades(Client(), symbol, path, start_ms, end_ms)
+
+    first, last = TickStoreReader(path).time_range()
+    if first is not None:
+        print(f"📅 Período: {np.datetime64(first, 'ms')} a {np.datetime64(last, 'ms')}")
+        print(f"💾 Tamaño: {os.path.getsize(path) / 1024 / 1024:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
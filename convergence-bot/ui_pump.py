@@ -0,0 +1,136 @@
+"""
+Bombeo de mensajes de un hilo de trabajo hacia Tk sin bloquear la interfaz
+Cada frame vacía la cola con un presupuesto de tiempo: los manejadores solo
+acumulan estado (precios, líneas de log) y al final del frame se aplica todo
+de una vez (un redibujado, una inserción en el log). Si la cola no se vacía
+dentro del presupuesto, el siguiente frame se programa de inmediato en lugar
+de esperar al intervalo, así la GUI sigue respondiendo aunque el hilo de
+trabajo inunde la cola. La duración de cada frame queda medida.
+"""
+
+import queue
+import time
+import tkinter as tk
+from collections import deque
+
+from live_chart import RingBuffer
+
+
+class LogView:
+    """
+    Log sobre un widget Text con inserción por lotes y retención limitada.
+
+    Las líneas se acumulan y se insertan juntas en flush(); el widget conserva
+    solo las últimas max_lines. Las pendientes viven en un buffer circular del
+    mismo tamaño: si llegan más líneas de las que caben entre dos frames, las
+    más antiguas se descartan sin llegar a insertarse.
+    """
+
+    def __init__(self, text_widget, max_lines=1000):
+        self.text = text_widget
+        self.max_lines = max_lines
+        self._pending = deque(maxlen=max_lines)
+        self.dropped = 0
+
+    def append(self, line):
+        """Añade una línea (sin salto final) para el siguiente flush"""
+        if len(self._pending) == self.max_lines:
+            self.dropped += 1
+        self._pending.append(line)
+
+    def flush(self):
+        """Inserta las líneas pendientes y recorta el widget. Devuelve si hubo cambios"""
+        if not self._pending:
+            return False
+        self.text.insert(tk.END, '\n'.join(self._pending) + '\n')
+        self._pending.clear()
+
+        # 'end-1c' queda al inicio de la línea vacía que sigue al último '\n'
+        lines = int(self.text.index('end-1c').split('.')[0]) - 1
+        if lines > self.max_lines:
+            self.text.delete('1.0', f'{lines - self.max_lines + 1}.0')
+        self.text.see(tk.END)
+        return True
+
+
+class MessagePump:
+    """
+    Consumidor periódico de una cola de mensajes (tipo, *args) en el hilo de Tk.
+
+    handlers: {tipo: función(*args)}; deben ser baratos (acumular estado).
+    flushers: funciones sin argumentos llamadas al final de cada frame que
+        aplican lo acumulado; devuelven True si hicieron algo.
+    """
+
+    def __init__(self, root, message_queue, handlers, flushers=(), interval_ms=50,
+                 budget_ms=15, history=120):
+        """
+        Args:
+            root: ventana de Tk (para root.after)
+            message_queue: queue.Queue que llena el hilo de trabajo
+            interval_ms: espera entre frames cuando la cola está al día
+            budget_ms: tiempo máximo de vaciado de la cola por frame
+            history: frames con trabajo que se guardan para las estadísticas
+        """
+        self.root = root
+        self.queue = message_queue
+        self.handlers = handlers
+        self.flushers = list(flushers)
+        self.interval_ms = interval_ms
+        self.budget = budget_ms / 1000.0
+        self.frame_ms = RingBuffer(history)
+        self.frames = 0
+        self.messages = 0
+        self.backlog_frames = 0
+        self._after_id = None
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._frame)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _frame(self):
+        start = time.perf_counter()
+        deadline = start + self.budget
+        processed = 0
+        backlog = False
+        try:
+            while True:
+                if time.perf_counter() >= deadline:
+                    backlog = True
+                    break
+                message = self.queue.get_nowait()
+                handler = self.handlers.get(message[0])
+                if handler is not None:
+                    handler(*message[1:])
+                processed += 1
+        except queue.Empty:
+            pass
+
+        # Cada flusher se llama siempre (no cortocircuitar con any)
+        flushed = [flush() for flush in self.flushers]
+        if processed or any(flushed):
+            self.frame_ms.append((time.perf_counter() - start) * 1000)
+            self.frames += 1
+            self.messages += processed
+        if backlog:
+            self.backlog_frames += 1
+
+        # Con mensajes atrasados, siguiente frame en cuanto Tk atienda sus eventos
+        self._after_id = self.root.after(1 if backlog else self.interval_ms, self._frame)
+
+    def stats(self):
+        """Duración de los frames recientes (ms) y contadores acumulados"""
+        times = self.frame_ms.view()
+        return {
+            'frames': self.frames,
+            'messages': self.messages,
+            'backlog_frames': self.backlog_frames,
+            'last_ms': float(times[-1]) if len(times) else 0.0,
+            'avg_ms': float(times.mean()) if len(times) else 0.0,
+            'max_ms': float(times.max()) if len(times) else 0.0,
+        }
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Optimización walk-forward de los umbrales de MAConvergenceBot
+Divide los datos en ventanas consecutivas: en cada una se buscan los mejores
+umbral_ma1/umbral_ma2 sobre el tramo de entrenamiento y se evalúan sobre el
+tramo siguiente (fuera de muestra). Las ventanas se procesan en paralelo.
+
+Reutilización entre ventanas y combinaciones:
+- Los indicadores (MAs, RSI, MACD) y las pendientes locales de cada MA se
+  calculan una sola vez sobre el archivo completo; cada ventana usa un corte.
+- Los segmentos de tendencia de cada tramo se calculan una vez y se comparten
+  entre todas las combinaciones de umbrales (solo cambia su clasificación).
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ma_convergence_bot import MAConvergenceBot
+
+# Misma rejilla logarítmica que test_ma_matrix_fast.py
+DEFAULT_UMBRALES = np.logspace(np.log10(0.0002), np.log10(0.1), 20)
+
+
+def make_windows(n_rows, train_size, test_size, step=None):
+    """
+    Ventanas (inicio_train, fin_train, fin_test) en posiciones de fila.
+    Por defecto cada ventana avanza test_size filas, de modo que los tramos
+    de prueba son consecutivos y no se solapan.
+    """
+    step = step or test_size
+    return [(start, start + train_size, start + train_size + test_size)
+            for start in range(0, n_rows - train_size - test_size + 1, step)]
+
+
+class SliceEvaluator:
+    """
+    Backtests de MAConvergenceBot sobre cortes de un mismo DataFrame.
+
+    Los indicadores vienen ya calculados sobre el archivo completo y las
+    pendientes locales de cada MA se calculan una sola vez; los segmentos de
+    cada corte se guardan y se comparten entre todos los umbrales probados.
+    """
+
+    def __init__(self, data, ma1_period="MA7", ma2_period="MA25", slopes=None, **bot_kwargs):
+        """
+        Args:
+            data: DataFrame de MAConvergenceBot.load_data (con indicadores)
+            slopes: pendientes locales ya calculadas {columna MA: array}
+                (None = calcularlas aquí)
+            bot_kwargs: resto de parámetros de MAConvergenceBot
+                (take_profit, stop_loss, initial_capital...)
+        """
+        self.data = data
+        self.ma1_period = ma1_period
+        self.ma2_period = ma2_period
+        self.bot_kwargs = bot_kwargs
+        self.slopes = slopes if slopes is not None else self.compute_slopes(data, (ma1_period, ma2_period))
+        self._segments = {}
+
+    @staticmethod
+    def compute_slopes(data, ma_columns):
+        """Pendientes locales de cada MA sobre la serie completa (alineadas a las filas)"""
+        slopes = {}
+        for ma_column in dict.fromkeys(ma_columns):
+            valid = data[ma_column].notna().to_numpy()
+            slopes[ma_column] = np.full(len(data), np.nan)
+            slopes[ma_column][valid] = MAConvergenceBot.local_slopes(data[ma_column].dropna())
+        return slopes
+
+    def segments(self, start, end):
+        """Segmentos sin clasificar de las MAs del bot para las filas [start, end)"""
+        key = (start, end)
+        if key not in self._segments:
+            cache = {}
+            for ma_column in (self.ma1_period, self.ma2_period):
+                column = self.data[ma_column].iloc[start:end]
+                positions = np.flatnonzero(column.notna().to_numpy()) + start
+                local_slopes = None
+                if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+                    # Tramo sin huecos: las pendientes de la serie completa valen aquí
+                    local_slopes = self.slopes[ma_column][positions[0]:positions[-1] + 1]
+                cache[ma_column] = MAConvergenceBot.segment_ma(column.dropna(), local_slopes)
+            self._segments[key] = cache
+        return self._segments[key]
+
+    def run(self, start, end, umbral_ma1, umbral_ma2):
+        """Backtest de las filas [start, end) con los umbrales indicados"""
+        bot = MAConvergenceBot(
+            ma1_period=self.ma1_period,
+            ma2_period=self.ma2_period,
+            umbral_ma1=umbral_ma1,
+            umbral_ma2=umbral_ma2,
+            verbose=False,
+            **self.bot_kwargs
+        )
+        bot.data = self.data.iloc[start:end]
+        bot.segment_cache = self.segments(start, end)
+        return bot.run_backtest()
+
+
+# Estado compartido de cada worker (se inicializa una vez por proceso)
+_shared = {}
+
+
+def _init_worker(data, slopes, settings):
+    _shared['settings'] = settings
+    _shared['evaluator'] = SliceEvaluator(
+        data, settings['ma1_period'], settings['ma2_period'], slopes,
+        take_profit=settings['take_profit'],
+        stop_loss=settings['stop_loss'],
+        initial_capital=settings['initial_capital']
+    )
+
+
+def _optimize_window(window):
+    """Busca los mejores umbrales en el tramo de entrenamiento y evalúa el de prueba"""
+    train_start, train_end, test_end = window
+    settings = _shared['settings']
+    evaluator = _shared['evaluator']
+    metric = settings['metric']
+    index = evaluator.data.index
+    t0 = time.perf_counter()
+
+    best = None
+    for umbral_ma1 in settings['umbrales_ma1']:
+        for umbral_ma2 in settings['umbrales_ma2']:
+            result = evaluator.run(train_start, train_end, umbral_ma1, umbral_ma2)
+            if result['total_trades'] < settings['min_trades']:
+                continue
+            if best is None or result[metric] > best[2][metric]:
+                best = (umbral_ma1, umbral_ma2, result)
+
+    row = {
+        'train_inicio': index[train_start],
+        'train_fin': index[train_end - 1],
+        'test_inicio': index[train_end],
+        'test_fin': index[test_end - 1],
+        'umbral_ma1': np.nan,
+        'umbral_ma2': np.nan,
+        f'train_{metric}': np.nan,
+        'train_trades': 0,
+        'test_retorno_pct': 0.0,
+        'test_trades': 0,
+        'test_win_rate': 0.0,
+    }
+    if best is not None:
+        umbral_ma1, umbral_ma2, train_result = best
+        test_result = evaluator.run(train_end, test_end, umbral_ma1, umbral_ma2)
+        row.update({
+            'umbral_ma1': umbral_ma1,
+            'umbral_ma2': umbral_ma2,
+            f'train_{metric}': train_result[metric],
+            'train_trades': train_result['total_trades'],
+            'test_retorno_pct': test_result['retorno_pct'],
+            'test_trades': test_result['total_trades'],
+            'test_win_rate': test_result['win_rate'],
+        })
+    row['segundos'] = time.perf_counter() - t0
+    return row
+
+
+def walk_forward(csv_file, train_size=6000, test_size=2000, step=None,
+                 umbrales_ma1=DEFAULT_UMBRALES, umbrales_ma2=DEFAULT_UMBRALES,
+                 ma1_period="MA7", ma2_period="MA25", take_profit=0.002, stop_loss=0.001,
+                 initial_capital=1000.0, metric='retorno_pct', min_trades=1,
+                 max_workers=None, callback=None):
+    """
+    Ejecuta la optimización walk-forward sobre un CSV de velas.
+
+    Args:
+        csv_file: CSV con el formato que acepta MAConvergenceBot.load_data
+        train_size, test_size: filas de los tramos de entrenamiento y prueba
+        step: filas que avanza cada ventana (por defecto test_size)
+        umbrales_ma1, umbrales_ma2: rejilla de umbrales a probar
+        metric: campo del resultado a maximizar en entrenamiento
+        min_trades: operaciones mínimas en entrenamiento para aceptar una
+            combinación (si ninguna llega, la ventana no opera en la prueba)
+        max_workers: procesos en paralelo (por defecto núcleos disponibles)
+        callback: función opcional para mensajes de progreso
+
+    Returns:
+        tuple: (DataFrame con una fila por ventana, dict resumen con los
+                umbrales recomendados y el retorno fuera de muestra)
+    """
+    log = callback or (lambda message: None)
+    start = time.perf_counter()
+
+    loader = MAConvergenceBot(ma1_period=ma1_period, ma2_period=ma2_period, verbose=False)
+    if not loader.load_data(csv_file):
+        raise ValueError(f"No se pudieron cargar datos de {csv_file}")
+    data = loader.data
+
+    windows = make_windows(len(data), train_size, test_size, step)
+    if not windows:
+        raise ValueError(f"{len(data)} filas no alcanzan para train={train_size} + test={test_size}")
+
+    slopes = SliceEvaluator.compute_slopes(data, (ma1_period, ma2_period))
+    log(f"✅ {len(data)} velas, {len(windows)} ventanas, "
+        f"{len(umbrales_ma1) * len(umbrales_ma2)} combinaciones por ventana "
+        f"(indicadores en {time.perf_counter() - start:.1f}s)")
+
+    settings = {
+        'ma1_period': ma1_period, 'ma2_period': ma2_period,
+        'take_profit': take_profit, 'stop_loss': stop_loss,
+        'initial_capital': initial_capital, 'metric': metric, 'min_trades': min_trades,
+        'umbrales_ma1': list(umbrales_ma1), 'umbrales_ma2': list(umbrales_ma2),
+    }
+    max_workers = max_workers or min(len(windows), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(data, slopes, settings)) as pool:
+        rows = []
+        for i, row in enumerate(pool.map(_optimize_window, windows), 1):
+            rows.append(row)
+            log(f"[{i}/{len(windows)}] {row['test_inicio']} → MA1={row['umbral_ma1']:.4f} "
+                f"MA2={row['umbral_ma2']:.4f} | prueba: {row['test_retorno_pct']:+.3f}% "
+                f"({row['test_trades']} trades, {row['segundos']:.1f}s)")
+
+    table = pd.DataFrame(rows)
+    chosen = table.dropna(subset=['umbral_ma1'])
+    summary = {
+        # Mediana geométrica: la rejilla es logarítmica
+        'umbral_ma1': float(np.exp(np.log(chosen['umbral_ma1']).median())) if len(chosen) else np.nan,
+        'umbral_ma2': float(np.exp(np.log(chosen['umbral_ma2']).median())) if len(chosen) else np.nan,
+        'ventanas': len(table),
+        'ventanas_con_operaciones': int((table['test_trades'] > 0).sum()),
+        'retorno_fuera_muestra_pct': (np.prod(1 + table['test_retorno_pct'] / 100) - 1) * 100,
+        'segundos': time.perf_counter() - start,
+    }
+    log(f"⏱️ Walk-forward completado en {summary['segundos']:.1f}s con {max_workers} procesos")
+    return table, summary
+
+
+def main():
+    """Walk-forward de MA7/MA25 sobre el CSV de 1s más reciente de Bots Info"""
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Bots Info')
+    csv_files = sorted(glob.glob(os.path.join(data_dir, 'binance_BNBUSDT_1s_*.csv')))
+    if not csv_files:
+        print("❌ No se encontraron archivos binance_BNBUSDT_1s_*.csv")
+        return
+
+    csv_file = csv_files[-1]
+    print(f"📁 Usando archivo: {os.path.basename(csv_file)}")
+    table, summary = walk_forward(csv_file, callback=print)
+
+    print("\n" + "=" * 60)
+    print("📊 RESULTADO WALK-FORWARD")
+    print("=" * 60)
+    print(f"🎯 Umbrales recomendados: MA1={summary['umbral_ma1']:.4f} | MA2={summary['umbral_ma2']:.4f}")
+    print(f"📈 Retorno fuera de muestra: {summary['retorno_fuera_muestra_pct']:+.3f}%")
+    print(f"🔄 Ventanas con operaciones: {summary['ventanas_con_operaciones']}/{summary['ventanas']}")
+
+    filename = f"walk_forward_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    table.to_csv(filename, index=False)
+    print(f"💾 Resultados guardados en: {filename}")
+
+
+if __name__ == "__main__":
+    main()